@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+回测基准测试（耗时较长，需指定--slow）
+
+在临时目录生成BACKTEST_CODES只股票、BACKTEST_DAYS个交易日的合成K线存储，
+分别用单进程BacktestEngine和多进程ParallelBacktestRunner回测，比较每根K线的耗时。
+多进程的加速比取决于CPU核心数，结果中记录了实际使用的进程数。
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_xtquant import install, session_minutes
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from trader.backtest import BacktestContext, BacktestEngine
+from trader.bar_store import BarStore
+from trader.parallel_backtest import ParallelBacktestRunner
+
+from strategys.一进二低吸战法.strategy import YiJinErDiXiStrategy
+
+# 合成K线存储的股票数和交易日数
+BACKTEST_CODES = 30
+BACKTEST_DAYS = 40
+
+
+def create_strategy(context, params=None):
+    """
+    多进程回测的策略工厂函数
+    """
+    return YiJinErDiXiStrategy(context, True, params)
+
+
+def create_stock_pool(bar_store):
+    """
+    多进程回测的股票池工厂函数，每天以存储中的全部股票作为股票池
+    """
+    return bar_store.get_codes('1m')
+
+
+def build_bar_store(root, codes, days, seed=0):
+    """
+    生成合成的日线和1分钟K线存储
+
+    参数:
+        root (str): 存储目录
+        codes (list): 股票代码列表
+        days (list): 交易日列表（date）
+        seed (int): 随机种子
+
+    返回:
+        BarStore: K线存储
+    """
+    rng = np.random.default_rng(seed)
+    store = BarStore(root)
+    pre_close = rng.uniform(5, 50, len(codes))
+    daily = {field: np.empty((len(codes), len(days))) for field in ('open', 'high', 'low', 'close', 'volume', 'amount', 'preClose')}
+    for d, day in enumerate(days):
+        steps = rng.normal(0, 0.003, (len(codes), 240))
+        close = np.round(pre_close[:, None] * np.exp(np.cumsum(steps, axis=1)), 2)
+        close = np.clip(close, np.round(pre_close * 0.9, 2)[:, None], np.round(pre_close * 1.1, 2)[:, None])
+        open_ = np.concatenate([np.round(pre_close[:, None] * (1 + rng.normal(0, 0.005, (len(codes), 1))), 2),
+                                close[:, :-1]], axis=1)
+        high = np.maximum(open_, close) + 0.01
+        low = np.minimum(open_, close) - 0.01
+        volume = np.round(rng.uniform(10, 2000, close.shape))
+        minute = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+                  'amount': volume * 100 * close}
+        store.append('1m', codes, session_minutes(day), minute)
+        for field, values in (('open', open_[:, 0]), ('high', high.max(axis=1)), ('low', low.min(axis=1)),
+                              ('close', close[:, -1]), ('volume', volume.sum(axis=1)),
+                              ('amount', minute['amount'].sum(axis=1)), ('preClose', pre_close)):
+            daily[field][:, d] = values
+        pre_close = close[:, -1]
+    store.append('1d', codes, [day.strftime('%Y%m%d') for day in days], daily)
+    return store
+
+
+def _prepare_store():
+    root = tempfile.mkdtemp(prefix='qmt-benchmarks-bars-')
+    days = [d.date() for d in pd.bdate_range(end=market.trading_day, periods=BACKTEST_DAYS)]
+    store = build_bar_store(root, market.codes[:BACKTEST_CODES], days)
+    partitions = store.list_partitions('1m')
+    return root, store, partitions[0], partitions[-1]
+
+
+@benchmark('backtest.serial', '单进程分钟线回测，每项为一根K线', number=1, repeat=1, slow=True)
+def bench_backtest_serial():
+    root, store, start, end = _prepare_store()
+    bar_count = [0]
+
+    def run():
+        context = BacktestContext(initial_cash=1000000)
+        engine = BacktestEngine(context, create_strategy(context), store, create_stock_pool(store),
+                                log_level=logging.WARNING)
+        engine.run(start, end)
+        bar_count[0] = engine.bar_count
+
+    run()
+    return Case(run, items=bar_count[0], metrics={'K线数': bar_count[0]},
+                teardown=lambda: shutil.rmtree(root, ignore_errors=True))
+
+
+@benchmark('backtest.parallel', '多进程分段分钟线回测（进程数为CPU核心数），每项为一根K线', number=1, repeat=1, slow=True)
+def bench_backtest_parallel():
+    root, store, start, end = _prepare_store()
+    workers = os.cpu_count() or 1
+    runner = ParallelBacktestRunner(create_strategy, create_stock_pool, bar_root=root, initial_cash=1000000,
+                                    max_workers=workers)
+    bars = BACKTEST_CODES * BACKTEST_DAYS * 240
+    return Case(lambda: runner.run(start, end), items=bars, metrics={'进程数': workers, 'K线数': bars},
+                teardown=lambda: shutil.rmtree(root, ignore_errors=True))
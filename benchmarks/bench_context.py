@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+交易上下文和工具函数基准测试
+
+- Context.get_positions：50只持仓，由持仓簿记生成DataFrame
+- Context.get_position：策略每根K线调用一次的单只股票持仓查询
+- add_stock_suffix：全市场5000个不带后缀的股票代码
+"""
+
+from benchmarks.fake_xtquant import close_context, create_context, install
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from trader.utils import add_stock_suffix
+
+# 持仓股票数量
+POSITION_COUNT = 50
+
+
+@benchmark('context.get_positions_50', '查询50只股票的持仓DataFrame')
+def bench_get_positions():
+    context = create_context(position_codes=market.codes[:POSITION_COUNT])
+    positions = context.get_positions()
+    return Case(context.get_positions, metrics={'持仓数': len(positions)}, teardown=lambda: close_context(context))
+
+
+@benchmark('context.get_position', '在50只持仓中查询单只股票的持仓')
+def bench_get_position():
+    context = create_context(position_codes=market.codes[:POSITION_COUNT])
+    stock_code = market.codes[POSITION_COUNT // 2]
+    return Case(lambda: context.get_position(stock_code), teardown=lambda: close_context(context))
+
+
+@benchmark('utils.add_stock_suffix_5000', '为全市场5000个股票代码添加后缀，每项为一个代码')
+def bench_add_stock_suffix():
+    raw_codes = list(market.raw_codes)
+    return Case(lambda: add_stock_suffix(raw_codes), items=len(raw_codes))
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+批量历史数据下载基准测试
+
+- BulkDownloader：全市场5000只股票分25块，数据客户端替身每次调用耗时20毫秒，
+  分别测量串行调用客户端（默认）和允许并发调用时的耗时，指标中记录同时进行的最大调用数
+"""
+
+from benchmarks.fake_xtquant import FakeDownloadClient, install
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from trader.downloader import BulkDownloader
+
+# 每块股票数量和同时处理的最大块数，与CustomData.download_qmt_history_data的默认值相同
+CHUNK_SIZE = 200
+MAX_WORKERS = 4
+# 数据客户端每次调用的耗时（秒）
+LATENCY = 0.02
+
+
+def _download_case(concurrent_calls):
+    client = FakeDownloadClient(latency=LATENCY)
+    downloader = BulkDownloader(client, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS, checkpoint_path=None,
+                                show_progress=False, concurrent_calls=concurrent_calls)
+    codes = list(market.codes)
+    downloader.download(codes)
+    metrics = {'块数': client.calls, '最大并发调用数': client.max_active}
+    return Case(lambda: downloader.download(codes), items=len(codes), metrics=metrics)
+
+
+@benchmark('downloader.serial_5000', '5000只股票分块下载，串行调用客户端，每项为一只股票', repeat=3)
+def bench_download_serial():
+    return _download_case(concurrent_calls=False)
+
+
+@benchmark('downloader.concurrent_5000', '5000只股票分块下载，4块并发调用客户端，每项为一只股票', repeat=3)
+def bench_download_concurrent():
+    return _download_case(concurrent_calls=True)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+metatable数据表读取基准测试
+
+FakeTableClient中的合成财务数据表：全市场每只股票REPORT_COUNT期，每行为BSON编码的宽表，
+除S（代码）、G（时间）外有VALUE_FIELDS个数值字段，读取时只请求其中REQUEST_FIELDS个：
+- 全市场读取：codes为空，扫描全市场数据文件
+- 按代码过滤：股票没有单独的数据文件时，扫描全市场数据文件并按S字段过滤
+- 单独数据文件：股票有单独的数据文件时逐个文件读取
+- 逐行完整解码再选取字段（只解码请求字段之前的做法），用于对比
+- 分批读取：iter_tabular_data逐批返回DataFrame，与一次读取全部数据比较峰值内存
+
+安装了pyarrow时，另在临时目录生成FEATHER_ROWS行的Feather格式数据表（约2GB，需指定--slow），
+比较以pyarrow.dataset分批扫描和get_tabular_fe_data一次读取整个文件的耗时和峰值内存。
+峰值内存为pyarrow内存池的峰值加tracemalloc记录的峰值。
+"""
+
+import os
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.fake_xtquant import install
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from xtquant import xtbson
+from xtquant.metatable import get_arrow, get_bson
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# 数据表的metaid和表名
+TABLE_ID = 9001
+TABLE_NAME = 'BenchReport'
+
+# 每只股票的报告期数、数值字段数和请求的字段数
+REPORT_COUNT = 8
+VALUE_FIELDS = 40
+REQUEST_FIELDS = 3
+
+# 按代码读取的股票数量
+QUERY_CODES = 50
+
+# 分批读取的每批行数
+BATCH_SIZE = 4096
+
+# Feather格式数据表的行数，每行约340字节
+FEATHER_ROWS = 6000000
+
+
+def build_table(codes, seed=0):
+    """
+    生成合成数据表的表结构和数据行
+
+    参数:
+        codes (list): 股票代码列表
+        seed (int): 随机种子
+
+    返回:
+        tuple: (metainfo, rows)
+    """
+    rng = np.random.default_rng(seed)
+    fields = {
+        'S': {'modelName': 'stock_code', 'fieldNameCn': '股票代码', 'type': 'string', 'unit': ''},
+        'G': {'modelName': 'report_time', 'fieldNameCn': '报告期', 'type': 'long', 'unit': ''},
+    }
+    for i in range(VALUE_FIELDS):
+        fields[f'v{i:02d}'] = {'modelName': f'value_{i:02d}', 'fieldNameCn': f'数值{i:02d}', 'type': 'double', 'unit': '元'}
+    metainfo = {'I': TABLE_ID, 'modelName': TABLE_NAME, 'tableNameCn': '基准测试报表', 'fields': fields}
+
+    report_times = [int(t) for t in np.arange(REPORT_COUNT) * 7776000000 + 1577808000000]
+    values = np.round(rng.normal(1e8, 3e7, (len(codes) * REPORT_COUNT, VALUE_FIELDS)), 2).tolist()
+    rows = []
+    for i, code in enumerate(codes):
+        for j, report_time in enumerate(report_times):
+            row = {'S': code, 'G': report_time}
+            row.update(zip((f'v{k:02d}' for k in range(VALUE_FIELDS)), values[i * REPORT_COUNT + j]))
+            rows.append(row)
+    return metainfo, rows
+
+
+metainfo, rows = build_table(market.codes)
+per_code = market.codes[:QUERY_CODES]
+filtered = market.codes[QUERY_CODES:QUERY_CODES * 2]
+xtdata.get_client().add_table(metainfo, rows, per_code=per_code)
+request_fields = [f'{TABLE_NAME}.value_{i:02d}' for i in range(REQUEST_FIELDS)]
+
+
+@benchmark('metatable.tabular_data_whole_market', f'全市场{REPORT_COUNT}期数据表读取{REQUEST_FIELDS}个字段，每项为一行')
+def bench_tabular_data_whole_market():
+    return Case(lambda: get_bson.get_tabular_data([], request_fields, '', '', ''), items=len(rows))
+
+
+@benchmark('metatable.tabular_data_filtered', f'{QUERY_CODES}只没有单独数据文件的股票，扫描全市场数据按代码过滤，每项为扫描的一行')
+def bench_tabular_data_filtered():
+    return Case(lambda: get_bson.get_tabular_data(filtered, request_fields, '', '', ''), items=len(rows))
+
+
+@benchmark('metatable.tabular_data_per_code', f'{QUERY_CODES}只有单独数据文件的股票逐个文件读取，每项为一行')
+def bench_tabular_data_per_code():
+    return Case(lambda: get_bson.get_tabular_data(per_code, request_fields, '', '', ''),
+                items=QUERY_CODES * REPORT_COUNT)
+
+
+@benchmark('metatable.tabular_bson_whole_market', f'全市场数据表读取{REQUEST_FIELDS}个字段并编码为BSON，每项为一行')
+def bench_tabular_bson_whole_market():
+    return Case(lambda: get_bson.get_tabular_bson([], request_fields, '', '', ''), items=len(rows))
+
+
+@benchmark('metatable.full_decode_whole_market', '全市场数据逐行完整解码后选取请求的字段（只解码请求字段之前的做法），用于对比')
+def bench_full_decode_whole_market():
+    datas = xtdata.get_client().files[xtdata._get_data_file_path(['XXXXXX.XX'], (TABLE_ID, 0))['XXXXXX.XX']]
+    keys = [f'v{i:02d}' for i in range(REQUEST_FIELDS)]
+
+    def run():
+        result = []
+        for data in datas:
+            idata = xtbson.decode(data)
+            result.append({k: idata[k] for k in keys if k in idata})
+        return result
+
+    return Case(run, items=len(datas))
+
+
+def _peak_memory(func):
+    """
+    单独运行一次func，返回峰值内存（字节）：pyarrow内存池的峰值（安装了pyarrow时）加tracemalloc记录的峰值
+    """
+    default_pool = pool = None
+    if pa is not None:
+        default_pool = pa.default_memory_pool()
+        pool = pa.proxy_memory_pool(default_pool)
+        pa.set_memory_pool(pool)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        if pool is not None:
+            pa.set_memory_pool(default_pool)
+    return peak + (pool.max_memory() if pool is not None else 0)
+
+
+def _consume(batches):
+    """
+    读取全部批次，返回总行数
+    """
+    return sum(len(batch) for batch in batches)
+
+
+@benchmark('metatable.iter_tabular_data_whole_market', f'全市场数据表分批读取{REQUEST_FIELDS}个字段，每批{BATCH_SIZE}行，每项为一行')
+def bench_iter_tabular_data_whole_market():
+    def run():
+        return _consume(get_bson.iter_tabular_data([], request_fields, '', '', '', batch_size=BATCH_SIZE))
+
+    metrics = {
+        '分批峰值内存(字节)': _peak_memory(run),
+        '一次读取峰值内存(字节)': _peak_memory(lambda: get_bson.get_tabular_data([], request_fields, '', '', '')),
+    }
+    return Case(run, items=len(rows), metrics=metrics)
+
+
+def write_feather_table(path, codes, row_count, seed=0, chunk_rows=100000):
+    """
+    分块生成并写入Feather格式的合成数据表，列为_stock、_time和VALUE_FIELDS个数值字段，按_time排序
+
+    参数:
+        path (str): 文件路径
+        codes (list): 股票代码列表，每个时间全部股票各一行
+        row_count (int): 行数
+        seed (int): 随机种子
+        chunk_rows (int): 每次生成和写入的行数
+
+    返回:
+        int: 文件字节数
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    schema = pa.schema([('_stock', pa.string()), ('_time', pa.int64())]
+                       + [(f'value_{i:02d}', pa.float64()) for i in range(VALUE_FIELDS)])
+    codes = np.array(codes, dtype=object)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for start in range(0, row_count, chunk_rows):
+            index = np.arange(start, min(start + chunk_rows, row_count))
+            columns = [pa.array(codes[index % len(codes)], pa.string()),
+                       pa.array(1577808000000 + index // len(codes) * 86400000, pa.int64())]
+            columns += [pa.array(rng.normal(1e8, 3e7, len(index))) for _ in range(VALUE_FIELDS)]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+    return os.path.getsize(path)
+
+
+_feather_size = []
+
+
+def _feather_table():
+    """
+    生成Feather格式数据表（同一进程只生成一次），返回文件字节数
+    """
+    if not _feather_size:
+        path = os.path.join(xtdata.get_data_dir(), 'EP', f'{TABLE_NAME}_Xdat2', 'data.fe')
+        _feather_size.append(write_feather_table(path, market.codes, FEATHER_ROWS))
+    return _feather_size[0]
+
+
+def _feather_case(func):
+    size = _feather_table()
+    metrics = {'文件大小(字节)': size, '峰值内存(字节)': _peak_memory(func)}
+    return Case(func, items=FEATHER_ROWS, metrics=metrics)
+
+
+if pa is not None:
+    @benchmark('metatable.iter_tabular_fe_data_large', f'{FEATHER_ROWS}行Feather数据表分批扫描{REQUEST_FIELDS}个字段，每批{BATCH_SIZE}行，每项为一行',
+               number=1, repeat=1, slow=True)
+    def bench_iter_tabular_fe_data_large():
+        return _feather_case(lambda: _consume(get_arrow.iter_tabular_fe_data([], request_fields, '', '', '',
+                                                                             batch_size=BATCH_SIZE)))
+
+    @benchmark('metatable.iter_tabular_fe_data_large_filtered', f'{FEATHER_ROWS}行Feather数据表分批扫描，按{QUERY_CODES}只股票和时间范围过滤，每项为文件中的一行',
+               number=1, repeat=1, slow=True)
+    def bench_iter_tabular_fe_data_large_filtered():
+        return _feather_case(lambda: _consume(get_arrow.iter_tabular_fe_data(filtered, request_fields, '', '20200301', '20200630',
+                                                                             batch_size=BATCH_SIZE)))
+
+    @benchmark('metatable.tabular_fe_data_large', f'{FEATHER_ROWS}行Feather数据表一次读取整个文件后选取{REQUEST_FIELDS}个字段，用于对比',
+               number=1, repeat=1, slow=True)
+    def bench_tabular_fe_data_large():
+        return _feather_case(lambda: get_arrow.get_tabular_fe_data([], request_fields, '', '', ''))
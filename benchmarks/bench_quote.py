@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+行情推送基准测试
+
+- BSON解码：全推快照和1分钟K线推送，与xtdata.subscribe_callback_wrapper对推送数据的处理相同，
+  另外给出通用解码器和首次解码（没有已缓存的文档布局）的耗时用于对比
+- QuoteHub分发：合成的全市场全推快照经xtdata替身推送到QuoteHub，再按股票分发到处理函数
+- BarBuilder合成：一个交易日的分笔快照合成1分钟K线
+"""
+
+from benchmarks.fake_xtquant import install
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from xtquant import xtbson
+from xtquant.xtbson.bson37 import DEFAULT_CODEC_OPTIONS, _bson_to_dict, _fast_decode
+
+from trader.bar_builder import BarBuilder
+from trader.quote_hub import QuoteHub
+
+# 策略股票池的规模
+POOL_SIZE = 50
+
+
+@benchmark('quote.bson_decode_whole_quote', '解码一次全市场全推快照（5000只股票），每项为一只股票')
+def bench_bson_decode_whole_quote():
+    push = market.tick_pushes(market.codes, ticks_per_minute=1, minutes=[100])[0]
+    payload = xtbson.BSON.encode(push)
+    return Case(lambda: xtbson.BSON.decode(payload), items=len(push), metrics={'字节数': len(payload)})
+
+
+@benchmark('quote.bson_decode_1m', '解码股票池的1分钟K线推送（50只股票各1根），每项为一根K线')
+def bench_bson_decode_1m():
+    push = market.bar_pushes(market.codes[:POOL_SIZE], minutes=[100])[0]
+    payload = xtbson.BSON.encode(push)
+    return Case(lambda: xtbson.BSON.decode(payload), items=len(push), metrics={'字节数': len(payload)})
+
+
+@benchmark('quote.bson_decode_whole_quote_generic', '用通用解码器解码全市场全推快照（快速解码之前的做法），用于对比')
+def bench_bson_decode_whole_quote_generic():
+    push = market.tick_pushes(market.codes, ticks_per_minute=1, minutes=[100])[0]
+    payload = xtbson.BSON.encode(push)
+    return Case(lambda: _bson_to_dict(payload, DEFAULT_CODEC_OPTIONS), items=len(push))
+
+
+@benchmark('quote.bson_decode_whole_quote_cold', '解码全推快照，每次调用前清空已缓存的文档布局，即开盘后的第一次推送')
+def bench_bson_decode_whole_quote_cold():
+    push = market.tick_pushes(market.codes, ticks_per_minute=1, minutes=[100])[0]
+    payload = xtbson.BSON.encode(push)
+
+    def run():
+        _fast_decode._LAYOUTS.clear()
+        _fast_decode._SEEN.clear()
+        xtbson.BSON.decode(payload)
+
+    return Case(run, items=len(push))
+
+
+@benchmark('quote.bson_decode_1m_generic', '用通用解码器解码股票池的1分钟K线推送（快速解码之前的做法），用于对比')
+def bench_bson_decode_1m_generic():
+    push = market.bar_pushes(market.codes[:POOL_SIZE], minutes=[100])[0]
+    payload = xtbson.BSON.encode(push)
+    return Case(lambda: _bson_to_dict(payload, DEFAULT_CODEC_OPTIONS), items=len(push))
+
+
+@benchmark('quote.hub_dispatch_whole_quote', '全市场全推快照经QuoteHub分发到订阅的处理函数，每项为一只股票')
+def bench_hub_dispatch_whole_quote():
+    hub = QuoteHub(xtdata.subscribe_quote, xtdata.subscribe_whole_quote, xtdata.unsubscribe_quote)
+    received = []
+    hub.subscribe(market.codes, lambda stock_code, data: received.append(stock_code), period='tick')
+    push = market.tick_pushes(market.codes, ticks_per_minute=1, minutes=[100])[0]
+
+    def run():
+        xtdata.push(push, 'tick')
+        received.clear()
+
+    def teardown():
+        hub.unsubscribe_all()
+
+    return Case(run, items=len(push), teardown=teardown)
+
+
+@benchmark('quote.hub_dispatch_whole_quote_bson', '全市场全推快照的BSON数据解码后经QuoteHub分发，每项为一只股票')
+def bench_hub_dispatch_whole_quote_bson():
+    hub = QuoteHub(xtdata.subscribe_quote, xtdata.subscribe_whole_quote, xtdata.unsubscribe_quote)
+    hub.subscribe(market.codes, lambda stock_code, data: None, period='tick')
+    push = market.tick_pushes(market.codes, ticks_per_minute=1, minutes=[100])[0]
+    payload = bytes(xtbson.BSON.encode(push))
+    return Case(lambda: xtdata.push(payload, 'tick'), items=len(push), teardown=hub.unsubscribe_all)
+
+
+@benchmark('quote.bar_builder_day', '股票池一个交易日的分笔快照（每分钟4次）合成1分钟K线，每项为一笔快照')
+def bench_bar_builder_day():
+    codes = market.codes[:POOL_SIZE]
+    ticks = [(code, tick) for push in market.tick_pushes(codes) for code, tick in push.items()]
+    bars = []
+    builder = BarBuilder({'1m': bars.append})
+
+    def run():
+        builder.reset()
+        bars.clear()
+        for stock_code, tick in ticks:
+            builder.on_tick(stock_code, tick)
+        builder.close_out()
+
+    run()
+    return Case(run, items=len(ticks), metrics={'K线数': len(bars)})
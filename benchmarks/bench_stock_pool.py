@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+选股和全市场指标基准测试
+
+- filter_stock_pool：5000只合成股票，合约信息来自当日快照，日线面板来自xtdata.get_market_data替身
+- 批量MACDFS：5000只股票×240分钟的价格矩阵一次计算，以及用calculate_macdfs逐只计算同一份数据的对比，
+  逐只计算一次约需数十秒，只在--slow时运行
+"""
+
+import pandas as pd
+
+from benchmarks.fake_xtquant import close_context, create_context, install
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from strategys.一进二低吸战法.indicator import calculate_macdfs, calculate_macdfs_batch
+from strategys.一进二低吸战法.stock_pool import filter_stock_pool
+
+
+@benchmark('stock_pool.filter_5000', '全市场5000只股票筛选一进二股票池，每项为一只股票')
+def bench_filter_stock_pool():
+    context = create_context()
+    # 合约信息快照在开盘前的定时任务中构建，不计入选股耗时
+    context.custom_data.get_instrument_snapshot(refresh=True)
+    selected = filter_stock_pool(context, batch_download_success=True)
+    return Case(lambda: filter_stock_pool(context, batch_download_success=True), items=len(market.codes),
+                metrics={'入选股票': len(selected), '预置涨停股票': len(market.limit_up_codes)},
+                teardown=lambda: close_context(context))
+
+
+@benchmark('indicator.macdfs_batch_5000x240', '5000只股票×240分钟的MACDFS批量计算，每项为一只股票一分钟')
+def bench_macdfs_batch():
+    bars = market.minute_bars(market.codes)
+    prices, open_prices = bars['close'], bars['open'][:, 0]
+    return Case(lambda: calculate_macdfs_batch(prices, open_prices), items=prices.size)
+
+
+@benchmark('indicator.macdfs_per_series_5000x240', '5000只股票×240分钟逐只调用calculate_macdfs（对比），每项为一只股票一分钟',
+           number=1, repeat=1, slow=True)
+def bench_macdfs_per_series():
+    bars = market.minute_bars(market.codes)
+    prices, open_prices = bars['close'], bars['open'][:, 0]
+    # 与批量计算使用同一份数据，Series在计时前创建
+    series = [(pd.Series(row), open_price) for row, open_price in zip(prices, open_prices)]
+
+    def run():
+        for row, open_price in series:
+            calculate_macdfs(row, open_price=open_price)
+
+    return Case(run, items=prices.size)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+策略热点路径基准测试
+
+- 分笔到on_bar：股票池一个交易日的全推快照经QuoteHub、BarBuilder合成K线后交给策略on_bar，
+  即原先quote_callback和_normalize_bar_data加on_bar的完整路径
+- on_bar：直接回放当日1分钟K线，Context为实盘Context加交易替身，部分股票有持仓，委托以废单结束
+- on_bar加WebHook：日志级别为INFO，日志推送到本地HTTP服务，服务每次请求延迟模拟网络耗时
+- MACDFS：单只股票第1根和第240根K线的增量计算，以及按旧方式在第240根K线时重算全天的耗时
+- 分时状态：500只股票×240根K线写入IntradayState的耗时和内存
+"""
+
+import logging
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_xtquant import close_context, create_context, install
+from benchmarks.harness import Case, benchmark
+
+xtdata = install()
+market = xtdata.market
+
+from trader.logger import WebHookHandler, listener, logger, push_formatter, RemoveAnsiEscapeCodes
+
+from strategys.一进二低吸战法.indicator import calculate_macdfs
+from strategys.一进二低吸战法.intraday_state import IntradayState
+from strategys.一进二低吸战法.strategy import YiJinErDiXiStrategy
+
+# 策略股票池的规模，以及其中有持仓的股票数量
+POOL_SIZE = 50
+POSITION_COUNT = 10
+
+# 本地WebHook服务每次请求的延迟（秒）
+WEBHOOK_LATENCY = 0.05
+
+
+def create_strategy():
+    """
+    创建实盘Context和策略，股票池为前POOL_SIZE只股票，其中前POSITION_COUNT只有持仓
+
+    返回:
+        tuple: (context, strategy)
+    """
+    codes = market.codes[:POOL_SIZE]
+    context = create_context(position_codes=codes[:POSITION_COUNT])
+    strategy = YiJinErDiXiStrategy(context, True)
+    strategy.stock_pool = list(codes)
+    return context, strategy
+
+
+def replay_bars(context, strategy, minutes):
+    """
+    按分钟回放K线，每分钟结束后处理积压的交易推送
+
+    参数:
+        context: create_strategy创建的Context
+        strategy: 策略对象
+        minutes (list): 每分钟的BarData列表
+    """
+    strategy._clear_cache()
+    for bars in minutes:
+        for bar in bars:
+            strategy.on_bar(bar)
+        context.xt_trader.deliver()
+
+
+def _split_minutes(bars, count):
+    return [bars[i:i + count] for i in range(0, len(bars), count)]
+
+
+@benchmark('strategy.tick_to_on_bar', '股票池一个交易日的全推快照经QuoteHub和BarBuilder交给on_bar，每项为一根K线')
+def bench_tick_to_on_bar():
+    context, strategy = create_strategy()
+    strategy.subscribe_stock_quotes()
+    codes = strategy.subscribed_stocks
+    pushes = market.tick_pushes(codes)
+    ticks_per_minute = len(pushes) // 240
+
+    def run():
+        strategy._clear_cache()
+        strategy.bar_builder.reset()
+        for i, push in enumerate(pushes):
+            xtdata.push(push, 'tick')
+            if (i + 1) % ticks_per_minute == 0:
+                context.xt_trader.deliver()
+        strategy.bar_builder.close_out()
+        context.xt_trader.deliver()
+
+    run()
+    # BarBuilder补齐没有成交的分钟，每只股票每天240根K线
+    return Case(run, items=len(codes) * 240, metrics={'快照数': len(pushes)},
+                teardown=lambda: close_context(context))
+
+
+@benchmark('strategy.on_bar', '回放股票池一个交易日的1分钟K线，每项为一根K线')
+def bench_on_bar():
+    context, strategy = create_strategy()
+    codes = strategy.stock_pool
+    minutes = _split_minutes(market.bar_data(codes), len(codes))
+    replay_bars(context, strategy, minutes)
+    orders = context.xt_trader.order_count
+    return Case(lambda: replay_bars(context, strategy, minutes), items=len(codes) * 240,
+                metrics={'每日委托数': orders}, teardown=lambda: close_context(context))
+
+
+class _WebHookStandIn(BaseHTTPRequestHandler):
+    """
+    本地WebHook服务，每次请求延迟WEBHOOK_LATENCY秒后返回成功
+    """
+
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(WEBHOOK_LATENCY)
+        type(self).requests += 1
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@benchmark('strategy.on_bar_webhook', '日志级别INFO并推送到本地WebHook服务时回放一个交易日，每项为一根K线')
+def bench_on_bar_webhook():
+    context, strategy = create_strategy()
+    codes = strategy.stock_pool
+    minutes = _split_minutes(market.bar_data(codes), len(codes))
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _WebHookStandIn)
+    threading.Thread(target=server.serve_forever, name='WebHookStandIn', daemon=True).start()
+    handler = WebHookHandler(f"http://127.0.0.1:{server.server_port}/webhook")
+    handler.setLevel(logging.INFO)
+    handler.setFormatter(push_formatter)
+    handler.addFilter(RemoveAnsiEscapeCodes())
+
+    # 只保留WebHook处理器，避免控制台和日志文件的输出影响计时
+    level, handlers = logger.level, listener.handlers
+    listener.stop()
+    listener.handlers = (handler,)
+    listener.start()
+    logger.setLevel(logging.INFO)
+
+    def teardown():
+        listener.stop()
+        listener.handlers = handlers
+        listener.start()
+        logger.setLevel(level)
+        metrics['推送批次'] = handler.sent
+        metrics['服务收到请求'] = _WebHookStandIn.requests
+        metrics['丢弃日志'] = handler.dropped + len(handler.pending)
+        handler.pending.clear()
+        handler.close()
+        server.shutdown()
+        server.server_close()
+        close_context(context)
+
+    metrics = {'服务延迟(秒)': WEBHOOK_LATENCY}
+    return Case(lambda: replay_bars(context, strategy, minutes), items=len(codes) * 240, metrics=metrics,
+                teardown=teardown)
+
+
+@benchmark('strategy.macdfs_minute_1', '单只股票第1根K线的MACDFS增量计算（含新交易日重置）')
+def bench_macdfs_minute_1():
+    state = IntradayState()
+    bar = market.bar_data(market.codes[:1])[0]
+
+    def run():
+        state.reset()
+        state.update(bar.stock_code, bar)
+
+    return run
+
+
+@benchmark('strategy.macdfs_minute_240', '单只股票第240根K线的MACDFS增量计算（重复K线重算最后一根，计算量与新K线相同）')
+def bench_macdfs_minute_240():
+    state = IntradayState()
+    bars = market.bar_data(market.codes[:1])
+    for bar in bars:
+        state.update(bar.stock_code, bar)
+    last = bars[-1]
+    return lambda: state.update(last.stock_code, last)
+
+
+@benchmark('strategy.macdfs_recompute_240', '第240根K线时按全天收盘价重算MACDFS（增量计算之前的做法），用于对比')
+def bench_macdfs_recompute_240():
+    bars = market.bar_data(market.codes[:1])
+    prices = pd.Series([bar.close for bar in bars])
+    open_price = bars[0].open
+    return lambda: calculate_macdfs(prices, open_price=open_price)
+
+
+@benchmark('strategy.intraday_state_500x240', '500只股票一个交易日的K线写入分时状态，每项为一根K线')
+def bench_intraday_state():
+    codes = market.codes[:500]
+    bars = market.bar_data(codes)
+    state = IntradayState(capacity=len(codes))
+
+    def run():
+        state.reset()
+        for bar in bars:
+            state.update(bar.stock_code, bar)
+
+    # 内存在计时之外单独测量，包含扩容过程
+    tracemalloc.start()
+    measured = IntradayState()
+    for bar in bars:
+        measured.update(bar.stock_code, bar)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    metrics = {
+        'tracemalloc当前(字节)': current,
+        'tracemalloc峰值(字节)': peak,
+        'nbytes(字节)': measured.nbytes(),
+        '每只股票(字节)': int(np.ceil(measured.nbytes() / len(codes))),
+    }
+    return Case(run, items=len(bars), metrics=metrics)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+xtdata数据转换基准测试
+
+运行xtquant/xtdata.py的原始实现，只把行情客户端换成FakeMarketDataClient，测量客户端返回数据之后
+在Python侧的转换耗时和内存：
+- 分笔数据的时间index：批量转换日期时间字符串、使用毫秒时间戳，以及逐个调用timetag_to_datetime（用于对比）
+- 全市场日线：result_type为pandas时逐只股票创建DataFrame，为numpy时直接拼成(股票数, 时间数)的二维数组
+"""
+
+import tracemalloc
+
+from benchmarks.fake_xtquant import FakeMarketDataClient, install, load_xtdata
+from benchmarks.harness import Case, benchmark
+
+market = install().market
+client = FakeMarketDataClient(market, listed_late=market.codes[::50])
+xtdata = load_xtdata(client)
+
+# 分笔数据的股票数量，每只股票一个交易日4800笔
+TICK_CODES = 5
+
+
+def _peak_memory(func):
+    """
+    单独运行一次func，返回tracemalloc记录的峰值内存（字节）
+    """
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def _tick_case(raw_time):
+    codes = market.codes[:TICK_CODES]
+    rows = sum(len(client._ticks_of(code)) for code in codes)
+
+    def run():
+        return xtdata.get_market_data_ex([], codes, period='tick', raw_time=raw_time)
+
+    return Case(run, items=rows, metrics={'笔数': rows})
+
+
+@benchmark('xtdata.tick_time_index', f'{TICK_CODES}只股票一个交易日的分笔数据，index转换成日期时间字符串，每项为一笔')
+def bench_tick_time_index():
+    return _tick_case(raw_time=False)
+
+
+@benchmark('xtdata.tick_raw_time', f'{TICK_CODES}只股票一个交易日的分笔数据，index为毫秒时间戳（raw_time），每项为一笔')
+def bench_tick_raw_time():
+    return _tick_case(raw_time=True)
+
+
+@benchmark('xtdata.timetag_to_datetime_per_row', '逐个调用timetag_to_datetime转换分笔时间（批量转换之前的做法），用于对比')
+def bench_timetag_to_datetime_per_row():
+    times = client._ticks_of(market.codes[0])['time']
+    return Case(lambda: [xtdata.timetag_to_datetime(t, '%Y%m%d%H%M%S') for t in times], items=len(times))
+
+
+def _kline_case(result_type, codes):
+    def run():
+        return xtdata.get_market_data_ex([], codes, period='1d', result_type=result_type)
+
+    run()
+    bars = len(codes) * len(market.daily_times)
+    return Case(run, items=bars, metrics={'股票数': len(codes), '峰值内存(字节)': _peak_memory(run)})
+
+
+@benchmark('xtdata.kline_pandas_5000', '全市场日线，逐只股票创建DataFrame（result_type=pandas），每项为一根K线')
+def bench_kline_pandas():
+    return _kline_case('pandas', market.codes)
+
+
+@benchmark('xtdata.kline_numpy_5000', '全市场日线，拼成二维数组（result_type=numpy，部分股票上市较晚需按时间对齐），每项为一根K线')
+def bench_kline_numpy():
+    return _kline_case('numpy', market.codes)
+
+
+@benchmark('xtdata.kline_numpy_aligned_5000', '全市场日线，拼成二维数组（result_type=numpy，各股票时间一致），每项为一根K线')
+def bench_kline_numpy_aligned():
+    return _kline_case('numpy', [code for code in market.codes if code not in client.listed_late])
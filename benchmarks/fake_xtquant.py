@@ -0,0 +1,833 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试使用的QMT接口替身和合成行情
+
+基准测试需要在没有QMT终端的Linux上运行，install()在导入trader模块之前把替身注册为
+xtquant.xtdata和xtquant.xttrader，其余xtquant模块（xtconstant、xttype、xtbson）使用原始实现：
+1. FakeXtData: 行情订阅、推送、板块成份股、合约信息、日线数据和全推快照，数据来自SyntheticMarket
+2. FakeXtQuantTrader: 持仓、资产查询和下单，委托全部以废单结束，推送在deliver()时才交给回调，
+   与QMT在独立线程推送一样，不会在下单调用内重入
+3. SyntheticMarket: 按随机种子生成的全市场股票、合约信息、日线面板、当日1分钟K线和分笔快照，
+   日线中预置一部分满足一进二选股条件的股票
+4. FakeMarketDataClient和load_xtdata(): 以行情客户端替身运行xtdata的原始实现，测量xtdata内部的数据转换
+5. FakeTableClient: metatable数据表的表结构和按文件读取的BSON数据行，由FakeXtData.get_client()返回
+6. FakeDownloadClient: 按块下载历史数据的客户端替身，每次调用固定耗时，记录同时进行的调用数
+
+策略目录下的config.py不在版本库中，不存在时以README中的默认参数代替。
+"""
+
+import itertools
+import os
+import sys
+import threading
+import types
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from time import sleep
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+# 项目根目录
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 合成行情的交易日，固定为一个周五，结果与运行日期无关
+TRADING_DAY = date(2025, 6, 20)
+
+# 北京时间相对UTC的偏移（毫秒），分笔行情的time为UTC毫秒时间戳
+BEIJING_OFFSET_MS = 8 * 3600 * 1000
+
+# 各板块股票代码前缀及占比，每个前缀后接4位序号
+CODE_PREFIXES = (
+    ('60', 'SH', 0.30), ('68', 'SH', 0.10), ('00', 'SZ', 0.28),
+    ('30', 'SZ', 0.25), ('43', 'BJ', 0.04), ('83', 'BJ', 0.03),
+)
+
+# 日线中满足一进二选股条件（首次涨停、非一字板、30日新高）的股票比例
+LIMIT_UP_RATIO = 0.01
+
+# 策略配置不存在时使用的默认参数，与README一致
+STRATEGY_CONFIG_DEFAULTS = {
+    'STRATEGY_NAME': '一进二低吸战法',
+    'BUY_AMOUNT': 10000,
+    'MAX_BUY_TIMES': 2,
+    'MAX_INTRADAY_GAIN': 0.09,
+    'MACDFS_SHORT': 12,
+    'MACDFS_LONG': 26,
+    'MACDFS_SIGNAL': 9,
+    'MAX_POSITION_RATIO': 0.8,
+    'ENABLE_POSITION_CONTROL': True,
+    'EXCLUDE_ONE_WORD_BOARD': True,
+    'FIRST_LIMIT_UP_DAYS': 3,
+    'NEW_HIGH_DAYS': 30,
+    'MAX_MARKET_VALUE': 150,
+    'MAIN_BOARD_ONLY': True,
+    'EXCLUDE_ST': True,
+    'EXCLUDE_SUSPENDED': True,
+    'STOCK_POOL_REFRESH_TIME': '15:30:00',
+}
+
+
+def make_stock_codes(count):
+    """
+    生成带后缀的股票代码
+
+    参数:
+        count (int): 股票数量
+
+    返回:
+        list: 按板块占比生成的股票代码，如['600000.SH', ...]
+    """
+    codes = []
+    for prefix, market, ratio in CODE_PREFIXES:
+        n = max(int(round(count * ratio)), 1)
+        codes.extend(f"{prefix}{i:04d}.{market}" for i in range(n))
+    return codes[:count]
+
+
+def session_minutes(day=TRADING_DAY):
+    """
+    生成一个交易日240根1分钟K线的结束时间
+
+    参数:
+        day (date): 交易日
+
+    返回:
+        list: 9:31至11:30、13:01至15:00的datetime（北京时间）
+    """
+    morning = datetime.combine(day, time(9, 30))
+    afternoon = datetime.combine(day, time(13, 0))
+    return ([morning + timedelta(minutes=i) for i in range(1, 121)] +
+            [afternoon + timedelta(minutes=i) for i in range(1, 121)])
+
+
+def _round_price(values):
+    return np.round(np.asarray(values, dtype=np.float64), 2)
+
+
+class SyntheticMarket:
+    """
+    合成行情
+
+    全部数据在构造时按随机种子生成，相同参数生成的数据完全相同。
+    """
+
+    def __init__(self, stock_count=5000, daily_days=60, trading_day=TRADING_DAY, seed=0):
+        """
+        初始化合成行情
+
+        参数:
+            stock_count (int): 股票数量，默认为5000
+            daily_days (int): 日线交易日数，默认为60，最后一天为交易日的前一个工作日
+            trading_day (date): 当日分钟行情的交易日
+            seed (int): 随机种子
+        """
+        rng = np.random.default_rng(seed)
+        self.trading_day = trading_day
+        self.codes = make_stock_codes(stock_count)
+        self.raw_codes = [code.split('.')[0] for code in self.codes]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        count = len(self.codes)
+
+        # 日线：对数随机游走，预置的股票前30天横盘、最后一天涨停
+        days = pd.bdate_range(end=trading_day - timedelta(days=1), periods=daily_days)
+        self.daily_times = [d.strftime('%Y%m%d') for d in days]
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (count, daily_days)), axis=1)) * rng.uniform(0.5, 5, (count, 1))
+        self.limit_up_codes = []
+        for i in rng.choice(count, max(int(count * LIMIT_UP_RATIO), 1), replace=False):
+            base = close[i, -32]
+            close[i, -32:-1] = base * (1 + rng.uniform(-0.03, 0.0, 31))
+            close[i, -1] = close[i, -2] * 1.1
+            self.limit_up_codes.append(self.codes[i])
+        close = _round_price(close)
+        pre_close = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+        open_ = _round_price(pre_close * (1 + rng.normal(0, 0.01, close.shape)))
+        high = np.maximum(np.maximum(open_, close), _round_price(close * (1 + np.abs(rng.normal(0, 0.01, close.shape)))))
+        low = np.minimum(np.minimum(open_, close), _round_price(close * (1 - np.abs(rng.normal(0, 0.01, close.shape)))))
+        volume = np.round(rng.uniform(1e4, 1e6, close.shape))
+        self.daily = {
+            'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+            'amount': volume * 100 * close, 'preClose': pre_close,
+        }
+
+        # 合约信息：约3%为ST，约1%停牌，总股本使总市值分布在20亿到400亿之间
+        last_close = close[:, -1]
+        total_volume = np.round(rng.uniform(2e9, 4e10, count) / last_close, -4)
+        names = [f"股票{code[:6]}" for code in self.codes]
+        for i in rng.choice(count, max(int(count * 0.03), 1), replace=False):
+            names[i] = 'ST' + names[i]
+        suspended = set(rng.choice(count, max(int(count * 0.01), 1), replace=False).tolist())
+        self.details = {}
+        for i, code in enumerate(self.codes):
+            limit = 0.2 if code.startswith(('30', '68')) else 0.3 if code.endswith('.BJ') else 0.1
+            self.details[code] = {
+                'InstrumentName': names[i],
+                'InstrumentStatus': 1 if i in suspended else 0,
+                'IsTrading': i not in suspended,
+                'PreClose': float(last_close[i]),
+                'UpStopPrice': float(np.round(last_close[i] * (1 + limit), 2)),
+                'DownStopPrice': float(np.round(last_close[i] * (1 - limit), 2)),
+                'FloatVolume': float(total_volume[i] * 0.8),
+                'TotalVolume': float(total_volume[i]),
+            }
+        self.last_prices = dict(zip(self.codes, last_close.tolist()))
+        self._seed = seed
+        self._minute_cache = {}
+
+    def minute_bars(self, codes):
+        """
+        生成当日的1分钟K线
+
+        参数:
+            codes (list): 股票代码列表
+
+        返回:
+            dict: {字段: numpy.ndarray}，形状为(股票数, 240)，包含open、high、low、close、volume（手）、amount，
+                以及形状为(股票数,)的preClose
+        """
+        key = tuple(codes)
+        if key in self._minute_cache:
+            return self._minute_cache[key]
+        rng = np.random.default_rng([self._seed, len(codes)])
+        pre_close = np.array([self.details[code]['PreClose'] for code in codes])
+        steps = rng.normal(0, 0.002, (len(codes), 240))
+        close = _round_price(pre_close[:, None] * np.exp(np.cumsum(steps, axis=1)))
+        open_ = np.concatenate([_round_price(pre_close[:, None] * (1 + rng.normal(0, 0.005, (len(codes), 1)))),
+                                close[:, :-1]], axis=1)
+        spread = np.abs(rng.normal(0, 0.001, close.shape))
+        high = np.maximum(np.maximum(open_, close), _round_price(close * (1 + spread)))
+        low = np.minimum(np.minimum(open_, close), _round_price(close * (1 - spread)))
+        volume = np.round(rng.uniform(10, 2000, close.shape))
+        bars = {
+            'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+            'amount': np.round(volume * 100 * (high + low + close) / 3, 2), 'preClose': pre_close,
+        }
+        self._minute_cache[key] = bars
+        return bars
+
+    def bar_data(self, codes):
+        """
+        生成按时间排列的当日1分钟BarData，同一分钟内按股票顺序排列
+
+        参数:
+            codes (list): 股票代码列表
+
+        返回:
+            list: BarData列表，长度为240×股票数
+        """
+        from trader.bar_builder import BarData
+        bars = self.minute_bars(codes)
+        columns = [bars[field].tolist() for field in ('open', 'high', 'low', 'close', 'volume', 'amount')]
+        pre_close = bars['preClose'].tolist()
+        result = []
+        for minute, bar_time in enumerate(session_minutes(self.trading_day)):
+            for i, code in enumerate(codes):
+                result.append(BarData(code, bar_time, columns[0][i][minute], columns[1][i][minute], columns[2][i][minute],
+                                      columns[3][i][minute], columns[4][i][minute], columns[5][i][minute], pre_close[i]))
+        return result
+
+    def bar_pushes(self, codes, minutes=None):
+        """
+        生成subscribe_quote周期为1m的推送，每分钟一次
+
+        参数:
+            codes (list): 股票代码列表
+            minutes (list): 生成第几根K线（0至239）的推送，默认为None表示全天
+
+        返回:
+            list: 按时间排列的{股票代码: [K线字典]}
+        """
+        bars = self.minute_bars(codes)
+        bar_times = session_minutes(self.trading_day)
+        pushes = []
+        for minute in (range(240) if minutes is None else minutes):
+            bar_time = bar_times[minute]
+            timetag = int((bar_time - datetime(1970, 1, 1)).total_seconds() * 1000) - BEIJING_OFFSET_MS
+            pushes.append({code: [{
+                'time': timetag,
+                'open': float(bars['open'][i, minute]),
+                'high': float(bars['high'][i, minute]),
+                'low': float(bars['low'][i, minute]),
+                'close': float(bars['close'][i, minute]),
+                'volume': int(bars['volume'][i, minute]),
+                'amount': float(bars['amount'][i, minute]),
+                'settelementPrice': 0.0,
+                'openInterest': 15,
+                'preClose': float(bars['preClose'][i]),
+                'suspendFlag': 0,
+            }] for i, code in enumerate(codes)})
+        return pushes
+
+    def tick_pushes(self, codes, ticks_per_minute=4, minutes=None):
+        """
+        生成subscribe_whole_quote的全推快照，每分钟ticks_per_minute次，字段与QMT分笔数据一致
+
+        每分钟的快照价格在开盘价和收盘价之间，最后一次为收盘价，累计成交量和成交额与1分钟K线一致。
+
+        参数:
+            codes (list): 股票代码列表
+            ticks_per_minute (int): 每分钟的快照次数，默认为4（QMT为每3秒一次，即20次）
+            minutes (list): 生成第几分钟（0至239）的快照，默认为None表示全天
+
+        返回:
+            list: 按时间排列的{股票代码: 分笔字典}
+        """
+        bars = self.minute_bars(codes)
+        cum_volume = np.cumsum(bars['volume'], axis=1)
+        cum_amount = np.cumsum(bars['amount'], axis=1)
+        bar_times = session_minutes(self.trading_day)
+        pushes = []
+        for minute in (range(240) if minutes is None else minutes):
+            bar_time = bar_times[minute]
+            end_ms = int((bar_time - datetime(1970, 1, 1)).total_seconds() * 1000) - BEIJING_OFFSET_MS
+            for k in range(1, ticks_per_minute + 1):
+                # 分钟内的快照时间，最后一次在下一分钟开始前3秒
+                timetag = end_ms - 60000 + (57000 * k) // ticks_per_minute
+                weight = k / ticks_per_minute
+                push = {}
+                for i, code in enumerate(codes):
+                    price = round(bars['open'][i, minute] + (bars['close'][i, minute] - bars['open'][i, minute]) * weight, 2)
+                    prev_volume = cum_volume[i, minute - 1] if minute else 0.0
+                    prev_amount = cum_amount[i, minute - 1] if minute else 0.0
+                    push[code] = {
+                        'time': timetag,
+                        'lastPrice': price,
+                        'open': float(bars['open'][i, 0]),
+                        'high': float(bars['high'][i, :minute + 1].max()),
+                        'low': float(bars['low'][i, :minute + 1].min()),
+                        'lastClose': float(bars['preClose'][i]),
+                        'amount': float(prev_amount + (cum_amount[i, minute] - prev_amount) * weight),
+                        'volume': int(prev_volume + (cum_volume[i, minute] - prev_volume) * weight),
+                        'pvolume': int(prev_volume + (cum_volume[i, minute] - prev_volume) * weight) * 100,
+                        'stockStatus': 3,
+                        'openInt': 13,
+                        'transactionNum': minute * 50 + k,
+                        'lastSettlementPrice': 0.0,
+                        'settlementPrice': 0.0,
+                        'pe': 0.0,
+                        'askPrice': [round(price + 0.01 * j, 2) for j in range(1, 6)],
+                        'bidPrice': [round(price - 0.01 * j, 2) for j in range(5)],
+                        'askVol': [100 * j for j in range(1, 6)],
+                        'bidVol': [100 * j for j in range(1, 6)],
+                        'volRatio': 0.0,
+                        'speed1Min': 0.0,
+                        'speed5Min': 0.0,
+                    }
+                pushes.append(push)
+        return pushes
+
+
+class FakeXtData:
+    """
+    xtquant.xtdata的替身，实现trader和策略用到的接口
+    """
+
+    def __init__(self, market):
+        self.market = market
+        self.enable_hello = False
+        self.subscriptions = {}  # 格式：{seq: (period, codes, callback)}，whole quote的codes为None
+        self._seqs = itertools.count(1)
+        self.table_client = None  # FakeTableClient，metatable读取数据时使用
+
+    # ------------------------------------------------------------------ 行情订阅
+
+    def subscribe_quote(self, stock_code, period='1d', start_time='', end_time='', count=0, callback=None):
+        seq = next(self._seqs)
+        self.subscriptions[seq] = (period, {stock_code}, callback)
+        return seq
+
+    def subscribe_whole_quote(self, code_list, callback=None):
+        seq = next(self._seqs)
+        self.subscriptions[seq] = ('tick', None, callback)
+        return seq
+
+    def unsubscribe_quote(self, seq):
+        self.subscriptions.pop(seq, None)
+
+    def push(self, datas, period='tick'):
+        """
+        向订阅了该周期的回调推送行情，同一回调只推送一次
+
+        参数:
+            datas (dict|bytes): {股票代码: 数据}，周期为tick时为分笔字典，否则为K线字典列表；
+                为BSON编码的bytes时先解码，与xtdata.subscribe_callback_wrapper的处理一致
+            period (str): 行情周期
+
+        返回:
+            int: 推送的回调数量
+        """
+        if isinstance(datas, bytes):
+            from xtquant import xtbson
+            datas = xtbson.BSON.decode(datas)
+        delivered = set()
+        for sub_period, codes, callback in list(self.subscriptions.values()):
+            if sub_period != period or callback is None or id(callback) in delivered:
+                continue
+            if codes is not None and codes.isdisjoint(datas):
+                continue
+            delivered.add(id(callback))
+            callback(datas)
+        return len(delivered)
+
+    # ------------------------------------------------------------------ 基础数据
+
+    def get_stock_list_in_sector(self, sector_name, real_timetag=-1):
+        return list(self.market.codes) if sector_name == '沪深A股' else []
+
+    def get_instrument_detail(self, stock_code, iscomplete=False):
+        return self.market.details.get(stock_code)
+
+    def get_instrument_detail_list(self, stock_list, iscomplete=False):
+        return {code: self.market.details.get(code) for code in stock_list}
+
+    def get_holidays(self):
+        return []
+
+    def get_full_tick(self, code_list):
+        return {code: {'lastPrice': self.market.last_prices[code]} for code in code_list if code in self.market.last_prices}
+
+    def get_market_data(self, field_list=[], stock_list=[], period='1d', start_time='', end_time='', count=-1,
+                        dividend_type='none', fill_data=True):
+        if period != '1d':
+            return {}
+        times = self.market.daily_times[-count:] if count and count > 0 else self.market.daily_times
+        columns = slice(len(self.market.daily_times) - len(times), None)
+        rows = [self.market.index[code] for code in stock_list if code in self.market.index]
+        codes = [code for code in stock_list if code in self.market.index]
+        return {field: pd.DataFrame(self.market.daily[field][rows, columns], index=codes, columns=times)
+                for field in field_list if field in self.market.daily}
+
+    def download_history_data(self, stock_code, period, start_time='', end_time='', incrementally=None):
+        return None
+
+    def download_history_data2(self, stock_list, period, start_time='', end_time='', callback=None,
+                               incrementally=None):
+        return None
+
+    def download_sector_data(self):
+        return None
+
+    # ------------------------------------------------------------------ metatable
+
+    def get_client(self):
+        if self.table_client is None:
+            self.table_client = FakeTableClient()
+        return self.table_client
+
+    def _get_data_file_path(self, stocklist, period, date='20380119'):
+        return self.get_client().data_file_path(stocklist, period)
+
+    def get_data_dir(self):
+        return self.get_client().root
+
+
+class FakeXtQuantTraderCallback:
+    """
+    xtquant.xttrader.XtQuantTraderCallback的替身，回调方法默认不做任何处理
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('on_'):
+            return lambda *args: None
+        raise AttributeError(name)
+
+
+class FakeXtQuantTrader:
+    """
+    xtquant.xttrader.XtQuantTrader的替身
+
+    持仓按给定股票生成，每只1000股；委托全部在deliver()时先返回订单编号、再推送废单。
+    """
+
+    def __init__(self, path='', session=0, market=None, position_codes=(), cash=1000000.0):
+        """
+        初始化交易替身
+
+        参数:
+            path (str): miniQMT路径，不使用
+            session (int): 会话编号，不使用
+            market (SyntheticMarket): 合成行情，用于持仓的价格
+            position_codes (list): 持仓股票代码
+            cash (float): 可用资金
+        """
+        self.callback = None
+        self.market = market
+        self.account_id = 'BENCHMARK'
+        self.pushes = deque()
+        self._seqs = itertools.count(1)
+        self._order_ids = itertools.count(100000)
+        prices = market.last_prices if market is not None else {}
+        self.positions = [SimpleNamespace(
+            account_type=2, account_id=self.account_id, stock_code=code, volume=1000,
+            open_price=prices.get(code, 10.0), can_use_volume=1000, market_value=prices.get(code, 10.0) * 1000,
+            frozen_volume=0, on_road_volume=0, yesterday_volume=1000, avg_price=prices.get(code, 10.0), direction=48,
+        ) for code in position_codes]
+        market_value = sum(p.market_value for p in self.positions)
+        self.asset = SimpleNamespace(account_type=2, account_id=self.account_id, total_asset=cash + market_value,
+                                     cash=cash, frozen_cash=0.0, market_value=market_value)
+        self.order_count = 0
+
+    def register_callback(self, callback):
+        self.callback = callback
+
+    def start(self):
+        return None
+
+    def connect(self):
+        return 0
+
+    def subscribe(self, account):
+        return 0
+
+    def run_forever(self):
+        return None
+
+    def query_stock_positions(self, account):
+        return list(self.positions)
+
+    def query_stock_asset(self, account):
+        return self.asset
+
+    def query_stock_orders(self, account, cancelable_only=False):
+        return []
+
+    def query_stock_order(self, account, order_id):
+        return None
+
+    def query_stock_trades(self, account):
+        return []
+
+    def _reject(self, seq, stock_code, order_type, order_volume, price, remark):
+        order_id = next(self._order_ids)
+        self.order_count += 1
+        if seq is not None:
+            self.pushes.append(('on_order_stock_async_response', SimpleNamespace(
+                account_type=2, account_id=self.account_id, order_id=order_id, strategy_name='',
+                order_remark=remark, error_msg='', seq=seq)))
+        self.pushes.append(('on_stock_order', SimpleNamespace(
+            account_type=2, account_id=self.account_id, stock_code=stock_code, order_id=order_id, order_sysid='',
+            order_time=0, order_type=order_type, order_volume=order_volume, price_type=11, price=price,
+            traded_volume=0, traded_price=0.0, order_status=57, status_msg='', strategy_name='',
+            order_remark=remark, direction=48, offset_flag=48)))
+        return order_id
+
+    def order_stock_async(self, account, stock_code, order_type, order_volume, price_type, price,
+                          strategy_name='', order_remark=''):
+        seq = next(self._seqs)
+        self._reject(seq, stock_code, order_type, order_volume, price, order_remark)
+        return seq
+
+    def order_stock(self, account, stock_code, order_type, order_volume, price_type, price,
+                    strategy_name='', order_remark=''):
+        return self._reject(None, stock_code, order_type, order_volume, price, order_remark)
+
+    def cancel_order_stock(self, account, order_id):
+        return 0
+
+    def cancel_order_stock_async(self, account, order_id):
+        return next(self._seqs)
+
+    def deliver(self):
+        """
+        把积压的交易推送交给回调
+
+        返回:
+            int: 推送数量
+        """
+        count = 0
+        while self.pushes:
+            name, data = self.pushes.popleft()
+            if self.callback is not None:
+                getattr(self.callback, name)(data)
+            count += 1
+        return count
+
+
+class FakeMarketDataClient:
+    """
+    xtdata.get_client()返回的行情客户端替身，只实现get_market_data3
+
+    用于测量xtdata原始实现中数据转换的耗时，数据格式与客户端一致：
+    - v3（分笔）: {股票代码: 结构化数组}
+    - v4（K线）: [(股票代码, 时间列表, [(字段, 类型, 缓冲区), ...]), ...]
+    """
+
+    def __init__(self, market, listed_late=()):
+        """
+        参数:
+            market (SyntheticMarket): 合成行情
+            listed_late (list): 上市较晚的股票代码，日线缺少前一半交易日，用于测量按时间对齐的情况
+        """
+        self.market = market
+        self.listed_late = set(listed_late)
+        self._ticks = {}
+        self._daily = {}  # 相同参数的v4请求返回同一份数据，计时不包含生成数据的耗时
+
+    def _daily_fields(self, field_list):
+        fields = ['time', *self.market.daily] if not field_list else list(field_list)
+        return [field for field in fields if field == 'time' or field in self.market.daily]
+
+    def _ticks_of(self, code):
+        if code not in self._ticks:
+            rows = [push[code] for push in self.market.tick_pushes([code], ticks_per_minute=20)]
+            names = ['time', 'lastPrice', 'open', 'high', 'low', 'lastClose', 'amount', 'volume', 'pvolume',
+                     'stockStatus', 'openInt', 'transactionNum']
+            dtype = [(name, 'i8' if name in ('time', 'volume', 'pvolume', 'stockStatus', 'openInt', 'transactionNum')
+                      else 'f8') for name in names]
+            self._ticks[code] = np.array([tuple(row[name] for name in names) for row in rows], dtype=dtype)
+        return self._ticks[code]
+
+    def get_market_data3(self, field_list, stock_list, period, start_time, end_time, count, dividend_type, fill_data,
+                         version, *args):
+        if version == 'v3' and period == 'tick':
+            result = {}
+            for code in stock_list:
+                ticks = self._ticks_of(code)
+                result[code] = ticks[list(field_list)] if field_list else ticks
+            return result
+        if version != 'v4' or period != '1d':
+            return []
+        key = (tuple(field_list), tuple(stock_list))
+        if key not in self._daily:
+            self._daily[key] = self._daily_buffers(field_list, stock_list)
+        return self._daily[key]
+
+    def _daily_buffers(self, field_list, stock_list):
+        times = self.market.daily_times
+        # 按时间差换算毫秒，与DatetimeIndex的精度（pandas 3默认为微秒）无关
+        time_ms = ((pd.DatetimeIndex(times) - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).to_numpy('int64')
+        time_ms = time_ms - BEIJING_OFFSET_MS
+        fields = self._daily_fields(field_list)
+        result = []
+        for code in stock_list:
+            row = self.market.index.get(code)
+            if row is None:
+                continue
+            start = len(times) // 2 if code in self.listed_late else 0
+            buffers = []
+            for field in fields:
+                values = time_ms[start:] if field == 'time' else self.market.daily[field][row, start:]
+                buffers.append((field, values.dtype.str, values.tobytes()))
+            result.append((code, times[start:], buffers))
+        return result
+
+
+class FakeDownloadClient:
+    """
+    BulkDownloader使用的数据客户端替身，实现download_history_data2
+
+    每次调用休眠固定时间模拟QMT终端的下载耗时，记录调用次数和同时进行的最大调用数。
+    """
+
+    def __init__(self, latency=0.02):
+        """
+        参数:
+            latency (float): 每次调用的耗时（秒）
+        """
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def download_history_data2(self, stock_list, period, start_time='', end_time='', callback=None,
+                               incrementally=None):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            sleep(self.latency)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class FakeTableClient:
+    """
+    metatable使用的行情客户端替身，实现commonControl('getmetatabledatas')和read_local_data
+
+    数据行为BSON编码的bytes，保存在内存中；数据文件在临时目录中创建为空文件，
+    只用于通过os.path.exists检查。全市场数据文件的代码为XXXXXX.XX，
+    没有单独数据文件的股票按全市场数据过滤S字段读取。
+    临时目录同时作为get_data_dir()，Feather格式的数据表位于其中的EP/<表名>_Xdat2/data.fe。
+    """
+
+    WHOLE_MARKET = 'XXXXXX.XX'
+
+    def __init__(self):
+        self.metainfos = []
+        self.files = {}  # 格式：{文件路径: [BSON数据行, ...]}
+        self._root = None
+
+    @property
+    def root(self):
+        if self._root is None:
+            import atexit
+            import shutil
+            import tempfile
+            self._root = tempfile.mkdtemp(prefix='qmt-benchmarks-metatable-')
+            atexit.register(shutil.rmtree, self._root, ignore_errors=True)
+        return self._root
+
+    def add_table(self, metainfo, rows, period=0, per_code=()):
+        """
+        添加数据表
+
+        参数:
+            metainfo (dict): 表结构，格式与getmetatabledatas返回的一致，含I、modelName、tableNameCn和fields
+            rows (list): 数据行字典，含S字段
+            period (int): 数据周期（毫秒），0表示不分周期
+            per_code (list): 有单独数据文件的股票代码
+        """
+        from xtquant import xtbson
+
+        self.metainfos.append(metainfo)
+        metaid = metainfo['I']
+        encoded = [xtbson.BSON.encode(row) for row in rows]
+        self._write((metaid, period), self.WHOLE_MARKET, encoded)
+        per_code = set(per_code)
+        if per_code:
+            by_code = {}
+            for row, data in zip(rows, encoded):
+                if row['S'] in per_code:
+                    by_code.setdefault(row['S'], []).append(data)
+            for code, datas in by_code.items():
+                self._write((metaid, period), code, datas)
+
+    def _write(self, period, code, datas):
+        path = self.data_file_path([code], period)[code]
+        open(path, 'wb').close()
+        self.files[path] = datas
+
+    def data_file_path(self, stocklist, period):
+        metaid, period_num = period
+        return {code: os.path.join(self.root, f"{metaid}_{period_num}_{code}.dat") for code in stocklist}
+
+    def commonControl(self, func, data):
+        from xtquant import xtbson
+
+        if func == 'getmetatabledatas':
+            return xtbson.BSON.encode({'result': self.metainfos})
+        return xtbson.BSON.encode({})
+
+    def read_local_data(self, file_path, start_time, end_time, count):
+        datas = self.files.get(file_path, [])
+        return datas[-count:] if count > 0 else datas
+
+
+def load_xtdata(client):
+    """
+    加载xtquant/xtdata.py的原始实现，get_client()返回client
+
+    与install()注册的FakeXtData不同，这里运行的是xtdata本身的代码，只把客户端换成替身，
+    用于测量get_market_data_ex等接口在Python侧的数据转换。xtquant.datacenter为QMT的二进制模块，
+    无法导入时以最小的替身代替，只满足模块初始化。
+
+    参数:
+        client: 行情客户端替身，如FakeMarketDataClient
+
+    返回:
+        module: xtdata模块
+    """
+    import importlib
+    import importlib.util
+
+    if ROOT_PATH not in sys.path:
+        sys.path.insert(0, ROOT_PATH)
+    try:
+        importlib.import_module('xtquant.datacenter')
+    except ImportError:
+        datacenter = types.ModuleType('xtquant.datacenter')
+        datacenter.rpc_init = lambda config_dir: 0
+        datacenter.get_local_server_port = lambda: 0
+        datacenter.register_create_nparray = lambda func: None
+        datacenter.IPythonApiClient = object
+        sys.modules['xtquant.datacenter'] = datacenter
+
+    spec = importlib.util.spec_from_file_location('xtquant._xtdata_original', os.path.join(ROOT_PATH, 'xtquant', 'xtdata.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.get_client = lambda *args, **kwargs: client
+    return module
+
+
+def create_context(position_codes=(), cash=1000000.0, strategy_name='benchmark'):
+    """
+    以交易替身创建实盘Context，需先调用install()
+
+    合约信息快照保存到临时目录，不写入项目的data目录。
+
+    参数:
+        position_codes (list): 持仓股票代码
+        cash (float): 可用资金
+        strategy_name (str): 策略名称
+
+    返回:
+        Context: 交易上下文，xt_trader为FakeXtQuantTrader，用完后调用close_context
+    """
+    import tempfile
+    from xtquant.xttype import StockAccount
+    from trader.context import Context
+    from trader.data import custom_data
+    from trader.trader import MyXtQuantTraderCallback
+
+    custom_data.instrument_snapshot_root = os.path.join(tempfile.gettempdir(), 'qmt-benchmarks', 'instruments')
+    xt_trader = FakeXtQuantTrader(market=install().market, position_codes=position_codes, cash=cash)
+    xt_trader.register_callback(MyXtQuantTraderCallback())
+    return Context(xt_trader, StockAccount(xt_trader.account_id), strategy_name=strategy_name)
+
+
+def close_context(context):
+    """
+    停止Context的定时任务和委托超时线程
+
+    参数:
+        context (Context): create_context创建的交易上下文
+    """
+    context.scheduler.stop()
+    context.order_manager.stop()
+
+
+def install_strategy_config():
+    """
+    策略目录下没有config.py时，以STRATEGY_CONFIG_DEFAULTS注册策略配置模块
+    """
+    module_name = 'strategys.一进二低吸战法.config'
+    if module_name in sys.modules:
+        return
+    if os.path.exists(os.path.join(ROOT_PATH, 'strategys', '一进二低吸战法', 'config.py')):
+        return
+    config = types.ModuleType(module_name)
+    config.__dict__.update(STRATEGY_CONFIG_DEFAULTS)
+    sys.modules[module_name] = config
+
+
+def install(market=None):
+    """
+    注册xtquant.xtdata和xtquant.xttrader替身，必须在导入trader模块之前调用，重复调用返回已注册的替身
+
+    参数:
+        market (SyntheticMarket): 合成行情，默认为None表示使用默认参数生成
+
+    返回:
+        FakeXtData: 注册的xtdata替身，合成行情为其market属性
+    """
+    installed = sys.modules.get('xtquant.xtdata')
+    if isinstance(installed, FakeXtData):
+        return installed
+    if ROOT_PATH not in sys.path:
+        sys.path.insert(0, ROOT_PATH)
+    import xtquant
+
+    xtdata = FakeXtData(market or SyntheticMarket())
+    xttrader = types.ModuleType('xtquant.xttrader')
+    xttrader.XtQuantTrader = FakeXtQuantTrader
+    xttrader.XtQuantTraderCallback = FakeXtQuantTraderCallback
+    sys.modules['xtquant.xtdata'] = xtdata
+    sys.modules['xtquant.xttrader'] = xttrader
+    xtquant.xtdata = xtdata
+    xtquant.xttrader = xttrader
+    install_strategy_config()
+    return xtdata
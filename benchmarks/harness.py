@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试框架
+
+各bench_*.py模块用@benchmark注册测试用例。被装饰的函数负责准备数据，返回被计时的无参函数，
+或返回Case以同时给出每次调用处理的项数（如K线根数）和附加指标（如内存占用）。
+
+计时方式与timeit相同：计时期间关闭垃圾回收，每轮连续调用number次，共repeat轮，
+number未指定时自动增加到每轮不少于MIN_ROUND_SECONDS。结果按名称保存为JSON，
+compare_results比较两次结果中每项耗时的最小值，用于发现不同提交之间的性能退化。
+"""
+
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# 已注册的测试用例，按注册顺序排列
+BENCHMARKS = []
+
+# 自动确定调用次数时，每轮的最短耗时（秒）
+MIN_ROUND_SECONDS = 0.2
+
+# 默认重复轮数
+DEFAULT_REPEAT = 5
+
+# 比较结果时判定为变慢或变快的耗时比例
+DEFAULT_THRESHOLD = 1.10
+
+
+class Case:
+    """
+    测试用例的计时对象
+    """
+
+    def __init__(self, func, items=1, metrics=None, teardown=None):
+        """
+        初始化计时对象
+
+        参数:
+            func (callable): 被计时的无参函数
+            items (int): 每次调用处理的项数，用于计算每项耗时，默认为1
+            metrics (dict): 附加指标，如内存占用、加速比，原样写入结果
+            teardown (callable): 计时结束后调用的清理函数
+        """
+        self.func = func
+        self.items = items
+        self.metrics = metrics or {}
+        self.teardown = teardown
+
+
+class Benchmark:
+    """
+    已注册的测试用例
+    """
+
+    def __init__(self, name, setup, description='', number=None, repeat=DEFAULT_REPEAT, slow=False):
+        self.name = name
+        self.setup = setup
+        self.description = description
+        self.number = number
+        self.repeat = repeat
+        self.slow = slow
+
+
+def benchmark(name, description='', number=None, repeat=DEFAULT_REPEAT, slow=False):
+    """
+    注册测试用例的装饰器
+
+    参数:
+        name (str): 用例名称，格式为"分组.名称"，结果按名称比较
+        description (str): 用例说明
+        number (int): 每轮调用次数，默认为None表示自动确定
+        repeat (int): 重复轮数，默认为DEFAULT_REPEAT
+        slow (bool): 是否为耗时较长的用例，默认不运行，需指定--slow
+
+    返回:
+        callable: 装饰器
+    """
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name, setup, description or (setup.__doc__ or '').strip().split('\n')[0],
+                                    number, repeat, slow))
+        return setup
+    return decorator
+
+
+def _time_calls(func, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure(case, number=None, repeat=DEFAULT_REPEAT):
+    """
+    对一个计时对象计时
+
+    参数:
+        case (Case): 计时对象
+        number (int): 每轮调用次数，默认为None表示自动确定
+        repeat (int): 重复轮数
+
+    返回:
+        dict: 调用次数、重复轮数、每次调用耗时（最小、中位数、平均，秒）和每项耗时（微秒）
+    """
+    if number is None:
+        # 与timeit.autorange相同，按1、2、5、10……增加调用次数，直到一轮不少于MIN_ROUND_SECONDS
+        number = 1
+        while True:
+            elapsed = _time_calls(case.func, number)
+            if elapsed >= MIN_ROUND_SECONDS:
+                break
+            number = number * 5 // 2 if str(number).startswith('2') else number * 2
+    rounds = np.array([_time_calls(case.func, number) for _ in range(repeat)]) / number
+    best = float(rounds.min())
+    return {
+        '调用次数': number,
+        '重复轮数': repeat,
+        '项数': case.items,
+        '每次调用(秒)': {
+            '最小': best,
+            '中位数': float(np.median(rounds)),
+            '平均': float(rounds.mean()),
+        },
+        '每项(微秒)': best / case.items * 1e6,
+    }
+
+
+def run_benchmarks(benchmarks, quick=False, log=print):
+    """
+    运行测试用例
+
+    参数:
+        benchmarks (list): Benchmark列表
+        quick (bool): 快速模式，每个用例只调用一次、计时一轮，用于检查用例能否运行
+        log (callable): 输出进度的函数
+
+    返回:
+        dict: {用例名称: 结果}，失败的用例结果中包含"错误"
+    """
+    results = {}
+    for item in benchmarks:
+        start = time.perf_counter()
+        try:
+            case = item.setup()
+            if not isinstance(case, Case):
+                case = Case(case)
+            try:
+                result = measure(case, 1 if quick else item.number, 1 if quick else item.repeat)
+            finally:
+                if case.teardown is not None:
+                    case.teardown()
+            result['说明'] = item.description
+            result['指标'] = case.metrics
+            log(f"{item.name:<45} {result['每项(微秒)']:>14.3f}us/项 "
+                f"{result['每次调用(秒)']['最小'] * 1e3:>12.3f}ms/次 "
+                f"(x{result['调用次数']} 共{time.perf_counter() - start:.1f}s)")
+        except Exception as e:
+            result = {'说明': item.description, '错误': f"{type(e).__name__}: {e}"}
+            log(f"{item.name:<45} 失败 {result['错误']}")
+        results[item.name] = result
+    return results
+
+
+def _git(*args):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return subprocess.run(['git', *args], cwd=root, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def environment_info():
+    """
+    获取运行环境信息
+
+    返回:
+        dict: 提交、是否有未提交修改、Python和依赖库版本、平台和CPU核心数
+    """
+    return {
+        '提交': _git('rev-parse', '--short', 'HEAD') or 'unknown',
+        '未提交修改': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        '平台': platform.platform(),
+        'CPU核心数': os.cpu_count(),
+    }
+
+
+def save_results(path, results):
+    """
+    将结果和运行环境保存为JSON文件
+
+    参数:
+        path (str): 文件路径
+        results (dict): run_benchmarks的返回结果
+
+    返回:
+        dict: 写入文件的内容
+    """
+    report = {
+        '时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        '环境': environment_info(),
+        '结果': results,
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def load_results(path):
+    """
+    读取结果文件
+
+    参数:
+        path (str): save_results写入的JSON文件路径
+
+    返回:
+        dict: 文件内容
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(base, current, threshold=DEFAULT_THRESHOLD):
+    """
+    比较两次结果中每个用例的每项耗时
+
+    参数:
+        base (dict): 基准结果，load_results的返回值
+        current (dict): 当前结果
+        threshold (float): 耗时比例超过threshold判定为变慢，低于1/threshold判定为变快
+
+    返回:
+        pd.DataFrame: 每行一个用例，包含基准和当前的每项耗时、比例和结论，按比例降序排列
+    """
+    rows = []
+    base_results, current_results = base['结果'], current['结果']
+    for name in dict.fromkeys([*base_results, *current_results]):
+        old, new = base_results.get(name, {}), current_results.get(name, {})
+        old_us, new_us = old.get('每项(微秒)'), new.get('每项(微秒)')
+        if old_us is None or new_us is None:
+            ratio, verdict = np.nan, '缺失'
+        else:
+            ratio = new_us / old_us if old_us > 0 else np.nan
+            verdict = '变慢' if ratio > threshold else '变快' if ratio < 1 / threshold else '持平'
+        rows.append({'用例': name, '基准(微秒)': old_us, '当前(微秒)': new_us, '比例': ratio, '结论': verdict})
+    return pd.DataFrame(rows).sort_values('比例', ascending=False, na_position='last').reset_index(drop=True)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+基准测试入口
+
+使用QMT接口替身和合成行情运行benchmarks目录下的全部bench_*.py，不需要QMT终端，可以在Linux上运行。
+结果按提交保存为JSON，两次结果可以用--compare比较：
+
+    python benchmarks/run.py                          # 运行全部用例（不含耗时较长的回测用例）
+    python benchmarks/run.py -k strategy -k quote     # 只运行名称包含strategy或quote的用例
+    python benchmarks/run.py --slow                   # 包含回测用例
+    python benchmarks/run.py --quick                  # 每个用例只运行一次，检查能否运行
+    python benchmarks/run.py --compare benchmarks/results/abc1234.json
+    python benchmarks/run.py --compare old.json new.json   # 只比较已有结果，不运行
+"""
+
+import argparse
+import glob
+import importlib
+import logging
+import os
+import sys
+
+# 添加项目根目录到系统路径
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_path)
+
+from benchmarks.fake_xtquant import install
+from benchmarks.harness import (BENCHMARKS, DEFAULT_THRESHOLD, compare_results, environment_info, load_results,
+                                run_benchmarks, save_results)
+
+# 结果文件默认目录
+RESULTS_DIR = os.path.join(root_path, 'benchmarks', 'results')
+
+
+def load_benchmarks():
+    """
+    导入全部bench_*.py模块，注册其中的用例
+
+    返回:
+        list: 已注册的Benchmark
+    """
+    install()
+    for path in sorted(glob.glob(os.path.join(root_path, 'benchmarks', 'bench_*.py'))):
+        importlib.import_module(f"benchmarks.{os.path.splitext(os.path.basename(path))[0]}")
+    return BENCHMARKS
+
+
+def default_output_path():
+    """
+    默认结果文件路径，以当前提交命名，有未提交修改时加-dirty后缀
+    """
+    env = environment_info()
+    return os.path.join(RESULTS_DIR, f"{env['提交']}{'-dirty' if env['未提交修改'] else ''}.json")
+
+
+def print_comparison(base, current, threshold):
+    """
+    输出比较结果
+
+    返回:
+        int: 变慢的用例数量
+    """
+    table = compare_results(base, current, threshold)
+    print(f"\n基准:{base['环境']['提交']} ({base['时间']})  当前:{current['环境']['提交']} ({current['时间']})")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return int((table['结论'] == '变慢').sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='trader和策略热点路径的基准测试')
+    parser.add_argument('-k', dest='keywords', action='append', default=[], help='只运行名称包含该关键字的用例，可重复指定')
+    parser.add_argument('--slow', action='store_true', help='包含耗时较长的用例')
+    parser.add_argument('--quick', action='store_true', help='每个用例只运行一次，用于检查用例能否运行')
+    parser.add_argument('--list', action='store_true', help='只列出用例')
+    parser.add_argument('--output', help='结果文件路径，默认为benchmarks/results/<提交>.json')
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help='与基准结果比较；给出两个文件时只比较这两个文件，不运行用例')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'判定变慢的耗时比例，默认为{DEFAULT_THRESHOLD}')
+    parser.add_argument('--fail-on-regression', action='store_true', help='有用例变慢时以非零状态退出')
+    parser.add_argument('--log-level', default='WARNING', help='运行期间的日志级别，默认为WARNING')
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        regressions = print_comparison(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        return 1 if regressions and args.fail_on_regression else 0
+
+    benchmarks = [item for item in load_benchmarks()
+                  if (args.slow or not item.slow)
+                  and (not args.keywords or any(keyword in item.name for keyword in args.keywords))]
+    if args.list:
+        for item in benchmarks:
+            print(f"{item.name:<45} {item.description}")
+        return 0
+
+    from trader.logger import logger
+    logger.setLevel(getattr(logging, args.log_level.upper()))
+
+    results = run_benchmarks(benchmarks, quick=args.quick)
+    output = args.output or default_output_path()
+    current = save_results(output, results)
+    print(f"\n结果已保存到:{output}")
+
+    if args.compare:
+        regressions = print_comparison(load_results(args.compare[0]), current, args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 1 if any('错误' in result for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,4 +14,7 @@ MINI_QMT_PATH = "D:\国金QMT交易端模拟\userdata_mini"  # miniQMT客户端
 LOG_LEVEL = "INFO"  # 日志级别，可选值：DEBUG, INFO, WARNING, ERROR, CRITICAL
 
 # 其他全局配置
-DEFAULT_ORDER_TIMEOUT = 60  # 默认订单超时时间（秒） 
\ No newline at end of file
+DEFAULT_ORDER_TIMEOUT = 60  # 默认订单超时时间（秒） 
+
+# 历史数据下载配置
+DOWNLOAD_CONCURRENT_CALLS = False  # 是否允许多块同时调用download_history_data2，确认QMT客户端支持并发下载后再开启
\ No newline at end of file
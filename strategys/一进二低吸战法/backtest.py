@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+一进二低吸战法回测入口文件
+
+使用本地K线存储中的日线选股、1分钟K线回放策略，不需要连接QMT，可以在Linux上运行。
+回测前需在QMT环境中将日线和股票池相关股票的1分钟K线同步到K线存储，例如：
+    context.custom_data.sync_bar_store(stock_list, period='1d')
+    context.custom_data.sync_bar_store(stock_list, period='1m')
+
+用法:
+    # 单进程逐日回测
+    python strategys/一进二低吸战法/backtest.py --start 20250102 --end 20251231 --cash 1000000
+    # 多进程分段回测
+    python strategys/一进二低吸战法/backtest.py --start 20250102 --end 20251231 --workers 8
+    # 参数扫描（任一参数给出多个取值时），每组参数一个进程
+    python strategys/一进二低吸战法/backtest.py --start 20250102 --end 20251231 \
+        --param MACDFS_SHORT=6,12 --param MACDFS_LONG=26,30 --param MAX_INTRADAY_GAIN=0.07,0.09
+
+结果（成交记录、每日权益曲线、汇总指标或参数扫描结果）保存在--output指定的目录。
+"""
+
+import os
+import sys
+import ast
+import argparse
+from datetime import datetime, timedelta
+
+# 添加项目根目录到系统路径
+root_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, root_path)  # 确保根目录优先级最高
+
+from trader.backtest import BacktestContext, BacktestEngine, save_backtest_results
+from trader.parallel_backtest import ParallelBacktestRunner
+from trader.bar_store import BarStore
+from trader.profiler import PROFILE_ENABLED, profiler
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+from strategys.一进二低吸战法.config import (
+    STRATEGY_NAME, NEW_HIGH_DAYS, MAIN_BOARD_ONLY, EXCLUDE_ONE_WORD_BOARD
+)
+from strategys.一进二低吸战法.strategy import YiJinErDiXiStrategy
+from strategys.一进二低吸战法.stock_pool import build_stock_pool_masks, is_main_board_stock
+
+
+def create_strategy(context, params=None):
+    """
+    创建回测使用的策略对象，作为多进程回测的策略工厂函数
+
+    Args:
+        context: 回测上下文
+        params: 覆盖默认参数的字典
+
+    Returns:
+        YiJinErDiXiStrategy: 策略对象
+    """
+    return YiJinErDiXiStrategy(context, data_download_success=True, params=params)
+
+
+def parse_params(items):
+    """
+    解析命令行参数中的策略参数
+
+    Args:
+        items: 形如"NAME=v1,v2"的字符串列表
+
+    Returns:
+        dict: {参数名: 取值列表}
+    """
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition('=')
+        grid[name.strip()] = [ast.literal_eval(value.strip()) for value in values.split(',') if value.strip()]
+    return grid
+
+
+def create_stock_pool_provider(bar_store):
+    """
+    创建按交易日选股的函数
+
+    使用交易日之前的日线面板按filter_stock_pool相同的涨停、首次涨停、新高条件选股。
+    K线存储中没有历史名称、市值和停牌信息，ST、市值和停牌条件在回测中不生效。
+
+    Args:
+        bar_store: 本地K线存储
+
+    Returns:
+        callable: 参数为交易日（YYYYMMDD），返回股票代码列表
+    """
+    def provider(day):
+        previous_day = (datetime.strptime(day, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
+        codes, times, data = bar_store.read('1d', fields=['open', 'close', 'volume'], end_time=previous_day,
+                                            count=NEW_HIGH_DAYS + 2)
+        if not codes:
+            logger.warning(f"{YELLOW}【回测选股】{RESET} 日期:{day} 没有日线数据")
+            return []
+        masks = build_stock_pool_masks(codes, data)
+        selected_mask = masks['数据充足'] & masks['涨停'] & masks['首次涨停'] & masks['新高']
+        if EXCLUDE_ONE_WORD_BOARD:
+            selected_mask &= ~masks['一字板']
+        selected = [code for code, keep in zip(codes, selected_mask)
+                    if keep and (not MAIN_BOARD_ONLY or is_main_board_stock(code))]
+        logger.debug(f"{BLUE}【回测选股】{RESET} 日期:{day} 股票池:{selected}")
+        return selected
+
+    return provider
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='一进二低吸战法分钟线回测')
+    parser.add_argument('--start', required=True, help='开始日期，格式为YYYYMMDD')
+    parser.add_argument('--end', required=True, help='结束日期，格式为YYYYMMDD')
+    parser.add_argument('--cash', type=float, default=1000000.0, help='初始资金')
+    parser.add_argument('--bar-root', default='data/bars', help='K线存储根目录')
+    parser.add_argument('--output', default='backtest_results', help='结果输出目录')
+    parser.add_argument('--workers', type=int, default=1, help='进程数，大于1时分段并行回测')
+    parser.add_argument('--param', action='append', help='策略参数，格式为NAME=v1,v2，多个取值时进行参数扫描')
+    args = parser.parse_args()
+
+    try:
+        param_grid = parse_params(args.param)
+        params = {name: values[0] for name, values in param_grid.items()}
+        if any(len(values) > 1 for values in param_grid.values()):
+            runner = ParallelBacktestRunner(create_strategy, create_stock_pool_provider, bar_root=args.bar_root,
+                                            initial_cash=args.cash, max_workers=args.workers if args.workers > 1 else None,
+                                            context_kwargs={'strategy_name': STRATEGY_NAME})
+            results = runner.sweep(param_grid, args.start, args.end)
+            os.makedirs(args.output, exist_ok=True)
+            results.to_csv(os.path.join(args.output, 'sweep.csv'), index=False, encoding='utf-8-sig')
+            logger.info(f"{GREEN}【参数扫描结果】{RESET} 已保存到:{args.output}")
+        elif args.workers > 1:
+            runner = ParallelBacktestRunner(create_strategy, create_stock_pool_provider, bar_root=args.bar_root,
+                                            initial_cash=args.cash, max_workers=args.workers,
+                                            context_kwargs={'strategy_name': STRATEGY_NAME})
+            results = runner.run(args.start, args.end, params)
+            save_backtest_results(args.output, results['trades'], results['equity'], results['summary'])
+        else:
+            bar_store = BarStore(args.bar_root)
+            context = BacktestContext(initial_cash=args.cash, strategy_name=STRATEGY_NAME)
+            strategy = create_strategy(context, params)
+            engine = BacktestEngine(context, strategy, bar_store, create_stock_pool_provider(bar_store))
+            engine.run(args.start, args.end)
+            engine.save_results(args.output)
+            if PROFILE_ENABLED:
+                profiler.report(os.path.join(args.output, 'profile.json'))
+    except KeyboardInterrupt:
+        logger.info(f"{YELLOW}【回测终止】{RESET} 用户手动终止回测")
+        sys.exit(0)
+    except Exception as e:
+        logger.error(f"{RED}【回测错误】{RESET} {e}")
+        raise
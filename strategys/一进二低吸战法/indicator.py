@@ -8,6 +8,7 @@ MACDFS指标计算模块
 
 import pandas as pd
 import numpy as np
+from bisect import bisect_left
 
 
 def calculate_ema_with_init(prices, period, init_value=None):
@@ -90,6 +91,279 @@ def calculate_macdfs(prices, fast_period=12, slow_period=26, signal_period=9, op
     return result
 
 
+def macdfs_step(price, fast_ema, slow_ema, dea, fast_multiplier, slow_multiplier, signal_multiplier):
+    """
+    MACDFS的单步递推：由上一分钟的状态和当前分钟的收盘价计算当前分钟的状态
+
+    逐只股票的增量计算和批量计算共用这一递推，参数可以是标量，也可以是可互相广播的numpy数组。
+    开盘第一分钟不做递推，快线和慢线EMA设为开盘价，DEA设为0。
+
+    Args:
+        price: 当前分钟收盘价
+        fast_ema: 上一分钟快线EMA
+        slow_ema: 上一分钟慢线EMA
+        dea: 上一分钟DEA
+        fast_multiplier: 快线EMA系数，2 / (快线周期 + 1)
+        slow_multiplier: 慢线EMA系数
+        signal_multiplier: 信号线EMA系数
+
+    Returns:
+        tuple: 当前分钟的(快线EMA, 慢线EMA, DIF, DEA, MACDFS)
+    """
+    fast_ema = (price - fast_ema) * fast_multiplier + fast_ema
+    slow_ema = (price - slow_ema) * slow_multiplier + slow_ema
+    dif = fast_ema - slow_ema
+    dea = (dif - dea) * signal_multiplier + dea
+    return fast_ema, slow_ema, dif, dea, 2 * (dif - dea)
+
+
+def _first_valid(prices, init_values):
+    """
+    找出每只股票第一个有效价格的位置，并确定EMA初始值
+
+    Args:
+        prices (numpy.ndarray): 价格矩阵，形状为(股票数, 分钟数)
+        init_values (numpy.ndarray, optional): 每只股票的EMA初始值，为None时使用第一个有效价格
+
+    Returns:
+        tuple: (有效价格掩码, 第一个有效价格的列号, 初始值)，没有任何有效价格的股票列号为0
+    """
+    valid = ~np.isnan(prices)
+    first = valid.argmax(axis=1)
+    if init_values is None:
+        init_values = prices[np.arange(prices.shape[0]), first]
+    else:
+        init_values = np.broadcast_to(np.asarray(init_values, dtype=np.float64), prices.shape[:1])
+    return valid, first, init_values
+
+
+def calculate_ema_batch(prices, period, init_values=None):
+    """
+    批量计算多只股票的EMA，支持每只股票单独的初始值
+
+    按时间列递推，每一步对所有股票做一次向量化运算。价格为NaN（停牌、无成交或未上市）的分钟
+    不参与递推：第一个有效价格之前为NaN，第一个有效价格处EMA设为初始值，之后的NaN沿用上一分钟的EMA，
+    与实盘中没有K线推送的分钟不更新状态一致。因此每只股票有效价格处的结果与只对有效价格调用
+    calculate_ema_with_init一致；没有NaN时与对整行调用calculate_ema_with_init一致。
+    calculate_ema_with_init遇到NaN会使之后的EMA全部为NaN，两者在有缺失数据时不同。
+
+    Args:
+        prices (numpy.ndarray): 价格矩阵，形状为(股票数, 分钟数)
+        period (int): EMA计算周期
+        init_values (numpy.ndarray, optional): 每只股票的EMA初始值，形状为(股票数,)，
+            默认为None表示使用每只股票第一个有效价格
+
+    Returns:
+        numpy.ndarray: EMA矩阵，形状与prices相同
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 2:
+        raise ValueError("prices必须是(股票数, 分钟数)的二维数组")
+
+    ema_values = np.full_like(prices, np.nan)
+    if prices.shape[1] == 0:
+        return ema_values
+    valid, first, init_values = _first_valid(prices, init_values)
+
+    # EMA计算参数
+    multiplier = 2.0 / (period + 1)
+
+    # 按列递推，每一列对全部股票向量化计算。第一个有效价格处用初始值代替价格递推，EMA即为初始值
+    ema = init_values.copy()
+    for i in range(prices.shape[1]):
+        column = np.where(first == i, init_values, prices[:, i])
+        ema = np.where(valid[:, i], (column - ema) * multiplier + ema, ema)
+        ema_values[:, i] = ema
+
+    # 第一个有效价格之前没有EMA
+    ema_values[~np.logical_or.accumulate(valid, axis=1)] = np.nan
+    return ema_values
+
+
+def calculate_macdfs_batch(prices, open_prices=None, fast_period=12, slow_period=26, signal_period=9):
+    """
+    批量计算多只股票的分时MACD指标(MACDFS)
+
+    与calculate_macdfs的计算方式相同，但一次处理整个股票池，适用于重启后重建指标
+    或对全部沪深A股做回测。没有NaN时每只股票的结果与calculate_macdfs(prices[i], open_price=open_prices[i])一致。
+
+    NaN的处理与calculate_ema_batch相同：每只股票只用自己的有效价格递推，EMA初始值为开盘价或第一个有效价格，
+    第一个有效价格之前为NaN，之后的NaN沿用上一分钟的DIF、DEA和MACDFS，与StreamingMACDFS只收到有效K线时一致。
+
+    周期参数可以是一维数组（长度相同或可广播），此时参数组作为结果的第一个维度，按分钟列递推时
+    每一步对全部参数组和全部股票做一次向量化运算，用于参数优化时一次计算多组周期。
+
+    Args:
+        prices (numpy.ndarray): 分钟收盘价矩阵，形状为(股票数, 分钟数)
+        open_prices (numpy.ndarray, optional): 每只股票的开盘价，形状为(股票数,)，
+            默认为None表示使用每只股票第一个有效价格
+        fast_period (int or numpy.ndarray): 快线周期，默认为12
+        slow_period (int or numpy.ndarray): 慢线周期，默认为26
+        signal_period (int or numpy.ndarray): 信号线周期，默认为9
+
+    Returns:
+        dict: 包含'DIF'、'DEA'、'MACDFS'三个键，周期为标量时值的形状与prices相同，
+            为数组时形状为(参数组数, 股票数, 分钟数)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 2:
+        raise ValueError("prices必须是(股票数, 分钟数)的二维数组")
+    periods = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (fast_period, slow_period, signal_period)))
+    if periods[0].ndim > 1:
+        raise ValueError("周期参数必须是标量或一维数组")
+
+    # EMA计算参数，形状为(参数组数, 1)，与(参数组数, 股票数)的状态广播；标量周期按一组参数计算
+    fast_multiplier, slow_multiplier, signal_multiplier = (2.0 / (p.reshape(-1, 1) + 1) for p in periods)
+    n_params = len(fast_multiplier)
+
+    result = {key: np.full((n_params,) + prices.shape, np.nan) for key in ('DIF', 'DEA', 'MACDFS')}
+    if prices.shape[1] > 0:
+        valid, first, init_values = _first_valid(prices, open_prices)
+
+        # 快线和慢线EMA初始值设为开盘价，DEA初始值为0。第一个有效价格处用开盘价代替价格递推，状态保持为初始值
+        fast = np.broadcast_to(init_values, (n_params, prices.shape[0])).copy()
+        slow = fast.copy()
+        dea = np.zeros_like(fast)
+        for i in range(prices.shape[1]):
+            column = np.where(first == i, init_values, prices[:, i])
+            column_valid = valid[:, i]
+            step = macdfs_step(column, fast, slow, dea, fast_multiplier, slow_multiplier, signal_multiplier)
+            fast = np.where(column_valid, step[0], fast)
+            slow = np.where(column_valid, step[1], slow)
+            dea = np.where(column_valid, step[3], dea)
+            dif = fast - slow
+            result['DIF'][..., i] = dif
+            result['DEA'][..., i] = dea
+            result['MACDFS'][..., i] = 2 * (dif - dea)
+
+        # 第一个有效价格之前没有指标
+        not_started = ~np.logical_or.accumulate(valid, axis=1)
+        for values in result.values():
+            values[:, not_started] = np.nan
+
+    if periods[0].ndim == 0:
+        result = {key: values[0] for key, values in result.items()}
+    return result
+
+
+class StreamingMACDFS:
+    """
+    增量计算的分时MACD指标(MACDFS)
+
+    保存快线EMA、慢线EMA和DEA的逐根状态，每收到一根新K线只做一次O(1)递推，
+    不再像calculate_macdfs那样每分钟对全天价格重新计算。计算结果与
+    calculate_macdfs(prices, open_price=open_price)逐根一致。
+
+    K线以时间为键：
+    - 时间晚于最后一根：追加并递推
+    - 时间等于最后一根（同一分钟的重复推送）：用前一根的状态重新计算最后一根
+    - 时间早于最后一根（迟到的K线）：插入到对应位置，并从该位置起向后重算
+
+    一个实例对应一只股票一个交易日，新交易日需调用reset()或重新创建。
+    """
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9, open_price=None):
+        """
+        初始化MACDFS状态
+
+        Args:
+            fast_period (int): 快线周期，默认为12
+            slow_period (int): 慢线周期，默认为26
+            signal_period (int): 信号线周期，默认为9
+            open_price (float, optional): 开盘价，用于初始化EMA值，默认为None表示使用第一个价格
+        """
+        self.fast_multiplier = 2.0 / (fast_period + 1)
+        self.slow_multiplier = 2.0 / (slow_period + 1)
+        self.signal_multiplier = 2.0 / (signal_period + 1)
+        self.reset(open_price)
+
+    def reset(self, open_price=None):
+        """
+        清空状态，开始新交易日的计算
+
+        Args:
+            open_price (float, optional): 新交易日的开盘价，默认为None表示使用第一个价格
+        """
+        self.open_price = open_price
+        self.times = []  # K线时间
+        self.prices = []  # K线收盘价
+        self.fast_ema = []  # 快线EMA
+        self.slow_ema = []  # 慢线EMA
+        self.dif = []  # DIF
+        self.dea = []  # DEA
+        self.macdfs = []  # MACDFS柱状线
+
+    def __len__(self):
+        return len(self.macdfs)
+
+    def update(self, bar_time, price):
+        """
+        加入一根K线的收盘价并返回最新的MACDFS值
+
+        Args:
+            bar_time: K线时间，可以是datetime或毫秒时间戳，只要同一实例内可比较即可
+            price (float): K线收盘价
+
+        Returns:
+            float: 最新一根K线的MACDFS值
+        """
+        if not self.times or bar_time > self.times[-1]:
+            self.times.append(bar_time)
+            self.prices.append(price)
+            self._recalculate_from(len(self.times) - 1)
+        elif bar_time == self.times[-1]:
+            self.prices[-1] = price
+            self._recalculate_from(len(self.times) - 1)
+        else:
+            index = bisect_left(self.times, bar_time)
+            if self.times[index] == bar_time:
+                self.prices[index] = price
+            else:
+                self.times.insert(index, bar_time)
+                self.prices.insert(index, price)
+            self._recalculate_from(index)
+        return self.macdfs[-1]
+
+    def _recalculate_from(self, index):
+        """
+        从指定位置开始递推EMA状态，index之前的状态保持不变
+
+        Args:
+            index (int): 开始重算的位置
+        """
+        # 截断index及之后的旧状态
+        del self.fast_ema[index:], self.slow_ema[index:], self.dif[index:], self.dea[index:], self.macdfs[index:]
+
+        for i in range(index, len(self.prices)):
+            if i == 0:
+                # 开盘第一分钟EMA初始值设为开盘价，DEA初始值为0
+                init_value = self.open_price if self.open_price is not None else self.prices[0]
+                fast, slow, dea = init_value, init_value, 0.0
+                dif = fast - slow
+                macdfs = 2 * (dif - dea)
+            else:
+                fast, slow, dif, dea, macdfs = macdfs_step(self.prices[i], self.fast_ema[-1], self.slow_ema[-1], self.dea[-1],
+                                                           self.fast_multiplier, self.slow_multiplier, self.signal_multiplier)
+            self.fast_ema.append(fast)
+            self.slow_ema.append(slow)
+            self.dif.append(dif)
+            self.dea.append(dea)
+            self.macdfs.append(macdfs)
+
+    def to_frame(self):
+        """
+        以DataFrame形式返回全部结果，格式与calculate_macdfs一致
+
+        Returns:
+            pandas.DataFrame: 包含DIF、DEA和MACDFS三列的DataFrame
+        """
+        return pd.DataFrame({
+            'DIF': self.dif,
+            'DEA': self.dea,
+            'MACDFS': self.macdfs
+        }, columns=['DIF', 'DEA', 'MACDFS'])
+
+
 def is_green_bar_shrinking(macdfs_values):
     """
     判断MACDFS绿柱是否连续两根上缩
@@ -141,4 +415,38 @@ def is_red_bar_shrinking(macdfs_values):
     if v2 < v1 and v3 < v2:
         return True
     
-    return False 
\ No newline at end of file
+    return False 
+
+
+def green_bar_shrinking_mask(macdfs):
+    """
+    逐分钟判断MACDFS绿柱是否连续两根上缩，向量化版本的is_green_bar_shrinking
+
+    Args:
+        macdfs (numpy.ndarray): MACDFS数组，最后一个维度为分钟
+
+    Returns:
+        numpy.ndarray: 与macdfs形状相同的布尔数组，前两分钟为False
+    """
+    mask = np.zeros(np.shape(macdfs), dtype=bool)
+    v1, v2, v3 = macdfs[..., :-2], macdfs[..., 1:-1], macdfs[..., 2:]
+    # 三根均为绿柱且绝对值连续变小，即v1 < v2 < v3 < 0
+    mask[..., 2:] = (v3 < 0) & (v1 < v2) & (v2 < v3)
+    return mask
+
+
+def red_bar_shrinking_mask(macdfs):
+    """
+    逐分钟判断MACDFS红柱是否连续两根下缩，向量化版本的is_red_bar_shrinking
+
+    Args:
+        macdfs (numpy.ndarray): MACDFS数组，最后一个维度为分钟
+
+    Returns:
+        numpy.ndarray: 与macdfs形状相同的布尔数组，前两分钟为False
+    """
+    mask = np.zeros(np.shape(macdfs), dtype=bool)
+    v1, v2, v3 = macdfs[..., :-2], macdfs[..., 1:-1], macdfs[..., 2:]
+    # 三根均为红柱且连续变小，即v1 > v2 > v3 > 0
+    mask[..., 2:] = (v3 > 0) & (v1 > v2) & (v2 > v3)
+    return mask
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分时状态存储模块
+
+按股票保存当日的分钟收盘价、MACDFS柱状线、当日最高价和涨停价，替代按{股票: {日期: 值}}嵌套的字典缓存：
+1. K线时间、收盘价和MACDFS保存在预分配的二维数组中，每只股票一行，每行SESSION_SLOTS个位置（每日240根1分钟K线），
+   按环形缓冲区写入，超过容量时覆盖最早的值，策略只读取最近几根
+2. 每只股票一个使用__slots__的状态对象，保存行号、K线数量、EMA递推状态、当日最高价、涨停价，
+   以及买卖规则用到的最近三根MACDFS和最近两根收盘价，读取时不访问数组
+3. 新交易日调用reset()只递增代数，是O(1)操作；状态对象在下次访问时发现代数变化再清空
+
+MACDFS的递推与StreamingMACDFS相同（共用indicator.macdfs_step）：开盘第一分钟EMA初始值为第一个价格，DEA初始值为0。
+同一分钟的重复K线重新计算最后一根；早于最后一根的迟到K线按时间插入，并用数组中的收盘价从第一根起重算该股票的MACDFS。
+环形缓冲区已写满（最早的K线已被覆盖）时无法重算，迟到K线忽略。
+"""
+
+import sys
+
+import numpy as np
+
+from strategys.一进二低吸战法.indicator import macdfs_step
+
+# 每个交易日的K线位置数
+SESSION_SLOTS = 240
+
+# 预分配的股票行数，不足时按倍数扩容
+DEFAULT_CAPACITY = 64
+
+
+class StockIntradayState:
+    """
+    单只股票的当日分时状态
+    """
+
+    __slots__ = ('store', 'stock_code', 'row', 'generation', 'count', 'last_time', 'high', 'limit_up',
+                 'fast_ema', 'slow_ema', 'dea', 'prev_fast_ema', 'prev_slow_ema', 'prev_dea',
+                 'last_macdfs', 'last_closes')
+
+    def __init__(self, store, stock_code, row):
+        self.store = store
+        self.stock_code = stock_code
+        self.row = row
+        self.clear(store.generation)
+
+    def clear(self, generation):
+        """
+        清空当日状态
+
+        Args:
+            generation (int): 所属的存储代数
+        """
+        self.generation = generation
+        self.count = 0  # 当日K线数量
+        self.last_time = None  # 最后一根K线时间
+        self.high = 0.0  # 当日最高价
+        self.limit_up = None  # 当日涨停价，None表示尚未获取
+        self.fast_ema = self.slow_ema = self.dea = 0.0
+        self.prev_fast_ema = self.prev_slow_ema = self.prev_dea = 0.0
+        self.last_macdfs = ()  # 最近三根MACDFS值，按时间先后排列
+        self.last_closes = ()  # 最近两根收盘价，按时间先后排列
+
+    def _recent(self, values, n):
+        count = self.count
+        n = min(n, count, self.store.slots)
+        slots = self.store.slots
+        row = values[self.row]
+        return [float(row[i % slots]) for i in range(count - n, count)]
+
+    def recent_closes(self, n=2):
+        """
+        从数组中获取最近n根K线的收盘价，n不超过2时可直接使用last_closes
+
+        Args:
+            n (int): 数量，默认为2
+
+        Returns:
+            list: 按时间先后排列的收盘价，不足n根时返回全部
+        """
+        return self._recent(self.store.closes, n)
+
+    def recent_macdfs(self, n=3):
+        """
+        从数组中获取最近n根K线的MACDFS值，n不超过3时可直接使用last_macdfs
+
+        Args:
+            n (int): 数量，默认为3
+
+        Returns:
+            list: 按时间先后排列的MACDFS值，不足n根时返回全部
+        """
+        return self._recent(self.store.macdfs, n)
+
+
+class IntradayState:
+    """
+    分时状态存储
+    """
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9, slots=SESSION_SLOTS, capacity=DEFAULT_CAPACITY):
+        """
+        初始化分时状态存储
+
+        Args:
+            fast_period (int): MACDFS快线周期，默认为12
+            slow_period (int): MACDFS慢线周期，默认为26
+            signal_period (int): MACDFS信号线周期，默认为9
+            slots (int): 每只股票保存的K线数量，默认为SESSION_SLOTS
+            capacity (int): 预分配的股票行数，默认为DEFAULT_CAPACITY
+        """
+        self.fast_multiplier = 2.0 / (fast_period + 1)
+        self.slow_multiplier = 2.0 / (slow_period + 1)
+        self.signal_multiplier = 2.0 / (signal_period + 1)
+        self.slots = slots
+        self.capacity = max(int(capacity), 1)
+        self.times = np.empty((self.capacity, slots), dtype=object)  # K线时间，用于插入迟到的K线
+        self.closes = np.zeros((self.capacity, slots), dtype=np.float64)
+        self.macdfs = np.zeros((self.capacity, slots), dtype=np.float64)
+        self.states = {}  # 格式：{stock_code: StockIntradayState}
+        self.generation = 0
+
+    def reset(self):
+        """
+        开始新交易日，全部股票的状态在下次访问时清空
+        """
+        self.generation += 1
+
+    def get(self, stock_code):
+        """
+        获取股票的当日状态，不存在时分配新的一行
+
+        Args:
+            stock_code (str): 股票代码
+
+        Returns:
+            StockIntradayState: 状态对象
+        """
+        state = self.states.get(stock_code)
+        if state is None:
+            row = len(self.states)
+            if row >= self.capacity:
+                self._grow(self.capacity * 2)
+            state = self.states[stock_code] = StockIntradayState(self, stock_code, row)
+        elif state.generation != self.generation:
+            state.clear(self.generation)
+        return state
+
+    def _grow(self, capacity):
+        for name in ('times', 'closes', 'macdfs'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, self.slots), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def update(self, stock_code, bar_data):
+        """
+        加入一根K线，更新收盘价、MACDFS和当日最高价
+
+        Args:
+            stock_code (str): 股票代码
+            bar_data: K线数据，需包含time、high、close
+
+        Returns:
+            StockIntradayState: 状态对象
+        """
+        state = self.get(stock_code)
+        bar_time = bar_data.time
+        price = bar_data.close
+        if state.count and bar_time == state.last_time:
+            # 同一分钟的重复K线，从前一根的状态重新计算最后一根
+            position = (state.count - 1) % self.slots
+            first = state.count == 1
+            last_macdfs, last_closes = state.last_macdfs[:-1], state.last_closes[:-1]
+        elif state.count and bar_time < state.last_time:
+            if state.count < self.slots:
+                self._insert_late(state, bar_time, price)
+            if bar_data.high > state.high:
+                state.high = bar_data.high
+            return state
+        else:
+            state.prev_fast_ema, state.prev_slow_ema, state.prev_dea = state.fast_ema, state.slow_ema, state.dea
+            position = state.count % self.slots
+            first = state.count == 0
+            state.count += 1
+            state.last_time = bar_time
+            last_macdfs, last_closes = state.last_macdfs[-2:], state.last_closes[-1:]
+
+        if first:
+            # 开盘第一分钟EMA初始值设为第一个价格，DEA初始值为0
+            fast = slow = price
+            dea = macdfs = 0.0
+        else:
+            fast, slow, _, dea, macdfs = macdfs_step(price, state.prev_fast_ema, state.prev_slow_ema, state.prev_dea,
+                                                     self.fast_multiplier, self.slow_multiplier, self.signal_multiplier)
+        state.fast_ema, state.slow_ema, state.dea = fast, slow, dea
+        state.last_macdfs = last_macdfs + (macdfs,)
+        state.last_closes = last_closes + (price,)
+        self.times[state.row, position] = bar_time
+        self.closes[state.row, position] = price
+        self.macdfs[state.row, position] = macdfs
+        if bar_data.high > state.high:
+            state.high = bar_data.high
+        return state
+
+    def _insert_late(self, state, bar_time, price):
+        """
+        按时间插入迟到的K线（环形缓冲区未写满时），并从第一根起重算该股票的MACDFS
+
+        Args:
+            state (StockIntradayState): 状态对象
+            bar_time: K线时间
+            price (float): K线收盘价
+        """
+        row, count = state.row, state.count
+        times, closes, macdfs = self.times[row], self.closes[row], self.macdfs[row]
+        index = int(np.searchsorted(times[:count], bar_time))
+        if times[index] == bar_time:
+            closes[index] = price
+        else:
+            times[index + 1:count + 1] = times[index:count]
+            closes[index + 1:count + 1] = closes[index:count]
+            times[index] = bar_time
+            closes[index] = price
+            count = state.count = count + 1
+
+        fast = slow = float(closes[0])
+        dea = 0.0
+        macdfs[0] = 0.0
+        for i in range(1, count):
+            state.prev_fast_ema, state.prev_slow_ema, state.prev_dea = fast, slow, dea
+            fast, slow, _, dea, macdfs[i] = macdfs_step(float(closes[i]), fast, slow, dea, self.fast_multiplier,
+                                                        self.slow_multiplier, self.signal_multiplier)
+        state.fast_ema, state.slow_ema, state.dea = fast, slow, dea
+        state.last_macdfs = tuple(float(value) for value in macdfs[max(count - 3, 0):count])
+        state.last_closes = tuple(float(value) for value in closes[max(count - 2, 0):count])
+
+    def nbytes(self):
+        """
+        估算占用的内存
+
+        Returns:
+            int: 数组和状态对象占用的字节数
+        """
+        handles = sum(sys.getsizeof(state) for state in self.states.values()) + sys.getsizeof(self.states)
+        return int(self.times.nbytes + self.closes.nbytes + self.macdfs.nbytes + handles)
@@ -23,10 +23,15 @@ if os.path.exists(xtquant_path):
 
 # 导入全局配置
 from config import ACCOUNT_ID, MINI_QMT_PATH
+try:
+    from config import DOWNLOAD_CONCURRENT_CALLS
+except ImportError:
+    DOWNLOAD_CONCURRENT_CALLS = False  # 旧的全局配置文件没有该项时串行下载
 
 from trader.trader import create_trader
 from trader.context import Context
 from trader.logger import logger
+from trader.profiler import PROFILE_ENABLED, PROFILE_REPORT_INTERVAL, profiler
 from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
 from trader.utils import add_stock_suffix
 
@@ -58,12 +63,18 @@ def download_astock_history_data(context):
         
         # 股票代码添加市场后缀并批量下载
         stock_codes_with_suffix = [add_stock_suffix(code) for code in all_stocks]
-        context.custom_data.download_qmt_history_data(
+        download_success = context.custom_data.download_qmt_history_data(
             stock_list=stock_codes_with_suffix,
             period='1d', 
             start_time='20250101'
         )
+        if not download_success:
+            logger.warning(f"{YELLOW}【数据准备】{RESET} 部分A股历史数据下载失败，下次运行将从检查点继续")
+            return False
         logger.info(f"{GREEN}【数据准备】{RESET} A股历史数据下载完成")
+        
+        # 增量同步到本地K线存储，选股时直接从存储读取
+        context.custom_data.sync_bar_store(stock_codes_with_suffix, period='1d')
         return True
     except Exception as e:
         logger.error(f"{RED}【下载错误】{RESET} {e}")
@@ -102,6 +113,10 @@ if __name__ == "__main__":
         logger.info(f"{GREEN}【系统启动】{RESET} 正在创建交易上下文...")
         context = Context(xt_trader, account, strategy_name=STRATEGY_NAME)
         
+        # 启用本地K线存储
+        context.custom_data.enable_bar_store()
+        context.custom_data.download_concurrent_calls = DOWNLOAD_CONCURRENT_CALLS
+        
         # 下载A股历史数据
         logger.info(f"{GREEN}【系统启动】{RESET} 正在下载A股历史数据...")
         # data_download_success = download_astock_history_data(context)
@@ -114,6 +129,18 @@ if __name__ == "__main__":
         # 启动时立即更新股票池
         logger.info(f"{GREEN}【策略启动】{RESET} 正在更新股票池...")
         strategy.update_stock_pool()
+
+        # 每秒收盘已到结束时间、但没有新分笔行情的分钟K线
+        context.run_time(strategy.bar_builder.flush, "1nSecond")
+
+        # 开启性能分析时（环境变量QMT_PROFILE=1）定时输出各环节耗时
+        if PROFILE_ENABLED:
+            context.run_time(profiler.report, PROFILE_REPORT_INTERVAL)
+            logger.info(f"{BLUE}【性能分析】{RESET} 已开启 报告周期:{PROFILE_REPORT_INTERVAL}")
+
+        # 每个交易日定时下载数据并刷新股票池
+        context.run_daily(lambda: refresh_stock_pool_task(context), STOCK_POOL_REFRESH_TIME)
+        logger.info(f"{GREEN}【定时任务】{RESET} 股票池刷新时间:{STOCK_POOL_REFRESH_TIME}")
         xt_trader.run_forever()
             
     except KeyboardInterrupt:
@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+一进二低吸战法参数优化模块
+
+不对每组参数重新运行策略类，而是把策略的买卖规则写成数组运算：每个交易日把股票池的分钟线整理为
+(股票数, 分钟数)的价格矩阵，参数网格作为额外的维度广播到矩阵上，一次算出全部参数组合的买卖点和盈亏。
+参数网格按MACDFS周期分块计算，每块的中间数组大小不超过memory_limit，参数组合再多峰值内存也有上限。
+
+可优化的参数：MACDFS_SHORT、MACDFS_LONG、MACDFS_SIGNAL、MAX_INTRADAY_GAIN、FIRST_SELL_RATIO、NEXT_SELL_RATIO，
+未给出的参数使用策略的默认参数。
+
+计算规则：
+1. 买入: 股票池中的股票在MACDFS绿柱连续两根上缩、日内最高涨幅不超过MAX_INTRADAY_GAIN、价格高于分时均价时买入，
+   每只股票当日在第一个能成交的信号买入一次，买入金额为BUY_AMOUNT
+2. 卖出: 买入次日起，次日开盘低开且第一分钟收阴、涨停开板时清仓；MACDFS红柱连续两根下缩且未涨停时，
+   当日第一次卖出FIRST_SELL_RATIO、之后卖出NEXT_SELL_RATIO的剩余仓位；持有满hold_days个交易日后按收盘价清仓
+3. 撮合: 与BacktestContext相同，委托在下一分钟按开盘价加减滑点成交，一字涨停不能买入、一字跌停不能卖出，
+   当日最后一分钟的信号不成交
+
+与BacktestEngine逐分钟回测的差异：每笔交易独立计算，不受资金和仓位上限约束；卖出按比例计算，不取整到股；
+卖出佣金不计最低佣金；策略有持仓后不再检查买入信号，只有委托未成交被撤销后才会按MAX_BUY_TIMES再次买入，
+优化器跳过下一分钟不能成交的信号，每只股票当日最多买入一次，因此不优化MAX_BUY_TIMES。
+结果适合比较参数的相对优劣，选出的参数建议再用backtest.py回测确认。
+
+用法:
+    python strategys/一进二低吸战法/optimizer.py --start 20250102 --end 20251231 \
+        --param MACDFS_SHORT=6,9,12 --param MACDFS_LONG=20,26 --param MAX_INTRADAY_GAIN=0.05,0.07,0.09 \
+        --param FIRST_SELL_RATIO=0.3,0.5,1.0 --param NEXT_SELL_RATIO=0.5,1.0
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到系统路径
+root_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, root_path)  # 确保根目录优先级最高
+
+from trader.backtest import (
+    BACKTEST_BAR_FIELDS, COMMISSION_RATE, MIN_COMMISSION, STAMP_TAX_RATE, TRANSFER_FEE_RATE, SLIPPAGE,
+    calculate_limit_prices
+)
+from trader.bar_store import BarStore
+from trader.vwap import cumulative_vwap, get_volume_unit
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+from strategys.一进二低吸战法.strategy import DEFAULT_PARAMS
+from strategys.一进二低吸战法.indicator import (
+    calculate_macdfs_batch, green_bar_shrinking_mask, red_bar_shrinking_mask
+)
+
+# 可优化的参数
+OPTIMIZE_PARAMS = ['MACDFS_SHORT', 'MACDFS_LONG', 'MACDFS_SIGNAL', 'MAX_INTRADAY_GAIN', 'FIRST_SELL_RATIO',
+                   'NEXT_SELL_RATIO']
+
+HOLD_DAYS = 3  # 买入后最多持有的交易日数
+MEMORY_LIMIT = 512 * 1024 * 1024  # 每个参数块中间数组的内存上限（字节）
+
+
+class ParameterOptimizer:
+    """
+    一进二低吸战法向量化参数优化器
+    """
+
+    def __init__(self, bar_store, stock_pool, buy_amount=None, hold_days=HOLD_DAYS, memory_limit=MEMORY_LIMIT,
+                 commission_rate=COMMISSION_RATE, min_commission=MIN_COMMISSION, stamp_tax_rate=STAMP_TAX_RATE,
+                 transfer_fee_rate=TRANSFER_FEE_RATE, slippage=SLIPPAGE):
+        """
+        初始化优化器
+
+        Args:
+            bar_store: 本地K线存储
+            stock_pool: 股票池，列表或参数为交易日（YYYYMMDD）、返回股票代码列表的函数
+            buy_amount (float): 每次买入金额，默认为None表示使用策略的BUY_AMOUNT
+            hold_days (int): 买入后最多持有的交易日数，默认为HOLD_DAYS
+            memory_limit (int): 每个参数块中间数组的内存上限（字节），默认为MEMORY_LIMIT
+            commission_rate (float): 佣金费率
+            min_commission (float): 买入单笔最低佣金
+            stamp_tax_rate (float): 印花税率
+            transfer_fee_rate (float): 过户费率
+            slippage (float): 滑点比例
+        """
+        self.bar_store = bar_store
+        self.stock_pool = stock_pool
+        self.buy_amount = buy_amount if buy_amount is not None else DEFAULT_PARAMS['BUY_AMOUNT']
+        self.hold_days = hold_days
+        self.memory_limit = memory_limit
+        self.commission_rate = commission_rate
+        self.min_commission = min_commission
+        self.stamp_tax_rate = stamp_tax_rate
+        self.transfer_fee_rate = transfer_fee_rate
+        self.slippage = slippage
+
+    def run(self, param_grid, start_date, end_date):
+        """
+        对参数网格的全部组合计算区间内的交易结果
+
+        Args:
+            param_grid (dict): {参数名: 取值列表}，参数名必须在OPTIMIZE_PARAMS中
+            start_date (str): 开始日期（买入日），格式为YYYYMMDD
+            end_date (str): 结束日期（买入日），格式为YYYYMMDD
+
+        Returns:
+            DataFrame: 每行为一个参数组合，包含各参数取值和交易次数、胜率、平均收益率、总盈亏、盈亏比、最大回撤，
+                按总盈亏从高到低排序
+
+        Raises:
+            ValueError: param_grid中包含不支持优化的参数时抛出
+        """
+        unknown = set(param_grid) - set(OPTIMIZE_PARAMS)
+        if unknown:
+            raise ValueError(f"不支持优化的参数: {sorted(unknown)}")
+        grid = {name: list(param_grid.get(name) or [DEFAULT_PARAMS[name]]) for name in OPTIMIZE_PARAMS}
+
+        # 参数网格拆成三个广播维度：MACDFS周期组、涨幅上限、卖出比例组
+        macd_params = np.array(list(itertools.product(grid['MACDFS_SHORT'], grid['MACDFS_LONG'],
+                                                      grid['MACDFS_SIGNAL'])), dtype=np.float64)
+        gains = np.array(grid['MAX_INTRADAY_GAIN'], dtype=np.float64)
+        sell_ratios = np.array(list(itertools.product(grid['FIRST_SELL_RATIO'], grid['NEXT_SELL_RATIO'])),
+                               dtype=np.float64)
+        shape = (len(macd_params), len(gains), len(sell_ratios))
+
+        all_days = self.bar_store.list_partitions('1m')
+        buy_days = [day for day in all_days if str(start_date) <= day <= str(end_date)]
+        if not buy_days:
+            logger.error(f"{RED}【参数优化失败】{RESET} K线存储中没有{start_date}至{end_date}的1分钟K线")
+            return pd.DataFrame()
+        logger.info(f"{GREEN}【参数优化】{RESET} 区间:{buy_days[0]}-{buy_days[-1]} 交易日:{len(buy_days)}天 "
+                    f"参数组合:{int(np.prod(shape))}个")
+
+        start = time.perf_counter()
+        stats = {key: np.zeros(shape) for key in ['交易次数', '盈利次数', '收益率合计', '总盈亏', '盈利合计', '亏损合计']}
+        daily_pnl = []
+        for day in buy_days:
+            index = all_days.index(day)
+            day_pnl = self._run_day(day, all_days[index + 1:index + 1 + self.hold_days],
+                                    macd_params, gains, sell_ratios, stats)
+            daily_pnl.append(day_pnl)
+
+        # 按买入日累计盈亏计算最大回撤（金额）
+        cumulative = np.cumsum(np.concatenate([np.zeros((1,) + shape), np.array(daily_pnl)]), axis=0)
+        max_drawdown = (np.maximum.accumulate(cumulative, axis=0) - cumulative).max(axis=0)
+
+        rows = []
+        for position in np.ndindex(shape):
+            m, g, r = position
+            count = stats['交易次数'][position]
+            loss = stats['亏损合计'][position]
+            rows.append({
+                'MACDFS_SHORT': int(macd_params[m, 0]),
+                'MACDFS_LONG': int(macd_params[m, 1]),
+                'MACDFS_SIGNAL': int(macd_params[m, 2]),
+                'MAX_INTRADAY_GAIN': float(gains[g]),
+                'FIRST_SELL_RATIO': float(sell_ratios[r, 0]),
+                'NEXT_SELL_RATIO': float(sell_ratios[r, 1]),
+                '交易次数': int(count),
+                '胜率': stats['盈利次数'][position] / count if count else 0.0,
+                '平均收益率': stats['收益率合计'][position] / count if count else 0.0,
+                '总盈亏': float(stats['总盈亏'][position]),
+                '盈亏比': stats['盈利合计'][position] / loss if loss else np.inf,
+                '最大回撤': float(max_drawdown[position]),
+            })
+        results = pd.DataFrame(rows).sort_values('总盈亏', ascending=False, ignore_index=True)
+
+        elapsed = time.perf_counter() - start
+        best = results.iloc[0]
+        best_params = ' '.join(f"{name}:{best[name]:g}" for name in OPTIMIZE_PARAMS)
+        logger.info(f"{GREEN}【参数优化完成】{RESET} 耗时:{elapsed:.1f}秒 参数组合:{len(results)}个 "
+                    f"最优参数:{best_params} 总盈亏:{best['总盈亏']:.2f}")
+        return results
+
+    def _run_day(self, day, hold_days, macd_params, gains, sell_ratios, stats):
+        # 计算一个买入日的全部参数组合，累加到stats，返回各参数组合当日买入交易的盈亏合计
+        shape = (len(macd_params), len(gains), len(sell_ratios))
+        day_pnl = np.zeros(shape)
+        pool = list(self.stock_pool(day) if callable(self.stock_pool) else self.stock_pool)
+        if not pool:
+            return day_pnl
+        entry = self._read_day(day, pool)
+        n_stocks, n_minutes = entry['close'].shape
+        if n_minutes == 0:
+            return day_pnl
+
+        # 每组MACDFS周期的中间数组：DIF、DEA、MACDFS和信号矩阵、每种涨幅上限的买入信号、各参数组合每只股票的盈亏
+        bytes_per_macd = n_stocks * n_minutes * (8 * 6 + len(gains)) + int(np.prod(shape[1:])) * n_stocks * 8 * 3
+        chunk_size = max(1, int(self.memory_limit // max(bytes_per_macd, 1)))
+        hold = None
+        for lo in range(0, len(macd_params), chunk_size):
+            chunk = slice(lo, lo + chunk_size)
+            shares, cost = self._evaluate_entries(entry, macd_params[chunk], gains)
+            bought = np.flatnonzero(shares.any(axis=(0, 1)))
+            if not len(bought):
+                continue
+            if hold is None:
+                hold = self._read_hold_days(hold_days, pool, entry)
+            value = self._evaluate_exits(entry, hold, bought, macd_params[chunk], sell_ratios)
+
+            # 每股卖出所得(m, R, S)与买入股数、成本(m, G, S)广播为(m, G, R, S)
+            shares, cost = shares[..., bought], cost[..., bought]
+            pnl = shares[:, :, None, :] * value[:, None, :, :] - cost[:, :, None, :]
+            traded = (shares > 0)[:, :, None, :]
+            returns = np.divide(pnl, cost[:, :, None, :], out=np.zeros_like(pnl), where=traded)
+
+            stats['交易次数'][chunk] += traded.sum(axis=-1)
+            stats['盈利次数'][chunk] += ((pnl > 0) & traded).sum(axis=-1)
+            stats['收益率合计'][chunk] += returns.sum(axis=-1)
+            stats['总盈亏'][chunk] += pnl.sum(axis=-1)
+            stats['盈利合计'][chunk] += np.where(pnl > 0, pnl, 0).sum(axis=-1)
+            stats['亏损合计'][chunk] -= np.where(pnl < 0, pnl, 0).sum(axis=-1)
+            day_pnl[chunk] = pnl.sum(axis=-1)
+
+        logger.debug(f"{BLUE}【参数优化】{RESET} 日期:{day} 股票池:{len(pool)}只 参数块大小:{chunk_size}")
+        return day_pnl
+
+    def _read_day(self, day, codes, prev_closes=None):
+        """
+        读取一个交易日的分钟线，按codes的顺序对齐
+
+        Args:
+            day (str): 交易日，格式为YYYYMMDD
+            codes (list): 股票代码列表
+            prev_closes (numpy.ndarray): 上一交易日收盘价，日线缺少前收盘价时使用
+
+        Returns:
+            dict: 包含codes、times，各分钟线字段(股票数, 分钟数)的数组，以及pre_close、limit_up、limit_down(股票数,)
+        """
+        read_codes, times, data = self.bar_store.read('1m', codes=codes, fields=BACKTEST_BAR_FIELDS,
+                                                      start_time=day, end_time=day)
+        index = {code: i for i, code in enumerate(codes)}
+        rows = [index[code] for code in read_codes]
+        result = {'codes': codes, 'times': np.asarray(times)}
+        for field in BACKTEST_BAR_FIELDS:
+            values = np.full((len(codes), len(times)), np.nan)
+            if rows:
+                values[rows] = data[field]
+            result[field] = values
+
+        # 与BacktestEngine相同，优先使用日线的前收盘价，再使用上一交易日收盘价，最后使用当日第一个开盘价
+        pre_closes = np.full(len(codes), np.nan)
+        daily_codes, _, daily = self.bar_store.read('1d', codes=codes, fields=['preClose'], start_time=day, end_time=day)
+        if daily_codes and 'preClose' in daily and daily['preClose'].shape[1]:
+            pre_closes[[index[code] for code in daily_codes]] = daily['preClose'][:, -1]
+        pre_closes[pre_closes <= 0] = np.nan
+        if prev_closes is not None:
+            pre_closes = np.where(np.isnan(pre_closes), prev_closes, pre_closes)
+        if len(times):
+            opens = result['open']
+            first_open = opens[np.arange(len(codes)), (~np.isnan(opens)).argmax(axis=1)]
+            pre_closes = np.where(np.isnan(pre_closes), first_open, pre_closes)
+        result['pre_close'] = np.nan_to_num(pre_closes)
+
+        limits = [calculate_limit_prices(code, pre_close) for code, pre_close in zip(codes, result['pre_close'])]
+        result['limit_up'] = np.array([limit[0] for limit in limits], dtype=np.float64)
+        result['limit_down'] = np.array([limit[1] for limit in limits], dtype=np.float64)
+        return result
+
+    def _read_hold_days(self, hold_days, codes, entry):
+        # 依次读取持有期各交易日的分钟线，上一交易日收盘价作为缺失日线时的前收盘价
+        hold = []
+        prev_closes = self._last_closes(entry, np.full(len(codes), np.nan))
+        for day in hold_days:
+            data = self._read_day(day, codes, prev_closes)
+            prev_closes = self._last_closes(data, prev_closes)
+            hold.append(data)
+        return hold
+
+    @staticmethod
+    def _last_closes(data, default):
+        # 每只股票当日最后一个有效收盘价，当日没有数据时使用default
+        closes = data['close']
+        if closes.shape[1] == 0:
+            return default
+        valid = ~np.isnan(closes)
+        last = closes[np.arange(len(closes)), closes.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)]
+        return np.where(valid.any(axis=1), last, default)
+
+    def _next_bar_fill(self, data, is_buy):
+        # 委托在下一分钟按开盘价加减滑点成交，价格限制在涨跌停价之间；返回(成交价, 能否成交)，形状为(股票数, 分钟数)
+        opens, highs, lows = data['open'], data['high'], data['low']
+        limit_up, limit_down = data['limit_up'][:, None], data['limit_down'][:, None]
+        price = np.full(opens.shape, np.nan)
+        can_fill = np.zeros(opens.shape, dtype=bool)
+        next_open = opens[:, 1:]
+        next_price = next_open * (1 + self.slippage if is_buy else 1 - self.slippage)
+        price[:, :-1] = np.round(np.where(limit_up > 0, np.clip(next_price, limit_down, limit_up), next_price), 2)
+        if is_buy:
+            # 一字涨停买不进
+            can_fill[:, :-1] = ~np.isnan(next_open) & ~((limit_up > 0) & (lows[:, 1:] >= limit_up))
+        else:
+            # 一字跌停卖不出
+            can_fill[:, :-1] = ~np.isnan(next_open) & ~((limit_down > 0) & (highs[:, 1:] <= limit_down))
+        return price, can_fill
+
+    def _evaluate_entries(self, data, macd_params, gains):
+        """
+        计算买入日各参数组合每只股票的买入股数和买入成本
+
+        Args:
+            data (dict): 买入日分钟线，_read_day的返回值
+            macd_params (numpy.ndarray): MACDFS周期参数块，形状为(m, 3)
+            gains (numpy.ndarray): 日内涨幅上限，形状为(G,)
+
+        Returns:
+            tuple: 买入股数和买入成本（含手续费），形状均为(m, G, 股票数)
+        """
+        closes, highs = data['close'], data['high']
+        pre_closes = data['pre_close'][:, None]
+        n_stocks = closes.shape[0]
+
+        # MACDFS绿柱连续两根上缩，(m, S, T)
+        green = green_bar_shrinking_mask(calculate_macdfs_batch(closes, None, *macd_params.T)['MACDFS']) & ~np.isnan(closes)
+
+        # 日内最高涨幅不超过上限，(G, S, T)
+        day_high = np.fmax.accumulate(highs, axis=1)
+        gain = np.divide(day_high - pre_closes, pre_closes, out=np.zeros_like(day_high), where=pre_closes > 0)
+        gain_ok = gain[None, :, :] <= gains[:, None, None]
+
+        # 价格高于分时均价（当日累计），均价的计算方式与策略相同，(S, T)
+        avg_price = cumulative_vwap(data['amount'], data['volume'], [get_volume_unit(code) for code in data['codes']])
+        above_avg = closes > avg_price
+
+        fill_price, can_fill = self._next_bar_fill(data, is_buy=True)
+        signal = green[:, None] & gain_ok[None] & (above_avg & can_fill)[None, None]  # (m, G, S, T)
+
+        # 策略有持仓后不再检查买入信号，每只股票当日只在第一个能成交的信号买入一次
+        has_signal = signal.any(axis=-1)
+        minute = signal.argmax(axis=-1)
+        stock_index = np.arange(n_stocks)
+        reference = closes[stock_index, minute]
+        price = fill_price[stock_index, minute]
+        # 与order_value相同，按参考价格计算100股整数倍的买入数量
+        shares = np.where(has_signal, np.floor(self.buy_amount / reference / 100) * 100, 0)
+        amount = np.where(shares > 0, shares * price, 0)
+        fee = np.where(shares > 0, np.maximum(amount * self.commission_rate, self.min_commission)
+                       + amount * self.transfer_fee_rate, 0)
+        return shares, amount + fee
+
+    def _evaluate_exits(self, entry, hold, stocks, macd_params, sell_ratios):
+        """
+        计算持有期各参数组合每股的卖出所得
+
+        卖出都是按剩余仓位的比例进行的，每股卖出所得与买入股数无关，可以与买入结果直接相乘。
+
+        Args:
+            entry (dict): 买入日分钟线
+            hold (list): 持有期各交易日的分钟线
+            stocks (numpy.ndarray): 需要计算的股票在股票池中的位置
+            macd_params (numpy.ndarray): MACDFS周期参数块，形状为(m, 3)
+            sell_ratios (numpy.ndarray): 卖出比例组，形状为(R, 2)，每行为(第一次卖出比例, 之后卖出比例)
+
+        Returns:
+            numpy.ndarray: 每股卖出所得（扣除卖出费用），形状为(m, R, 股票数)
+        """
+        shape = (len(macd_params), len(sell_ratios), len(stocks))
+        position = np.ones(shape)
+        value = np.zeros(shape)
+        proceeds_rate = 1 - self.commission_rate - self.stamp_tax_rate - self.transfer_fee_rate
+        first_ratio = sell_ratios[:, 0][None, :, None]
+        next_ratio = sell_ratios[:, 1][None, :, None]
+        last_closes = self._last_closes(entry, np.zeros(len(entry['codes'])))[stocks]
+
+        for data in hold:
+            data = {key: data[key][stocks] if key not in ('codes', 'times') else data[key] for key in data}
+            closes, opens = data['close'], data['open']
+            if closes.shape[1] == 0:
+                continue
+            limit_up = data['limit_up'][:, None]
+
+            # MACDFS红柱连续两根下缩且未涨停，(m, S, T)
+            red = red_bar_shrinking_mask(calculate_macdfs_batch(closes, None, *macd_params.T)['MACDFS']) & ((limit_up <= 0) | (closes < limit_up))
+
+            # 次日开盘低开且第一分钟收阴，清仓
+            open_exit = np.zeros(closes.shape, dtype=bool)
+            first_minute = np.flatnonzero(data['times'] % 1000000 == 93100)
+            if len(first_minute):
+                j = first_minute[0]
+                open_exit[:, j] = (opens[:, j] < data['pre_close']) & (closes[:, j] < opens[:, j])
+
+            # 上一分钟涨停、当前低于涨停价（开板），以当前价格的99%限价清仓
+            break_exit = np.zeros(closes.shape, dtype=bool)
+            break_exit[:, 1:] = (closes[:, :-1] >= limit_up) & (closes[:, 1:] < limit_up)
+            limit_price = closes * 0.99
+            break_price = np.full(closes.shape, np.nan)
+            break_price[:, :-1] = np.maximum(opens[:, 1:], limit_price[:, :-1])
+            break_fill = np.zeros(closes.shape, dtype=bool)
+            break_fill[:, :-1] = data['high'][:, 1:] >= limit_price[:, :-1]
+
+            market_price, market_fill = self._next_bar_fill(data, is_buy=False)
+            full_exit = open_exit | break_exit
+            price = np.where(break_exit, break_price, market_price)
+            can_fill = np.where(break_exit, break_fill, market_fill)
+
+            # 只在有卖出信号的分钟上递推剩余仓位
+            sell_times = np.zeros(shape)
+            for t in np.flatnonzero(red.any(axis=(0, 1)) | full_exit.any(axis=0)):
+                ratio = np.where(sell_times == 0, first_ratio, next_ratio)
+                ratio = np.where(red[:, None, :, t], ratio, 0)
+                ratio = np.where(full_exit[:, t], 1.0, ratio)
+                submitted = (ratio > 0) & (position > 0)
+                sell_times += submitted
+                sold = np.where(submitted & can_fill[:, t], position * ratio, 0)
+                value += sold * np.nan_to_num(price[:, t]) * proceeds_rate
+                position -= sold
+            last_closes = self._last_closes(data, last_closes)
+
+        # 持有期满按最后收盘价清仓
+        value += position * last_closes * proceeds_rate
+        return value
+
+
+if __name__ == "__main__":
+    from strategys.一进二低吸战法.backtest import parse_params, create_stock_pool_provider
+
+    parser = argparse.ArgumentParser(description='一进二低吸战法向量化参数优化')
+    parser.add_argument('--start', required=True, help='开始日期，格式为YYYYMMDD')
+    parser.add_argument('--end', required=True, help='结束日期，格式为YYYYMMDD')
+    parser.add_argument('--bar-root', default='data/bars', help='K线存储根目录')
+    parser.add_argument('--output', default='backtest_results', help='结果输出目录')
+    parser.add_argument('--param', action='append', help='优化参数，格式为NAME=v1,v2')
+    parser.add_argument('--hold-days', type=int, default=HOLD_DAYS, help='买入后最多持有的交易日数')
+    parser.add_argument('--memory-limit', type=int, default=MEMORY_LIMIT // 1024 // 1024, help='每个参数块的内存上限（MB）')
+    args = parser.parse_args()
+
+    try:
+        bar_store = BarStore(args.bar_root)
+        optimizer = ParameterOptimizer(bar_store, create_stock_pool_provider(bar_store), hold_days=args.hold_days,
+                                       memory_limit=args.memory_limit * 1024 * 1024)
+        results = optimizer.run(parse_params(args.param), args.start, args.end)
+        os.makedirs(args.output, exist_ok=True)
+        results.to_csv(os.path.join(args.output, 'optimize.csv'), index=False, encoding='utf-8-sig')
+        logger.info(f"{GREEN}【参数优化结果】{RESET} 已保存到:{args.output}")
+    except KeyboardInterrupt:
+        logger.info(f"{YELLOW}【参数优化终止】{RESET} 用户手动终止参数优化")
+        sys.exit(0)
+    except Exception as e:
+        logger.error(f"{RED}【参数优化错误】{RESET} {e}")
+        raise
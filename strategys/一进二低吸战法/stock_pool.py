@@ -6,8 +6,10 @@
 实现一进二低吸战法的选股逻辑，筛选出符合条件的股票池
 """
 
+import numpy as np
 import pandas as pd
 from datetime import datetime, time
+from time import perf_counter
 
 # 导入配置参数
 from strategys.一进二低吸战法.config import (
@@ -38,6 +40,73 @@ def is_st_stock(stock_name):
     return 'ST' in stock_name or '*ST' in stock_name
 
 
+def build_stock_pool_masks(codes, data, limit_up_ratio=0.095):
+    """
+    在对齐后的日线面板上计算选股条件掩码
+
+    所有条件都以数组运算完成。面板按交易日对齐，停牌或未上市的日期为NaN（以收盘价判断），
+    计算前把每只股票的有效数据按原顺序移到行尾，使最后一列为该股票自己的最后一个交易日，
+    前收盘、涨停和各时间窗口都只在自身的有效数据上计算，判断规则与逐只股票取日线后计算时一致。
+
+    Args:
+        codes (list): 股票代码列表，与数组的行对应
+        data (dict): {字段: numpy.ndarray}，形状为(股票数, 交易日数)，需包含open、close、volume
+        limit_up_ratio (float): 判断涨停的涨幅阈值，默认为9.5%
+
+    Returns:
+        dict: {条件名称: 布尔数组}，包含以下条件：
+            - 数据充足: 至少有2个交易日的有效数据
+            - 涨停: 最后一个交易日涨停
+            - 一字板: 最后一个交易日为一字板
+            - 首次涨停: 近FIRST_LIMIT_UP_DAYS个交易日内除最后一天外没有涨停
+            - 新高: 最后一个交易日收盘价是近NEW_HIGH_DAYS个交易日的最高价
+    """
+    # 有效数据移到行尾（稳定排序保持原顺序），NaN只出现在行首
+    order = np.argsort(~np.isnan(data['close']), axis=1, kind='stable')
+    open_, close, volume = (np.take_along_axis(np.asarray(data[field], dtype=np.float64), order, axis=1)
+                            for field in ('open', 'close', 'volume'))
+
+    # 前一交易日收盘价和成交量（第一列没有前值）
+    pre_close = np.full_like(close, np.nan)
+    pre_close[:, 1:] = close[:, :-1]
+    vol_prev = np.full_like(volume, np.nan)
+    vol_prev[:, 1:] = volume[:, :-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_change = (close - pre_close) / pre_close
+    # NaN的比较结果为False，与逐只计算时的行为一致
+    is_limit_up_matrix = np.nan_to_num(pct_change, nan=-np.inf) >= limit_up_ratio
+
+    valid_days = np.count_nonzero(~np.isnan(close), axis=1)
+    has_enough_data = valid_days >= 2
+
+    # 条件1：最后一个交易日涨停，排除一字板
+    is_limit_up = is_limit_up_matrix[:, -1]
+    with np.errstate(invalid='ignore'):
+        volume_shrink = volume[:, -1] < vol_prev[:, -1] * 0.2
+    one_word_board = (open_[:, -1] == close[:, -1]) | volume_shrink
+
+    # 条件2：近FIRST_LIMIT_UP_DAYS个交易日内的首次涨停（不包括最后一天）
+    recent_days = max(FIRST_LIMIT_UP_DAYS - 1, 0)
+    if recent_days > 0:
+        previous_limit_up = is_limit_up_matrix[:, -1 - recent_days:-1].any(axis=1)
+    else:
+        previous_limit_up = np.zeros(len(codes), dtype=bool)
+    first_limit_up = ~previous_limit_up
+
+    # 条件3：最后一个交易日收盘价是近NEW_HIGH_DAYS个交易日的最高价
+    high_window = np.nan_to_num(close[:, -NEW_HIGH_DAYS:], nan=-np.inf)
+    is_new_high = np.nan_to_num(close[:, -1], nan=-np.inf) >= high_window.max(axis=1)
+
+    return {
+        '数据充足': has_enough_data,
+        '涨停': is_limit_up,
+        '一字板': one_word_board,
+        '首次涨停': first_limit_up,
+        '新高': is_new_high,
+    }
+
+
 def filter_stock_pool(context, batch_download_success=True):
     """
     根据选股条件筛选股票池
@@ -48,104 +117,74 @@ def filter_stock_pool(context, batch_download_success=True):
     3. 昨天收盘价是近30个交易日的最高价
     4. 主板股票、排除ST股和停牌股
     5. 公司总市值上限为150亿元
+
+    全市场日线数据一次性载入为按时间对齐的面板，各条件以数组运算完成，
+    不再逐只查询和逐行遍历。筛选结束后输出各阶段耗时。
     """
+    timings = {}
+    stage_start = perf_counter()
+
     # 获取沪深A股股票列表
     all_stocks = context.get_stock_list_in_sector("沪深A股")
-    selected_stocks = []
     
     # 开始筛选股票
     logger.info(f"{GREEN}【选股开始】{RESET} 正在筛选符合一进二低吸战法条件的股票...")
-    
-    # 遍历所有股票
-    for stock_code in all_stocks:
-        try:
-            # 获取股票基本信息并进行初步筛选
-            stock_info = context.get_stock_info(stock_code)
-            if not stock_info:
-                continue
-                
-            stock_name = stock_info['股票名称']
-            
-            # 基本条件筛选（条件4和5）
-            if (EXCLUDE_SUSPENDED and stock_info['停牌状态'] == 1) or \
-               (EXCLUDE_ST and is_st_stock(stock_name)) or \
-               (MAIN_BOARD_ONLY and not is_main_board_stock(stock_code)) or \
-               (stock_info['总市值'] / 100000000 > MAX_MARKET_VALUE):
-                continue
-                
-            # 获取涨停价
-            up_stop_price = stock_info['涨停价']
-                
-            # 获取历史日线数据
-            daily_data_dict = context.get_qmt_daily_data(
-                stock_list=[stock_code], 
-                period='1d', 
-                count=NEW_HIGH_DAYS + 2,
-                is_download=not batch_download_success
-            )
-            
-            daily_data = daily_data_dict[stock_code]
-            if daily_data.empty or len(daily_data) < 2:
-                continue
-                
-            # 确保数据按日期升序排列
-            daily_data = daily_data.sort_index()
-            
-            # 数据预处理：计算涨跌幅和前一天成交量
-            daily_data['pre_close'] = daily_data['close'].shift(1)
-            daily_data['pct_change'] = (daily_data['close'] - daily_data['pre_close']) / daily_data['pre_close']
-            daily_data['vol_prev'] = daily_data['volume'].shift(1)
-            
-            # 获取最后一个交易日的数据（无论是否在交易时段）
-            yesterday_data = daily_data.iloc[-1]
-            yesterday_date = daily_data.index[-1]
-            
-            # 条件1：判断是否涨停
-            # 优先使用涨停价判断，涨停价无效时使用涨幅判断
-            is_limit_up = False
-            if up_stop_price > 0 and False:
-                is_limit_up = abs(yesterday_data['close'] - up_stop_price) < 0.01
-            else:
-                is_limit_up = yesterday_data['pct_change'] >= 0.095
-                
-            # 排除非涨停或一字板
-            if not is_limit_up or (EXCLUDE_ONE_WORD_BOARD and is_one_word_board(yesterday_data)):
-                continue
-                
-            # 条件2：近3个交易日内的首次涨停
-            recent_end_idx = len(daily_data)
-            recent_start_idx = max(0, recent_end_idx - FIRST_LIMIT_UP_DAYS)
-            recent_data = daily_data.iloc[recent_start_idx:recent_end_idx]
-            
-            # 计算涨停次数 - 需要使用涨幅判断，因为涨停价是变化的
-            # 最后一天已经是涨停了，所以初始计数为1
-            limit_up_count = 1
-            
-            # 检查前面的日期是否也有涨停
-            for i in range(recent_start_idx, recent_end_idx - 1):  # 不包括最后一天，因为已经知道最后一天涨停
-                current_row = daily_data.iloc[i]
-                # 使用涨幅判断涨停，一般认为9.5%以上就是涨停
-                if current_row['pct_change'] >= 0.095:
-                    limit_up_count += 1
-            
-            # 排除非首次涨停（即排除连续涨停的情况）
-            if limit_up_count > 1:
-                continue
-                
-            # 条件3：最后一个交易日收盘价是近30个交易日的最高价
-            high_end_idx = len(daily_data)
-            high_start_idx = max(0, high_end_idx - NEW_HIGH_DAYS)
-            high_data = daily_data.iloc[high_start_idx:high_end_idx]
-            
-            if yesterday_data['close'] < high_data['close'].max():
-                continue
-                
-            # 所有条件都满足，将股票添加到选股结果中
-            selected_stocks.append(stock_code)
-            logger.info(f"{GREEN}【选股结果】{RESET} 股票代码:{stock_code} 股票名称:{stock_name} 日期:{yesterday_date}")
-                
-        except Exception as e:
-            logger.error(f"筛选股票 {stock_code} 时出错: {e}")
-    
+
+    # 条件4：主板股票，仅依赖代码，先过滤以减少后续查询
+    candidates = [code for code in all_stocks if not MAIN_BOARD_ONLY or is_main_board_stock(code)]
+    timings['股票列表'] = perf_counter() - stage_start
+
+    # 基本条件筛选（条件4和5）
+    stage_start = perf_counter()
+    stock_infos = context.get_stock_info_list(candidates)
+    candidates = [code for code in candidates if stock_infos.get(code)]
+    names = [stock_infos[code]['股票名称'] for code in candidates]
+    suspended = np.array([stock_infos[code]['停牌状态'] == 1 for code in candidates], dtype=bool)
+    market_value = np.array([stock_infos[code]['总市值'] for code in candidates], dtype=np.float64)
+    is_st = np.array([is_st_stock(name) for name in names], dtype=bool)
+
+    basic_mask = market_value / 100000000 <= MAX_MARKET_VALUE
+    if EXCLUDE_SUSPENDED:
+        basic_mask &= ~suspended
+    if EXCLUDE_ST:
+        basic_mask &= ~is_st
+    candidates = [code for code, keep in zip(candidates, basic_mask) if keep]
+    timings['基本信息'] = perf_counter() - stage_start
+
+    if not candidates:
+        logger.info(f"{GREEN}【选股完成】{RESET} 共筛选出 0 只符合条件的股票")
+        return []
+
+    # 一次性获取候选股票对齐后的日线面板
+    stage_start = perf_counter()
+    codes, times, data = context.get_qmt_daily_panel(
+        stock_list=candidates,
+        field_list=['open', 'close', 'volume'],
+        period='1d',
+        count=NEW_HIGH_DAYS + 2,
+        is_download=not batch_download_success
+    )
+    timings['日线数据'] = perf_counter() - stage_start
+    if not codes:
+        logger.error(f"{RED}【选股失败】{RESET} 未获取到日线数据")
+        return []
+
+    # 条件1~3：向量化计算
+    stage_start = perf_counter()
+    masks = build_stock_pool_masks(codes, data)
+    selected_mask = masks['数据充足'] & masks['涨停'] & masks['首次涨停'] & masks['新高']
+    if EXCLUDE_ONE_WORD_BOARD:
+        selected_mask &= ~masks['一字板']
+    selected_stocks = [code for code, keep in zip(codes, selected_mask) if keep]
+    timings['条件计算'] = perf_counter() - stage_start
+
+    # 最后一个交易日（无论是否在交易时段）
+    yesterday_date = times[-1]
+    for stock_code in selected_stocks:
+        stock_name = stock_infos[stock_code]['股票名称']
+        logger.info(f"{GREEN}【选股结果】{RESET} 股票代码:{stock_code} 股票名称:{stock_name} 日期:{yesterday_date}")
+
+    timing_report = ' '.join(f"{stage}:{elapsed:.3f}s" for stage, elapsed in timings.items())
+    logger.info(f"{GREEN}【选股耗时】{RESET} 全市场:{len(all_stocks)}只 面板:{len(codes)}只 {timing_report} 合计:{sum(timings.values()):.3f}s")
     logger.info(f"{GREEN}【选股完成】{RESET} 共筛选出 {len(selected_stocks)} 只符合条件的股票")
-    return selected_stocks 
\ No newline at end of file
+    return selected_stocks
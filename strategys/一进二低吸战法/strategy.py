@@ -23,16 +23,17 @@ from collections import namedtuple
 from trader.logger import logger
 from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
 from trader.utils import is_trade_time, add_stock_suffix
-from xtquant import xtdata
+from trader.bar_builder import BarBuilder
+from trader.vwap import VWAPTracker
+from trader.profiler import profiled
 
 from strategys.一进二低吸战法.config import (
     BUY_AMOUNT, MAX_BUY_TIMES, MAX_INTRADAY_GAIN,
     MACDFS_SHORT, MACDFS_LONG, MACDFS_SIGNAL,
     STRATEGY_NAME, MAX_POSITION_RATIO, ENABLE_POSITION_CONTROL
 )
-from strategys.一进二低吸战法.indicator import (
-    calculate_macdfs, is_green_bar_shrinking, is_red_bar_shrinking
-)
+from strategys.一进二低吸战法.indicator import is_green_bar_shrinking, is_red_bar_shrinking
+from strategys.一进二低吸战法.intraday_state import IntradayState
 from strategys.一进二低吸战法.stock_pool import filter_stock_pool
 
 # 定义BarData数据结构
@@ -41,6 +42,24 @@ BarData = namedtuple('BarData', ['stock_code', 'time', 'open', 'high', 'low', 'c
 # 订单超时撤单配置
 ORDER_TIMEOUT_SECONDS = 180  # 订单超时时间(秒)
 
+# MACDFS红柱下缩卖出比例
+FIRST_SELL_RATIO = 0.5  # 当日第一次触发时卖出的仓位比例
+NEXT_SELL_RATIO = 1.0  # 当日第二次及以后触发时卖出的仓位比例
+
+# 可按策略实例覆盖的参数及其默认值（取自config），回测参数扫描时每个实例使用不同的参数
+DEFAULT_PARAMS = {
+    'BUY_AMOUNT': BUY_AMOUNT,
+    'MAX_BUY_TIMES': MAX_BUY_TIMES,
+    'MAX_INTRADAY_GAIN': MAX_INTRADAY_GAIN,
+    'MACDFS_SHORT': MACDFS_SHORT,
+    'MACDFS_LONG': MACDFS_LONG,
+    'MACDFS_SIGNAL': MACDFS_SIGNAL,
+    'MAX_POSITION_RATIO': MAX_POSITION_RATIO,
+    'ENABLE_POSITION_CONTROL': ENABLE_POSITION_CONTROL,
+    'FIRST_SELL_RATIO': FIRST_SELL_RATIO,
+    'NEXT_SELL_RATIO': NEXT_SELL_RATIO,
+}
+
 
 class YiJinErDiXiStrategy:
     """
@@ -49,51 +68,61 @@ class YiJinErDiXiStrategy:
     实现一进二低吸战法的核心交易逻辑
     """
     
-    def __init__(self, context, data_download_success=False):
+    def __init__(self, context, data_download_success=False, params=None):
         """
         初始化策略
         
         Args:
             context: QMT交易上下文对象
             data_download_success: 是否已成功下载A股历史数据
-        """
+            params: 覆盖DEFAULT_PARAMS中默认参数的字典，默认为None表示全部使用config中的参数
+            
+        Raises:
+            ValueError: params中包含未知的参数名时抛出
+        """
+        unknown = set(params or {}) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"未知的策略参数: {sorted(unknown)}")
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.buy_amount = self.params['BUY_AMOUNT']
+        self.max_buy_times = self.params['MAX_BUY_TIMES']
+        self.max_intraday_gain = self.params['MAX_INTRADAY_GAIN']
+        self.macdfs_short = self.params['MACDFS_SHORT']
+        self.macdfs_long = self.params['MACDFS_LONG']
+        self.macdfs_signal = self.params['MACDFS_SIGNAL']
+        self.max_position_ratio = self.params['MAX_POSITION_RATIO']
+        self.enable_position_control = self.params['ENABLE_POSITION_CONTROL']
+        self.first_sell_ratio = self.params['FIRST_SELL_RATIO']
+        self.next_sell_ratio = self.params['NEXT_SELL_RATIO']
+        
         self.context = context
-        # 不再直接导入xtdata模块，使用context提供的方法
+        # 不直接导入xtdata模块，行情和交易都通过context访问，实盘Context与回测BacktestContext可以互换
         
         self.stock_pool = []  # 符合条件的股票池
         self.subscribed_stocks = []  # 已订阅行情的股票
         self.data_download_success = data_download_success  # 是否已成功下载A股历史数据
-        self.last_minute = {}  # 记录每个股票最后处理的分钟时间
+        # 由分笔行情合成1分钟K线，每根K线收盘后调用一次on_bar
+        self.bar_builder = BarBuilder({'1m': self.on_bar})
         
         # 交易记录
         self.stock_buy_times = {}  # 记录每只股票的买入次数，格式：{stock_code: count}
         self.stock_buy_prices = {}  # 记录每只股票当天的买入价格，格式：{stock_code: [price1, price2]}
         self.stock_sell_times = {}  # 记录每只股票的卖出次数，格式：{stock_code: count}
         
-        # MACDFS计算用的价格缓存，格式：{stock_code: {date: [price1, price2, ...]}}
-        self.price_cache = {}
-        # MACDFS计算结果缓存，格式：{stock_code: {date: [macdfs1, macdfs2, ...]}}
-        self.macdfs_cache = {}
+        # 当日分时状态：分钟收盘价、MACDFS、当日最高价和涨停价
+        self.intraday_state = IntradayState(self.macdfs_short, self.macdfs_long, self.macdfs_signal)
         
-        # 分时均价缓存，格式：{stock_code: {date: avg_price}}
-        self.avg_price_cache = {}
-        
-        # 当日最高价缓存，格式：{stock_code: {date: high_price}}
-        self.high_price_cache = {}
-        
-        # 涨停价缓存，格式：{stock_code: {date: limit_up_price}}
-        self.limit_up_cache = {}
+        # 分时均价，按股票累计当日成交额和成交股数
+        self.vwap = VWAPTracker()
         
         # 是否为新的交易日
-        self.current_date = datetime.now().strftime('%Y-%m-%d')
+        self.current_day = datetime.now().date()
+        self.current_date = self.current_day.strftime('%Y-%m-%d')
         
-        # 订单管理
-        self.active_orders = {}  # 活跃订单，格式：{order_id: {'time': 下单时间, 'stock_code': 股票代码, 'order_type': '买入'/'卖出'}}
+        # 订单管理，委托状态由context.order_manager根据交易推送维护
+        self.order_manager = context.order_manager
         self.order_timeout = ORDER_TIMEOUT_SECONDS  # 订单超时时间(秒)
         
-        # 设置定时任务
-        self.setup_tasks()
-        
         logger.info(f"{GREEN}【策略初始化】{RESET} 一进二低吸战法策略初始化完成")
     
     def update_stock_pool(self):
@@ -110,7 +139,8 @@ class YiJinErDiXiStrategy:
             self._clear_cache()
             
             # 更新当前日期
-            self.current_date = datetime.now().strftime('%Y-%m-%d')
+            self.current_day = datetime.now().date()
+            self.current_date = self.current_day.strftime('%Y-%m-%d')
             
             # 订阅股票行情
             self.subscribe_stock_quotes()
@@ -128,91 +158,18 @@ class YiJinErDiXiStrategy:
         self.stock_buy_times = {}
         self.stock_buy_prices = {}
         self.stock_sell_times = {}
-        self.price_cache = {}
-        self.macdfs_cache = {}
-        self.avg_price_cache = {}
-        self.high_price_cache = {}
-        self.limit_up_cache = {}
-        self.active_orders = {}  # 清空活跃订单记录
+        self.intraday_state.reset()
+        self.vwap.reset()
+        self.order_manager.clear_closed()  # 清除已完成的订单记录
     
-    def _normalize_bar_data(self, bar_data):
-        """
-        规范化K线数据，处理数据格式问题
-        
-        Args:
-            bar_data (dict): 原始K线数据
-            
-        Returns:
-            dict: 规范化后的K线数据
-        """
-        normalized = {}
-        
-        # 处理时间戳
-        if 'time' in bar_data:
-            normalized['time'] = bar_data['time']
-        
-        # 处理价格数据 - 修复浮点精度问题
-        for field in ['open', 'high', 'low', 'close']:
-            if field in bar_data:
-                # 处理科学计数法和浮点精度问题
-                try:
-                    value = float(bar_data[field])
-                    # 四舍五入到2位小数，避免浮点精度问题
-                    normalized[field] = round(value, 2)
-                except (ValueError, TypeError):
-                    normalized[field] = 0.0
-        
-        # 处理成交量和成交额
-        for field in ['volume', 'amount']:
-            if field in bar_data:
-                try:
-                    normalized[field] = int(float(bar_data[field]))
-                except (ValueError, TypeError):
-                    normalized[field] = 0
-        
-        # 处理前收盘价 - 处理可能的科学计数法格式
-        if 'preClose' in bar_data:
-            try:
-                preClose = float(bar_data['preClose'])
-                # 如果前收盘价异常小或为0，可能是数据错误
-                if preClose < 0.01 or preClose > 10000:
-                    # 尝试使用其他方式获取前收盘价
-                    preClose = 0.0
-                normalized['preClose'] = round(preClose, 2)
-            except (ValueError, TypeError):
-                normalized['preClose'] = 0.0
-        
-        # 处理其他字段
-        for field in ['settlementPrice', 'openInterest', 'dr', 'totaldr', 'suspendFlag']:
-            if field in bar_data:
-                try:
-                    normalized[field] = float(bar_data[field])
-                except (ValueError, TypeError):
-                    normalized[field] = 0.0
-        
-        return normalized
-
     def subscribe_stock_quotes(self):
         """
         订阅股票行情
         
-        订阅股票池中所有股票和已持仓股票的分钟级行情
+        通过context.quote_hub订阅股票池中所有股票和已持仓股票的分笔行情，由bar_builder合成分钟K线，
+        只订阅新增的股票、取消不再需要的股票，保留仍在订阅中的股票
         """
         try:
-            # 取消之前的订阅
-            if self.subscribed_stocks:
-                # 遍历取消每个股票的订阅
-                for stock in self.subscribed_stocks:
-                    try:
-                        # 使用context提供的方法取消订阅
-                        self.context.unsubscribe_quote(stock)
-                    except Exception as e:
-                        logger.debug(f"{YELLOW}【取消订阅失败】{RESET} 股票:{stock} 错误:{e}")
-                
-                logger.debug(f"{BLUE}【取消订阅】{RESET} 已取消 {len(self.subscribed_stocks)} 只股票的行情订阅")
-                self.subscribed_stocks = []
-                self.last_minute = {}  # 清空最后处理时间记录
-            
             # 获取持仓信息，将已持仓的股票也加入到订阅列表中
             position_stock_codes = []
             positions_df = self.context.get_positions()
@@ -221,85 +178,26 @@ class YiJinErDiXiStrategy:
             if not positions_df.empty:
                 # 遍历DataFrame的每一行
                 for _, position in positions_df.iterrows():
-                    stock_code = position['证券代码']
+                    stock_code = position['股票代码']
                     if stock_code not in self.stock_pool:
                         position_stock_codes.append(stock_code)
                         logger.debug(f"{GREEN}【持仓股票】{RESET} 股票:{stock_code} 持仓数量:{position['持仓数量']}")
             
             # 合并策略池和持仓股票
-            subscribe_stocks = list(set(self.stock_pool + position_stock_codes))
+            subscribe_stocks = list(dict.fromkeys(self.stock_pool + position_stock_codes))
             
-            # 订阅股票行情
-            if subscribe_stocks:
-                # 定义行情回调函数
-                def quote_callback(quote_data):
-                    try:
-                        if not quote_data:
-                            return
-                            
-                        # 获取股票代码和K线数据
-                        stock_code = list(quote_data.keys())[0]  # 单股订阅只有一个股票
-                        bar_list = quote_data[stock_code]
-                        
-                        if not bar_list:  # 跳过空数据
-                            return
-                            
-                        # 获取最新的K线数据
-                        raw_bar_data = bar_list[-1]
-                        
-                        # 规范化K线数据
-                        bar_data = self._normalize_bar_data(raw_bar_data)
-                        
-                        # 转换时间戳为datetime对象
-                        try:
-                            current_time = pd.to_datetime(bar_data['time'], unit='ms')
-                        except (ValueError, TypeError):
-                            # 如果时间戳转换失败，使用当前时间
-                            current_time = datetime.now()
-                            logger.warning(f"{YELLOW}【时间戳转换失败】{RESET} 股票:{stock_code} 使用当前时间")
-                        
-                        # 获取当前分钟时间（去掉秒和微秒）
-                        current_minute = current_time.replace(second=0, microsecond=0)
-                        
-                        # 如果是新的分钟，且该股票之前没有处理过这个分钟的数据
-                        if stock_code not in self.last_minute or self.last_minute[stock_code] < current_minute:
-                            self.last_minute[stock_code] = current_minute
-                            
-                            # 创建BarData对象并调用on_bar
-                            bar_obj = BarData(
-                                stock_code=stock_code,
-                                time=current_time,
-                                open=bar_data['open'],
-                                high=bar_data['high'],
-                                low=bar_data['low'],
-                                close=bar_data['close'],
-                                volume=bar_data['volume'],
-                                amount=bar_data['amount'],
-                                pre_close=bar_data.get('preClose', 0)  # 添加pre_close字段，可能在某些情况下需要
-                            )
-                            
-                            # 调用on_bar处理K线数据
-                            self.on_bar(bar_obj)
-                        
-                    except Exception as e:
-                        logger.error(f"{RED}【行情处理错误】{RESET} 错误:{e}")
-                        traceback.print_exc()
-                
-                # 遍历订阅每个股票的行情
-                for stock in subscribe_stocks:
-                    try:
-                        # 使用context提供的方法订阅行情
-                        self.context.subscribe_quote(stock, period='1m', callback=quote_callback)
-                        logger.debug(f"{GREEN}【订阅成功】{RESET} 股票:{stock}")
-                        self.subscribed_stocks.append(stock)
-                    except Exception as e:
-                        logger.error(f"{RED}【订阅失败】{RESET} 股票:{stock} 错误:{e}")
-                
-                logger.info(f"{GREEN}【行情订阅】{RESET} 已订阅 {len(self.subscribed_stocks)} 只股票的行情，包含策略池股票 {len(self.stock_pool)} 只，持仓非策略池股票 {len(position_stock_codes)} 只")
+            # 按差异调整订阅
+            added, removed = self.context.quote_hub.set_symbols(subscribe_stocks, self.bar_builder.on_tick, period='tick')
+            self.bar_builder.reset(removed)  # 清除取消订阅股票的K线状态
+            self.subscribed_stocks = self.context.quote_hub.get_symbols('tick', self.bar_builder.on_tick)
+            
+            logger.debug(f"{BLUE}【订阅调整】{RESET} 新增订阅:{added} 取消订阅:{removed}")
+            logger.info(f"{GREEN}【行情订阅】{RESET} 已订阅 {len(self.subscribed_stocks)} 只股票的行情，包含策略池股票 {len(self.stock_pool)} 只，持仓非策略池股票 {len(position_stock_codes)} 只")
         except Exception as e:
             logger.error(f"{RED}【行情订阅错误】{RESET} 错误:{e}")
             traceback.print_exc()
     
+    @profiled('on_bar', kind='bar')
     def on_bar(self, bar_data):
         """
         K线数据回调函数
@@ -310,17 +208,19 @@ class YiJinErDiXiStrategy:
             bar_data: K线数据
         """
         try:
+            # 以K线时间作为策略时钟，实盘与回测行为一致
             # 检查是否交易时间
-            if not is_trade_time():
+            if not is_trade_time(bar_data.time):
                 return
                 
-            # 检查是否新的一天
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            if current_date != self.current_date:
+            # 检查是否新的一天，每根K线只取一次日期，日期变化时才格式化
+            bar_day = bar_data.time.date()
+            if bar_day != self.current_day:
                 logger.info(f"{GREEN}【新交易日】{RESET} 清空交易记录和缓存")
                 # 清空交易记录和缓存
                 self._clear_cache()
-                self.current_date = current_date
+                self.current_day = bar_day
+                self.current_date = bar_day.strftime('%Y-%m-%d')
             
             # 获取股票代码和时间
             stock_code = bar_data.stock_code
@@ -337,24 +237,22 @@ class YiJinErDiXiStrategy:
             if stock_code not in self.stock_pool and not has_position:
                 return
                 
-            # 更新价格缓存
-            self.update_price_cache(stock_code, bar_data)
+            # 更新收盘价、MACDFS指标和当日最高价
+            state = self.intraday_state.update(stock_code, bar_data)
             
-            # 计算MACDFS指标
-            self.calculate_stock_macdfs(stock_code)
-            
-            # 更新分时均价缓存
+            # 更新分时均价
             self.update_avg_price_cache(stock_code, bar_data)
             
-            # 更新当日最高价缓存
-            self.update_high_price_cache(stock_code, bar_data)
-            
             # 更新涨停价缓存
-            self.update_limit_up_cache(stock_code)
+            self.update_limit_up_cache(state)
             
             # # 判断是否为开盘第一分钟
             is_first_minute = bar_time.hour == 9 and bar_time.minute == 31
             
+            # 有未完成或尚未返回订单编号的委托时等待委托推送，避免重复下单
+            if self.order_manager.has_open_order(stock_code) or self.context.async_orders.has_pending(stock_code):
+                return
+            
             # # 处理持仓股票的卖出信号
             if has_position:
                 # 开盘第一分钟判断次日开盘卖出条件
@@ -370,138 +268,50 @@ class YiJinErDiXiStrategy:
             # 处理股票池中的买入信号
             if stock_code in self.stock_pool and not has_position:
                 self.check_buy_signal(stock_code, bar_data)
-                
-            # 每分钟检查一次超时订单
-            if bar_time.second == 0:
-                self.check_timeout_orders()
 
         except Exception as e:
             logger.error(f"{RED}【行情处理异常】{RESET} 股票:{stock_code} 错误:{e}")
             traceback.print_exc()
     
-    def update_price_cache(self, stock_code, bar_data):
-        """
-        更新价格缓存
-        
-        将最新的分钟K线价格添加到缓存中
-        
-        Args:
-            stock_code: 股票代码
-            bar_data: K线数据
-        """
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 初始化价格缓存
-        self._ensure_cache_initialized(self.price_cache, stock_code, current_date, default=[])
-        
-        # 添加价格到缓存
-        self.price_cache[stock_code][current_date].append(bar_data.close)
-    
     def update_avg_price_cache(self, stock_code, bar_data):
         """
-        更新分时均价缓存
-        
-        计算并缓存当前的分时均价
-        
-        Args:
-            stock_code: 股票代码
-            bar_data: K线数据
-        """
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 初始化分时均价缓存
-        self._ensure_cache_initialized(self.avg_price_cache, stock_code)
-        
-        # 计算分时均价 = 当日累计成交金额 ÷ 当日累计成交股数
-        # 注意：volume可能是以"手"为单位(1手=100股)，而amount是以"元"为单位
-        # 因此需要将volume乘以100转换为股数
-        volume_in_shares = bar_data.volume * 100 if bar_data.volume > 0 else 0
-        avg_price = bar_data.amount / volume_in_shares if volume_in_shares > 0 else 0
-        
-        # 缓存分时均价
-        self.avg_price_cache[stock_code][current_date] = avg_price
-    
-    def update_high_price_cache(self, stock_code, bar_data):
-        """
-        更新当日最高价缓存
+        更新分时均价
         
-        记录当日的最高价格
+        分时均价 = 当日累计成交金额 ÷ 当日累计成交股数，成交量（手）按市场换算为股数。
+        K线由分笔行情合成时使用分笔行情中的当日累计值，盘中重启或重新筛选股票池后仍为全天均价；
+        回测等直接回放K线时按K线成交额和成交量累加
         
         Args:
             stock_code: 股票代码
             bar_data: K线数据
         """
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 初始化最高价缓存
-        self._ensure_cache_initialized(self.high_price_cache, stock_code)
-        
-        # 获取当前缓存的最高价
-        current_high = self.high_price_cache[stock_code].get(current_date, 0)
-        
-        # 更新最高价
-        if bar_data.high > current_high:
-            self.high_price_cache[stock_code][current_date] = bar_data.high
+        cumulative = self.bar_builder.get_cumulative(stock_code)
+        if cumulative is not None and cumulative[0] == self.current_day:
+            self.vwap.update_cumulative(stock_code, self.current_date, cumulative[1], cumulative[2])
+        else:
+            self.vwap.update(stock_code, self.current_date, bar_data.amount, bar_data.volume)
     
-    def update_limit_up_cache(self, stock_code):
+    def update_limit_up_cache(self, state):
         """
         更新涨停价缓存
         
         每只股票每天只获取一次涨停价信息并缓存
         
         Args:
-            stock_code: 股票代码
+            state: 股票的当日分时状态
+            
+        Returns:
+            float: 涨停价
         """
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 初始化涨停价缓存
-        self._ensure_cache_initialized(self.limit_up_cache, stock_code)
-        
         # 如果当日涨停价未缓存，则获取并缓存
-        if current_date not in self.limit_up_cache[stock_code]:
+        if state.limit_up is None:
             # 获取股票信息，包括涨停价
-            stock_info = self.context.get_stock_info(stock_code)
-            limit_up_price = stock_info['涨停价']
-            
-            # 缓存涨停价
-            self.limit_up_cache[stock_code][current_date] = limit_up_price
-            logger.debug(f"{BLUE}【涨停价缓存】{RESET} 股票:{stock_code} 涨停价:{limit_up_price:.2f}")
-    
-    def calculate_stock_macdfs(self, stock_code):
-        """
-        计算股票的MACDFS指标
-        
-        使用价格缓存计算MACDFS指标，确保每个交易日的MACDFS计算相对独立，
-        从零轴开始计算，与行情软件保持一致。
-        
-        Args:
-            stock_code: 股票代码
-        """
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 初始化MACDFS缓存
-        self._ensure_cache_initialized(self.macdfs_cache, stock_code, current_date, default=[])
-        
-        # 获取价格数据
-        prices = self.price_cache[stock_code].get(current_date, [])
-        
-        if len(prices) >= 1:  # 至少需要1个价格点
-            # 使用第一个价格作为开盘价
-            open_price = prices[0]
-            
-            # 计算MACDFS，传递开盘价以便正确初始化
-            prices_series = pd.Series(prices)
-            macdfs_df = calculate_macdfs(
-                prices_series, 
-                fast_period=MACDFS_SHORT,
-                slow_period=MACDFS_LONG,
-                signal_period=MACDFS_SIGNAL,
-                open_price=open_price  # 传递开盘价
-            )
-            
-            # 缓存MACDFS值
-            self.macdfs_cache[stock_code][current_date] = macdfs_df['MACDFS'].tolist()
+            stock_info = self.context.get_stock_info(state.stock_code)
+            state.limit_up = stock_info['涨停价']
+            logger.debug(f"{BLUE}【涨停价缓存】{RESET} 股票:{state.stock_code} 涨停价:{state.limit_up:.2f}")
+        return state.limit_up
     
+    @profiled('check_buy_signal')
     def check_buy_signal(self, stock_code, bar_data):
         """
         检查买入信号
@@ -517,16 +327,16 @@ class YiJinErDiXiStrategy:
             stock_code: 股票代码
             bar_data: K线数据
         """
-        current_date = datetime.now().strftime('%Y-%m-%d')
+        state = self.intraday_state.get(stock_code)
         
         # 检查买入次数是否已达上限
         buy_times = self.stock_buy_times.get(stock_code, 0)
-        if buy_times >= MAX_BUY_TIMES:
-            logger.debug(f"{BLUE}【买入次数已满】{RESET} 股票:{stock_code} 当前买入次数:{buy_times} 最大买入次数:{MAX_BUY_TIMES}")
+        if buy_times >= self.max_buy_times:
+            logger.debug(f"{BLUE}【买入次数已满】{RESET} 股票:{stock_code} 当前买入次数:{buy_times} 最大买入次数:{self.max_buy_times}")
             return
         
-        # 获取MACDFS值
-        macdfs_values = self.macdfs_cache[stock_code].get(current_date, [])
+        # 获取最近三根MACDFS值
+        macdfs_values = state.last_macdfs
         
         # 检查MACDFS绿柱是否连续两根上缩
         if len(macdfs_values) < 3 or not is_green_bar_shrinking(macdfs_values):
@@ -535,17 +345,17 @@ class YiJinErDiXiStrategy:
         logger.debug(f"{BLUE}【MACDFS绿柱上缩】{RESET} 股票:{stock_code} MACDFS值:{macdfs_values[-3:]}")
         
         # 获取当日最高价
-        high_price = self.high_price_cache[stock_code].get(current_date, 0)
+        high_price = state.high
         
         # 检查当日涨幅是否超过限制
         prev_close = bar_data.pre_close
         intraday_gain = (high_price - prev_close) / prev_close if prev_close > 0 else 0
-        if intraday_gain > MAX_INTRADAY_GAIN:
-            logger.debug(f"{BLUE}【涨幅超限】{RESET} 股票:{stock_code} 日内最高涨幅:{intraday_gain:.2%} 超过{MAX_INTRADAY_GAIN:.2%}")
+        if intraday_gain > self.max_intraday_gain:
+            logger.debug(f"{BLUE}【涨幅超限】{RESET} 股票:{stock_code} 日内最高涨幅:{intraday_gain:.2%} 超过{self.max_intraday_gain:.2%}")
             return
         
         # 获取分时均价
-        avg_price = self.avg_price_cache[stock_code].get(current_date, 0)
+        avg_price = self.vwap.get(stock_code, self.current_date)
         
         # 检查当前价格是否大于分时均价
         current_price = bar_data.close
@@ -567,6 +377,7 @@ class YiJinErDiXiStrategy:
         # 执行买入
         self.execute_buy(stock_code, current_price)
     
+    @profiled('check_sell_signal')
     def check_sell_signal(self, stock_code):
         """
         检查卖出信号
@@ -577,10 +388,10 @@ class YiJinErDiXiStrategy:
         Args:
             stock_code: 股票代码
         """
-        current_date = datetime.now().strftime('%Y-%m-%d')
+        state = self.intraday_state.get(stock_code)
         
-        # 获取MACDFS值
-        macdfs_values = self.macdfs_cache[stock_code].get(current_date, [])
+        # 获取最近三根MACDFS值
+        macdfs_values = state.last_macdfs
         
         # 检查MACDFS红柱是否连续两根下缩
         if len(macdfs_values) < 3 or not is_red_bar_shrinking(macdfs_values):
@@ -590,8 +401,7 @@ class YiJinErDiXiStrategy:
         latest_price = self.context.get_latest_price(stock_code)
         
         # 确保涨停价已缓存
-        self.update_limit_up_cache(stock_code)
-        limit_up_price = self.limit_up_cache[stock_code][current_date]
+        limit_up_price = self.update_limit_up_cache(state)
         
         # 判断是否涨停
         is_limit_up = (latest_price >= limit_up_price)
@@ -606,12 +416,13 @@ class YiJinErDiXiStrategy:
         
         # 执行卖出
         if sell_times == 0:
-            # 第一次触发，卖出1/2仓位
-            self.execute_sell(stock_code, latest_price, 0.5)
+            # 第一次触发，默认卖出1/2仓位
+            self.execute_sell(stock_code, latest_price, self.first_sell_ratio)
         else:
-            # 第二次及以后触发，卖出全部剩余仓位
-            self.execute_sell(stock_code, latest_price, 1.0)
+            # 第二次及以后触发，默认卖出全部剩余仓位
+            self.execute_sell(stock_code, latest_price, self.next_sell_ratio)
     
+    @profiled('check_next_day_open_sell_signal')
     def check_next_day_open_sell_signal(self, stock_code, bar_data):
         """
         检查次日开盘卖出条件
@@ -636,6 +447,7 @@ class YiJinErDiXiStrategy:
             # 执行清仓
             self.execute_sell(stock_code, close_price, 1.0)
     
+    @profiled('check_limit_up_break_sell_signal')
     def check_limit_up_break_sell_signal(self, stock_code, bar_data):
         """
         检查涨停开板卖出条件
@@ -647,10 +459,10 @@ class YiJinErDiXiStrategy:
             stock_code: 股票代码
             bar_data: K线数据
         """
-        current_date = datetime.now().strftime('%Y-%m-%d')
+        state = self.intraday_state.get(stock_code)
         
-        # 获取价格缓存
-        prices = self.price_cache[stock_code].get(current_date, [])
+        # 获取最近两分钟的收盘价
+        prices = state.last_closes
         if len(prices) < 2:
             return
             
@@ -659,7 +471,7 @@ class YiJinErDiXiStrategy:
         current_price = prices[-1]
         
         # 从缓存获取涨停价
-        limit_up_price = self.limit_up_cache[stock_code][current_date]
+        limit_up_price = self.update_limit_up_cache(state)
         
         # 判断前一分钟是否涨停
         is_prev_limit_up = (prev_price >= limit_up_price)
@@ -674,6 +486,7 @@ class YiJinErDiXiStrategy:
             # 执行清仓，使用限价委托
             self.execute_sell(stock_code, current_price, 1.0, use_limit_price=True)
     
+    @profiled('execute_buy', kind='order')
     def execute_buy(self, stock_code, price):
         """
         执行买入操作
@@ -694,28 +507,27 @@ class YiJinErDiXiStrategy:
             available_cash = asset['可用金额']
             total_asset = asset['总资产']
             
-            if available_cash < BUY_AMOUNT:
-                logger.warning(f"{YELLOW}【资金不足】{RESET} 可用资金:{available_cash:.2f} 小于买入金额:{BUY_AMOUNT:.2f}")
+            if available_cash < self.buy_amount:
+                logger.warning(f"{YELLOW}【资金不足】{RESET} 可用资金:{available_cash:.2f} 小于买入金额:{self.buy_amount:.2f}")
                 return False
             
             # 检查整体仓位是否已达到最大限制
-            if ENABLE_POSITION_CONTROL:
-                # 计算当前总持仓市值
-                positions = self.context.get_positions()
-                total_position_value = sum([p['最新市值'] for p in positions]) if positions else 0
+            if self.enable_position_control:
+                # 当前总持仓市值，直接取自账户簿记中的资产信息
+                total_position_value = asset['持仓市值'] or 0
                 
                 # 计算当前仓位比例
                 current_position_ratio = total_position_value / total_asset if total_asset > 0 else 0
                 
                 # 预估本次买入后的仓位比例
-                estimated_new_position_ratio = (total_position_value + BUY_AMOUNT) / total_asset if total_asset > 0 else 0
+                estimated_new_position_ratio = (total_position_value + self.buy_amount) / total_asset if total_asset > 0 else 0
                 
                 # 如果预估仓位超过设定的最大仓位比例，则不执行买入
-                if estimated_new_position_ratio > MAX_POSITION_RATIO:
-                    logger.warning(f"{YELLOW}【仓位超限】{RESET} 股票:{stock_code} 当前仓位比例:{current_position_ratio:.2%} 本次买入后预估仓位比例:{estimated_new_position_ratio:.2%} 超过最大限制:{MAX_POSITION_RATIO:.2%}")
+                if estimated_new_position_ratio > self.max_position_ratio:
+                    logger.warning(f"{YELLOW}【仓位超限】{RESET} 股票:{stock_code} 当前仓位比例:{current_position_ratio:.2%} 本次买入后预估仓位比例:{estimated_new_position_ratio:.2%} 超过最大限制:{self.max_position_ratio:.2%}")
                     return False
                 
-                logger.debug(f"{BLUE}【仓位检查】{RESET} 股票:{stock_code} 当前仓位比例:{current_position_ratio:.2%} 买入后预估仓位比例:{estimated_new_position_ratio:.2%} 最大限制:{MAX_POSITION_RATIO:.2%}")
+                logger.debug(f"{BLUE}【仓位检查】{RESET} 股票:{stock_code} 当前仓位比例:{current_position_ratio:.2%} 买入后预估仓位比例:{estimated_new_position_ratio:.2%} 最大限制:{self.max_position_ratio:.2%}")
                 
             # 获取股票名称
             stock_name = self.context.get_security_name(stock_code)
@@ -732,23 +544,22 @@ class YiJinErDiXiStrategy:
             buy_times = self.stock_buy_times[stock_code]
             remark = f"{STRATEGY_NAME}-买入{buy_times}"
             
-            # 执行买入，使用市价委托（价格参数设为0）
-            order_result = self.context.order_value(
+            # 执行买入，使用市价委托（价格参数设为0），异步下单不阻塞行情回调
+            future = self.context.order_value_async(
                 security=stock_code,
-                value=BUY_AMOUNT,
+                value=self.buy_amount,
                 price=0,  # 使用0表示市价委托
                 strategy_name=STRATEGY_NAME,
-                remark=remark
+                remark=remark,
+                timeout=self.order_timeout
             )
             
-            if order_result and order_result.get('订单编号'):
-                order_id = order_result.get('订单编号')
-                # 记录订单信息
-                self.add_active_order(order_id, stock_code, '买入')
-                logger.info(f"{GREEN}【买入信号】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 金额:{BUY_AMOUNT:.2f} 次数:{buy_times} 委托方式:市价 订单编号:{order_id}")
+            if future is not None:
+                future.add_done_callback(lambda f: self._on_order_result(f, stock_code, '买入'))
+                logger.info(f"{GREEN}【买入信号】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 金额:{self.buy_amount:.2f} 次数:{buy_times} 委托方式:市价 请求序号:{getattr(future, 'seq', None)}")
                 return True
             else:
-                logger.warning(f"{YELLOW}【买入失败】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 金额:{BUY_AMOUNT:.2f} 委托方式:市价 返回结果:{order_result}")
+                logger.warning(f"{YELLOW}【买入失败】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 金额:{self.buy_amount:.2f} 委托方式:市价 返回结果:{future}")
                 return False
             
         except Exception as e:
@@ -756,6 +567,7 @@ class YiJinErDiXiStrategy:
             traceback.print_exc()
             return False
     
+    @profiled('execute_sell', kind='order')
     def execute_sell(self, stock_code, price, ratio=1.0, use_limit_price=False):
         """
         执行卖出操作
@@ -808,23 +620,22 @@ class YiJinErDiXiStrategy:
                 limit_price = 0
                 price_type = "市价"
             
-            # 执行卖出
-            order_result = self.context.order(
+            # 执行卖出，异步下单不阻塞行情回调
+            future = self.context.order_async(
                 security=stock_code,
                 amount=-sell_shares,
                 price=limit_price,
                 strategy_name=STRATEGY_NAME,
-                remark=remark
+                remark=remark,
+                timeout=self.order_timeout
             )
             
-            if order_result and order_result.get('订单编号'):
-                order_id = order_result.get('订单编号')
-                # 记录订单信息
-                self.add_active_order(order_id, stock_code, '卖出')
-                logger.info(f"{YELLOW}【卖出信号】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 委托价格:{limit_price if limit_price > 0 else '市价'} 数量:{sell_shares} 比例:{ratio:.2%} 次数:{sell_times} 委托方式:{price_type} 订单编号:{order_id}")
+            if future is not None:
+                future.add_done_callback(lambda f: self._on_order_result(f, stock_code, '卖出'))
+                logger.info(f"{YELLOW}【卖出信号】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 委托价格:{limit_price if limit_price > 0 else '市价'} 数量:{sell_shares} 比例:{ratio:.2%} 次数:{sell_times} 委托方式:{price_type} 请求序号:{getattr(future, 'seq', None)}")
                 return True
             else:
-                logger.warning(f"{YELLOW}【卖出失败】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 委托价格:{limit_price if limit_price > 0 else '市价'} 数量:{sell_shares} 委托方式:{price_type} 返回结果:{order_result}")
+                logger.warning(f"{YELLOW}【卖出失败】{RESET} 股票:{stock_code} 名称:{stock_name} 参考价格:{price:.2f} 委托价格:{limit_price if limit_price > 0 else '市价'} 数量:{sell_shares} 委托方式:{price_type} 返回结果:{future}")
                 return False
             
         except Exception as e:
@@ -832,178 +643,17 @@ class YiJinErDiXiStrategy:
             traceback.print_exc()
             return False
     
-    def _ensure_cache_initialized(self, cache_dict, stock_code, date=None, default=None):
+    def _on_order_result(self, future, stock_code, order_type):
         """
-        确保缓存已初始化
+        异步委托完成回调，记录柜台返回的订单编号
         
         Args:
-            cache_dict: 缓存字典
-            stock_code: 股票代码
-            date: 日期，默认为None
-            default: 默认值，默认为None
-        """
-        if stock_code not in cache_dict:
-            cache_dict[stock_code] = {}
-        
-        if date is not None and date not in cache_dict[stock_code]:
-            if default is None:
-                default = {}
-            cache_dict[stock_code][date] = default if not isinstance(default, list) else []
-    
-    def add_active_order(self, order_id, stock_code, order_type):
-        """
-        添加活跃订单记录
-        
-        Args:
-            order_id: 订单编号
+            future: order_async返回的Future
             stock_code: 股票代码
             order_type: 订单类型，'买入'或'卖出'
-            
-        Returns:
-            None
-        """
-        if order_id:
-            self.active_orders[order_id] = {
-                'time': datetime.now(),
-                'stock_code': stock_code,
-                'order_type': order_type
-            }
-            logger.debug(f"{BLUE}【订单记录】{RESET} 添加{order_type}订单 ID:{order_id} 股票:{stock_code}")
-    
-    def remove_active_order(self, order_id):
-        """
-        移除活跃订单记录
-        
-        Args:
-            order_id: 订单编号
-            
-        Returns:
-            bool: 是否成功移除
         """
-        if order_id in self.active_orders:
-            order_info = self.active_orders.pop(order_id)
-            logger.debug(f"{BLUE}【订单记录】{RESET} 移除{order_info['order_type']}订单 ID:{order_id} 股票:{order_info['stock_code']}")
-            return True
-        return False
-    
-    def check_timeout_orders(self):
-        """
-        检查超时未成交订单并撤单
-        
-        检查所有活跃订单，如果超过设定的超时时间未成交，则执行撤单操作
-        
-        Returns:
-            int: 撤单数量
-        """
-        if not self.active_orders:
-            return 0
-            
-        now = datetime.now()
-        cancel_count = 0
-        orders_to_cancel = []
-        
-        # 找出所有超时的订单
-        for order_id, order_info in self.active_orders.items():
-            order_time = order_info['time']
-            elapsed_seconds = (now - order_time).total_seconds()
-            
-            if elapsed_seconds >= self.order_timeout:
-                orders_to_cancel.append(order_id)
-        
-        # 执行撤单
-        for order_id in orders_to_cancel:
-            order_info = self.active_orders[order_id]
-            stock_code = order_info['stock_code']
-            order_type = order_info['order_type']
-            
-            try:
-                # 执行撤单
-                cancel_result = self.context.cancel_order(order_id)
-                
-                if cancel_result:
-                    logger.info(f"{YELLOW}【超时撤单】{RESET} {order_type}订单 ID:{order_id} 股票:{stock_code} 超时:{self.order_timeout}秒")
-                    self.remove_active_order(order_id)
-                    cancel_count += 1
-                else:
-                    logger.warning(f"{YELLOW}【撤单失败】{RESET} {order_type}订单 ID:{order_id} 股票:{stock_code}")
-            except Exception as e:
-                logger.error(f"{RED}【撤单异常】{RESET} 订单ID:{order_id} 错误:{e}")
-                traceback.print_exc()
-        
-        return cancel_count
-    
-    def process_order_callback(self, order):
-        """
-        处理订单回调
-        
-        当收到订单状态变化推送时调用，用于更新订单状态
-        
-        Args:
-            order: 订单信息
-        """
-        try:
-            order_id = order.get('委托编号') or order.get('order_id')
-            if not order_id:
-                return
-                
-            order_status = order.get('委托状态') or order.get('order_status')
-            
-            # 如果订单已成交、已撤单或已拒绝，从活跃订单中移除
-            if order_status in ['已成交', '已撤单', '已拒绝', '部撤', '部成']:
-                self.remove_active_order(order_id)
-                
-        except Exception as e:
-            logger.error(f"{RED}【订单回调处理异常】{RESET} 错误:{e}")
-            traceback.print_exc()
-    
-    def process_trade_callback(self, trade):
-        """
-        处理成交回调
-        
-        当收到成交信息推送时调用，用于更新订单状态
-        
-        Args:
-            trade: 成交信息
-        """
-        try:
-            order_id = trade.get('委托编号') or trade.get('order_id')
-            if not order_id:
-                return
-                
-            # 从活跃订单中移除
-            self.remove_active_order(order_id)
-                
-        except Exception as e:
-            logger.error(f"{RED}【成交回调处理异常】{RESET} 错误:{e}")
-            traceback.print_exc()
-    
-    def setup_tasks(self):
-        """
-        设置定时任务
-        
-        设置定期检查超时订单的定时任务
-        """
-        try:
-            # 每30秒检查一次超时订单
-            self.context.run_time(self.timer_check_timeout_orders, "30nSecond")
-            logger.info(f"{GREEN}【定时任务】{RESET} 设置超时订单检查任务，间隔:30秒")
-        except Exception as e:
-            logger.error(f"{RED}【定时任务设置失败】{RESET} 错误:{e}")
-            traceback.print_exc()
-    
-    def timer_check_timeout_orders(self):
-        """
-        定时检查超时订单
-        
-        定时任务回调函数，用于检查超时订单并执行撤单
-        """
-        if not is_trade_time():
-            return
-            
-        try:
-            cancel_count = self.check_timeout_orders()
-            if cancel_count > 0:
-                logger.info(f"{YELLOW}【定时撤单】{RESET} 已撤销{cancel_count}个超时订单")
-        except Exception as e:
-            logger.error(f"{RED}【定时撤单异常】{RESET} 错误:{e}")
-            traceback.print_exc() 
\ No newline at end of file
+        order_id = future.result()
+        if order_id is not None and order_id > 0:
+            logger.debug(f"{BLUE}【订单记录】{RESET} {order_type}委托 股票:{stock_code} 订单编号:{order_id}")
+        else:
+            logger.warning(f"{YELLOW}【{order_type}失败】{RESET} 股票:{stock_code} 柜台未返回订单编号")
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""
+单元测试
+
+在仓库根目录运行 python -m pytest tests，需要行情和交易接口的测试使用benchmarks.fake_xtquant中的替身。
+"""
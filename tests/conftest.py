@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+测试共用的设置
+
+测试在没有QMT终端的环境中运行，导入trader模块之前先注册benchmarks.fake_xtquant中的
+xtdata、xttrader替身和策略默认配置。
+"""
+
+from benchmarks.fake_xtquant import install
+
+install()
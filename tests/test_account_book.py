@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+账户簿记测试
+"""
+
+import time
+from types import SimpleNamespace
+
+from xtquant import xtconstant
+
+from trader.account_book import AccountBook
+
+STOCK = '600000.SH'
+
+
+def _position(volume, can_use_volume):
+    return SimpleNamespace(account_type=2, account_id='test', stock_code=STOCK, volume=volume, open_price=10.0,
+                           can_use_volume=can_use_volume, market_value=volume * 10.0, frozen_volume=0,
+                           on_road_volume=0, yesterday_volume=can_use_volume, avg_price=10.0, direction=48)
+
+
+def _asset(cash):
+    return SimpleNamespace(account_type=2, account_id='test', total_asset=100000.0, cash=cash, frozen_cash=0.0,
+                           market_value=100000.0 - cash)
+
+
+def _trade(traded_id, volume, traded_time=None, order_type=xtconstant.STOCK_BUY):
+    return SimpleNamespace(account_id='test', stock_code=STOCK, order_type=order_type, traded_id=traded_id,
+                           traded_time=traded_time, traded_price=10.0, traded_volume=volume,
+                           traded_amount=volume * 10.0)
+
+
+def _seeded_book():
+    book = AccountBook()
+    book.seed([_position(1000, 1000)], _asset(90000.0))
+    return book
+
+
+def test_trade_before_position_push():
+    """成交推送先到时先行调整，随后的持仓推送以柜台数据覆盖"""
+    book = _seeded_book()
+    book.on_stock_trade(_trade('t1', 500, time.time() + 1))
+    assert book.get_position(STOCK)['持仓数量'] == 1500
+    assert book.get_asset()['可用金额'] == 85000.0
+
+    book.on_stock_position(_position(1500, 1000))
+    book.on_stock_asset(_asset(85000.0))
+    assert book.get_position(STOCK)['持仓数量'] == 1500
+    assert book.get_asset()['可用金额'] == 85000.0
+
+
+def test_position_push_before_trade_is_not_counted_twice():
+    """持仓和资产推送先于成交推送到达并已包含该成交时，成交推送不再调整"""
+    book = _seeded_book()
+    traded_at = time.time() - 1
+    book.on_stock_position(_position(1500, 1000))
+    book.on_stock_asset(_asset(85000.0))
+    book.on_stock_trade(_trade('t1', 500, traded_at))
+    assert book.get_position(STOCK)['持仓数量'] == 1500
+    assert book.get_asset()['可用金额'] == 85000.0
+
+    # 只有持仓推送先到时，资产仍按成交调整
+    book = _seeded_book()
+    traded_at = time.time() + 1
+    book.on_stock_position(_position(1500, 1000))
+    book._position_times[STOCK] = traded_at + 1
+    book.on_stock_trade(_trade('t1', 500, traded_at))
+    assert book.get_position(STOCK)['持仓数量'] == 1500
+    assert book.get_asset()['可用金额'] == 85000.0
+
+
+def test_duplicate_trade_push_applied_once():
+    """同一成交编号重复推送只调整一次；没有成交时间的成交照常调整"""
+    book = _seeded_book()
+    trade = _trade('t1', 300, time.time() + 1, order_type=xtconstant.STOCK_SELL)
+    book.on_stock_trade(trade)
+    book.on_stock_trade(trade)
+    position = book.get_position(STOCK)
+    assert (position['持仓数量'], position['可用数量']) == (700, 700)
+    assert book.get_asset()['可用金额'] == 93000.0
+
+    book.on_stock_trade(_trade(None, 100, None, order_type=xtconstant.STOCK_SELL))
+    assert book.get_position(STOCK)['持仓数量'] == 600
+
+
+def test_trade_time_before_last_query():
+    """成交时间早于最近一次同步查询时，查询结果已包含该成交，不再调整"""
+    book = AccountBook()
+    traded_at = time.time() - 5
+    book.seed([_position(1500, 1000)], _asset(85000.0))
+    book.on_stock_trade(_trade('t1', 500, traded_at))
+    assert book.get_position(STOCK)['持仓数量'] == 1500
+    assert book.get_asset()['可用金额'] == 85000.0
+
+
+def test_trade_time_date_part_is_ignored():
+    """成交时间的日期部分按当日换算，只比较时分秒"""
+    # 日期部分早于查询，时分秒晚于查询，仍调整簿记
+    book = _seeded_book()
+    book.on_stock_trade(_trade('t1', 500, (time.time() + 1 - 3 * 86400) * 1000))
+    assert book.get_position(STOCK)['持仓数量'] == 1500
+
+    # 日期部分晚于查询，时分秒早于查询，查询结果已包含该成交
+    book = _seeded_book()
+    book.on_stock_trade(_trade('t1', 500, time.time() - 5 + 86400))
+    assert book.get_position(STOCK)['持仓数量'] == 1000
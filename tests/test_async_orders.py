@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+异步下单测试
+"""
+
+import itertools
+from types import SimpleNamespace
+
+from xtquant import xtconstant
+
+from trader import async_orders
+from trader.async_orders import AsyncOrderSubmitter
+from trader.order_manager import OrderManager
+
+STOCK = '600000.SH'
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTrader:
+    """只分配下单请求序号，反馈和委托失败推送由测试发出"""
+
+    def __init__(self):
+        self.seqs = itertools.count(1)
+
+    def order_stock_async(self, account, stock_code, order_type, order_volume, price_type, price,
+                          strategy_name='', order_remark=''):
+        return next(self.seqs)
+
+
+def _submitter(max_in_flight=None):
+    clock = FakeClock()
+    manager = OrderManager(clock=clock)
+    submitter = AsyncOrderSubmitter(FakeTrader(), 'test', manager, max_in_flight=max_in_flight,
+                                    response_timeout=10, clock=clock)
+    return submitter, manager, clock
+
+
+def _submit(submitter):
+    return submitter.submit(STOCK, xtconstant.STOCK_BUY, 100, xtconstant.FIX_PRICE, 10.0)
+
+
+def _response(seq, order_id):
+    return SimpleNamespace(seq=seq, order_id=order_id, error_msg='')
+
+
+def test_order_error_resolves_pending_order():
+    """委托失败推送按seq结束在途委托，释放在途名额"""
+    submitter, _, _ = _submitter(max_in_flight=1)
+    future = _submit(submitter)
+    assert submitter.has_pending(STOCK)
+    assert _submit(submitter) is None
+
+    submitter.on_order_error(SimpleNamespace(seq=future.seq, order_id=-1, error_msg='资金不足'))
+    assert future.result(0) == -1
+    assert not submitter.has_pending(STOCK)
+    assert submitter.in_flight() == 0
+    assert _submit(submitter) is not None
+
+
+def test_order_error_before_seq_returned():
+    """order_stock_async返回seq之前到达的委托失败推送在登记时处理"""
+    submitter, _, _ = _submitter()
+    submitter.on_order_error(SimpleNamespace(seq=1, order_id=-1, error_msg='资金不足'))
+    future = _submit(submitter)
+    assert future.result(0) == -1
+    assert not submitter.has_pending(STOCK)
+
+
+def test_pending_order_expires_without_response():
+    """超过反馈等待时间的在途委托按失败处理，迟到的反馈仍登记到订单管理器"""
+    submitter, manager, clock = _submitter(max_in_flight=1)
+    future = _submit(submitter)
+    clock.now += 9
+    assert submitter.expire() == []
+    assert submitter.has_pending(STOCK)
+
+    clock.now += 1
+    assert not submitter.has_pending(STOCK)
+    assert future.result(0) == -1
+    assert submitter.in_flight() == 0
+    assert _submit(submitter) is not None
+
+    submitter.on_order_stock_async_response(_response(future.seq, 42))
+    assert manager.is_open(42)
+    assert future.result(0) == -1
+
+
+def test_unmatched_pushes_are_bounded(monkeypatch):
+    """一直匹配不上的反馈和委托失败推送只保留最近的若干条"""
+    monkeypatch.setattr(async_orders, 'MAX_UNMATCHED', 3)
+    submitter, _, _ = _submitter()
+    for seq in range(100, 110):
+        submitter.on_order_stock_async_response(_response(seq, seq))
+        submitter.on_order_error(SimpleNamespace(seq=seq + 100, order_id=-1, error_msg=''))
+    assert list(submitter._early_responses) == [208, 109, 209]
+
+
+def test_order_target_async_orders_the_delta():
+    """order_target_async按簿记持仓计算差额异步下单，并异步撤销该股票的未完成委托"""
+    from benchmarks.fake_xtquant import close_context, create_context
+
+    context = create_context(position_codes=[STOCK])
+    try:
+        context.order_manager.track(7, STOCK, xtconstant.STOCK_BUY, 100)
+        cancels = []
+        context.xt_trader.cancel_order_stock_async = lambda account, order_id: cancels.append(order_id) or 1
+        submitted = []
+        context.async_orders.submit = lambda *args, **kwargs: submitted.append(args) or 'future'
+
+        assert context.order_target_async(STOCK, 1500, price=10.0) == 'future'
+        assert cancels == [7]
+        assert submitted[0][:3] == (STOCK, xtconstant.STOCK_BUY, 500)
+    finally:
+        close_context(context)
+
+
+def test_repeated_placeholder_order_id_errors_reach_submitter():
+    """取得订单编号前被拒绝的委托推送重复的占位order_id，每条仍按seq结束对应的在途委托"""
+    from trader.trader import MyXtQuantTraderCallback
+
+    submitter, _, _ = _submitter()
+    callback = MyXtQuantTraderCallback()
+    callback.add_listener(submitter)
+    futures = [_submit(submitter) for _ in range(3)]
+    for future in futures:
+        callback.on_order_error(SimpleNamespace(seq=future.seq, order_id=-1, error_msg='资金不足'))
+    assert [future.result(0) for future in futures] == [-1, -1, -1]
+    assert not submitter.has_pending(STOCK)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+分钟线回测撮合与引擎测试
+"""
+
+import logging
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from xtquant import xtconstant
+
+from benchmarks.fake_xtquant import session_minutes
+from trader.backtest import (
+    BacktestContext, BacktestEngine, BarData, SLIPPAGE, VOLUME_LIMIT, VOLUME_UNIT
+)
+from trader.bar_store import BarStore
+
+STOCK = '600000.SH'
+PRE_CLOSE = 10.0
+LIMIT_UP = 11.0
+
+
+def _bar(minute, open_=10.0, high=None, low=None, close=None, volume=1000):
+    close = open_ if close is None else close
+    return BarData(STOCK, datetime(2025, 6, 16, 9, 30 + minute), open_,
+                   max(open_, close) + 0.01 if high is None else high,
+                   min(open_, close) - 0.01 if low is None else low,
+                   close, volume, volume * VOLUME_UNIT * close, PRE_CLOSE)
+
+
+def _push(context, bar):
+    # 与BacktestEngine相同，推进模拟时钟后先撮合再更新最新价格
+    context.now = bar.time
+    context.on_bar(bar)
+
+
+@pytest.fixture
+def context():
+    context = BacktestContext(initial_cash=100000)
+    context.start_day({STOCK: PRE_CLOSE})
+    _push(context, _bar(1))
+    return context
+
+
+def test_same_bar_order_fills_on_next_bar(context):
+    """当根K线内发出的委托不在这根K线撮合，下一根K线按开盘价加滑点成交"""
+    order_id = context.order(STOCK, 1000)
+    context.on_bar(_bar(1))
+    assert context.orders[order_id]['traded_volume'] == 0
+    assert context.get_position(STOCK) is None
+
+    _push(context, _bar(2, open_=10.2))
+    order = context.orders[order_id]
+    assert order['order_status'] == xtconstant.ORDER_SUCCEEDED
+    assert context.trades[-1]['成交均价'] == round(10.2 * (1 + SLIPPAGE), 2)
+    assert context.get_position(STOCK)['持仓数量'] == 1000
+    assert not context.order_manager.has_open_order(STOCK)
+
+
+def test_buy_is_sellable_after_end_day(context):
+    """T+1：当日买入的股票不能卖出，日终结算后才可用"""
+    context.order(STOCK, 1000)
+    _push(context, _bar(2))
+    position = context.get_position(STOCK)
+    assert position['持仓数量'] == 1000 and position['可用数量'] == 0
+    assert context.order(STOCK, -1000) == -1
+
+    context.end_day('20250616')
+    assert context.get_position(STOCK)['可用数量'] == 1000
+    assert context.get_position(STOCK)['昨夜拥股'] == 1000
+    assert context.order(STOCK, -1000) > 0
+    assert context.get_position(STOCK)['冻结数量'] == 1000
+
+
+def test_one_price_limit_up_blocks_buy(context):
+    """一字涨停的K线不能买入，打开涨停后成交价不超过涨停价"""
+    order_id = context.order(STOCK, 1000)
+    _push(context, _bar(2, open_=LIMIT_UP, high=LIMIT_UP, low=LIMIT_UP, close=LIMIT_UP))
+    assert context.orders[order_id]['traded_volume'] == 0
+    assert order_id in context.pending_orders
+
+    _push(context, _bar(3, open_=LIMIT_UP, high=LIMIT_UP, low=10.9, close=10.9))
+    assert context.orders[order_id]['traded_volume'] == 1000
+    assert context.trades[-1]['成交均价'] == LIMIT_UP
+
+
+def test_volume_limit_partial_fill(context):
+    """单根K线最多成交其成交量的VOLUME_LIMIT，剩余部分在后续K线继续成交"""
+    capacity = int(10 * VOLUME_UNIT * VOLUME_LIMIT)
+    order_id = context.order(STOCK, 600)
+    _push(context, _bar(2, volume=10))
+    order = context.orders[order_id]
+    assert order['traded_volume'] == capacity // 100 * 100
+    assert order_id in context.pending_orders
+    assert context.order_manager.has_open_order(STOCK)
+
+    _push(context, _bar(3, volume=10))
+    _push(context, _bar(4, volume=10))
+    assert order['traded_volume'] == 600
+    assert order['order_status'] == xtconstant.ORDER_SUCCEEDED
+    assert [trade['成交数量'] for trade in context.trades] == [200, 200, 200]
+
+
+def test_cancel_and_end_day_release_frozen_cash(context):
+    """撤单和日终撤销未完成委托时，冻结资金全部退回可用资金"""
+    order_id = context.order(STOCK, 1000)
+    assert context.frozen_cash > 0
+    assert context.cash + context.frozen_cash == pytest.approx(100000)
+    assert context.cancel_order(order_id) == 0
+    assert context.cash == pytest.approx(100000) and context.frozen_cash == pytest.approx(0)
+    assert context.orders[order_id]['order_status'] == xtconstant.ORDER_CANCELED
+    assert context.cancel_order(order_id) == -1
+
+    # 部分成交后日终撤销剩余部分，只扣除已成交部分的金额和费用
+    order_id = context.order(STOCK, 600)
+    _push(context, _bar(2, volume=10))
+    record = context.end_day('20250616')
+    trade = context.trades[-1]
+    assert context.orders[order_id]['order_status'] == xtconstant.ORDER_PART_CANCEL
+    assert not context.pending_orders
+    assert context.frozen_cash == pytest.approx(0) and record['冻结金额'] == pytest.approx(0)
+    assert context.cash == pytest.approx(100000 - trade['成交金额'] - trade['手续费'])
+
+
+class _BuyOnce:
+    """在每只股票的第一根K线市价买入100股的测试策略"""
+
+    def __init__(self, context):
+        self.context = context
+        self.stock_pool = []
+        self.bought = set()
+
+    def on_bar(self, bar):
+        if bar.stock_code not in self.bought:
+            self.bought.add(bar.stock_code)
+            self.context.order(bar.stock_code, 100)
+
+
+def test_engine_replays_store_with_next_bar_fills(tmp_path):
+    """引擎按分钟回放存储中的K线，第一根K线的委托在第二根K线成交，日终记录权益"""
+    day = date(2025, 6, 16)
+    times = session_minutes(day)
+    opens = np.round(np.linspace(10, 10.5, len(times)), 2)[None, :]
+    store = BarStore(str(tmp_path / 'bars'))
+    store.append('1m', [STOCK], times, {'open': opens, 'high': opens + 0.01, 'low': opens - 0.01,
+                                        'close': opens, 'volume': np.full(opens.shape, 1000.0),
+                                        'amount': opens * 1000 * VOLUME_UNIT})
+
+    context = BacktestContext(initial_cash=100000)
+    engine = BacktestEngine(context, _BuyOnce(context), store, [STOCK], log_level=logging.WARNING)
+    summary = engine.run('20250616', '20250616')
+    trades = engine.get_trades()
+    assert len(trades) == 1
+    assert trades['成交时间'].iloc[0] == times[1]
+    assert trades['成交均价'].iloc[0] == round(opens[0, 1] * (1 + SLIPPAGE), 2)
+    assert engine.bar_count == len(times)
+    assert summary['成交笔数'] == 1
+    assert engine.get_equity()['日期'].tolist() == ['20250616']
+    assert context.get_position(STOCK)['可用数量'] == 100
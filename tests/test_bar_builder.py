@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+分笔行情合成K线测试，回放合成行情的全推快照
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from xtquant import xtdata
+
+from trader.bar_builder import BEIJING_OFFSET_SECONDS, BarBuilder
+from trader.quote_hub import QuoteHub
+
+POOL_SIZE = 10
+
+
+def test_ticks_with_concurrent_flush():
+    """行情线程合成K线的同时定时任务线程不断flush：处理函数不并发，每只股票的K线按时间推送且与1分钟K线一致"""
+    market = xtdata.market
+    codes = market.codes[:POOL_SIZE]
+    pushes = market.tick_pushes(codes)
+    expected = market.minute_bars(codes)
+
+    received = {code: [] for code in codes}
+    active = []
+    overlaps = []
+
+    def on_bar(bar):
+        active.append(bar)
+        if len(active) > 1:
+            overlaps.append(bar)
+        time.sleep(0.0001)
+        received[bar.stock_code].append(bar)
+        active.pop()
+
+    builder = BarBuilder({'1m': on_bar})
+    hub = QuoteHub(xtdata.subscribe_quote, xtdata.subscribe_whole_quote, xtdata.unsubscribe_quote)
+    hub.subscribe(codes, builder.on_tick, period='tick')
+
+    # flush使用正在推送的快照的时间，上一分钟的K线由flush和下一分钟的第一笔行情同时收盘
+    clock = [None]
+    done = threading.Event()
+
+    def flush_loop():
+        while not done.is_set():
+            if clock[0] is not None:
+                builder.flush(clock[0])
+            time.sleep(0.0002)
+
+    flusher = threading.Thread(target=flush_loop)
+    flusher.start()
+    try:
+        for push in pushes:
+            tick_time = next(iter(push.values()))['time']
+            clock[0] = datetime(1970, 1, 1) + timedelta(seconds=tick_time // 1000 + BEIJING_OFFSET_SECONDS)
+            xtdata.push(push, 'tick')
+    finally:
+        done.set()
+        flusher.join()
+        hub.unsubscribe_all()
+    builder.close_out()
+
+    assert overlaps == []
+    for i, code in enumerate(codes):
+        bars = received[code]
+        times = [bar.time for bar in bars]
+        assert len(bars) == 240
+        assert times == sorted(set(times))
+        np.testing.assert_allclose([bar.close for bar in bars], expected['close'][i])
+        np.testing.assert_allclose([bar.volume for bar in bars], expected['volume'][i])
+        np.testing.assert_allclose([bar.amount for bar in bars], expected['amount'][i], rtol=1e-9)
+    assert builder.get_stats()['处理异常'] == 0
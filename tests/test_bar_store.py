@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+本地K线存储测试
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trader.data
+from trader.bar_store import BarStore, DEFAULT_BAR_FIELDS
+from trader.data import CustomData
+
+CODES = ['600000.SH', '000001.SZ']
+
+
+def _bars(times, base):
+    shape = (len(CODES), len(times))
+    return {field: np.full(shape, base + i, dtype=np.float64) for i, field in enumerate(DEFAULT_BAR_FIELDS)}
+
+
+@pytest.fixture
+def custom_data(tmp_path, monkeypatch):
+    data = CustomData()
+    data.enable_bar_store(str(tmp_path / 'bars'))
+    data.bar_store.append('1d', CODES, ['20250618', '20250619'], _bars(['20250618', '20250619'], 10.0))
+    monkeypatch.setattr(trader.data, 'last_closed_trading_day', lambda: date(2025, 6, 19))
+    return data
+
+
+def test_read_from_store_matches_market_data_ex_schema(custom_data, monkeypatch):
+    """存储已同步到最近收盘交易日时直接读取，格式与get_market_data_ex相同"""
+    monkeypatch.setattr(trader.data.xtdata, 'get_market_data_ex', None, raising=False)
+    result = custom_data.get_qmt_daily_data(CODES, period='1d', count=2, is_download=False)
+    assert list(result) == CODES
+    frame = result['600000.SH']
+    assert list(frame.columns) == ['time'] + DEFAULT_BAR_FIELDS
+    assert list(frame.index) == ['20250618', '20250619']
+    # 北京时间2025-06-19 00:00的UTC毫秒时间戳
+    assert frame['time'].dtype == np.int64
+    assert frame['time'].iloc[-1] == int(pd.Timestamp('2025-06-18 16:00', tz='UTC').timestamp() * 1000)
+    assert frame['close'].iloc[-1] == 10.0 + DEFAULT_BAR_FIELDS.index('close')
+
+
+def test_stale_store_falls_back_to_qmt(custom_data, monkeypatch):
+    """存储落后于最近收盘交易日，或含有未收盘的K线时，回退到QMT终端"""
+    calls = []
+    monkeypatch.setattr(trader.data.xtdata, 'get_market_data_ex',
+                        lambda **kwargs: calls.append(kwargs) or {'fallback': True}, raising=False)
+
+    monkeypatch.setattr(trader.data, 'last_closed_trading_day', lambda: date(2025, 6, 20))
+    assert custom_data.get_qmt_daily_data(CODES, count=2, is_download=False) == {'fallback': True}
+    # 指定了更早的结束时间时，存储仍可使用
+    stored = custom_data.get_qmt_daily_data(CODES, end_time='20250619', count=2, is_download=False)
+    assert list(stored) == CODES
+
+    monkeypatch.setattr(trader.data, 'last_closed_trading_day', lambda: date(2025, 6, 18))
+    assert custom_data.get_qmt_daily_data(CODES, count=2, is_download=False) == {'fallback': True}
+    assert len(calls) == 2
+
+
+def test_replace_rewrites_unfinished_bars(tmp_path):
+    """覆盖写入时，从第一个时间起的已存储数据被替换，之前的数据保持不变"""
+    store = BarStore(str(tmp_path))
+    store.append('1d', CODES, ['20250618', '20250619'], _bars(['20250618', '20250619'], 10.0))
+    assert store.append('1d', CODES, ['20250619'], _bars(['20250619'], 20.0)) == 0
+    assert store.append('1d', CODES, ['20250619', '20250620'], _bars(['20250619', '20250620'], 20.0),
+                        replace=True) == 2
+
+    codes, times, data = store.read('1d', fields=['open'])
+    assert codes == CODES
+    assert times.tolist() == [20250618, 20250619, 20250620]
+    assert data['open'][0].tolist() == [10.0, 20.0, 20.0]
+
+
+def test_sync_skips_unfinished_day(tmp_path, monkeypatch):
+    """同步只写入已收盘交易日的K线，再次同步时覆盖存储中最后一个交易日"""
+    data = CustomData()
+    data.enable_bar_store(str(tmp_path))
+    market = trader.data.xtdata.market
+    codes = market.codes[:3]
+    last_day, previous_day = market.daily_times[-1], market.daily_times[-2]
+
+    monkeypatch.setattr(trader.data, 'last_closed_trading_day', lambda: pd.Timestamp(previous_day).date())
+    data.sync_bar_store(codes, count=5)
+    assert data.bar_store.get_last_time('1d') == int(previous_day)
+
+    monkeypatch.setattr(trader.data, 'last_closed_trading_day', lambda: pd.Timestamp(last_day).date())
+    assert data.sync_bar_store(codes, count=5) == 2
+    _, times, stored = data.bar_store.read('1d', fields=['close'])
+    assert times.tolist()[-2:] == [int(previous_day), int(last_day)]
+    np.testing.assert_array_equal(stored['close'][:, -1], market.daily['close'][:3, -1])
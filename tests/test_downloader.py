@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+批量历史数据下载测试
+"""
+
+import threading
+import time
+from datetime import date
+
+import trader.downloader
+from trader.downloader import BulkDownloader
+
+
+class FakeDownloadClient:
+    """
+    download_history_data2的替身，记录每次调用和同时进行的调用数，指定的股票前几次调用失败
+    """
+
+    def __init__(self, failures=None, delay=0.01):
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def download_history_data2(self, stock_list, period, start_time, end_time, callback, incrementally):
+        with self._lock:
+            self.calls.append(list(stock_list))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            for code in stock_list:
+                if self.failures.get(code, 0) > 0:
+                    self.failures[code] -= 1
+                    raise RuntimeError(f"{code}下载失败")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+CODES = [f'{600000 + i:06d}.SH' for i in range(10)]
+
+
+def _downloader(client, tmp_path, **kwargs):
+    return BulkDownloader(client, chunk_size=3, max_workers=4, checkpoint_path=str(tmp_path / 'checkpoint.json'),
+                          retry_delay=0, show_progress=False, **kwargs)
+
+
+def test_calls_are_serialized_by_default(tmp_path):
+    """默认串行调用客户端，允许并发时多块同时下载"""
+    client = FakeDownloadClient()
+    result = _downloader(client, tmp_path).download(CODES)
+    assert result == {'total': 4, 'downloaded': 4, 'skipped': 0, 'failed': []}
+    assert client.max_active == 1
+    assert sorted(code for chunk in client.calls for code in chunk) == CODES
+
+    client = FakeDownloadClient(delay=0.05)
+    _downloader(client, tmp_path, concurrent_calls=True).download(CODES)
+    assert client.max_active > 1
+
+
+def test_retry_and_resume_from_checkpoint(tmp_path):
+    """失败的块重试后仍失败时留待下次运行，下次只下载未完成的块"""
+    client = FakeDownloadClient(failures={CODES[4]: 10})
+    downloader = _downloader(client, tmp_path, max_retries=2)
+    result = downloader.download(CODES)
+    assert result['downloaded'] == 3
+    assert result['failed'] == CODES[3:6]
+    assert sum(chunk == CODES[3:6] for chunk in client.calls) == 3
+
+    client.failures.clear()
+    client.calls.clear()
+    result = downloader.download(CODES)
+    assert result == {'total': 4, 'downloaded': 1, 'skipped': 3, 'failed': []}
+    assert client.calls == [CODES[3:6]]
+
+    # 全部完成后清除检查点，再次运行重新下载全部
+    client.calls.clear()
+    assert downloader.download(CODES)['downloaded'] == 4
+
+
+def test_checkpoint_not_reused_after_close(tmp_path, monkeypatch):
+    """盘中中断的检查点在收盘后（最近收盘交易日变化）不再复用"""
+    client = FakeDownloadClient(failures={CODES[0]: 10})
+    downloader = _downloader(client, tmp_path, max_retries=0)
+
+    monkeypatch.setattr(trader.downloader, 'last_closed_trading_day', lambda: date(2025, 6, 19))
+    assert downloader.download(CODES)['skipped'] == 0
+    assert downloader.download(CODES)['skipped'] == 3
+
+    monkeypatch.setattr(trader.downloader, 'last_closed_trading_day', lambda: date(2025, 6, 20))
+    client.failures.clear()
+    assert downloader.download(CODES)['downloaded'] == 4
+
+    # 指定了已收盘的结束时间时，收盘前后使用同一检查点
+    client.failures[CODES[0]] = 10
+    assert downloader.download(CODES, end_time='20250619')['failed'] == CODES[:3]
+    monkeypatch.setattr(trader.downloader, 'last_closed_trading_day', lambda: date(2025, 6, 23))
+    assert downloader.download(CODES, end_time='20250619')['skipped'] == 3
+
+
+def test_download_qmt_history_data_passes_concurrent_calls(monkeypatch):
+    """download_qmt_history_data未指定concurrent_calls时使用CustomData的配置"""
+    import trader.data
+    from trader.data import CustomData
+
+    created = []
+
+    class RecordingDownloader:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+        def download(self, stock_list, **kwargs):
+            return {'failed': []}
+
+    monkeypatch.setattr(trader.data, 'BulkDownloader', RecordingDownloader)
+    data = CustomData()
+    assert data.download_qmt_history_data(['600000'])
+    data.download_concurrent_calls = True
+    data.download_qmt_history_data(['600000'])
+    data.download_qmt_history_data(['600000'], concurrent_calls=False)
+    assert [kwargs['concurrent_calls'] for kwargs in created] == [False, True, False]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+MACDFS指标测试
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from strategys.一进二低吸战法.indicator import (
+    StreamingMACDFS, calculate_ema_batch, calculate_ema_with_init, calculate_macdfs, calculate_macdfs_batch)
+
+
+def _random_walk(n_stocks, n_minutes, seed=0):
+    rng = np.random.default_rng(seed)
+    return 10 * np.exp(np.cumsum(rng.normal(0, 0.002, (n_stocks, n_minutes)), axis=1))
+
+
+def test_streaming_matches_batch():
+    """逐根增量计算的结果与批量计算、逐只股票计算一致"""
+    prices = _random_walk(5, 240)
+    open_prices = prices[:, 0] * 1.01
+    batch = calculate_macdfs_batch(prices, open_prices)
+    for i in range(len(prices)):
+        streaming = StreamingMACDFS(open_price=open_prices[i])
+        values = [streaming.update(j, price) for j, price in enumerate(prices[i])]
+        expected = calculate_macdfs(pd.Series(prices[i]), open_price=open_prices[i])
+        np.testing.assert_allclose(values, batch['MACDFS'][i], rtol=0, atol=1e-12)
+        for key in ('DIF', 'DEA', 'MACDFS'):
+            np.testing.assert_allclose(streaming.to_frame()[key], batch[key][i], rtol=0, atol=1e-12)
+            np.testing.assert_allclose(expected[key], batch[key][i], rtol=0, atol=1e-12)
+
+
+def test_streaming_duplicate_and_late_bars():
+    """同一分钟的重复推送和迟到的K线按时间重算，结果与按顺序计算一致"""
+    prices = _random_walk(1, 30, seed=1)[0]
+    start = datetime(2026, 10, 16, 9, 31)
+    times = [start + timedelta(minutes=i) for i in range(len(prices))]
+    expected = calculate_macdfs_batch(prices[None, :])['MACDFS'][0]
+
+    streaming = StreamingMACDFS()
+    order = list(range(len(prices)))
+    order[10], order[12] = order[12], order[10]
+    for i in order:
+        if i == 20:
+            streaming.update(times[i], prices[i] * 1.05)
+        streaming.update(times[i], prices[i])
+
+    assert streaming.times == times
+    np.testing.assert_allclose(streaming.macdfs, expected, rtol=0, atol=1e-12)
+
+
+def test_batch_nan_gaps_match_valid_prices():
+    """有NaN时，每只股票有效价格处的结果与只对有效价格逐只计算一致，NaN处沿用上一分钟的值"""
+    prices = _random_walk(4, 60, seed=2)
+    prices[0, :5] = np.nan  # 晚开盘
+    prices[1, 20:25] = np.nan  # 盘中停牌
+    prices[2, ::7] = np.nan  # 零散缺失，包括第一分钟
+    prices[3, :] = np.nan  # 全天没有数据
+    open_prices = np.array([np.nan, 9.9, 10.1, 10.0])
+    open_prices[0] = prices[0, 5]
+
+    for opens in (None, open_prices):
+        batch = calculate_macdfs_batch(prices, opens)
+        for i in range(3):
+            valid = ~np.isnan(prices[i])
+            open_price = None if opens is None else opens[i]
+            expected = calculate_macdfs(pd.Series(prices[i][valid]), open_price=open_price)
+            for key in ('DIF', 'DEA', 'MACDFS'):
+                values = batch[key][i]
+                np.testing.assert_allclose(values[valid], expected[key], rtol=0, atol=1e-12)
+                # 第一个有效价格之前为NaN，之后的缺失分钟沿用上一分钟
+                filled = pd.Series(np.where(valid, values, np.nan)).ffill().to_numpy()
+                np.testing.assert_array_equal(values, filled)
+        for key in ('DIF', 'DEA', 'MACDFS'):
+            assert np.isnan(batch[key][3]).all()
+
+    ema = calculate_ema_batch(prices, 12)
+    valid = ~np.isnan(prices[1])
+    np.testing.assert_allclose(ema[1][valid], calculate_ema_with_init(pd.Series(prices[1][valid]), 12), rtol=0, atol=1e-12)
+    assert np.isnan(ema[0, :5]).all() and np.isnan(ema[3]).all()
+
+    # 没有NaN时与逐只股票计算一致
+    clean = _random_walk(3, 60, seed=3)
+    batch = calculate_macdfs_batch(clean)
+    for i in range(len(clean)):
+        expected = calculate_macdfs(pd.Series(clean[i]))
+        np.testing.assert_allclose(batch['MACDFS'][i], expected['MACDFS'], rtol=0, atol=1e-12)
+
+
+def test_batch_param_axis_matches_per_param():
+    """周期参数为数组时，每组参数的结果与单独按该组参数计算一致"""
+    prices = _random_walk(6, 120, seed=4)
+    prices[1, :10] = np.nan
+    prices[2, 50:60] = np.nan
+    params = np.array([[12, 26, 9], [6, 13, 5], [20, 40, 10]])
+    grid = calculate_macdfs_batch(prices, None, params[:, 0], params[:, 1], params[:, 2])
+    for key in ('DIF', 'DEA', 'MACDFS'):
+        assert grid[key].shape == (len(params),) + prices.shape
+    for m, (fast, slow, signal) in enumerate(params):
+        expected = calculate_macdfs_batch(prices, None, fast, slow, signal)
+        for key in ('DIF', 'DEA', 'MACDFS'):
+            np.testing.assert_allclose(grid[key][m], expected[key], rtol=0, atol=1e-12)
+
+    # 标量周期与数组周期可以混合广播
+    mixed = calculate_macdfs_batch(prices, None, params[:, 0], 26, 9)
+    np.testing.assert_allclose(mixed['MACDFS'][0], grid['MACDFS'][0], rtol=0, atol=1e-12)
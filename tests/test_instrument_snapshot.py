@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+合约信息快照有效期测试
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+import trader.instrument_snapshot
+from trader.instrument_snapshot import InstrumentSnapshot, snapshot_trading_day
+
+# 2025-06-20为周五，2025-06-23为周一，2025-06-24为假设的节假日
+HOLIDAYS = {date(2025, 6, 24)}
+
+
+@pytest.fixture(autouse=True)
+def trading_days(monkeypatch):
+    monkeypatch.setattr(trader.instrument_snapshot, 'is_trading_day',
+                        lambda day: day.weekday() < 5 and day not in HOLIDAYS)
+
+
+def _snapshot(built_at):
+    details = {'600000.SH': {'InstrumentName': '浦发银行', 'PreClose': 10.0, 'UpStopPrice': 11.0}}
+    return InstrumentSnapshot.from_details(details, now=built_at)
+
+
+def test_snapshot_trading_day():
+    """交易日SNAPSHOT_READY_TIME之后为当天，之前、周末和节假日为上一个交易日"""
+    assert snapshot_trading_day(datetime(2025, 6, 20, 9, 15)) == date(2025, 6, 20)
+    assert snapshot_trading_day(datetime(2025, 6, 20, 9, 0)) == date(2025, 6, 19)
+    assert snapshot_trading_day(datetime(2025, 6, 22, 12, 0)) == date(2025, 6, 20)
+    assert snapshot_trading_day(datetime(2025, 6, 23, 8, 0)) == date(2025, 6, 20)
+    assert snapshot_trading_day(datetime(2025, 6, 24, 10, 0)) == date(2025, 6, 23)
+
+
+def test_friday_snapshot_fresh_until_monday_ready_time():
+    """周五盘中构建的快照整个周末和周一9:15之前都有效，之后需要重建"""
+    snapshot = _snapshot(datetime(2025, 6, 20, 10, 0))
+    assert snapshot.trading_day == '20250620'
+    assert snapshot.is_fresh(datetime(2025, 6, 20, 15, 30))
+    assert snapshot.is_fresh(datetime(2025, 6, 21, 10, 0))
+    assert snapshot.is_fresh(datetime(2025, 6, 23, 9, 0))
+    assert not snapshot.is_fresh(datetime(2025, 6, 23, 9, 15))
+
+
+def test_snapshot_built_before_ready_time():
+    """交易日开盘前构建的快照属于上一个交易日，9:15之后重建；周末构建的快照沿用到下一交易日9:15"""
+    snapshot = _snapshot(datetime(2025, 6, 20, 8, 30))
+    assert snapshot.trading_day == '20250619'
+    assert snapshot.is_fresh(datetime(2025, 6, 20, 9, 0))
+    assert not snapshot.is_fresh(datetime(2025, 6, 20, 9, 30))
+
+    snapshot = _snapshot(datetime(2025, 6, 22, 20, 0))
+    assert snapshot.trading_day == '20250620'
+    assert snapshot.is_fresh(datetime(2025, 6, 23, 9, 0))
+    assert not snapshot.is_fresh(datetime(2025, 6, 23, 9, 30))
+
+
+def test_saved_snapshot_keyed_by_trading_day(tmp_path):
+    """快照按交易日保存和载入，当日9:15之前按旧规则保存的快照不视为有效"""
+    snapshot = _snapshot(datetime(2025, 6, 20, 10, 0))
+    snapshot.save(str(tmp_path))
+    loaded = InstrumentSnapshot.load('20250620', str(tmp_path))
+    assert loaded.is_fresh(datetime(2025, 6, 22, 12, 0))
+    assert loaded.get('600000.SH')['涨停价'] == 11.0
+
+    early = InstrumentSnapshot('20250620', datetime(2025, 6, 20, 8, 0), loaded.codes, loaded.names,
+                               loaded.instrument_status, loaded.is_trading,
+                               {'pre_close': loaded.pre_close, 'up_stop_price': loaded.up_stop_price,
+                                'down_stop_price': loaded.down_stop_price, 'float_volume': loaded.float_volume,
+                                'total_volume': loaded.total_volume})
+    assert not early.is_fresh(datetime(2025, 6, 20, 10, 0))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+分时状态存储测试
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from trader.bar_builder import BarData
+from strategys.一进二低吸战法.indicator import StreamingMACDFS
+from strategys.一进二低吸战法.intraday_state import IntradayState
+
+STOCK = '600000.SH'
+
+
+def _bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.002, n))), 2)
+    start = datetime(2026, 10, 16, 9, 31)
+    return [BarData(STOCK, start + timedelta(minutes=i), c, c + 0.01, c - 0.01, c, 100.0, c * 10000, 10.0)
+            for i, c in enumerate(closes.tolist())]
+
+
+def _assert_matches(state, streaming):
+    count = len(streaming)
+    np.testing.assert_allclose(state.recent_macdfs(count), streaming.macdfs, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(state.last_macdfs, streaming.macdfs[-3:], rtol=0, atol=1e-12)
+    assert state.recent_closes(count) == streaming.prices
+    assert list(state.last_closes) == streaming.prices[-2:]
+    assert state.count == count
+
+
+def test_duplicate_and_late_bars_match_streaming():
+    """重复推送和迟到的K线按时间重算，结果与StreamingMACDFS一致，之后的K线从重算后的状态继续递推"""
+    bars = _bars(40)
+    order = list(range(len(bars)))
+    order[10], order[13] = order[13], order[10]  # 第10根K线在第13根之后到达
+    order.insert(25, 5)  # 已处理过的第5根K线再次推送，价格不同
+
+    store = IntradayState()
+    streaming = StreamingMACDFS()
+    high = 0.0
+    for step, i in enumerate(order):
+        bar = bars[i]
+        if step == 25:
+            bar = bar._replace(close=bar.close + 0.05, high=bar.close + 0.3)
+        store.update(STOCK, bar)
+        streaming.update(bar.time, bar.close)
+        high = max(high, bar.high)
+        _assert_matches(store.get(STOCK), streaming)
+        assert store.get(STOCK).high == high
+
+
+def test_late_bar_ignored_after_ring_wraps():
+    """环形缓冲区写满后无法重算，迟到的K线忽略"""
+    bars = _bars(8, seed=1)
+    store = IntradayState(slots=4)
+    for bar in bars[:6]:
+        store.update(STOCK, bar)
+    state = store.get(STOCK)
+    before = (state.count, state.last_macdfs, state.last_closes)
+    store.update(STOCK, bars[2]._replace(close=99.0))
+    assert (state.count, state.last_macdfs, state.last_closes) == before
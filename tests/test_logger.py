@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+WebHook日志处理器测试
+"""
+
+import logging
+import threading
+import time
+
+import requests
+
+from trader.logger import WebHookHandler
+
+
+class FakeSession:
+    """
+    WebHook请求替身，每次请求耗时delay秒，前failures次请求失败
+    """
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.posts = []
+        self.started = threading.Event()
+
+    def post(self, url, json=None, timeout=None):
+        self.started.set()
+        time.sleep(self.delay)
+        self.posts.append(json['text']['content'])
+        if len(self.posts) <= self.failures:
+            raise requests.exceptions.ConnectionError('webhook unavailable')
+        return self
+
+    def raise_for_status(self):
+        pass
+
+
+def _handler(session, **kwargs):
+    handler = WebHookHandler('http://webhook.invalid', min_interval=0, **kwargs)
+    handler._session = session
+    return handler
+
+
+def _record(message):
+    return logging.LogRecord('log', logging.INFO, __file__, 0, message, None, None)
+
+
+def test_flush_waits_for_in_flight_batch():
+    """缓冲区已取空、一批消息仍在推送时，flush等待推送完成"""
+    session = FakeSession(delay=0.3)
+    handler = _handler(session)
+    handler.emit(_record('message'))
+    assert session.started.wait(1)
+    assert not handler.pending
+
+    handler.flush(timeout=5)
+    assert handler.sent == 1
+    handler.close()
+
+
+def test_close_waits_for_retries():
+    """close等待正在退避重试的一批消息，推送成功后发送线程退出"""
+    session = FakeSession(delay=0.05, failures=2)
+    handler = _handler(session, retry_delay=0.2, timeout=0.05)
+    handler.emit(_record('message'))
+    assert session.started.wait(1)
+
+    handler.close()
+    assert not handler._thread.is_alive()
+    assert handler.sent == 1
+    assert session.posts == ['message'] * 3
+    assert handler.dropped == 0
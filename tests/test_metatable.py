@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+metatable数据表分批读取测试，数据表与benchmarks/bench_metatable.py相同
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from xtquant import xtdata
+from xtquant.metatable import get_arrow, get_bson
+
+from benchmarks import bench_metatable
+from benchmarks.bench_metatable import TABLE_NAME, filtered, per_code, request_fields, write_feather_table
+
+BATCH_SIZE = 4096
+
+
+def _concat(batches):
+    batches = list(batches)
+    assert all(len(batch) <= BATCH_SIZE for batch in batches)
+    return pd.concat(batches, ignore_index=True)
+
+
+@pytest.mark.parametrize('codes', [[], filtered, per_code], ids=['whole_market', 'filtered', 'per_code'])
+def test_iter_tabular_data_matches_get_tabular_data(codes):
+    """分批读取的结果拼接后与一次读取全部数据一致"""
+    expected = get_bson.get_tabular_data(codes, request_fields, '', '', '')
+    result = _concat(get_bson.iter_tabular_data(codes, request_fields, '', '', '', batch_size=BATCH_SIZE))
+    if not codes:
+        assert len(expected) == len(bench_metatable.rows) > BATCH_SIZE
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+@pytest.mark.parametrize('codes, start_time, end_time', [([], '', ''), (filtered, '20200103', '20200106')],
+                         ids=['whole_market', 'filtered'])
+def test_iter_tabular_fe_data_matches_get_tabular_fe_data(codes, start_time, end_time):
+    """Feather格式数据表分批扫描的结果拼接后与一次读取整个文件一致"""
+    pytest.importorskip('pyarrow')
+    path = os.path.join(xtdata.get_data_dir(), 'EP', f'{TABLE_NAME}_Xdat2', 'data.fe')
+    write_feather_table(path, xtdata.market.codes, 50000, chunk_rows=8192)
+
+    expected = get_arrow.get_tabular_fe_data(codes, request_fields, '', start_time, end_time)
+    result = _concat(get_arrow.iter_tabular_fe_data(codes, request_fields, '', start_time, end_time,
+                                                     batch_size=BATCH_SIZE))
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
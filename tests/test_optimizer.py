@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+一进二低吸战法参数优化器测试
+"""
+
+import logging
+from datetime import date
+
+import numpy as np
+import pytest
+
+from benchmarks.fake_xtquant import session_minutes
+from trader.backtest import BacktestContext, BacktestEngine
+from trader.bar_store import BarStore
+from strategys.一进二低吸战法.strategy import DEFAULT_PARAMS, YiJinErDiXiStrategy
+from strategys.一进二低吸战法.optimizer import ParameterOptimizer
+
+CODES = ['600000.SH', '600036.SH', '601318.SH', '000001.SZ', '000002.SZ', '000333.SZ']
+DAYS = [date(2025, 6, 16), date(2025, 6, 17)]
+
+
+@pytest.fixture
+def bar_store(tmp_path):
+    # 成交量足够大，回测委托在下一分钟全部成交，不受单根K线成交量比例限制
+    rng = np.random.default_rng(7)
+    store = BarStore(str(tmp_path / 'bars'))
+    pre_close = rng.uniform(5, 30, len(CODES))
+    daily = {field: np.empty((len(CODES), len(DAYS))) for field in ('close', 'preClose')}
+    for d, day in enumerate(DAYS):
+        close = np.round(pre_close[:, None] * np.exp(np.cumsum(rng.normal(0, 0.003, (len(CODES), 240)), axis=1)), 2)
+        open_ = np.concatenate([np.round(pre_close[:, None], 2), close[:, :-1]], axis=1)
+        volume = np.round(rng.uniform(5000, 10000, close.shape))
+        store.append('1m', CODES, session_minutes(day), {
+            'open': open_, 'high': np.maximum(open_, close) + 0.01, 'low': np.minimum(open_, close) - 0.01,
+            'close': close, 'volume': volume, 'amount': volume * 100 * close})
+        daily['close'][:, d], daily['preClose'][:, d] = close[:, -1], pre_close
+        pre_close = close[:, -1]
+    store.append('1d', CODES, [day.strftime('%Y%m%d') for day in DAYS], daily)
+    return store
+
+
+def test_entries_match_backtest_engine(bar_store):
+    """买入日的买入股数和成本与BacktestEngine回放策略的成交一致，成交后不再加仓"""
+    day = DAYS[0].strftime('%Y%m%d')
+    context = BacktestContext(initial_cash=100000000)
+    strategy = YiJinErDiXiStrategy(context, True, {'MAX_BUY_TIMES': 2})
+    BacktestEngine(context, strategy, bar_store, CODES, log_level=logging.WARNING).run(day, day)
+    buys = [trade for trade in context.trades if trade['委托类型'] == '买入']
+    assert buys
+
+    optimizer = ParameterOptimizer(bar_store, CODES)
+    macd_params = np.array([[DEFAULT_PARAMS['MACDFS_SHORT'], DEFAULT_PARAMS['MACDFS_LONG'],
+                             DEFAULT_PARAMS['MACDFS_SIGNAL']]], dtype=np.float64)
+    shares, costs = optimizer._evaluate_entries(optimizer._read_day(day, CODES), macd_params,
+                                                np.array([DEFAULT_PARAMS['MAX_INTRADAY_GAIN']]))
+    expected_shares, expected_costs = np.zeros(len(CODES)), np.zeros(len(CODES))
+    for trade in buys:
+        i = CODES.index(trade['证券代码'])
+        expected_shares[i] += trade['成交数量']
+        expected_costs[i] += trade['成交金额'] + trade['手续费']
+    np.testing.assert_array_equal(shares[0, 0], expected_shares)
+    np.testing.assert_allclose(costs[0, 0], expected_costs)
+
+    results = optimizer.run({}, day, day)
+    assert 'MAX_BUY_TIMES' not in results.columns
+    assert results['交易次数'].iloc[0] == len({trade['证券代码'] for trade in buys})
+    with pytest.raises(ValueError):
+        optimizer.run({'MAX_BUY_TIMES': [1, 2]}, day, day)
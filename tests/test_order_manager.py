@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+委托生命周期管理测试
+"""
+
+from types import SimpleNamespace
+
+from xtquant import xtconstant
+
+from trader.order_manager import CANCEL_RETRY_SECONDS, OrderManager
+
+STOCK = '600000.SH'
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _order(order_id, status, traded_volume=0):
+    return SimpleNamespace(order_id=order_id, order_status=status, order_volume=100, traded_volume=traded_volume)
+
+
+def _manager(query_func=None):
+    clock = FakeClock()
+    cancels = []
+    manager = OrderManager(cancel_func=lambda order_id: cancels.append(order_id) or 0, clock=clock,
+                           query_func=query_func)
+    manager.track(1, STOCK, xtconstant.STOCK_BUY, order_volume=100, timeout=10)
+    return manager, clock, cancels
+
+
+def test_lost_cancel_push_is_requeried():
+    """撤单后没有收到终态推送时，到期查询委托状态并关闭委托"""
+    statuses = {1: _order(1, xtconstant.ORDER_REPORTED)}
+    manager, clock, cancels = _manager(query_func=statuses.get)
+
+    clock.now += 10
+    assert manager.expire() == [1]
+    assert manager.has_open_order(STOCK)
+    assert manager.get_order(1)['deadline'] == clock.now + CANCEL_RETRY_SECONDS
+
+    # 撤单推送丢失，柜台上委托已撤
+    statuses[1] = _order(1, xtconstant.ORDER_CANCELED)
+    clock.now += CANCEL_RETRY_SECONDS
+    assert manager.expire() == []
+    assert cancels == [1]
+    assert not manager.has_open_order(STOCK)
+    assert manager.get_order(1)['order_status'] == xtconstant.ORDER_CANCELED
+
+
+def test_cancel_resent_while_order_still_open():
+    """查询到委托仍未完成或无法查询时重新撤单，直到收到终态推送"""
+    manager, clock, cancels = _manager(query_func=lambda order_id: _order(order_id, xtconstant.ORDER_REPORTED))
+    clock.now += 10
+    manager.expire()
+    clock.now += CANCEL_RETRY_SECONDS
+    assert manager.expire() == [1]
+    assert cancels == [1, 1]
+
+    manager.on_stock_order(_order(1, xtconstant.ORDER_PART_CANCEL, traded_volume=30))
+    clock.now += CANCEL_RETRY_SECONDS
+    assert manager.expire() == []
+    assert cancels == [1, 1]
+    assert not manager.has_open_order(STOCK)
+
+    manager, clock, cancels = _manager()
+    clock.now += 10 + CANCEL_RETRY_SECONDS
+    manager.expire()
+    clock.now += CANCEL_RETRY_SECONDS
+    manager.expire()
+    assert cancels == [1, 1]
+
+
+def test_cancel_error_retries_after_interval():
+    """撤单失败推送后按重试间隔重新撤单"""
+    manager, clock, cancels = _manager()
+    clock.now += 10
+    manager.expire()
+    manager.on_cancel_error(SimpleNamespace(order_id=1))
+    assert not manager.get_order(1)['cancel_requested']
+    clock.now += CANCEL_RETRY_SECONDS
+    assert manager.expire() == [1]
+    assert cancels == [1, 1]
+
+
+def test_trade_push_after_order_push_is_not_double_counted():
+    """委托推送已包含的成交不会被成交推送再计一次，部分成交的委托仍会超时撤单"""
+    manager, clock, cancels = _manager()
+    manager.on_stock_order(_order(1, xtconstant.ORDER_PART_SUCC, traded_volume=50))
+    manager.on_stock_trade(SimpleNamespace(order_id=1, traded_id='T1', traded_volume=50))
+    manager.on_stock_trade(SimpleNamespace(order_id=1, traded_id='T1', traded_volume=50))
+    assert manager.get_order(1)['traded_volume'] == 50
+    assert manager.has_open_order(STOCK)
+
+    clock.now += 10
+    assert manager.expire() == [1]
+    assert cancels == [1]
+
+    manager.on_stock_trade(SimpleNamespace(order_id=1, traded_id='T2', traded_volume=50))
+    assert manager.get_order(1)['order_status'] == xtconstant.ORDER_SUCCEEDED
+    assert not manager.has_open_order(STOCK)
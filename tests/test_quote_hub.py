@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+行情订阅中心测试
+"""
+
+import itertools
+
+import pytest
+
+from trader.quote_hub import QuoteHub
+
+
+class FakeSubscriptions:
+    """
+    记录订阅和取消订阅调用的xtdata替身，fail中的股票订阅失败
+    """
+
+    def __init__(self):
+        self.seqs = itertools.count(1)
+        self.subscribed = []  # 格式：[(seq, period, [stock_code, ...])]
+        self.unsubscribed = []
+        self.callbacks = {}
+        self.fail = set()
+
+    def subscribe_quote(self, stock_code, period='1d', callback=None):
+        if stock_code in self.fail:
+            raise RuntimeError('subscribe failed')
+        seq = next(self.seqs)
+        self.subscribed.append((seq, period, [stock_code]))
+        self.callbacks[period] = callback
+        return seq
+
+    def subscribe_whole_quote(self, code_list, callback=None):
+        if self.fail & set(code_list):
+            return -1
+        seq = next(self.seqs)
+        self.subscribed.append((seq, 'tick', list(code_list)))
+        self.callbacks['tick'] = callback
+        return seq
+
+    def unsubscribe_quote(self, seq):
+        self.unsubscribed.append(seq)
+
+    def push(self, period, datas):
+        self.callbacks[period](datas)
+
+
+@pytest.fixture
+def fake():
+    return FakeSubscriptions()
+
+
+@pytest.fixture
+def hub(fake):
+    return QuoteHub(subscribe_quote=fake.subscribe_quote, subscribe_whole_quote=fake.subscribe_whole_quote,
+                    unsubscribe_quote=fake.unsubscribe_quote)
+
+
+def _handler(received):
+    return lambda stock_code, data: received.append((stock_code, data))
+
+
+def test_set_symbols_subscribes_only_new_codes(hub, fake):
+    """调整股票列表时只订阅新增的股票，只取消移除的股票"""
+    handler = _handler([])
+    assert hub.set_symbols(['600000.SH', '000001.SZ'], handler) == (['600000.SH', '000001.SZ'], [])
+    assert [codes for _, _, codes in fake.subscribed] == [['600000.SH'], ['000001.SZ']]
+
+    added, removed = hub.set_symbols(['000001.SZ', '600036.SH'], handler)
+    assert (added, removed) == (['600036.SH'], ['600000.SH'])
+    assert [codes for _, _, codes in fake.subscribed[2:]] == [['600036.SH']]
+    assert fake.unsubscribed == [1]
+    assert sorted(hub.get_symbols()) == ['000001.SZ', '600036.SH']
+
+    # 列表不变时不订阅也不取消
+    assert hub.set_symbols(['000001.SZ', '600036.SH'], handler) == ([], [])
+    assert len(fake.subscribed) == 3 and fake.unsubscribed == [1]
+
+
+def test_whole_quote_seq_unsubscribed_after_last_code(hub, fake):
+    """同一批全推订阅的股票共用订阅号，最后一只股票移除后才取消订阅"""
+    handler = _handler([])
+    hub.subscribe(['600000.SH', '000001.SZ', '600036.SH'], handler, period='tick')
+    assert fake.subscribed == [(1, 'tick', ['600000.SH', '000001.SZ', '600036.SH'])]
+
+    assert hub.unsubscribe(['600000.SH', '000001.SZ'], period='tick') == ['600000.SH', '000001.SZ']
+    assert fake.unsubscribed == []
+    assert hub.get_stats()['订阅号数量'] == 1
+
+    assert hub.unsubscribe(['600036.SH'], period='tick') == ['600036.SH']
+    assert fake.unsubscribed == [1]
+    assert hub.get_stats()['订阅号数量'] == 0
+
+
+def test_failed_subscribe_keeps_no_handler(hub, fake):
+    """订阅失败的股票不保留处理函数，下次subscribe时重新订阅"""
+    handler = _handler([])
+    fake.fail = {'000001.SZ'}
+    assert hub.subscribe(['600000.SH', '000001.SZ'], handler) == ['600000.SH']
+    assert hub.get_symbols() == ['600000.SH']
+    assert hub.subscribe(['000002.SZ', '000001.SZ'], handler, period='tick') == []
+    assert hub.get_symbols('tick') == []
+    assert hub.get_stats()['订阅号数量'] == 1
+
+    fake.fail = set()
+    assert hub.subscribe(['600000.SH', '000001.SZ'], handler) == ['000001.SZ']
+    assert sorted(hub.get_symbols()) == ['000001.SZ', '600000.SH']
+
+
+def test_pushes_for_removed_codes_are_dropped(hub, fake):
+    """取消订阅后仍到达的推送不分发，计入丢弃次数"""
+    received = []
+    handler = _handler(received)
+    hub.subscribe(['600000.SH', '000001.SZ'], handler, period='tick')
+    fake.push('tick', {'600000.SH': {'lastPrice': 10.0}, '000001.SZ': {'lastPrice': 12.0}})
+    assert len(received) == 2
+
+    hub.unsubscribe(['000001.SZ'], period='tick')
+    fake.push('tick', {'600000.SH': {'lastPrice': 10.1}, '000001.SZ': {'lastPrice': 12.1}})
+    assert received[-1] == ('600000.SH', {'lastPrice': 10.1})
+    assert len(received) == 3
+
+    hub.unsubscribe(['600000.SH'], period='tick')
+    fake.push('tick', {'600000.SH': {'lastPrice': 10.2}})
+    stats = hub.get_stats()
+    assert stats['推送次数'] == 3
+    assert stats['分发次数'] == 3
+    assert stats['丢弃次数'] == 2
+    assert len(received) == 3
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+定时任务调度测试，使用模拟时钟并调用run_pending驱动
+"""
+
+from datetime import date, datetime
+
+from trader.scheduler import Scheduler, parse_daily_time, parse_period
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now.timestamp()
+
+    def __call__(self):
+        return self.now
+
+    def set(self, now):
+        self.now = now.timestamp()
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _weekdays(day):
+    return day.weekday() < 5
+
+
+def test_parse():
+    assert parse_period('30nSecond') == 30
+    assert parse_period('2nMinute') == 120
+    assert parse_daily_time('15:30') == parse_daily_time('15:30:00')
+    with pytest.raises(ValueError):
+        parse_period('0nSecond')
+    with pytest.raises(ValueError):
+        parse_daily_time('25:00:00')
+
+
+def test_periodic_task_merges_missed_runs():
+    """周期任务按间隔执行，阻塞期间错过的多个周期合并为一次，之后按原节奏继续"""
+    clock = FakeClock(datetime(2025, 6, 20, 10, 0, 0))
+    scheduler = Scheduler(clock=clock, is_trading_day=_weekdays)
+    calls = []
+    task = scheduler.run_time(lambda: calls.append(clock()), '10nSecond', name='tick')
+
+    clock.advance(9)
+    assert scheduler.run_pending() == []
+    clock.advance(1)
+    assert scheduler.run_pending() == ['tick']
+
+    clock.advance(35)
+    assert scheduler.run_pending() == ['tick']
+    assert len(calls) == 2
+    assert task['missed'] == 2
+    assert scheduler.next_run_time() == datetime(2025, 6, 20, 10, 0, 50).timestamp()
+
+
+def test_periodic_task_skips_non_trading_days():
+    clock = FakeClock(datetime(2025, 6, 21, 10, 0, 0))  # 周六
+    scheduler = Scheduler(clock=clock, is_trading_day=_weekdays)
+    calls = []
+    task = scheduler.run_time(lambda: calls.append(1), '1nMinute', name='tick')
+    clock.advance(60)
+    assert scheduler.run_pending() == []
+    assert (calls, task['skipped']) == ([], 1)
+
+    always = scheduler.run_time(lambda: calls.append(2), '1nMinute', name='always', trading_days_only=False)
+    clock.advance(60)
+    assert scheduler.run_pending() == ['always']
+    assert always['runs'] == 1
+
+
+def test_daily_task_grace_time_and_trading_days():
+    """每日任务在容忍时间内补执行，超出容忍时间或非交易日跳过，跨越多天只补执行最近一次"""
+    clock = FakeClock(datetime(2025, 6, 19, 9, 0, 0))  # 周四
+    scheduler = Scheduler(clock=clock, is_trading_day=_weekdays, misfire_grace_time=60)
+    calls = []
+    task = scheduler.run_daily(lambda: calls.append(datetime.fromtimestamp(clock())), '15:30:00', name='refresh')
+
+    # 延迟30秒唤醒，仍在容忍时间内
+    clock.set(datetime(2025, 6, 19, 15, 30, 30))
+    assert scheduler.run_pending() == ['refresh']
+
+    # 周五错过超过容忍时间，跳过
+    clock.set(datetime(2025, 6, 20, 15, 35, 0))
+    assert scheduler.run_pending() == []
+    assert task['missed'] == 1
+
+    # 周末不执行
+    for day in (21, 22):
+        clock.set(datetime(2025, 6, day, 15, 30, 0))
+        assert scheduler.run_pending() == []
+    assert task['skipped'] == 2
+
+    # 周一准时执行，下次执行时间为周二
+    clock.set(datetime(2025, 6, 23, 15, 30, 0))
+    assert scheduler.run_pending() == ['refresh']
+    assert len(calls) == 2
+    assert datetime.fromtimestamp(scheduler.next_run_time()) == datetime(2025, 6, 24, 15, 30, 0)
+
+    # 休眠两天后在周四容忍时间内唤醒：周二、周三计为错过，只执行一次
+    clock.set(datetime(2025, 6, 26, 15, 30, 10))
+    assert scheduler.run_pending() == ['refresh']
+    assert task['missed'] == 3
+    assert len(calls) == 3
+
+
+def test_errors_counted_and_tasks_replaced_or_removed():
+    clock = FakeClock(datetime(2025, 6, 20, 10, 0, 0))
+    scheduler = Scheduler(clock=clock, is_trading_day=None)
+
+    def fail():
+        raise RuntimeError('boom')
+
+    task = scheduler.run_time(fail, '1nSecond')
+    clock.advance(1)
+    assert scheduler.run_pending() == []
+    assert (task['runs'], task['errors']) == (1, 1)
+
+    calls = []
+    scheduler.run_time(lambda: calls.append('new'), '5nSecond', name='fail')
+    clock.advance(1)
+    assert scheduler.run_pending() == []
+    clock.advance(4)
+    assert scheduler.run_pending() == ['fail'] and calls == ['new']
+
+    assert scheduler.remove('fail')
+    clock.advance(5)
+    assert scheduler.run_pending() == []
+    assert scheduler.get_stats() == {}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+选股条件测试
+"""
+
+import numpy as np
+import pandas as pd
+
+from strategys.一进二低吸战法.config import FIRST_LIMIT_UP_DAYS, NEW_HIGH_DAYS
+from strategys.一进二低吸战法.stock_pool import build_stock_pool_masks, is_one_word_board
+
+
+def _select_one(daily_data):
+    """
+    逐只股票计算的选股规则（向量化之前filter_stock_pool中的做法），daily_data为该股票自己的日线
+
+    Returns:
+        dict: {条件名称: bool}
+    """
+    daily_data = daily_data.copy()
+    daily_data['pre_close'] = daily_data['close'].shift(1)
+    daily_data['pct_change'] = (daily_data['close'] - daily_data['pre_close']) / daily_data['pre_close']
+    daily_data['vol_prev'] = daily_data['volume'].shift(1)
+    yesterday_data = daily_data.iloc[-1]
+
+    recent_start_idx = max(0, len(daily_data) - FIRST_LIMIT_UP_DAYS)
+    limit_up_count = 1
+    for i in range(recent_start_idx, len(daily_data) - 1):
+        if daily_data.iloc[i]['pct_change'] >= 0.095:
+            limit_up_count += 1
+
+    high_data = daily_data.iloc[max(0, len(daily_data) - NEW_HIGH_DAYS):]
+    return {
+        '涨停': bool(yesterday_data['pct_change'] >= 0.095),
+        '一字板': bool(is_one_word_board(yesterday_data)),
+        '首次涨停': limit_up_count == 1,
+        '新高': bool(yesterday_data['close'] >= high_data['close'].max()),
+    }
+
+
+def _random_panel(n_stocks, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    # 涨跌幅多取涨停附近的值，使各条件都有成立和不成立的股票
+    pct = rng.choice([-0.05, -0.01, 0.0, 0.02, 0.096, 0.1], size=(n_stocks, n_days))
+    close = 10 * np.cumprod(1 + pct, axis=1)
+    open_ = np.where(rng.random((n_stocks, n_days)) < 0.3, close, close * 0.98)
+    volume = rng.integers(1000, 100000, (n_stocks, n_days)).astype(np.float64)
+    return {'open': open_, 'close': close, 'volume': volume}
+
+
+def test_masks_match_per_stock_rules():
+    """对齐面板上的向量化结果与逐只股票只用自身日线计算的结果一致，包括上市晚和停牌的股票"""
+    n_stocks, n_days = 400, NEW_HIGH_DAYS + 2
+    data = _random_panel(n_stocks, n_days)
+    rng = np.random.default_rng(1)
+    missing = np.zeros((n_stocks, n_days), dtype=bool)
+    for i in range(0, n_stocks, 4):
+        missing[i, :rng.integers(1, n_days)] = True  # 上市晚
+    for i in range(1, n_stocks, 4):
+        start = rng.integers(0, n_days - 1)
+        missing[i, start:start + rng.integers(1, 5)] = True  # 停牌，可能包括最后一天
+    missing[2] = True  # 没有数据
+    for field in data:
+        data[field][missing] = np.nan
+
+    codes = [f'{600000 + i:06d}.SH' for i in range(n_stocks)]
+    masks = build_stock_pool_masks(codes, data)
+
+    for i in range(n_stocks):
+        valid = ~missing[i]
+        daily_data = pd.DataFrame({field: values[i][valid] for field, values in data.items()})
+        assert masks['数据充足'][i] == (len(daily_data) >= 2)
+        if len(daily_data) < 2:
+            continue
+        for name, expected in _select_one(daily_data).items():
+            assert masks[name][i] == expected, (codes[i], name)
+
+    # 各条件都有成立和不成立的股票，测试才有意义
+    enough = masks['数据充足']
+    for name in ('涨停', '一字板', '首次涨停', '新高'):
+        assert masks[name][enough].any() and not masks[name][enough].all(), name
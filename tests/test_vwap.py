@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+分时均价测试
+"""
+
+import numpy as np
+
+from xtquant import xtdata
+
+from benchmarks.fake_xtquant import close_context, create_context
+from trader.vwap import cumulative_vwap, get_volume_unit
+from strategys.一进二低吸战法.strategy import YiJinErDiXiStrategy
+
+POOL_SIZE = 5
+
+
+def _strategy(codes):
+    context = create_context()
+    strategy = YiJinErDiXiStrategy(context, True)
+    strategy.stock_pool = list(codes)
+    return context, strategy
+
+
+def test_vwap_after_restart_uses_tick_cumulative():
+    """盘中重启后只收到之后的分笔行情，分时均价仍按全天累计成交额和成交量计算"""
+    market = xtdata.market
+    codes = market.codes[:POOL_SIZE]
+    bars = market.minute_bars(codes)
+    units = np.array([get_volume_unit(code) for code in codes])
+    expected = cumulative_vwap(bars['amount'], bars['volume'], units)
+
+    context, strategy = _strategy(codes)
+    try:
+        # 第100分钟起接收分笔行情，其间重新筛选股票池清空缓存
+        for minute in range(100, 141):
+            if minute == 120:
+                strategy.vwap.reset()
+            for push in market.tick_pushes(codes, minutes=[minute]):
+                for code, tick in push.items():
+                    strategy.bar_builder.on_tick(code, tick)
+        strategy.bar_builder.close_out()
+        for i, code in enumerate(codes):
+            assert np.isclose(strategy.vwap.get(code, strategy.current_date), expected[i, 140], rtol=1e-9)
+    finally:
+        close_context(context)
+
+
+def test_vwap_replayed_bars_accumulate():
+    """直接回放K线（回测）时按K线成交额和成交量累加"""
+    market = xtdata.market
+    codes = market.codes[:POOL_SIZE]
+    bars = market.minute_bars(codes)
+    units = np.array([get_volume_unit(code) for code in codes])
+    expected = cumulative_vwap(bars['amount'], bars['volume'], units)
+
+    context, strategy = _strategy(codes)
+    try:
+        for bar in market.bar_data(codes)[:POOL_SIZE * 60]:
+            strategy.on_bar(bar)
+        for i, code in enumerate(codes):
+            assert np.isclose(strategy.vwap.get(code, strategy.current_date), expected[i, 59], rtol=1e-9)
+    finally:
+        close_context(context)
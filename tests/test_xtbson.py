@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+xtbson快速解码路径测试
+
+快速解码的结果须与通用解码器_bson_to_dict完全一致（包括值的类型、NaN和-0.0），
+超出支持范围或数据损坏时返回None，由通用解码器处理。decode_fields的结果须与完整解码后
+取出相同字段一致。
+"""
+
+import math
+import random
+
+from xtquant.xtbson.bson37 import (DEFAULT_CODEC_OPTIONS, Int64, _bson_to_dict, _fast_decode, decode,
+                                   decode_fields, encode)
+
+SEED = 20250620
+CODES = [f'{600000 + i:06d}.SH' for i in range(20)]
+SPECIAL_FLOATS = [float('nan'), -0.0, 0.0, float('inf'), -float('inf'), 1e-310]
+
+
+def _canonical(value):
+    # repr区分int、float、Int64、bool以及NaN和-0.0，字典和列表按顺序比较
+    if isinstance(value, dict):
+        return [type(value).__name__] + [(key, _canonical(item)) for key, item in value.items()]
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return type(value).__name__, repr(value)
+
+
+def _generic(data):
+    return _bson_to_dict(data, DEFAULT_CODEC_OPTIONS)
+
+
+def _assert_same(data):
+    document = _fast_decode.fast_decode(data)
+    assert document is not None
+    assert _canonical(document) == _canonical(_generic(data))
+    assert _canonical(decode(data)) == _canonical(document)
+
+
+def _tick(rng):
+    price = round(rng.uniform(5, 50), 2)
+    return {
+        'time': Int64(1750381200000 + rng.randrange(14400) * 1000),
+        'lastPrice': price,
+        'open': rng.choice([price, float('nan')]),
+        'high': price + 0.5,
+        'low': rng.choice([price - 0.5, -0.0]),
+        'lastClose': price,
+        'amount': rng.uniform(0, 1e9),
+        'volume': rng.randrange(1, 2 ** 40),
+        'pvolume': rng.randrange(1, 2 ** 31 - 1),
+        'stockStatus': rng.randrange(0, 20),
+        'askPrice': [round(price + i * 0.01, 2) for i in range(5)],
+        'bidVol': [rng.randrange(0, 10000) for _ in range(5)],
+    }
+
+
+def _bar(rng):
+    close = round(rng.uniform(5, 50), 2)
+    return {'time': Int64(1750381260000), 'open': close, 'high': close, 'low': close, 'close': close,
+            'volume': rng.randrange(0, 2 ** 31 - 1), 'amount': rng.uniform(0, 1e8), 'settelementPrice': 0.0,
+            'openInterest': rng.randrange(0, 20), 'suspendFlag': 0}
+
+
+def test_repeated_tick_and_bar_pushes_match_generic_decoder():
+    """重复形状的全推快照和1分钟K线推送：学习布局前后的结果都与通用解码器一致"""
+    _fast_decode._LAYOUTS.clear()
+    _fast_decode._SEEN.clear()
+    rng = random.Random(SEED)
+    for _ in range(10):
+        _assert_same(encode({code: _tick(rng) for code in CODES}))
+        _assert_same(encode({code: [_bar(rng) for _ in range(rng.randrange(1, 4))] for code in CODES}))
+    assert _fast_decode._LAYOUTS
+
+
+def _random_value(rng, depth=0):
+    kind = rng.randrange(10 if depth < 2 else 8)
+    if kind == 0:
+        return rng.choice(SPECIAL_FLOATS)
+    if kind == 1:
+        return rng.uniform(-1e6, 1e6)
+    if kind == 2:
+        return rng.randrange(-2 ** 31, 2 ** 31)
+    if kind == 3:
+        return rng.randrange(2 ** 31, 2 ** 62)
+    if kind == 4:
+        return Int64(rng.randrange(-2 ** 20, 2 ** 20))
+    if kind == 5:
+        return ''.join(rng.choice('abc中文 ') for _ in range(rng.randrange(0, 6)))
+    if kind == 6:
+        return rng.choice([True, False])
+    if kind == 7:
+        return None
+    if kind == 8:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(0, 4))]
+    return {f'k{i}': _random_value(rng, depth + 1) for i in range(rng.randrange(0, 4))}
+
+
+def test_mixed_types_match_generic_decoder():
+    """随机的混合类型文档，相同形状重复出现，结果都与通用解码器一致"""
+    rng = random.Random(SEED)
+    shapes = [{f'f{i}': _random_value(rng) for i in range(rng.randrange(1, 6))} for _ in range(20)]
+    for _ in range(200):
+        shape = rng.choice(shapes)
+        # 数值替换为同类型的其他值，字节布局不变
+        document = {key: (rng.uniform(-1, 1) if isinstance(value, float) and not math.isnan(value) else value)
+                    for key, value in shape.items()}
+        _assert_same(encode({rng.choice(CODES): document, 'other': shape}))
+
+
+def test_unsupported_documents_fall_back():
+    """DBRef文档和不支持的类型返回None，decode由通用解码器得到相同结果"""
+    for document in [{'a': {'$ref': 'quotes', '$id': 1}}, {'a': {'$ref': 'quotes', '$id': 1}, 'b': 1.0},
+                     {'a': b'bytes'}]:
+        data = encode(document)
+        for _ in range(3):
+            assert _fast_decode.fast_decode(data) is None
+            assert _canonical(decode(data)) == _canonical(_generic(data))
+
+
+def test_truncated_and_corrupted_input():
+    """截断或损坏的数据不会由快速路径给出与通用解码器不同的结果"""
+    rng = random.Random(SEED)
+    data = encode({code: _tick(rng) for code in CODES[:3]})
+    for _ in range(3):
+        _assert_same(data)
+
+    candidates = [data[:cut] for cut in range(0, len(data), 7)]
+    for _ in range(300):
+        corrupted = bytearray(data)
+        corrupted[rng.randrange(len(corrupted))] = rng.randrange(256)
+        candidates.append(bytes(corrupted))
+    for candidate in candidates:
+        document = _fast_decode.fast_decode(candidate)
+        if document is None:
+            continue
+        assert _canonical(document) == _canonical(_generic(candidate))
+
+
+def _row(rng, names):
+    # 字段名相同，但可能缺少字段、字符串长度不同、值的类型不同
+    row = {}
+    for name in names:
+        kind = rng.randrange(8)
+        if kind == 0:
+            continue
+        if kind == 1:
+            row[name] = 'x' * rng.randrange(0, 12)
+        elif kind == 2:
+            row[name] = rng.randrange(-2 ** 31, 2 ** 31)
+        elif kind == 3:
+            row[name] = rng.randrange(2 ** 31, 2 ** 62)
+        elif kind == 4:
+            row[name] = [rng.random() for _ in range(rng.randrange(0, 3))]
+        elif kind == 5:
+            row[name] = {'v': rng.choice(SPECIAL_FLOATS)}
+        else:
+            row[name] = rng.uniform(-1e6, 1e6)
+    return row
+
+
+def test_decode_fields_matches_full_decode():
+    """字段名相同但布局不同的数据行，按缓存的字段布局读取的结果与完整解码后取出的字段一致"""
+    _fast_decode._FIELD_LAYOUTS.clear()
+    rng = random.Random(SEED)
+    names = [f'f{i}' for i in range(12)] + ['S', 'G']
+    requests = [['f3', 'f9'], ['S', 'G', 'f0'], ['f11'], ['missing', 'f5'], names]
+    # 固定布局的数据行反复出现，使缓存的布局被命中
+    fixed = [encode(_row(rng, names)) for _ in range(4)]
+    rows = [rng.choice(fixed) if rng.random() < 0.5 else encode(_row(rng, names)) for _ in range(500)]
+    for data in rows:
+        full = _generic(data)
+        for fields in requests:
+            expected = {key: value for key, value in full.items() if key in fields}
+            assert _canonical(decode_fields(data, fields)) == _canonical(expected)
+            assert _canonical(decode_fields(bytearray(data), fields)) == _canonical(expected)
+    assert _fast_decode._FIELD_LAYOUTS
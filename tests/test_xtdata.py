@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+xtdata数据转换测试
+
+运行xtquant/xtdata.py的原始实现，行情客户端为FakeMarketDataClient。检查批量转换时间index的结果
+与逐个调用timetag_to_datetime一致，包括夏令时切换、半小时时区偏移、NaN和不足1毫秒的时间；
+以及日线result_type为numpy时与逐只股票的DataFrame结果一致。
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fake_xtquant import FakeMarketDataClient, SyntheticMarket, load_xtdata
+
+market = SyntheticMarket(stock_count=30, daily_days=40)
+# 部分股票上市较晚，日线缺少前一半交易日，numpy结果需按时间并集对齐
+client = FakeMarketDataClient(market, listed_late=market.codes[::4])
+xtdata = load_xtdata(client)
+
+TIMEZONES = ['UTC', 'Asia/Shanghai', 'America/New_York', 'Australia/Lord_Howe']
+FORMATS = ['%Y%m%d', '%Y%m%d%H%M%S', '%Y-%m-%d %H:%M:%S']
+# 各时区夏令时切换前后的日期（UTC），上海为1986至1991年的夏令时
+TRANSITIONS = ['1986-05-03', '1991-09-14', '2024-03-10', '2024-11-03', '2024-04-06', '2024-10-05']
+
+
+def _ms(day):
+    return int(datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _timetags():
+    rng = np.random.default_rng(0)
+    # 切换日前后各一天，每5分钟一个时间
+    windows = [np.arange(_ms(day) - 86400000, _ms(day) + 2 * 86400000, 300000) for day in TRANSITIONS]
+    # 跨度较大的随机时间，覆盖按出现过的分段取值的分支；包含1970年以前的时间
+    spread = rng.integers(_ms('1965-01-01'), _ms('2035-01-01'), 5000)
+    return np.concatenate(windows + [spread]).astype('int64')
+
+
+@pytest.fixture(params=TIMEZONES)
+def local_timezone(request, monkeypatch):
+    if not hasattr(time, 'tzset'):
+        pytest.skip('time.tzset不可用')
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _expected(timetags, format):
+    return [xtdata.timetag_to_datetime(t, format) for t in timetags.tolist()]
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_int_timetags_match_timetag_to_datetime(local_timezone, format):
+    """整数毫秒时间戳的批量转换结果与逐个转换一致"""
+    timetags = _timetags()
+    assert xtdata._timetags_to_datetime_list(timetags, format) == _expected(timetags, format)
+    # 只有几天的数据时按连续分段建表
+    window = timetags[:864]
+    assert xtdata._timetags_to_datetime_list(window, format) == _expected(window, format)
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_float_timetags_with_nan_match_timetag_to_datetime(local_timezone, format):
+    """浮点毫秒时间戳（含不足1毫秒的部分和NaN）的批量转换结果与逐个转换一致，NaN对应None"""
+    timetags = _timetags().astype('float64')
+    timetags[::7] += 0.5
+    timetags[1::7] -= 999.75
+    timetags[::11] = np.nan
+    result = xtdata._timetags_to_datetime_list(timetags, format)
+    assert result == _expected(timetags, format)
+    assert result[0] is None
+    assert xtdata._timetags_to_datetime_list(np.full(3, np.nan), format) == [None] * 3
+
+
+@pytest.mark.parametrize('raw_time', [False, True])
+def test_kline_numpy_matches_pandas(raw_time):
+    """日线result_type为numpy的二维数组与逐只股票的DataFrame一致，缺失的交易日为NaN"""
+    codes = market.codes
+    frames = xtdata.get_market_data_ex([], codes, period='1d', raw_time=raw_time)
+    (stocks, times), data = xtdata.get_market_data_ex([], codes, period='1d', result_type='numpy', raw_time=raw_time)
+    assert stocks == codes
+    # time字段为北京时间0点的毫秒时间戳，raw_time为True时直接作为时间index
+    time_ms = data['time'][1].astype('int64')
+    assert pd.to_datetime(time_ms + 28800000, unit='ms').strftime('%Y%m%d').tolist() == market.daily_times
+    assert times == (time_ms.tolist() if raw_time else market.daily_times)
+
+    for i, code in enumerate(codes):
+        frame = frames[code]
+        start = len(market.daily_times) // 2 if code in client.listed_late else 0
+        assert list(frame.index) == times[start:]
+        for field, values in data.items():
+            row = pd.Series(values[i], index=times)
+            assert row.iloc[:start].isna().all()
+            np.testing.assert_array_equal(row.iloc[start:].to_numpy(), frame[field].to_numpy(dtype=np.float64))
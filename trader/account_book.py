@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+账户簿记模块
+
+该模块在内存中维护账户的持仓和资产，供策略在行情回调中以字典读取的方式查询，
+不再每根K线都向交易柜台发起同步查询。
+
+数据来源：
+1. 启动时通过同步查询初始化（seed）
+2. 交易回调推送增量更新：on_stock_position、on_stock_asset、on_stock_trade
+3. 定期与同步查询结果对账（reconcile），发现偏差时以柜台数据为准
+
+持仓和资产字典的键与Context.get_positions/get_asset返回的中文字段一致，
+字段映射见trader.constant。
+"""
+
+import threading
+import time
+
+from xtquant import xtconstant
+
+from trader.constant import QMT_POSITIONS_FIELD_MAPPING, QMT_ASSET_FIELD_MAPPING
+from trader.logger import logger
+from trader.utils import convert_to_current_date
+from trader.anis import GREEN, YELLOW, RESET
+
+# 对账时比较的字段
+RECONCILE_POSITION_FIELDS = ['持仓数量', '可用数量']
+RECONCILE_ASSET_FIELDS = ['可用金额', '总资产']
+
+
+def position_to_dict(position):
+    """
+    将XtPosition对象转换为中文字段字典
+
+    参数:
+        position: XtPosition对象
+
+    返回:
+        dict: 持仓信息字典，缺失的字段为None
+    """
+    return {key: getattr(position, value, None) for key, value in QMT_POSITIONS_FIELD_MAPPING.items()}
+
+
+def asset_to_dict(asset):
+    """
+    将XtAsset对象转换为中文字段字典
+
+    参数:
+        asset: XtAsset对象
+
+    返回:
+        dict: 资产信息字典，缺失的字段为0
+    """
+    return {key: getattr(asset, value, 0) for key, value in QMT_ASSET_FIELD_MAPPING.items()}
+
+
+class AccountBook:
+    """
+    内存中的持仓和资产簿记
+
+    写操作来自交易回调线程和定时对账任务，读操作来自行情回调线程，写入时加锁，
+    读取时返回副本，调用方可以随意修改返回值。读取不会触发同步查询，
+    簿记由交易推送和Context中定时执行的对账维护。
+    """
+
+    def __init__(self, reconcile_interval=60):
+        """
+        初始化账户簿记
+
+        参数:
+            reconcile_interval (float): 对账间隔（秒），默认为60秒
+        """
+        self.positions = {}  # 持仓，格式：{stock_code: 持仓信息字典}
+        self.asset = None  # 资产信息字典
+        self.seeded = False  # 是否已通过同步查询初始化
+        self.reconcile_interval = reconcile_interval
+        self.last_reconcile_time = 0.0
+        self._query_time = 0.0  # 最近一次以同步查询结果覆盖簿记的时间戳（秒）
+        self._position_times = {}  # 各股票最近一次持仓推送的时间戳（秒），格式：{stock_code: timestamp}
+        self._asset_time = 0.0  # 最近一次资产推送的时间戳（秒）
+        self._applied_trades = set()  # 已调整过簿记的成交编号
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ 初始化与对账
+
+    def seed(self, positions, asset):
+        """
+        使用同步查询结果初始化簿记
+
+        参数:
+            positions (list): XtPosition对象列表
+            asset: XtAsset对象，查询失败时为None
+        """
+        with self._lock:
+            self.positions = {p.stock_code: position_to_dict(p) for p in positions or []}
+            self.asset = asset_to_dict(asset) if asset is not None else None
+            self.seeded = True
+            self.last_reconcile_time = time.monotonic()
+            self._query_time = time.time()
+        logger.debug(f"{GREEN}【账户簿记】{RESET} 初始化完成 持仓:{len(self.positions)}只")
+
+    def reconcile(self, positions, asset):
+        """
+        与同步查询结果对账
+
+        比较持仓数量、可用数量、可用金额和总资产，发现偏差时记录日志，
+        并以同步查询结果覆盖簿记。
+
+        参数:
+            positions (list): XtPosition对象列表
+            asset: XtAsset对象，查询失败时为None
+
+        返回:
+            int: 发现偏差的条目数量
+        """
+        queried = {p.stock_code: position_to_dict(p) for p in positions or []}
+        drift = 0
+        with self._lock:
+            for stock_code in set(queried) | set(self.positions):
+                booked = self.positions.get(stock_code)
+                actual = queried.get(stock_code)
+                booked_values = [booked.get(f) if booked else 0 for f in RECONCILE_POSITION_FIELDS]
+                actual_values = [actual.get(f) if actual else 0 for f in RECONCILE_POSITION_FIELDS]
+                if booked_values != actual_values:
+                    drift += 1
+                    logger.warning(f"{YELLOW}【持仓对账偏差】{RESET} 股票:{stock_code} 簿记:{booked_values} 柜台:{actual_values}")
+            self.positions = queried
+
+            if asset is not None:
+                actual_asset = asset_to_dict(asset)
+                if self.asset is not None:
+                    for field in RECONCILE_ASSET_FIELDS:
+                        if abs((self.asset.get(field) or 0) - (actual_asset.get(field) or 0)) > 0.01:
+                            drift += 1
+                            logger.warning(f"{YELLOW}【资产对账偏差】{RESET} 字段:{field} 簿记:{self.asset.get(field)} 柜台:{actual_asset.get(field)}")
+                self.asset = actual_asset
+
+            self.seeded = True
+            self.last_reconcile_time = time.monotonic()
+            self._query_time = time.time()
+        return drift
+
+    # ------------------------------------------------------------------ 交易回调
+
+    def on_stock_position(self, position):
+        """
+        持仓变动推送，以推送内容覆盖对应股票的持仓
+
+        参数:
+            position: XtPosition对象
+        """
+        with self._lock:
+            self._position_times[position.stock_code] = time.time()
+            if position.volume <= 0 and position.can_use_volume <= 0:
+                self.positions.pop(position.stock_code, None)
+            else:
+                self.positions[position.stock_code] = position_to_dict(position)
+
+    def on_stock_asset(self, asset):
+        """
+        资产变动推送，以推送内容覆盖资产
+
+        参数:
+            asset: XtAsset对象
+        """
+        with self._lock:
+            self._asset_time = time.time()
+            self.asset = asset_to_dict(asset)
+
+    def on_stock_trade(self, trade):
+        """
+        成交推送，在持仓和资产推送到达前先行调整簿记
+
+        买入增加持仓数量（T+1，可用数量不变）并扣减可用金额；
+        卖出减少持仓数量和可用数量并增加可用金额。
+        随后到达的持仓和资产推送会以柜台数据覆盖这里的估算值。
+
+        推送的先后顺序没有保证，持仓或资产推送（或同步查询）可能先于成交推送到达并已包含这笔成交，
+        因此成交时间不晚于最近一次持仓（资产）数据的时间时，不再调整持仓（资产）；
+        同一成交编号只调整一次。
+
+        柜台成交时间的日期部分不可靠，比较前与交易推送日志一样以convert_to_current_date换算到当日。
+        柜台与本地时钟的偏差仍可能导致误判，由随后的持仓、资产推送和定时对账纠正。
+
+        参数:
+            trade: XtTrade对象
+        """
+        volume = trade.traded_volume
+        amount = trade.traded_amount or trade.traded_price * volume
+        is_buy = trade.order_type == xtconstant.STOCK_BUY
+        traded_id = getattr(trade, 'traded_id', None)
+        traded_at = getattr(trade, 'traded_time', None)
+        if traded_at:
+            if traded_at > 1e11:
+                traded_at /= 1000  # 毫秒时间戳
+            traded_at = convert_to_current_date(traded_at)
+        with self._lock:
+            if traded_id:
+                if traded_id in self._applied_trades:
+                    return
+                self._applied_trades.add(traded_id)
+            if traded_at:
+                apply_position = traded_at > max(self._query_time, self._position_times.get(trade.stock_code, 0.0))
+                apply_asset = traded_at > max(self._query_time, self._asset_time)
+            else:
+                apply_position = apply_asset = True
+
+            if apply_asset and self.asset is not None:
+                asset = dict(self.asset)
+                asset['可用金额'] = (asset.get('可用金额') or 0) + (-amount if is_buy else amount)
+                asset['持仓市值'] = (asset.get('持仓市值') or 0) + (amount if is_buy else -amount)
+                self.asset = asset
+            if not apply_position:
+                return
+
+            position = self.positions.get(trade.stock_code)
+            if position is None:
+                if not is_buy:
+                    return
+                position = {key: None for key in QMT_POSITIONS_FIELD_MAPPING}
+                position.update({'资金账号': trade.account_id, '股票代码': trade.stock_code, '持仓数量': 0,
+                                 '可用数量': 0, '持仓市值': 0.0, '冻结数量': 0, '在途股份': 0, '昨夜拥股': 0})
+                self.positions[trade.stock_code] = position
+            else:
+                position = dict(position)
+                self.positions[trade.stock_code] = position
+
+            if is_buy:
+                position['持仓数量'] = (position.get('持仓数量') or 0) + volume
+                position['持仓市值'] = (position.get('持仓市值') or 0) + amount
+            else:
+                position['持仓数量'] = max((position.get('持仓数量') or 0) - volume, 0)
+                position['可用数量'] = max((position.get('可用数量') or 0) - volume, 0)
+                position['持仓市值'] = max((position.get('持仓市值') or 0) - amount, 0)
+                if position['持仓数量'] == 0:
+                    self.positions.pop(trade.stock_code, None)
+
+    # ------------------------------------------------------------------ 查询
+
+    def get_position(self, stock_code):
+        """
+        查询指定股票的持仓
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+
+        返回:
+            dict: 持仓信息字典的副本，没有持仓时返回None
+        """
+        position = self.positions.get(stock_code)
+        return dict(position) if position is not None else None
+
+    def get_positions(self):
+        """
+        查询全部持仓
+
+        返回:
+            list: 持仓信息字典副本的列表
+        """
+        return [dict(position) for position in list(self.positions.values())]
+
+    def get_asset(self):
+        """
+        查询资产
+
+        返回:
+            dict: 资产信息字典的副本，未初始化时返回None
+        """
+        asset = self.asset
+        return dict(asset) if asset is not None else None
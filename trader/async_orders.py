@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+异步下单模块
+
+该模块基于XtQuantTrader.order_stock_async实现不阻塞调用线程的下单，包括：
+1. 下单后立即返回Future，柜台通过on_order_stock_async_response反馈订单编号后完成
+2. 可选的在途委托数量上限，超出上限时拒绝新委托而不是阻塞行情回调线程
+3. 收到订单编号后登记到订单管理器，由交易推送继续跟踪委托状态
+4. 委托失败推送按seq结束对应的在途委托，超过反馈等待时间仍未收到反馈的在途委托按失败处理
+
+同一分钟内的多个买入信号可以连续发出，不再逐个等待柜台往返。
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+# 等待柜台反馈订单编号的时间（秒），超时后在途委托按失败处理
+RESPONSE_TIMEOUT_SECONDS = 10
+# 提前到达的反馈和已超时委托最多保留的条数，超出后丢弃最早的
+MAX_UNMATCHED = 1024
+
+
+class AsyncOrderSubmitter:
+    """
+    异步下单器
+
+    以下单请求序号seq关联下单参数和Future，需注册为交易回调的监听对象以接收
+    on_order_stock_async_response和on_order_error推送。Future的结果为订单编号，下单失败时为-1。
+    在途委托在response_timeout秒内没有收到反馈时由expire按失败处理，不再占用在途名额，
+    之后迟到的反馈仍会把订单登记到订单管理器。
+    """
+
+    def __init__(self, xt_trader, account, order_manager=None, max_in_flight=None,
+                 response_timeout=RESPONSE_TIMEOUT_SECONDS, clock=time.time):
+        """
+        初始化异步下单器
+
+        参数:
+            xt_trader: QMT交易接口对象
+            account: 交易账户
+            order_manager (OrderManager): 订单管理器，收到订单编号后登记委托，为None时不登记
+            max_in_flight (int): 最大在途委托数量（已发出但未收到订单编号），None表示不限制
+            response_timeout (float): 等待柜台反馈订单编号的秒数
+            clock (callable): 时钟函数，返回当前时间的秒数，默认为time.time
+        """
+        self.xt_trader = xt_trader
+        self.account = account
+        self.order_manager = order_manager
+        self.max_in_flight = max_in_flight
+        self.response_timeout = response_timeout
+        self.clock = clock
+        self.pending = {}  # 在途委托，格式：{seq: 下单参数字典}
+        self.pending_stocks = defaultdict(int)  # 每只股票的在途委托数量
+        # 下单接口返回seq前已到达的反馈或委托失败推送，格式：{seq: (回调名, 推送对象)}
+        self._early_responses = OrderedDict()
+        self._expired = OrderedDict()  # 已按超时处理的委托，格式：{seq: 下单参数字典}
+        self._deadlines = deque()  # 反馈截止时间队列，元素为(截止时间, seq)，超时时间相同因此按时间有序
+        self._lock = threading.RLock()
+
+    def submit(self, stock_code, order_type, order_volume, price_type, price, strategy_name='', remark='',
+               timeout=None):
+        """
+        发出异步委托
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+            order_type (int): 委托类型，xtconstant.STOCK_BUY或xtconstant.STOCK_SELL
+            order_volume (int): 委托数量
+            price_type (int): 报价类型
+            price (float): 委托价格
+            strategy_name (str): 策略名称
+            remark (str): 委托备注
+            timeout (float): 收到订单编号后的超时撤单秒数，None表示不超时
+
+        返回:
+            Future: 结果为订单编号，下单失败时为-1；超出在途上限时返回None
+        """
+        self.expire()
+        with self._lock:
+            if self.max_in_flight is not None and len(self.pending) >= self.max_in_flight:
+                logger.warning(f"{YELLOW}【委托限流】{RESET} 股票:{stock_code} 在途委托:{len(self.pending)} 已达上限:{self.max_in_flight}")
+                return None
+
+            future = Future()
+            request = {
+                'stock_code': stock_code,
+                'order_type': order_type,
+                'order_volume': order_volume,
+                'remark': remark,
+                'timeout': timeout,
+                'future': future,
+            }
+            try:
+                seq = self.xt_trader.order_stock_async(self.account, stock_code, order_type, order_volume,
+                                                       price_type, price, strategy_name, remark)
+            except Exception as e:
+                logger.error(f"{RED}【异步委托异常】{RESET} 股票:{stock_code} 错误:{e}")
+                future.set_result(-1)
+                return future
+            if seq is None or seq < 0:
+                logger.error(f"{RED}【异步委托失败】{RESET} 股票:{stock_code} 返回序号:{seq}")
+                future.set_result(-1)
+                return future
+
+            request['seq'] = seq
+            future.seq = seq
+            self.pending[seq] = request
+            self.pending_stocks[stock_code] += 1
+            self._deadlines.append((self.clock() + self.response_timeout, seq))
+            # 反馈可能在order_stock_async返回前就已到达
+            early = self._early_responses.pop(seq, None)
+
+        if early is not None:
+            name, data = early
+            getattr(self, name)(data)
+        return future
+
+    def has_pending(self, stock_code):
+        """
+        判断指定股票是否有尚未收到订单编号的委托
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+
+        返回:
+            bool: 有在途委托返回True
+        """
+        if self._deadlines and self._deadlines[0][0] <= self.clock():
+            self.expire()
+        return self.pending_stocks.get(stock_code, 0) > 0
+
+    def in_flight(self):
+        """
+        返回在途委托数量
+
+        返回:
+            int: 已发出但未收到订单编号的委托数量
+        """
+        return len(self.pending)
+
+    def expire(self, now=None):
+        """
+        将超过反馈等待时间的在途委托按失败处理，Future结果为-1
+
+        参数:
+            now (float): 当前时间，None表示使用时钟
+
+        返回:
+            list: 本次超时的下单请求序号列表
+        """
+        now = self.clock() if now is None else now
+        expired = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, seq = self._deadlines.popleft()
+                request = self._pop_pending(seq)
+                # 已收到反馈的条目直接丢弃
+                if request is None:
+                    continue
+                self._remember(self._expired, seq, request)
+                expired.append(request)
+
+        for request in expired:
+            logger.error(f"{RED}【异步委托超时】{RESET} 股票:{request['stock_code']} 序号:{request['seq']} "
+                         f"{self.response_timeout}秒内未收到柜台反馈，按失败处理")
+            request['future'].set_result(-1)
+        return [request['seq'] for request in expired]
+
+    def on_order_stock_async_response(self, response):
+        """
+        异步下单反馈推送，登记订单编号并完成对应的Future
+
+        已按超时处理的委托收到迟到的反馈时，只把订单登记到订单管理器以便继续跟踪和超时撤单。
+
+        参数:
+            response: XtOrderResponse对象
+        """
+        with self._lock:
+            request = self._pop_pending(response.seq)
+            late = False
+            if request is None:
+                request = self._expired.pop(response.seq, None)
+                if request is None:
+                    self._remember(self._early_responses, response.seq, ('on_order_stock_async_response', response))
+                    return
+                late = True
+            stock_code = request['stock_code']
+
+        order_id = response.order_id if response.order_id is not None else -1
+        if order_id > 0:
+            if self.order_manager is not None:
+                self.order_manager.track(order_id, stock_code, request['order_type'], request['order_volume'],
+                                         request['remark'], timeout=request['timeout'])
+            if late:
+                logger.warning(f"{YELLOW}【异步委托迟到反馈】{RESET} 股票:{stock_code} 序号:{response.seq} 订单编号:{order_id}")
+            else:
+                logger.debug(f"{BLUE}【异步委托】{RESET} 股票:{stock_code} 序号:{response.seq} 订单编号:{order_id}")
+        else:
+            logger.error(f"{RED}【异步委托失败】{RESET} 股票:{stock_code} 序号:{response.seq} 错误信息:{response.error_msg}")
+        if not late:
+            request['future'].set_result(order_id)
+
+    def on_order_error(self, data):
+        """
+        委托失败推送，按seq结束对应的在途委托，Future结果为-1
+
+        已收到订单编号的委托失败由订单管理器按订单编号处理，这里只处理仍在途的委托。
+
+        参数:
+            data: XtOrderError对象
+        """
+        seq = getattr(data, 'seq', None)
+        if seq is None:
+            return
+        with self._lock:
+            request = self._pop_pending(seq)
+            if request is None:
+                # 推送可能在order_stock_async返回前就已到达；已超时的委托不再处理
+                if self._expired.pop(seq, None) is None:
+                    self._remember(self._early_responses, seq, ('on_order_error', data))
+                return
+        logger.error(f"{RED}【异步委托失败】{RESET} 股票:{request['stock_code']} 序号:{seq} 错误信息:{data.error_msg}")
+        request['future'].set_result(-1)
+
+    def _pop_pending(self, seq):
+        # 移除在途委托并更新股票的在途数量
+        request = self.pending.pop(seq, None)
+        if request is not None:
+            stock_code = request['stock_code']
+            self.pending_stocks[stock_code] -= 1
+            if self.pending_stocks[stock_code] <= 0:
+                del self.pending_stocks[stock_code]
+        return request
+
+    @staticmethod
+    def _remember(store, seq, value):
+        # 保留最近MAX_UNMATCHED条，防止一直匹配不上的推送无限累积
+        store[seq] = value
+        store.move_to_end(seq)
+        while len(store) > MAX_UNMATCHED:
+            store.popitem(last=False)
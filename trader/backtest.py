@@ -0,0 +1,902 @@
+# -*- coding: utf-8 -*-
+"""
+分钟线事件驱动回测模块
+
+该模块使用本地K线存储（BarStore）中的1分钟K线，按时间顺序逐根回放给策略的on_bar，
+不依赖QMT终端和交易柜台，可以在Linux上运行。包括：
+1. BacktestContext: 模拟Context的下单、持仓、资产、行情和定时任务接口，策略代码无需修改
+2. 撮合模型: 委托在下一根K线撮合，市价单按开盘价加滑点成交，限价单在K线价格区间穿过委托价时成交，
+   单根K线成交量不超过该K线成交量的一定比例，一字涨停不能买入、一字跌停不能卖出
+3. 交易规则: T+1（当日买入次日可卖）、佣金（含最低佣金）、印花税、过户费、委托当日有效
+4. BacktestEngine: 按交易日读取股票池和持仓股票的分钟线，驱动撮合、策略、超时撤单和定时任务，
+   输出成交记录、每日权益曲线和汇总指标
+
+委托状态和成交以与交易推送相同的方式通知context.order_manager，
+策略基于订单管理器的未完成委托判断和超时撤单逻辑在回测中保持不变。
+"""
+
+import itertools
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from xtquant import xtconstant
+
+from trader.constant import QMT_POSITIONS_FIELD_MAPPING
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.order_manager import OrderManager
+from trader.profiler import profiled
+from trader.quote_hub import QuoteHub
+from trader.scheduler import Scheduler
+from trader.utils import add_stock_suffix, calculate_shares
+
+# K线数据结构，字段与策略中的BarData一致
+BarData = namedtuple('BarData', ['stock_code', 'time', 'open', 'high', 'low', 'close', 'volume', 'amount', 'pre_close'])
+
+# 回放使用的分钟线字段
+BACKTEST_BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+# 交易费用
+COMMISSION_RATE = 0.00025  # 佣金费率，买卖双向
+MIN_COMMISSION = 5.0  # 单笔最低佣金（元）
+STAMP_TAX_RATE = 0.0005  # 印花税率，仅卖出
+TRANSFER_FEE_RATE = 0.00001  # 过户费率，买卖双向
+
+# 撮合参数
+SLIPPAGE = 0.001  # 市价单滑点比例
+VOLUME_LIMIT = 0.25  # 单根K线最多成交该K线成交量的比例
+VOLUME_UNIT = 100  # K线成交量单位（手）对应的股数
+
+
+def get_price_limit_ratio(stock_code):
+    """
+    获取股票的涨跌幅限制比例
+
+    按代码前缀判断：创业板和科创板20%，北交所30%，其余10%。
+    回测数据中没有历史名称，ST股票的5%限制不做区分。
+
+    参数:
+        stock_code (str): 带后缀的股票代码
+
+    返回:
+        float: 涨跌幅限制比例
+    """
+    code = stock_code.split('.')[0]
+    if stock_code.endswith('.BJ') or code.startswith(('4', '8', '92')):
+        return 0.3
+    if code.startswith(('300', '301', '688', '689')):
+        return 0.2
+    return 0.1
+
+
+def calculate_limit_prices(stock_code, pre_close):
+    """
+    根据前收盘价计算涨停价和跌停价
+
+    参数:
+        stock_code (str): 带后缀的股票代码
+        pre_close (float): 前收盘价
+
+    返回:
+        tuple: (涨停价, 跌停价)，前收盘价无效时返回(0, 0)
+    """
+    if not pre_close or pre_close <= 0:
+        return 0, 0
+    ratio = get_price_limit_ratio(stock_code)
+    # 四舍五入到分，加微小量避免浮点误差导致的向下舍入
+    return round(pre_close * (1 + ratio) + 1e-6, 2), round(pre_close * (1 - ratio) + 1e-6, 2)
+
+
+def calculate_summary(equity, trades, initial_cash):
+    """
+    根据每日权益和成交记录计算回测汇总指标
+
+    参数:
+        equity (DataFrame): 每日权益记录，需包含总资产和净值列
+        trades (DataFrame): 成交记录，需包含手续费列
+        initial_cash (float): 初始资金
+
+    返回:
+        dict: 包含初始资金、期末总资产、总收益率、年化收益率、最大回撤、交易天数、成交笔数、手续费合计
+    """
+    if equity.empty:
+        final_asset = initial_cash
+        max_drawdown = 0.0
+    else:
+        final_asset = float(equity['总资产'].iloc[-1])
+        net_value = equity['净值']
+        max_drawdown = float((1 - net_value / net_value.cummax()).max())
+    total_return = final_asset / initial_cash - 1
+    days = len(equity)
+    return {
+        '初始资金': initial_cash,
+        '期末总资产': final_asset,
+        '总收益率': total_return,
+        '年化收益率': (1 + total_return) ** (250 / days) - 1 if days else 0.0,
+        '最大回撤': max_drawdown,
+        '交易天数': days,
+        '成交笔数': len(trades),
+        '手续费合计': float(trades['手续费'].sum()) if not trades.empty else 0.0,
+    }
+
+
+def save_backtest_results(output_dir, trades, equity, summary):
+    """
+    保存回测结果
+
+    参数:
+        output_dir (str): 输出目录，生成trades.csv、equity.csv和summary.json
+        trades (DataFrame): 成交记录
+        equity (DataFrame): 每日权益记录
+        summary (dict): 汇总指标
+
+    返回:
+        str: 输出目录
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # utf-8-sig便于Excel直接打开中文列名
+    trades.to_csv(os.path.join(output_dir, 'trades.csv'), index=False, encoding='utf-8-sig')
+    equity.to_csv(os.path.join(output_dir, 'equity.csv'), index=False, encoding='utf-8-sig')
+    with open(os.path.join(output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=4)
+    logger.info(f"{GREEN}【回测结果】{RESET} 已保存到:{output_dir}")
+    return output_dir
+
+
+class BacktestOrderSubmitter:
+    """
+    回测中的异步下单器
+
+    回测委托在下单时立即得到订单编号，不存在尚未返回订单编号的在途委托。
+    """
+
+    def has_pending(self, stock_code):
+        return False
+
+    def in_flight(self):
+        return 0
+
+
+class BacktestContext:
+    """
+    回测交易上下文
+
+    提供与Context相同签名的下单、持仓、资产和行情接口，由BacktestEngine推进模拟时钟和撮合。
+    持仓、资产字典的键与Context.get_position/get_asset一致。
+    """
+
+    def __init__(self, initial_cash=1000000.0, strategy_name='', commission_rate=COMMISSION_RATE,
+                 min_commission=MIN_COMMISSION, stamp_tax_rate=STAMP_TAX_RATE, transfer_fee_rate=TRANSFER_FEE_RATE,
+                 slippage=SLIPPAGE, volume_limit=VOLUME_LIMIT):
+        """
+        初始化回测上下文
+
+        参数:
+            initial_cash (float): 初始资金，默认为100万元
+            strategy_name (str): 策略名称
+            commission_rate (float): 佣金费率
+            min_commission (float): 单笔最低佣金
+            stamp_tax_rate (float): 卖出印花税率
+            transfer_fee_rate (float): 过户费率
+            slippage (float): 市价单滑点比例
+            volume_limit (float): 单根K线最多成交该K线成交量的比例
+        """
+        self.initial_cash = initial_cash
+        self.strategy_name = strategy_name
+        self.commission_rate = commission_rate
+        self.min_commission = min_commission
+        self.stamp_tax_rate = stamp_tax_rate
+        self.transfer_fee_rate = transfer_fee_rate
+        self.slippage = slippage
+        self.volume_limit = volume_limit
+
+        self.now = datetime.now()  # 模拟时钟，由回测引擎推进
+        self.cash = initial_cash  # 可用金额
+        self.frozen_cash = 0.0  # 买入委托冻结金额
+        self.positions = {}  # 持仓，格式：{stock_code: {'volume', 'can_use', 'frozen', 'cost', 'yesterday'}}
+        self.last_bars = {}  # 每只股票最新的K线，格式：{stock_code: BarData}
+        self.pre_closes = {}  # 当日前收盘价，格式：{stock_code: float}
+        self.security_names = {}  # 股票名称，格式：{stock_code: str}
+        self.pending_orders = {}  # 未完成委托，格式：{order_id: 委托字典}
+        self.orders = {}  # 全部委托，格式：{order_id: 委托字典}
+        self.trades = []  # 成交记录列表
+        self.equity = []  # 每日权益记录列表
+        self.last_day = None  # 最近结束的交易日，格式为YYYYMMDD
+        self._order_ids = itertools.count(1)
+
+        self.order_manager = OrderManager(cancel_func=self.cancel_order, clock=self.clock)
+        self.async_orders = BacktestOrderSubmitter()
+        self.scheduler = Scheduler(clock=self.clock, is_trading_day=None)
+        self.tasks = []
+        # 回测行情由引擎推送，订阅中心只记录订阅关系，订阅号按序生成
+        seqs = itertools.count(1)
+        self.quote_hub = QuoteHub(subscribe_quote=lambda *args, **kwargs: next(seqs),
+                                  subscribe_whole_quote=lambda *args, **kwargs: next(seqs),
+                                  unsubscribe_quote=lambda seq: None)
+
+    # ------------------------------------------------------------------ 时钟与定时任务
+
+    def clock(self):
+        """
+        模拟时钟
+
+        返回:
+            float: 当前模拟时间的秒数
+        """
+        return self.now.timestamp()
+
+    def run_time(self, func, period):
+        """
+        按模拟时间周期性执行任务，参数同Context.run_time
+        """
+        task = self.scheduler.run_time(func, period)
+        self.tasks.append(task)
+        return task
+
+    def run_daily(self, func, time):
+        """
+        按模拟时间每日执行任务，参数同Context.run_daily
+        """
+        task = self.scheduler.run_daily(func, time)
+        self.tasks.append(task)
+        return task
+
+    # ------------------------------------------------------------------ 行情
+
+    def subscribe_quote(self, stock_code, period, callback):
+        """
+        回测行情由引擎推送，订阅为空操作
+        """
+        return None
+
+    def unsubscribe_quote(self, stock_code):
+        """
+        回测行情由引擎推送，取消订阅为空操作
+        """
+        return None
+
+    @profiled('BacktestContext.get_latest_price', kind='context')
+    def get_latest_price(self, security='000001.SZ'):
+        """
+        获取最新价格，即当前K线的收盘价
+
+        参数:
+            security (str): 股票代码
+
+        返回:
+            float: 最新价格，没有行情时返回0
+        """
+        bar = self.last_bars.get(add_stock_suffix(security))
+        return bar.close if bar is not None else 0
+
+    @profiled('BacktestContext.get_security_name', kind='context')
+    def get_security_name(self, security='000001.SZ'):
+        """
+        获取证券名称，回测数据中没有名称时返回股票代码
+
+        参数:
+            security (str): 股票代码
+
+        返回:
+            str: 证券名称
+        """
+        security = add_stock_suffix(security)
+        return self.security_names.get(security, security)
+
+    @profiled('BacktestContext.get_stock_info', kind='context')
+    def get_stock_info(self, stock_code):
+        """
+        获取股票基本信息，字段同CustomData.get_stock_info
+
+        涨停价和跌停价由当日前收盘价按涨跌幅限制计算，总市值和流通股本在回测中为0。
+
+        参数:
+            stock_code (str): 股票代码
+
+        返回:
+            dict: 股票基本信息
+        """
+        stock_code = add_stock_suffix(stock_code)
+        pre_close = self.pre_closes.get(stock_code, 0)
+        limit_up, limit_down = calculate_limit_prices(stock_code, pre_close)
+        return {
+            '股票名称': self.get_security_name(stock_code),
+            '停牌状态': 0,
+            '总市值': 0,
+            '涨停价': limit_up,
+            '跌停价': limit_down,
+            '前收盘价': pre_close,
+            '流通股本': 0,
+            '是否可交易': True,
+        }
+
+    # ------------------------------------------------------------------ 持仓与资产
+
+    @profiled('BacktestContext.get_position', kind='context')
+    def get_position(self, security='000001.SZ'):
+        """
+        查询指定股票的持仓
+
+        参数:
+            security (str): 股票代码
+
+        返回:
+            dict: 持仓信息字典，没有持仓时返回None
+        """
+        security = add_stock_suffix(security)
+        position = self.positions.get(security)
+        if position is None:
+            return None
+        return self._position_to_dict(security, position)
+
+    @profiled('BacktestContext.get_positions', kind='context')
+    def get_positions(self):
+        """
+        查询全部持仓
+
+        返回:
+            DataFrame: 持仓信息，列与Context.get_positions一致
+        """
+        rows = [self._position_to_dict(code, position) for code, position in self.positions.items()]
+        return pd.DataFrame(rows, columns=list(QMT_POSITIONS_FIELD_MAPPING.keys()))
+
+    @profiled('BacktestContext.get_asset', kind='context')
+    def get_asset(self):
+        """
+        查询资产
+
+        返回:
+            dict: 资产信息字典，字段同Context.get_asset
+        """
+        market_value = self._market_value()
+        return {
+            '账号类型': xtconstant.SECURITY_ACCOUNT,
+            '资金账号': 'backtest',
+            '总资产': self.cash + self.frozen_cash + market_value,
+            '可用金额': self.cash,
+            '冻结金额': self.frozen_cash,
+            '持仓市值': market_value,
+        }
+
+    def get_total_asset(self):
+        """
+        获取总资产
+
+        返回:
+            float: 总资产
+        """
+        return self.get_asset()['总资产']
+
+    def _position_to_dict(self, stock_code, position):
+        price = self.get_latest_price(stock_code) or position['cost']
+        return {
+            '账号类型': xtconstant.SECURITY_ACCOUNT,
+            '资金账号': 'backtest',
+            '股票代码': stock_code,
+            '持仓数量': position['volume'],
+            '开仓价格': position['cost'],
+            '可用数量': position['can_use'],
+            '持仓市值': position['volume'] * price,
+            '冻结数量': position['frozen'],
+            '在途股份': 0,
+            '昨夜拥股': position['yesterday'],
+            '成本价格': position['cost'],
+            '多空方向': xtconstant.DIRECTION_FLAG_LONG,
+        }
+
+    def _market_value(self):
+        return sum(position['volume'] * (self.get_latest_price(code) or position['cost'])
+                   for code, position in self.positions.items())
+
+    # ------------------------------------------------------------------ 下单与撤单
+
+    def order(self, security='000001.SZ', amount=100, price=0, strategy_name='', remark=''):
+        """
+        买卖标的，参数同Context.order
+
+        返回:
+            int: 订单编号，委托被拒绝时返回-1，数量为0时返回None
+        """
+        return self._submit(security, amount, price, strategy_name, remark)
+
+    def order_value(self, security='000001.SZ', value=None, price=0, strategy_name='', remark=''):
+        """
+        买卖价值为value的标的，参数同Context.order_value
+        """
+        current_price = price if price > 0 else self.get_latest_price(security)
+        amount = calculate_shares(value, current_price)
+        return self.order(security, amount, price, strategy_name, remark)
+
+    @profiled('BacktestContext.order_async', kind='context')
+    def order_async(self, security='000001.SZ', amount=100, price=0, strategy_name='', remark='', timeout=None):
+        """
+        异步买卖标的，参数同Context.order_async
+
+        回测中委托立即得到订单编号，返回已完成的Future，Future.seq为订单编号。
+        """
+        order_id = self._submit(security, amount, price, strategy_name, remark, timeout=timeout)
+        if order_id is None:
+            return None
+        future = Future()
+        future.seq = order_id
+        future.set_result(order_id)
+        return future
+
+    @profiled('BacktestContext.order_value_async', kind='context')
+    def order_value_async(self, security='000001.SZ', value=None, price=0, strategy_name='', remark='', timeout=None):
+        """
+        异步买卖价值为value的标的，参数同Context.order_value_async
+        """
+        current_price = price if price > 0 else self.get_latest_price(security)
+        amount = calculate_shares(value, current_price)
+        return self.order_async(security, amount, price, strategy_name, remark, timeout=timeout)
+
+    def cancel_order(self, order_id=None):
+        """
+        撤销未完成委托，释放冻结的资金或持仓
+
+        参数:
+            order_id (int): 订单编号
+
+        返回:
+            int: 撤单成功返回0，委托不存在或已完成返回-1
+        """
+        order = self.pending_orders.pop(order_id, None)
+        if order is None:
+            return -1
+        remaining = order['order_volume'] - order['traded_volume']
+        if order['order_type'] == xtconstant.STOCK_BUY:
+            self.cash += order['frozen_cash']
+            self.frozen_cash -= order['frozen_cash']
+            order['frozen_cash'] = 0.0
+        else:
+            position = self.positions.get(order['stock_code'])
+            if position is not None:
+                position['frozen'] -= remaining
+                position['can_use'] += remaining
+        order['order_status'] = xtconstant.ORDER_PART_CANCEL if order['traded_volume'] else xtconstant.ORDER_CANCELED
+        logger.debug(f"{YELLOW}【回测撤单】{RESET} 订单ID:{order_id} 股票:{order['stock_code']} 未成交数量:{remaining}")
+        self._notify_order(order)
+        return 0
+
+    def cancel_all_order(self):
+        """
+        撤销全部未完成委托
+
+        返回:
+            list: 各委托的撤单结果
+        """
+        return [self.cancel_order(order_id) for order_id in list(self.pending_orders)]
+
+    def _submit(self, security, amount, price, strategy_name, remark, timeout=None):
+        if amount == 0:
+            logger.warning(f"{YELLOW}【数据校验】{RESET} 标的：{security}  交易数量：{amount} 交易价格：{price if price > 0 else '市价'}")
+            return None
+        stock_code = add_stock_suffix(security)
+        side = xtconstant.STOCK_BUY if amount > 0 else xtconstant.STOCK_SELL
+        volume = abs(int(amount))
+        price_type = xtconstant.FIX_PRICE if price > 0 else xtconstant.LATEST_PRICE
+        reference_price = price if price > 0 else self.get_latest_price(stock_code)
+        if reference_price <= 0:
+            logger.error(f"{RED}【回测委托失败】{RESET} 股票:{stock_code} 没有行情数据")
+            return -1
+
+        frozen_cash = 0.0
+        if side == xtconstant.STOCK_BUY:
+            if volume % 100 != 0:
+                logger.error(f"{RED}【回测委托失败】{RESET} 股票:{stock_code} 买入数量:{volume} 不是100股的整数倍")
+                return -1
+            # 市价买入按最新价加滑点冻结资金
+            if price_type == xtconstant.LATEST_PRICE:
+                reference_price *= 1 + self.slippage
+            frozen_cash = reference_price * volume
+            frozen_cash += self._fee(frozen_cash, is_buy=True)
+            if frozen_cash > self.cash:
+                logger.error(f"{RED}【回测委托失败】{RESET} 股票:{stock_code} 可用资金:{self.cash:.2f} 不足:{frozen_cash:.2f}")
+                return -1
+            self.cash -= frozen_cash
+            self.frozen_cash += frozen_cash
+        else:
+            position = self.positions.get(stock_code)
+            if position is None or position['can_use'] < volume:
+                logger.error(f"{RED}【回测委托失败】{RESET} 股票:{stock_code} 卖出数量:{volume} 超过可用数量:{position['can_use'] if position else 0}")
+                return -1
+            position['can_use'] -= volume
+            position['frozen'] += volume
+
+        order_id = next(self._order_ids)
+        order = {
+            'order_id': order_id,
+            'stock_code': stock_code,
+            'order_type': side,
+            'order_volume': volume,
+            'price_type': price_type,
+            'price': price,
+            'traded_volume': 0,
+            'traded_amount': 0.0,
+            'frozen_cash': frozen_cash,
+            'order_status': xtconstant.ORDER_REPORTED,
+            'order_time': self.now,
+            'strategy_name': self.strategy_name if strategy_name == '' else strategy_name,
+            'remark': remark,
+        }
+        self.orders[order_id] = order
+        self.pending_orders[order_id] = order
+        self.order_manager.track(order_id, stock_code, side, volume, remark, timeout=timeout)
+        logger.debug(f"{BLUE}【回测委托】{RESET} 订单ID:{order_id} 股票:{stock_code} 方向:{'买入' if side == xtconstant.STOCK_BUY else '卖出'} 数量:{volume} 价格:{price if price > 0 else '市价'}")
+        return order_id
+
+    # ------------------------------------------------------------------ 撮合
+
+    def on_bar(self, bar):
+        """
+        收到新K线：先用该K线撮合此前的未完成委托，再更新最新价格
+
+        参数:
+            bar (BarData): K线数据
+        """
+        if self.pending_orders:
+            for order in [o for o in self.pending_orders.values() if o['stock_code'] == bar.stock_code]:
+                # 当根K线内发出的委托从下一根K线开始撮合
+                if order['order_time'] < bar.time:
+                    self._match(order, bar)
+        self.last_bars[bar.stock_code] = bar
+
+    def _match(self, order, bar):
+        is_buy = order['order_type'] == xtconstant.STOCK_BUY
+        limit_up, limit_down = calculate_limit_prices(bar.stock_code, self.pre_closes.get(bar.stock_code, 0))
+        # 一字涨停买不进，一字跌停卖不出
+        if is_buy and limit_up and bar.low >= limit_up:
+            return
+        if not is_buy and limit_down and bar.high <= limit_down:
+            return
+
+        if order['price_type'] == xtconstant.FIX_PRICE:
+            if is_buy:
+                if bar.low > order['price']:
+                    return
+                price = min(bar.open, order['price'])
+            else:
+                if bar.high < order['price']:
+                    return
+                price = max(bar.open, order['price'])
+        else:
+            price = bar.open * (1 + self.slippage if is_buy else 1 - self.slippage)
+            if limit_up:
+                price = min(max(price, limit_down), limit_up)
+        price = round(price, 2)
+
+        remaining = order['order_volume'] - order['traded_volume']
+        capacity = int(bar.volume * VOLUME_UNIT * self.volume_limit)
+        volume = remaining if remaining <= capacity else capacity // 100 * 100
+        if is_buy:
+            # 成交价高于冻结时的参考价时，以冻结资金和可用资金为上限
+            available = self.cash + order['frozen_cash']
+            while volume > 0 and price * volume + self._fee(price * volume, is_buy=True) > available:
+                volume -= 100
+        if volume <= 0:
+            return
+        self._fill(order, price, volume)
+
+    def _fill(self, order, price, volume):
+        stock_code = order['stock_code']
+        is_buy = order['order_type'] == xtconstant.STOCK_BUY
+        amount = price * volume
+        fee = self._fee(amount, is_buy)
+        remaining = order['order_volume'] - order['traded_volume']
+
+        if is_buy:
+            released = order['frozen_cash'] * volume / remaining
+            order['frozen_cash'] -= released
+            self.frozen_cash -= released
+            self.cash += released - amount - fee
+            position = self.positions.setdefault(stock_code, {'volume': 0, 'can_use': 0, 'frozen': 0,
+                                                              'cost': 0.0, 'yesterday': 0})
+            # 成本价包含交易费用
+            position['cost'] = (position['cost'] * position['volume'] + amount + fee) / (position['volume'] + volume)
+            position['volume'] += volume
+        else:
+            self.cash += amount - fee
+            position = self.positions[stock_code]
+            position['frozen'] -= volume
+            position['volume'] -= volume
+            if position['volume'] <= 0:
+                del self.positions[stock_code]
+
+        order['traded_volume'] += volume
+        order['traded_amount'] += amount
+        self.trades.append({
+            '成交时间': self.now,
+            '证券代码': stock_code,
+            '委托类型': '买入' if is_buy else '卖出',
+            '成交均价': price,
+            '成交数量': volume,
+            '成交金额': amount,
+            '手续费': fee,
+            '订单编号': order['order_id'],
+            '委托备注': order['remark'],
+        })
+        logger.debug(f"{GREEN}【回测成交】{RESET} {'买入' if is_buy else '卖出'} 股票:{stock_code} 价格:{price:.2f} 数量:{volume} 订单ID:{order['order_id']}")
+
+        self.order_manager.on_stock_trade(SimpleNamespace(order_id=order['order_id'], stock_code=stock_code,
+                                                          order_type=order['order_type'], traded_price=price,
+                                                          traded_volume=volume, traded_amount=amount))
+        if order['traded_volume'] >= order['order_volume']:
+            self.pending_orders.pop(order['order_id'], None)
+            if is_buy and order['frozen_cash']:
+                self.cash += order['frozen_cash']
+                self.frozen_cash -= order['frozen_cash']
+                order['frozen_cash'] = 0.0
+            order['order_status'] = xtconstant.ORDER_SUCCEEDED
+            self._notify_order(order)
+
+    def _fee(self, amount, is_buy):
+        fee = max(amount * self.commission_rate, self.min_commission) + amount * self.transfer_fee_rate
+        if not is_buy:
+            fee += amount * self.stamp_tax_rate
+        return fee
+
+    def _notify_order(self, order):
+        self.order_manager.on_stock_order(SimpleNamespace(order_id=order['order_id'], stock_code=order['stock_code'],
+                                                          order_type=order['order_type'],
+                                                          order_status=order['order_status'],
+                                                          order_volume=order['order_volume'],
+                                                          traded_volume=order['traded_volume']))
+
+    # ------------------------------------------------------------------ 日切
+
+    def start_day(self, pre_closes, names=None):
+        """
+        新交易日开始，设置各股票的前收盘价
+
+        参数:
+            pre_closes (dict): {stock_code: 前收盘价}
+            names (dict): {stock_code: 股票名称}，可选
+        """
+        self.pre_closes = dict(pre_closes)
+        if names:
+            self.security_names.update(names)
+
+    def end_day(self, day):
+        """
+        交易日结束：撤销未完成委托（委托当日有效），持仓全部转为可用（T+1），记录当日权益
+
+        参数:
+            day (str): 交易日，格式为YYYYMMDD
+
+        返回:
+            dict: 当日权益记录
+        """
+        self.cancel_all_order()
+        for position in self.positions.values():
+            position['can_use'] = position['volume']
+            position['yesterday'] = position['volume']
+        self.last_day = day
+        asset = self.get_asset()
+        record = {
+            '日期': day,
+            '可用金额': asset['可用金额'],
+            '冻结金额': asset['冻结金额'],
+            '持仓市值': asset['持仓市值'],
+            '总资产': asset['总资产'],
+            '净值': asset['总资产'] / self.initial_cash,
+            '持仓数量': len(self.positions),
+        }
+        self.equity.append(record)
+        return record
+
+    def get_state(self):
+        """
+        导出日终账户状态，用于分段回测之间交接持仓
+
+        返回:
+            dict: 包含day（最近结束的交易日）、cash（资金）、positions（持仓副本）
+                和last_bars（持仓股票的最新K线，用于估值和前收盘价）
+        """
+        return {
+            'day': self.last_day,
+            'cash': self.cash + self.frozen_cash,
+            'positions': {code: dict(position) for code, position in self.positions.items()},
+            'last_bars': {code: self.last_bars[code] for code in self.positions if code in self.last_bars},
+        }
+
+    def load_state(self, state):
+        """
+        载入get_state导出的日终账户状态
+
+        参数:
+            state (dict): get_state的返回值
+        """
+        self.last_day = state['day']
+        self.cash = state['cash']
+        self.frozen_cash = 0.0
+        self.positions = {code: dict(position) for code, position in state['positions'].items()}
+        self.last_bars.update(state['last_bars'])
+
+
+class BacktestEngine:
+    """
+    分钟线回测引擎
+
+    每个交易日读取股票池和持仓股票的1分钟K线，按时间顺序逐分钟回放：
+    推进模拟时钟并执行到期的定时任务，对每只股票先撮合未完成委托再调用策略on_bar，
+    最后检查超时委托。收盘后撤销未完成委托、结算T+1并记录权益。
+    """
+
+    def __init__(self, context, strategy, bar_store, stock_pool, log_level=logging.INFO):
+        """
+        初始化回测引擎
+
+        参数:
+            context (BacktestContext): 回测上下文，策略需以该对象创建
+            strategy: 策略对象，需提供on_bar方法和stock_pool属性
+            bar_store (BarStore): 本地K线存储，需包含1分钟K线，日线用于获取前收盘价（可选）
+            stock_pool: 股票池，可以是股票代码列表，或参数为交易日（YYYYMMDD）、返回股票代码列表的函数
+            log_level (int): 回测期间的日志级别，默认为INFO，避免逐根K线的调试日志拖慢回测
+        """
+        self.context = context
+        self.strategy = strategy
+        self.bar_store = bar_store
+        self.stock_pool = stock_pool
+        self.log_level = log_level
+        self.trading_days = set()
+        self.bar_count = 0
+        self.context.scheduler.is_trading_day = self._is_trading_day
+
+    def run(self, start_date, end_date):
+        """
+        运行回测
+
+        参数:
+            start_date (str): 开始日期，格式为YYYYMMDD
+            end_date (str): 结束日期，格式为YYYYMMDD
+
+        返回:
+            dict: 回测汇总指标，见summary
+        """
+        days = [day for day in self.bar_store.list_partitions('1m') if str(start_date) <= day <= str(end_date)]
+        if not days:
+            logger.error(f"{RED}【回测失败】{RESET} K线存储中没有{start_date}至{end_date}的1分钟K线")
+            return {}
+        self.trading_days = {datetime.strptime(day, '%Y%m%d').date() for day in days}
+        self.context.now = datetime.strptime(days[0], '%Y%m%d')
+        # 回测开始前注册的定时任务按模拟时钟重新安排
+        self.context.scheduler.reset()
+
+        previous_level = logger.level
+        logger.setLevel(self.log_level)
+        start = time.perf_counter()
+        try:
+            logger.info(f"{GREEN}【回测开始】{RESET} 区间:{days[0]}-{days[-1]} 交易日:{len(days)}天 初始资金:{self.context.initial_cash:.2f}")
+            for day in days:
+                self._run_day(day)
+        finally:
+            elapsed = time.perf_counter() - start
+            logger.setLevel(previous_level)
+
+        summary = self.summary()
+        logger.info(f"{GREEN}【回测完成】{RESET} 耗时:{elapsed:.1f}秒 K线:{self.bar_count}根 "
+                    f"速度:{self.bar_count / elapsed if elapsed > 0 else 0:.0f}根/秒 总收益率:{summary['总收益率']:.2%} "
+                    f"最大回撤:{summary['最大回撤']:.2%} 成交:{summary['成交笔数']}笔")
+        return summary
+
+    def _run_day(self, day):
+        context = self.context
+        pool = list(self.stock_pool(day) if callable(self.stock_pool) else self.stock_pool)
+        self.strategy.stock_pool = pool
+        codes = list(dict.fromkeys(pool + list(context.positions)))
+
+        codes, times, data = self.bar_store.read('1m', codes=codes, fields=BACKTEST_BAR_FIELDS,
+                                                 start_time=day, end_time=day)
+        context.start_day(self._get_pre_closes(day, codes, data))
+
+        if codes and len(times):
+            bar_times = [datetime.strptime(str(t), '%Y%m%d%H%M%S') for t in times.tolist()]
+            # 转为按分钟排列的嵌套列表，逐元素访问比NumPy标量索引快得多
+            columns = [data[field].T.tolist() for field in BACKTEST_BAR_FIELDS]
+            pre_closes = [context.pre_closes.get(code, 0) for code in codes]
+            for j, bar_time in enumerate(bar_times):
+                self._advance_clock(bar_time)
+                opens, highs, lows, closes, volumes, amounts = (column[j] for column in columns)
+                for i, stock_code in enumerate(codes):
+                    close = closes[i]
+                    if close != close:  # NaN表示该股票在这一分钟没有数据
+                        continue
+                    bar = BarData(stock_code, bar_time, opens[i], highs[i], lows[i], close,
+                                  volumes[i], amounts[i], pre_closes[i])
+                    context.on_bar(bar)
+                    self.strategy.on_bar(bar)
+                    self.bar_count += 1
+                context.order_manager.expire()
+
+        record = context.end_day(day)
+        logger.info(f"{BLUE}【回测日终】{RESET} 日期:{day} 股票池:{len(pool)}只 持仓:{record['持仓数量']}只 "
+                    f"总资产:{record['总资产']:.2f} 净值:{record['净值']:.4f}")
+        # 执行收盘后到当日结束前的定时任务
+        self._advance_clock(datetime.strptime(day, '%Y%m%d') + timedelta(days=1, seconds=-1))
+
+    def _get_pre_closes(self, day, codes, data):
+        # 优先使用日线的前收盘价，缺失时使用上一交易日最后一根分钟线收盘价，再缺失时使用当日第一根分钟线开盘价
+        pre_closes = {}
+        daily_codes, _, daily = self.bar_store.read('1d', codes=codes, fields=['preClose'],
+                                                    start_time=day, end_time=day)
+        if daily_codes and 'preClose' in daily and daily['preClose'].shape[1]:
+            for code, value in zip(daily_codes, daily['preClose'][:, -1].tolist()):
+                if value == value and value > 0:
+                    pre_closes[code] = value
+        for i, code in enumerate(codes):
+            if code in pre_closes:
+                continue
+            last_bar = self.context.last_bars.get(code)
+            if last_bar is not None and last_bar.time.strftime('%Y%m%d') == self.context.last_day:
+                pre_closes[code] = last_bar.close
+                continue
+            opens = data['open'][i] if data else np.empty(0)
+            valid = opens[~np.isnan(opens)]
+            if len(valid):
+                pre_closes[code] = float(valid[0])
+        return pre_closes
+
+    def _advance_clock(self, target):
+        # 按模拟时间逐个触发到期的定时任务，再把时钟推进到目标时间
+        scheduler = self.context.scheduler
+        target_ts = target.timestamp()
+        while True:
+            next_run = scheduler.next_run_time()
+            if next_run is None or next_run > target_ts:
+                break
+            self.context.now = max(self.context.now, datetime.fromtimestamp(next_run))
+            scheduler.run_pending(next_run)
+        self.context.now = target
+
+    def _is_trading_day(self, day):
+        return day in self.trading_days
+
+    # ------------------------------------------------------------------ 结果
+
+    def get_trades(self):
+        """
+        获取成交记录
+
+        返回:
+            DataFrame: 成交记录
+        """
+        return pd.DataFrame(self.context.trades)
+
+    def get_equity(self):
+        """
+        获取每日权益曲线
+
+        返回:
+            DataFrame: 每日权益记录
+        """
+        return pd.DataFrame(self.context.equity)
+
+    def summary(self):
+        """
+        计算回测汇总指标
+
+        返回:
+            dict: 见calculate_summary
+        """
+        return calculate_summary(self.get_equity(), self.get_trades(), self.context.initial_cash)
+
+    def save_results(self, output_dir):
+        """
+        保存成交记录、权益曲线和汇总指标
+
+        参数:
+            output_dir (str): 输出目录，见save_backtest_results
+
+        返回:
+            str: 输出目录
+        """
+        return save_backtest_results(output_dir, self.get_trades(), self.get_equity(), self.summary())
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+分笔行情合成K线模块
+
+由分笔行情推送（subscribe_quote(period='tick')或全推行情）在本地合成分钟K线，
+每根K线在收盘后推送给处理函数且只推送一次，不再处理未走完的K线：
+1. 每只股票占用预分配数组中的一行，记录当前K线的开高低收、K线开始时的累计成交量和成交额，
+   以及当日累计成交量、成交额（可计算分时均价）
+2. 分笔行情中的成交量、成交额为当日累计值，K线成交量为收盘时与开始时累计值之差，
+   延迟到达的分笔行情价格不再计入已推送的K线，其成交量计入下一根K线
+3. K线在该股票下一根K线的第一笔行情到达时收盘；没有新行情时由flush()按时间收盘，
+   收盘等待时间可配置，没有成交的分钟可选择以前一收盘价补齐
+
+K线时间采用结束时间，与QMT的1分钟K线一致：每日240根，9:31至11:30、13:01至15:00。
+9:25至9:30的集合竞价计入9:31的K线，11:30至13:00之间的行情计入11:30的K线，15:00之后的行情计入15:00的K线，
+9:25之前的行情（虚拟撮合价）忽略。多分钟周期由1分钟K线序号分组，不跨越午休。
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.profiler import profiled
+from trader.vwap import get_volume_unit
+
+# K线数据结构，字段与策略中的BarData一致
+BarData = namedtuple('BarData', ['stock_code', 'time', 'open', 'high', 'low', 'close', 'volume', 'amount', 'pre_close'])
+
+# 北京时间相对UTC的秒数，分笔行情时间为UTC毫秒时间戳
+BEIJING_OFFSET_SECONDS = 8 * 3600
+
+# 每日1分钟K线的结束时间（当日秒数），共240根
+MINUTE_END_SECONDS = np.array(
+    [9 * 3600 + 30 * 60 + 60 * (i + 1) for i in range(120)] + [13 * 3600 + 60 * (i + 1) for i in range(120)],
+    dtype=np.int64)
+MINUTES_PER_DAY = len(MINUTE_END_SECONDS)
+
+# 集合竞价成交开始计入K线的时间、上午和下午的开收盘时间（当日秒数）
+AUCTION_START_SECONDS = 9 * 3600 + 25 * 60
+MORNING_OPEN_SECONDS = 9 * 3600 + 30 * 60
+MORNING_CLOSE_SECONDS = 11 * 3600 + 30 * 60
+AFTERNOON_OPEN_SECONDS = 13 * 3600
+
+# K线结束后等待延迟行情的秒数
+CLOSE_DELAY_SECONDS = 3
+
+# 11:30和15:00的K线结束后等待收盘行情的秒数，收盘集合竞价结果通常在结束时间之后推送
+SESSION_CLOSE_DELAY_SECONDS = 30
+
+# 预分配的股票行数，不足时按倍数扩容
+DEFAULT_CAPACITY = 256
+
+# 支持的K线周期：{周期: 分钟数}，分钟数能整除120，K线不跨越午休
+PERIOD_MINUTES = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '60m': 60}
+
+
+def minute_index(seconds_of_day):
+    """
+    计算当日秒数所属的1分钟K线序号
+
+    参数:
+        seconds_of_day (int): 北京时间的当日秒数
+
+    返回:
+        int: K线序号（0-239），9:25之前返回-1
+    """
+    if seconds_of_day < AUCTION_START_SECONDS:
+        return -1
+    if seconds_of_day < MORNING_OPEN_SECONDS:
+        return 0
+    if seconds_of_day < MORNING_CLOSE_SECONDS:
+        return (seconds_of_day - MORNING_OPEN_SECONDS) // 60
+    if seconds_of_day < AFTERNOON_OPEN_SECONDS:
+        return 119
+    return min(120 + (seconds_of_day - AFTERNOON_OPEN_SECONDS) // 60, MINUTES_PER_DAY - 1)
+
+
+class _PeriodState:
+    """
+    单个周期的K线状态，各字段为按股票行号索引的预分配数组
+    """
+
+    def __init__(self, period, handler, capacity):
+        self.period = period
+        self.minutes = PERIOD_MINUTES[period]
+        self.handler = handler
+        self.bucket = np.full(capacity, -1, dtype=np.int32)  # 当前K线序号，-1表示没有未收盘的K线
+        self.emitted = np.full(capacity, -1, dtype=np.int32)  # 当日已推送的最后一根K线序号
+        self.open = np.zeros(capacity, dtype=np.float64)
+        self.high = np.zeros(capacity, dtype=np.float64)
+        self.low = np.zeros(capacity, dtype=np.float64)
+        self.close = np.zeros(capacity, dtype=np.float64)
+        self.volume_start = np.zeros(capacity, dtype=np.float64)  # K线开始时的当日累计成交量
+        self.amount_start = np.zeros(capacity, dtype=np.float64)  # K线开始时的当日累计成交额
+
+    def grow(self, capacity):
+        for name in ('bucket', 'emitted', 'open', 'high', 'low', 'close', 'volume_start', 'amount_start'):
+            old = getattr(self, name)
+            new = np.full(capacity, -1 if old.dtype == np.int32 else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def bucket_end_seconds(self, bucket):
+        # K线结束时间为该组最后一根1分钟K线的结束时间
+        return int(MINUTE_END_SECONDS[(bucket + 1) * self.minutes - 1])
+
+
+class BarBuilder:
+    """
+    分笔行情K线合成器
+
+    on_tick的参数与QuoteHub的处理函数一致，可直接注册到quote_hub：
+        quote_hub.subscribe(stock_codes, bar_builder.on_tick, period='tick')
+
+    行情推送线程调用on_tick，定时任务线程调用flush，状态修改在锁内进行，处理函数在锁外调用。
+    收盘的K线在锁内按收盘顺序加入待推送队列，再由持有推送锁的线程依次交给处理函数，
+    因此处理函数不会被两个线程同时调用，同一只股票的K线按时间顺序推送。
+    """
+
+    def __init__(self, handlers, close_delay=CLOSE_DELAY_SECONDS, session_close_delay=SESSION_CLOSE_DELAY_SECONDS,
+                 fill_empty=True, capacity=DEFAULT_CAPACITY):
+        """
+        初始化K线合成器
+
+        参数:
+            handlers (dict): {周期: 处理函数}，周期见PERIOD_MINUTES，处理函数参数为BarData
+            close_delay (float): K线结束后由flush收盘前等待的秒数，默认为CLOSE_DELAY_SECONDS
+            session_close_delay (float): 11:30和15:00的K线结束后等待的秒数，默认为SESSION_CLOSE_DELAY_SECONDS
+            fill_empty (bool): 没有成交的分钟是否以前一收盘价补齐成交量为0的K线，默认为True
+            capacity (int): 预分配的股票行数，默认为DEFAULT_CAPACITY
+
+        异常:
+            ValueError: 周期不受支持时抛出
+        """
+        unknown = set(handlers) - set(PERIOD_MINUTES)
+        if unknown:
+            raise ValueError(f"不支持的K线周期: {sorted(unknown)}，支持的周期为{list(PERIOD_MINUTES)}")
+        self.fill_empty = fill_empty
+        self.capacity = max(int(capacity), 1)
+        self._lock = threading.Lock()
+        self._emit_lock = threading.RLock()  # 推送锁，处理函数中再次调用on_tick等方法时可重入
+        self._pending = deque()  # 已收盘待推送的K线，格式：(处理函数, BarData)
+        self.index = {}  # 股票行号，格式：{stock_code: row}
+        self.codes = []  # 与行号对齐的股票代码
+        self.day = np.full(self.capacity, -1, dtype=np.int64)  # 当前交易日（自1970-01-01起的天数）
+        self.cum_volume = np.zeros(self.capacity, dtype=np.float64)  # 当日累计成交量
+        self.cum_amount = np.zeros(self.capacity, dtype=np.float64)  # 当日累计成交额
+        self.last_price = np.zeros(self.capacity, dtype=np.float64)
+        self.pre_close = np.zeros(self.capacity, dtype=np.float64)
+        self.periods = [_PeriodState(period, handler, self.capacity) for period, handler in handlers.items()]
+
+        # 各1分钟K线由flush收盘的时间（当日秒数）
+        self.close_seconds = MINUTE_END_SECONDS + close_delay
+        self.close_seconds[[119, MINUTES_PER_DAY - 1]] = MINUTE_END_SECONDS[[119, MINUTES_PER_DAY - 1]] + session_close_delay
+        self.stats = {'分笔数量': 0, '过期分笔': 0, '推送K线': 0, '补齐K线': 0, '处理异常': 0}
+
+    def _row(self, stock_code):
+        row = self.index.get(stock_code)
+        if row is None:
+            row = len(self.codes)
+            if row >= self.capacity:
+                self._grow(self.capacity * 2)
+            self.index[stock_code] = row
+            self.codes.append(stock_code)
+        return row
+
+    def _grow(self, capacity):
+        for name in ('day', 'cum_volume', 'cum_amount', 'last_price', 'pre_close'):
+            old = getattr(self, name)
+            new = np.full(capacity, -1 if name == 'day' else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for state in self.periods:
+            state.grow(capacity)
+        self.capacity = capacity
+
+    # ------------------------------------------------------------------ 行情输入
+
+    @profiled('BarBuilder.on_tick')
+    def on_tick(self, stock_code, data):
+        """
+        处理分笔行情推送
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+            data (dict or list): 分笔行情字典，或subscribe_quote推送的分笔行情字典列表
+        """
+        ticks = data if isinstance(data, list) else [data]
+        bars = []
+        with self._lock:
+            for tick in ticks:
+                self._update(stock_code, tick, bars)
+            self._pending.extend(bars)
+        self._emit()
+
+    def _update(self, stock_code, tick, bars):
+        price = tick.get('lastPrice') or 0
+        if price <= 0:
+            return
+        self.stats['分笔数量'] += 1
+        seconds = int(tick['time']) // 1000 + BEIJING_OFFSET_SECONDS
+        day, seconds_of_day = divmod(seconds, 86400)
+        index = minute_index(seconds_of_day)
+        if index < 0:
+            return
+
+        row = self._row(stock_code)
+        if self.day[row] != day:
+            if self.day[row] > day:
+                self.stats['过期分笔'] += 1
+                return
+            # 新交易日，先收盘上一交易日未收盘的K线
+            self._close_row(row, bars)
+            self.day[row] = day
+            self.cum_volume[row] = 0
+            self.cum_amount[row] = 0
+            for state in self.periods:
+                state.emitted[row] = -1
+
+        stale = False
+        for state in self.periods:
+            bucket = index // state.minutes
+            current = state.bucket[row]
+            if bucket == current:
+                if price > state.high[row]:
+                    state.high[row] = price
+                if price < state.low[row]:
+                    state.low[row] = price
+                state.close[row] = price
+            elif bucket > current and bucket > state.emitted[row]:
+                if current >= 0:
+                    self._close_bar(state, row, bars)
+                if self.fill_empty and state.emitted[row] >= 0:
+                    self._fill_bars(state, row, bucket - 1, bars)
+                state.bucket[row] = bucket
+                state.open[row] = state.high[row] = state.low[row] = state.close[row] = price
+                state.volume_start[row] = self.cum_volume[row]
+                state.amount_start[row] = self.cum_amount[row]
+            else:
+                # 所属K线已推送，价格不再计入
+                stale = True
+        if stale:
+            self.stats['过期分笔'] += 1
+
+        self.last_price[row] = price
+        self.pre_close[row] = tick.get('lastClose') or self.pre_close[row]
+        # 累计值只增不减，乱序到达的分笔不回退
+        self.cum_volume[row] = max(self.cum_volume[row], tick.get('volume') or 0)
+        self.cum_amount[row] = max(self.cum_amount[row], tick.get('amount') or 0)
+
+    # ------------------------------------------------------------------ K线收盘
+
+    def _bar_time(self, row, state, bucket):
+        seconds = int(self.day[row]) * 86400 + state.bucket_end_seconds(bucket)
+        return datetime(1970, 1, 1) + timedelta(seconds=seconds)
+
+    def _close_bar(self, state, row, bars):
+        bucket = int(state.bucket[row])
+        bars.append((state.handler, BarData(
+            stock_code=self.codes[row],
+            time=self._bar_time(row, state, bucket),
+            open=float(state.open[row]),
+            high=float(state.high[row]),
+            low=float(state.low[row]),
+            close=float(state.close[row]),
+            volume=float(self.cum_volume[row] - state.volume_start[row]),
+            amount=float(self.cum_amount[row] - state.amount_start[row]),
+            pre_close=float(self.pre_close[row])
+        )))
+        state.emitted[row] = bucket
+        state.bucket[row] = -1
+        self.stats['推送K线'] += 1
+
+    def _fill_bars(self, state, row, last_bucket, bars):
+        # 没有成交的K线以前一收盘价补齐，成交量和成交额为0
+        price = float(self.last_price[row])
+        for bucket in range(int(state.emitted[row]) + 1, last_bucket + 1):
+            bars.append((state.handler, BarData(
+                stock_code=self.codes[row], time=self._bar_time(row, state, bucket),
+                open=price, high=price, low=price, close=price, volume=0.0, amount=0.0,
+                pre_close=float(self.pre_close[row])
+            )))
+            state.emitted[row] = bucket
+            self.stats['补齐K线'] += 1
+
+    def _close_row(self, row, bars):
+        for state in self.periods:
+            if state.bucket[row] >= 0:
+                self._close_bar(state, row, bars)
+
+    @profiled('BarBuilder.flush')
+    def flush(self, now=None):
+        """
+        收盘已过收盘等待时间的K线，可作为定时任务每秒执行
+
+        fill_empty为True时，同时补齐当日已有成交的股票到当前时间为止没有成交的K线。
+
+        参数:
+            now (float or datetime): 当前时间，float为时间戳秒数，datetime为北京时间，默认为当前时间
+        """
+        if now is None:
+            now = time.time()
+        if isinstance(now, datetime):
+            # 不带时区的datetime按北京时间处理，与K线时间一致
+            seconds = int((now - datetime(1970, 1, 1)).total_seconds())
+        else:
+            seconds = int(now) + BEIJING_OFFSET_SECONDS
+        day, seconds_of_day = divmod(seconds, 86400)
+        # 已到收盘时间的最后一根1分钟K线序号
+        closed_minutes = int(np.searchsorted(self.close_seconds, seconds_of_day, side='right'))
+
+        bars = []
+        with self._lock:
+            n = len(self.codes)
+            days = self.day[:n]
+            for state in self.periods:
+                last_bucket = closed_minutes // state.minutes - 1
+                bucket = state.bucket[:n]
+                # 当日到时的K线和之前交易日未收盘的K线
+                rows = np.nonzero((bucket >= 0) & (((days == day) & (bucket <= last_bucket)) | (days < day)))[0]
+                for row in rows:
+                    self._close_bar(state, row, bars)
+                if self.fill_empty and last_bucket >= 0:
+                    emitted = state.emitted[:n]
+                    rows = np.nonzero((days == day) & (state.bucket[:n] < 0) & (emitted >= 0) & (emitted < last_bucket))[0]
+                    for row in rows:
+                        self._fill_bars(state, row, last_bucket, bars)
+            self._pending.extend(bars)
+        self._emit()
+
+    def close_out(self, stock_codes=None):
+        """
+        立即收盘未收盘的K线
+
+        参数:
+            stock_codes (list): 股票代码列表，默认为None表示全部股票
+        """
+        bars = []
+        with self._lock:
+            codes = self.codes if stock_codes is None else stock_codes
+            for stock_code in codes:
+                row = self.index.get(stock_code)
+                if row is not None:
+                    self._close_row(row, bars)
+            self._pending.extend(bars)
+        self._emit()
+
+    def reset(self, stock_codes=None):
+        """
+        清除股票的K线状态，不推送未收盘的K线，取消订阅的股票不再由flush补齐K线
+
+        参数:
+            stock_codes (list): 股票代码列表，默认为None表示全部股票
+        """
+        with self._lock:
+            codes = self.codes if stock_codes is None else stock_codes
+            for stock_code in codes:
+                row = self.index.get(stock_code)
+                if row is None:
+                    continue
+                self.day[row] = -1
+                for state in self.periods:
+                    state.bucket[row] = -1
+                    state.emitted[row] = -1
+
+    def _emit(self):
+        # 按加入队列的顺序推送，其他线程在此期间加入的K线也由持有推送锁的线程一并推送
+        with self._emit_lock:
+            while self._pending:
+                handler, bar = self._pending.popleft()
+                try:
+                    handler(bar)
+                except Exception as e:
+                    self.stats['处理异常'] += 1
+                    logger.error(f"{RED}【K线处理异常】{RESET} 股票:{bar.stock_code} 时间:{bar.time} 错误:{e}")
+
+    # ------------------------------------------------------------------ 查询
+
+    def get_vwap(self, stock_code):
+        """
+        获取当日分时均价（累计成交额/累计成交股数）
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+
+        返回:
+            float: 分时均价，成交量按get_volume_unit换算为股数，没有成交时返回None
+        """
+        row = self.index.get(stock_code)
+        if row is None or self.cum_volume[row] <= 0:
+            return None
+        return float(self.cum_amount[row] / (self.cum_volume[row] * get_volume_unit(stock_code)))
+
+    def get_cumulative(self, stock_code):
+        """
+        获取最新分笔行情的当日累计成交额和成交量
+
+        分笔行情中的累计值由交易所从开盘起累计，与合成器何时开始接收行情无关，
+        盘中重启后据此计算的分时均价仍为全天均价。
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+
+        返回:
+            tuple: (交易日date, 累计成交额, 累计成交量（手）)，没有该股票的分笔行情时返回None
+        """
+        row = self.index.get(stock_code)
+        if row is None or self.day[row] < 0:
+            return None
+        day = (datetime(1970, 1, 1) + timedelta(days=int(self.day[row]))).date()
+        return day, float(self.cum_amount[row]), float(self.cum_volume[row])
+
+    def get_stats(self):
+        """
+        获取合成统计
+
+        返回:
+            dict: 包含分笔数量、过期分笔、推送K线、补齐K线、处理异常和股票数量
+        """
+        return {**self.stats, '股票数量': len(self.codes)}
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+本地K线列式存储模块
+
+该模块将日线和分钟线历史数据保存为本地列式文件，读取时通过内存映射直接返回NumPy视图，
+选股、回测等批量读取不再经过QMT终端，也不再逐只转换为DataFrame。
+
+存储结构：
+    {root}/{period}/{partition}/
+        meta.json       分区元数据：股票代码列表、字段列表、已写入行数
+        time.i8         时间列，int64，格式为YYYYMMDD（日线）或YYYYMMDDHHMMSS（分钟线）
+        {field}.f8      字段列，float64，按(时间, 股票)行优先存放
+
+分区规则：
+    - 日线及以上周期按年分区，如 1d/2025
+    - 分钟线按交易日分区，如 1m/20250102
+
+每个分区按时间行优先存放，收盘后追加新的一行只需在文件末尾写入一行数据；
+出现新股票时重写该分区并扩展列。读取返回的数组形状为(股票数, 时间数)，
+与CustomData.get_qmt_daily_panel保持一致。
+"""
+
+import json
+import os
+
+import numpy as np
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+# 默认存储的K线字段，与xtdata.get_market_data_ex不指定字段时返回的K线字段（time除外）一致
+DEFAULT_BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'settelementPrice', 'openInterest',
+                      'preClose', 'suspendFlag']
+
+# 按年分区的周期，其余周期按交易日分区
+YEARLY_PARTITION_PERIODS = {'1d', '1w', '1mon', '1q', '1hy', '1y'}
+
+
+def to_time_int(value):
+    """
+    将时间转换为存储使用的整数格式
+
+    参数:
+        value: 时间，支持'20250102'、'20250102093100'、'2025-01-02 09:31:00'等字符串，
+            datetime/Timestamp对象，或已是整数格式的时间
+
+    返回:
+        int: YYYYMMDD或YYYYMMDDHHMMSS格式的整数
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if hasattr(value, 'strftime'):
+        if value.hour == 0 and value.minute == 0 and value.second == 0:
+            return int(value.strftime('%Y%m%d'))
+        return int(value.strftime('%Y%m%d%H%M%S'))
+    digits = ''.join(ch for ch in str(value) if ch.isdigit())
+    return int(digits)
+
+
+class BarStore:
+    """
+    本地K线列式存储
+
+    提供增量追加和内存映射读取，读取全市场数据时返回零拷贝的NumPy视图。
+    """
+
+    def __init__(self, root='data/bars'):
+        """
+        初始化存储
+
+        参数:
+            root (str): 存储根目录，默认为'data/bars'
+        """
+        self.root = root
+        self._partition_cache = {}  # 已打开的分区，格式：{(period, partition): (meta, times, {field: memmap})}
+
+    # ------------------------------------------------------------------ 路径与元数据
+
+    def _partition_key(self, period, time_int):
+        text = str(time_int)
+        return text[:4] if period in YEARLY_PARTITION_PERIODS else text[:8]
+
+    def _partition_dir(self, period, partition):
+        return os.path.join(self.root, period, partition)
+
+    def _read_meta(self, period, partition):
+        meta_path = os.path.join(self._partition_dir(period, partition), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, period, partition, meta):
+        partition_dir = self._partition_dir(period, partition)
+        meta_path = os.path.join(partition_dir, 'meta.json')
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        # 元数据中的行数是已提交数据的唯一依据，原子替换保证中断时不会读到半行
+        os.replace(tmp_path, meta_path)
+
+    def list_partitions(self, period):
+        """
+        列出指定周期已有的分区
+
+        参数:
+            period (str): 数据周期
+
+        返回:
+            list: 按时间升序排列的分区名列表
+        """
+        period_dir = os.path.join(self.root, period)
+        if not os.path.isdir(period_dir):
+            return []
+        return sorted(name for name in os.listdir(period_dir)
+                      if os.path.exists(os.path.join(period_dir, name, 'meta.json')))
+
+    def has_period(self, period):
+        """
+        判断存储中是否有指定周期的数据
+
+        参数:
+            period (str): 数据周期
+
+        返回:
+            bool: 有数据返回True
+        """
+        return len(self.list_partitions(period)) > 0
+
+    # ------------------------------------------------------------------ 写入
+
+    def append(self, period, codes, times, data, replace=False):
+        """
+        追加K线数据
+
+        已存在的时间会被跳过，因此对同一段数据重复调用是安全的，收盘后可直接追加当天数据。
+        replace为True时改为覆盖：各分区中不早于本次第一个时间的已存储数据先被删除，再写入本次数据，
+        用于修正盘中写入的未完成K线，本次数据需包含从第一个时间起的全部时间。
+
+        参数:
+            period (str): 数据周期，如'1d'、'1m'
+            codes (list): 股票代码列表，与数组的行对应
+            times (list): 时间列表，与数组的列对应，格式见to_time_int
+            data (dict): {字段: numpy.ndarray}，形状为(股票数, 时间数)
+            replace (bool): 是否覆盖已存储的时间，默认为False
+
+        返回:
+            int: 实际写入的行数（时间数）
+        """
+        if not codes or len(times) == 0 or not data:
+            return 0
+
+        time_ints = np.array([to_time_int(t) for t in times], dtype=np.int64)
+        order = np.argsort(time_ints, kind='stable')
+        time_ints = time_ints[order]
+        data = {field: np.asarray(values, dtype=np.float64)[:, order] for field, values in data.items()}
+
+        written = 0
+        partitions = np.array([self._partition_key(period, t) for t in time_ints])
+        for partition in dict.fromkeys(partitions):
+            columns = np.nonzero(partitions == partition)[0]
+            written += self._append_partition(period, partition, list(codes), time_ints[columns],
+                                              {field: values[:, columns] for field, values in data.items()}, replace)
+        return written
+
+    def _append_partition(self, period, partition, codes, time_ints, data, replace=False):
+        partition_dir = self._partition_dir(period, partition)
+        # 写入前释放该分区的内存映射，Windows下被映射的文件无法截断或替换
+        self._partition_cache.pop((period, partition), None)
+        meta = self._read_meta(period, partition)
+        if meta is None:
+            os.makedirs(partition_dir, exist_ok=True)
+            meta = {'codes': [], 'fields': list(data.keys()), 'rows': 0}
+            for name in ['time.i8'] + [f"{field}.f8" for field in meta['fields']]:
+                open(os.path.join(partition_dir, name), 'wb').close()
+
+        # 覆盖时先提交删除后的行数，中断后再次同步会重新写入被删除的时间
+        if replace and meta['rows'] > 0:
+            stored_times = np.fromfile(os.path.join(partition_dir, 'time.i8'), dtype='<i8', count=meta['rows'])
+            rows = int(np.searchsorted(stored_times, time_ints[0], side='left'))
+            if rows < meta['rows']:
+                meta['rows'] = rows
+                self._write_meta(period, partition, meta)
+
+        # 丢弃已存储的时间，保证增量追加幂等
+        if meta['rows'] > 0:
+            keep = time_ints > self._read_last_time(partition_dir, meta['rows'])
+            if not keep.any():
+                return 0
+            time_ints = time_ints[keep]
+            data = {field: values[:, keep] for field, values in data.items()}
+
+        # 出现新股票或新字段时扩展分区
+        stored_codes = set(meta['codes'])
+        new_codes = [code for code in codes if code not in stored_codes]
+        new_fields = [field for field in data if field not in meta['fields']]
+        if new_codes or new_fields:
+            meta = self._extend_partition(period, partition, meta, new_codes, new_fields)
+
+        # 按分区的股票顺序重排，缺失的股票填NaN
+        column_index = {code: i for i, code in enumerate(meta['codes'])}
+        target = np.array([column_index[code] for code in codes], dtype=np.int64)
+        n_codes = len(meta['codes'])
+        n_rows = len(time_ints)
+
+        self._truncate_to(partition_dir, 'time.i8', meta['rows'] * 8)
+        with open(os.path.join(partition_dir, 'time.i8'), 'ab') as f:
+            f.write(time_ints.astype('<i8').tobytes())
+        for field in meta['fields']:
+            block = np.full((n_rows, n_codes), np.nan, dtype='<f8')
+            if field in data:
+                block[:, target] = data[field].T
+            self._truncate_to(partition_dir, f"{field}.f8", meta['rows'] * n_codes * 8)
+            with open(os.path.join(partition_dir, f"{field}.f8"), 'ab') as f:
+                f.write(block.tobytes())
+
+        meta['rows'] += n_rows
+        self._write_meta(period, partition, meta)
+        return n_rows
+
+    def _extend_partition(self, period, partition, meta, new_codes, new_fields):
+        partition_dir = self._partition_dir(period, partition)
+        old_codes = len(meta['codes'])
+        codes = meta['codes'] + new_codes
+        fields = meta['fields'] + new_fields
+        rows = meta['rows']
+        logger.debug(f"{BLUE}【K线存储】{RESET} 扩展分区 {period}/{partition} 新增股票:{len(new_codes)}只 新增字段:{new_fields}")
+
+        for field in fields:
+            block = np.full((rows, len(codes)), np.nan, dtype='<f8')
+            if field in meta['fields'] and rows > 0:
+                block[:, :old_codes] = self._load_column(partition_dir, f"{field}.f8", np.float64, (rows, old_codes))
+            path = os.path.join(partition_dir, f"{field}.f8")
+            with open(path + '.tmp', 'wb') as f:
+                f.write(block.tobytes())
+            os.replace(path + '.tmp', path)
+
+        meta = {'codes': codes, 'fields': fields, 'rows': rows}
+        self._write_meta(period, partition, meta)
+        return meta
+
+    @staticmethod
+    def _read_last_time(partition_dir, rows):
+        with open(os.path.join(partition_dir, 'time.i8'), 'rb') as f:
+            f.seek((rows - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype='<i8')[0])
+
+    @staticmethod
+    def _truncate_to(partition_dir, name, size):
+        # 丢弃上次中断写入时残留的未提交数据
+        path = os.path.join(partition_dir, name)
+        if os.path.getsize(path) != size:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+    @staticmethod
+    def _load_column(partition_dir, name, dtype, shape):
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(partition_dir, name), dtype=np.dtype(dtype).newbyteorder('<'),
+                         mode='r', shape=shape)
+
+    # ------------------------------------------------------------------ 读取
+
+    def _open_partition(self, period, partition):
+        key = (period, partition)
+        cached = self._partition_cache.get(key)
+        if cached is not None:
+            return cached
+        meta = self._read_meta(period, partition)
+        if meta is None or meta['rows'] == 0:
+            return None
+        partition_dir = self._partition_dir(period, partition)
+        shape = (meta['rows'], len(meta['codes']))
+        times = self._load_column(partition_dir, 'time.i8', np.int64, (meta['rows'],))
+        columns = {field: self._load_column(partition_dir, f"{field}.f8", np.float64, shape)
+                   for field in meta['fields']}
+        opened = (meta, times, columns)
+        self._partition_cache[key] = opened
+        return opened
+
+    def read(self, period, codes=None, fields=None, start_time=None, end_time=None, count=None):
+        """
+        读取K线数据
+
+        在单个分区内读取全部股票时，返回的数组是内存映射文件的转置视图，不发生拷贝；
+        指定股票子集或跨分区读取时才会拷贝数据。
+
+        参数:
+            period (str): 数据周期
+            codes (list): 股票代码列表，默认为None表示全部股票
+            fields (list): 字段列表，默认为None表示全部字段
+            start_time: 起始时间（含），默认为None表示不限
+            end_time: 结束时间（含），默认为None表示不限
+            count (int): 数据条数，默认为None；指定时以end_time为基准向前取count条
+
+        返回:
+            tuple: 包含三个元素的元组
+                - codes (list): 股票代码列表，与数组的行对应
+                - times (numpy.ndarray): int64时间数组，与数组的列对应
+                - data (dict): {字段: numpy.ndarray}，形状为(股票数, 时间数)，缺失数据为NaN
+            存储中没有数据时返回([], 空数组, {})
+        """
+        start_int = self._normalize_bound(period, start_time, is_end=False)
+        end_int = self._normalize_bound(period, end_time, is_end=True)
+
+        # 从最新的分区向前收集，直到满足count
+        selected = []
+        collected = 0
+        for partition in reversed(self.list_partitions(period)):
+            if start_int is not None and partition < self._partition_key(period, start_int):
+                break
+            if end_int is not None and partition > self._partition_key(period, end_int):
+                continue
+            opened = self._open_partition(period, partition)
+            if opened is None:
+                continue
+            meta, times, columns = opened
+            lo = 0 if start_int is None else int(np.searchsorted(times, start_int, side='left'))
+            hi = len(times) if end_int is None else int(np.searchsorted(times, end_int, side='right'))
+            if count is not None:
+                lo = max(lo, hi - (count - collected))
+            if hi <= lo:
+                continue
+            selected.append((meta, times, columns, lo, hi))
+            collected += hi - lo
+            if count is not None and collected >= count:
+                break
+
+        if not selected:
+            return [], np.empty(0, dtype=np.int64), {}
+        selected.reverse()
+
+        if fields is None:
+            fields = list(dict.fromkeys(field for meta, *_ in selected for field in meta['fields']))
+
+        # 单分区读取全部股票：直接返回内存映射的转置视图
+        if len(selected) == 1:
+            meta, times, columns, lo, hi = selected[0]
+            if codes is None or list(codes) == meta['codes']:
+                data = {field: columns[field][lo:hi].T for field in fields if field in columns}
+                return list(meta['codes']), times[lo:hi], data
+
+        # 多分区或股票子集：按请求的股票顺序拼接
+        if codes is None:
+            codes = list(dict.fromkeys(code for meta, *_ in selected for code in meta['codes']))
+        codes = list(codes)
+        total = sum(hi - lo for *_, lo, hi in selected)
+        data = {field: np.full((len(codes), total), np.nan, dtype=np.float64) for field in fields}
+        time_parts = []
+        offset = 0
+        for meta, times, columns, lo, hi in selected:
+            column_index = {code: i for i, code in enumerate(meta['codes'])}
+            rows = [i for i, code in enumerate(codes) if code in column_index]
+            source = [column_index[codes[i]] for i in rows]
+            for field in fields:
+                if field in columns:
+                    data[field][rows, offset:offset + hi - lo] = columns[field][lo:hi][:, source].T
+            time_parts.append(times[lo:hi])
+            offset += hi - lo
+        return codes, np.concatenate(time_parts), data
+
+    @staticmethod
+    def _normalize_bound(period, value, is_end):
+        # 日线只比较日期部分；分钟线只给出日期时补齐到当天的开始或结束
+        if value is None or value == '':
+            return None
+        text = str(to_time_int(value))
+        if period in YEARLY_PARTITION_PERIODS:
+            return int(text[:8])
+        if len(text) == 8:
+            return int(text + ('235959' if is_end else '000000'))
+        return int(text)
+
+    def get_codes(self, period, partition=None):
+        """
+        获取指定周期已存储的股票代码
+
+        参数:
+            period (str): 数据周期
+            partition (str): 分区名，默认为None表示最新分区
+
+        返回:
+            list: 股票代码列表
+        """
+        partitions = self.list_partitions(period)
+        if not partitions:
+            return []
+        meta = self._read_meta(period, partition or partitions[-1])
+        return list(meta['codes']) if meta else []
+
+    def get_fields(self, period, partition=None):
+        """
+        获取指定周期已存储的字段
+
+        参数:
+            period (str): 数据周期
+            partition (str): 分区名，默认为None表示最新分区
+
+        返回:
+            list: 字段列表
+        """
+        partitions = self.list_partitions(period)
+        if not partitions:
+            return []
+        meta = self._read_meta(period, partition or partitions[-1])
+        return list(meta['fields']) if meta else []
+
+    def get_last_time(self, period):
+        """
+        获取指定周期最后一条数据的时间
+
+        参数:
+            period (str): 数据周期
+
+        返回:
+            int或None: 最后一条数据的时间，没有数据时返回None
+        """
+        for partition in reversed(self.list_partitions(period)):
+            opened = self._open_partition(period, partition)
+            if opened is not None:
+                return int(opened[1][-1])
+        return None
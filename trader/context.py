@@ -20,6 +20,13 @@ from xtquant import xtconstant
 from trader.constant import QMT_POSITIONS_FIELD_MAPPING, QMT_ASSET_FIELD_MAPPING, QMT_ORDERS_FIELD_MAPPING, \
     QMT_TRADES_FIELD_MAPPING
 from trader.data import custom_data
+from trader.account_book import AccountBook
+from trader.order_manager import OrderManager
+from trader.scheduler import Scheduler
+from trader.async_orders import AsyncOrderSubmitter
+from trader.quote_hub import QuoteHub
+from trader.profiler import profiled
+from trader.instrument_snapshot import SNAPSHOT_READY_TIME
 from trader.utils import add_stock_suffix, calculate_shares
 from trader.logger import logger
 from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
@@ -74,7 +81,7 @@ class Context:
                 return getattr(obj, name)
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
     
-    def __init__(self, xt_trader, account, mode=0, strategy_name=''):
+    def __init__(self, xt_trader, account, mode=0, strategy_name='', max_in_flight_orders=None):
         """
         初始化交易上下文对象。
         
@@ -83,20 +90,82 @@ class Context:
             account (str): 交易账户
             mode (int): 交易模式，0表示实盘，1表示模拟盘
             strategy_name (str): 策略名称，用于标识订单来源
+            max_in_flight_orders (int): 异步下单的最大在途委托数量，None表示不限制
         """
         self.tasks = []  # 定时任务列表
+        self.scheduler = Scheduler()  # 定时任务调度器
         self.xt_trader = xt_trader  # QMT交易接口
         self.custom_data = custom_data  # 自定义数据接口
         self.qmt_account = account  # 交易账户
         self.strategy_name = strategy_name  # 策略名称
         self.is_simulate = mode == 1  # 是否为模拟盘
         self.callbacks = {}  # 回调函数字典
+        self.account_book = AccountBook()  # 持仓和资产簿记
+        self.order_manager = OrderManager(cancel_func=self.cancel_order, query_func=self.query_order)  # 委托生命周期管理
+        self.async_orders = AsyncOrderSubmitter(xt_trader, account, self.order_manager,
+                                                max_in_flight=max_in_flight_orders)  # 异步下单
+        self.quote_hub = QuoteHub(xtdata.subscribe_quote, xtdata.subscribe_whole_quote,
+                                  xtdata.unsubscribe_quote)  # 行情订阅中心
+        self.quote_seqs = {}  # subscribe_quote的订阅号，格式：{stock_code: [seq1, seq2, ...]}
+
+        # 注册到交易回调，由持仓、资产、委托和成交推送维护簿记和委托状态，并以同步查询初始化簿记
+        callback = getattr(xt_trader, 'callback', None)
+        if hasattr(callback, 'add_listener'):
+            callback.add_listener(self.account_book)
+            callback.add_listener(self.order_manager)
+            callback.add_listener(self.async_orders)
+        if xt_trader is not None:
+            self.refresh_account_book()
+            self.order_manager.start()
+            # 定期与柜台对账，并启动定时任务调度
+            self.scheduler.run_time(self.refresh_account_book, f"{self.account_book.reconcile_interval}nSecond",
+                                    name='refresh_account_book')
+            # 没有收到柜台反馈的异步委托按失败处理，避免一直占用在途名额
+            self.scheduler.run_time(self.async_orders.expire, "1nSecond", name='expire_async_orders')
+            # 当日涨跌停价就绪后预先构建合约信息快照，避免在行情回调中构建
+            self.scheduler.run_daily(self.custom_data.get_instrument_snapshot,
+                                     SNAPSHOT_READY_TIME.strftime('%H:%M:%S'), name='instrument_snapshot')
+            self.scheduler.start()
+
+    def refresh_account_book(self):
+        """
+        以同步查询结果初始化或对账持仓和资产簿记
+
+        首次调用时初始化簿记，之后每次调用与簿记对账，发现偏差时记录日志并以查询结果为准。
+
+        返回:
+            bool: 查询是否成功
+        """
+        try:
+            positions = self.xt_trader.query_stock_positions(self.qmt_account)
+            asset = self.xt_trader.query_stock_asset(self.qmt_account)
+        except Exception as e:
+            logger.error(f"{RED}【簿记同步异常】{RESET} 账户:{self.qmt_account} 错误:{e}")
+            return False
+        if positions is None or asset is None:
+            logger.error(f"{RED}【簿记同步失败】{RESET} 账户:{self.qmt_account} 查询返回为None")
+            return False
+
+        if self.account_book.seeded:
+            drift = self.account_book.reconcile(positions, asset)
+            if drift:
+                logger.warning(f"{YELLOW}【簿记对账】{RESET} 发现偏差:{drift}项 已以柜台数据为准")
+        else:
+            self.account_book.seed(positions, asset)
+        return True
+
+    def _ensure_account_book(self):
+        # 返回簿记是否可用。读取发生在行情回调线程，不在这里发起同步查询，
+        # 簿记由交易推送和定时任务refresh_account_book维护，未初始化时调用方回退到同步查询
+        return self.account_book.seeded
     
     # 提供明确的xtdata接口方法
     def subscribe_quote(self, stock_code, period, callback):
         """
         订阅股票行情数据
         
+        每次订阅单独注册一个回调，多只股票共用回调时推荐使用quote_hub
+        
         参数:
             stock_code (str): 股票代码，如 '000001.SZ'
             period (str): 行情周期，支持 '1m'、'5m'、'15m'、'1d'、'tick' 等
@@ -106,7 +175,11 @@ class Context:
             bool: 订阅是否成功
         """
         try:
-            xtdata.subscribe_quote(stock_code, period=period, callback=callback)
+            seq = xtdata.subscribe_quote(stock_code, period=period, callback=callback)
+            if seq is None or seq < 0:
+                logger.error(f"{RED}【订阅失败】{RESET} 股票:{stock_code} 周期:{period} 订阅号:{seq}")
+                return False
+            self.quote_seqs.setdefault(stock_code, []).append(seq)
             return True
         except Exception as e:
             logger.error(f"{RED}【订阅失败】{RESET} 股票:{stock_code} 周期:{period} 错误:{e}")
@@ -116,14 +189,21 @@ class Context:
         """
         取消订阅股票行情数据
         
+        取消该股票通过subscribe_quote订阅的全部周期
+        
         参数:
             stock_code (str): 股票代码，如 '000001.SZ'
             
         返回:
             bool: 取消订阅是否成功
         """
+        seqs = self.quote_seqs.pop(stock_code, None)
+        if not seqs:
+            logger.warning(f"{YELLOW}【取消订阅】{RESET} 股票:{stock_code} 没有订阅记录")
+            return False
         try:
-            xtdata.unsubscribe_quote(stock_code)
+            for seq in seqs:
+                xtdata.unsubscribe_quote(seq)
             return True
         except Exception as e:
             logger.error(f"{RED}【取消订阅失败】{RESET} 股票:{stock_code} 错误:{e}")
@@ -194,17 +274,15 @@ class Context:
             period (str): 周期字符串，例如 "5nSecond"（5秒）、"1nMinute"（1分钟）
             
         返回:
-            None
+            dict: 任务记录，可通过context.scheduler.get_stats()查询执行统计
             
         示例:
             # 每5秒执行一次update函数
             context.run_time(update, "5nSecond")
         """
-        self.tasks.append({
-            "func": func,
-            "period": period,
-            "type": "time"
-        })
+        task = self.scheduler.run_time(func, period)
+        self.tasks.append(task)
+        return task
 
     def run_daily(self, func, time):
         """
@@ -215,18 +293,17 @@ class Context:
             time (str): 执行时间字符串，格式为"HH:MM:SS"，例如 "09:30:00"（每天上午9点30分执行）
             
         返回:
-            None
+            dict: 任务记录，可通过context.scheduler.get_stats()查询执行统计
             
         示例:
             # 每天开盘时执行open_market函数
             context.run_daily(open_market, "09:30:00")
         """
-        self.tasks.append({
-            "func": func,
-            "period": time,
-            "type":"daily"
-        })
+        task = self.scheduler.run_daily(func, time)
+        self.tasks.append(task)
+        return task
 
+    @profiled('Context.get_positions', kind='context')
     def get_positions(self):
         """
         查询并返回账户的持仓信息。
@@ -234,6 +311,12 @@ class Context:
         返回:
             pd.DataFrame: 包含账户持仓信息的 DataFrame。
         """
+        if self._ensure_account_book():
+            positions = self.account_book.get_positions()
+            if not positions:
+                return pd.DataFrame(columns=QMT_POSITIONS_FIELD_MAPPING.keys())
+            return pd.DataFrame(positions, columns=list(QMT_POSITIONS_FIELD_MAPPING.keys()))
+
         positions = self.xt_trader.query_stock_positions(self.qmt_account)
         if not positions:
             return pd.DataFrame(columns=QMT_POSITIONS_FIELD_MAPPING.keys())
@@ -243,6 +326,7 @@ class Context:
         ])
         return df
 
+    @profiled('Context.get_position', kind='context')
     def get_position(self, security='000001.SZ'):
         """
         查询并返回指定股票代码的持仓信息。
@@ -253,6 +337,9 @@ class Context:
         返回:
             dict: 包含指定股票持仓信息的字典。如果未找到该股票的持仓信息，则返回 None。
         """
+        if self._ensure_account_book():
+            return self.account_book.get_position(add_stock_suffix(security))
+
         positions = self.get_positions()
         if positions.empty:
             return None
@@ -293,6 +380,7 @@ class Context:
             return position['可用数量']
         return None
 
+    @profiled('Context.get_asset', kind='context')
     def get_asset(self):
         """
         查询并返回账户资产信息。
@@ -300,6 +388,9 @@ class Context:
         返回:
             dict: 包含账户资产信息的字典。如果查询失败，则返回None。
         """
+        if self._ensure_account_book() and self.account_book.asset is not None:
+            return self.account_book.get_asset()
+
         try:
             asset_info = self.xt_trader.query_stock_asset(self.qmt_account)
             if asset_info is None:
@@ -522,10 +613,165 @@ class Context:
                                               price_type, price,
                                               strategy_name,
                                               remark)
+        # 下单成功后登记到订单管理器，由交易推送跟踪委托状态
+        if order_id is not None and order_id > 0:
+            self.order_manager.track(order_id, add_stock_suffix(security), side, amount, remark)
         return order_id
 
         return None
 
+    @profiled('Context.order_async', kind='context')
+    def order_async(self, security='000001.SZ', amount=100, price=0, strategy_name='', remark='', timeout=None):
+        """
+        异步买卖标的。与order相同的校验后通过order_stock_async下单，不等待柜台返回订单编号，
+        适用于在行情回调中连续发出多笔委托。
+
+        参数:
+            security (str): 股票代码，默认为 '000001.SZ'。
+            amount (int): 交易数量，正数表示买入，负数表示卖出。
+            price (float): 交易价格，0 表示市价单，非 0 表示限价单。
+            strategy_name (str): 策略名称，用于记录订单来源。
+            remark (str): 备注信息，用于记录订单的额外说明。
+            timeout (float): 超时撤单秒数，None表示不超时。
+
+        返回:
+            Future: 结果为订单编号，柜台拒绝时为-1；Future.seq为下单请求序号。
+                如果条件不满足或在途委托已达上限，则返回 None。
+        """
+        if amount == 0:
+            logger.warning(
+                f"{YELLOW}【数据校验】{RESET} 标的：{security}  方向：[{'买入' if amount > 0 else '卖出'}]  交易数量：{amount} 交易价格：{ price if price > 0 else '市价'}")
+            return None
+        side = xtconstant.STOCK_BUY if amount > 0 else xtconstant.STOCK_SELL
+        amount = abs(amount)
+        price_type = xtconstant.FIX_PRICE if price > 0 else xtconstant.LATEST_PRICE
+        strategy_name = self.strategy_name if strategy_name == '' else strategy_name
+        # 检查订单是否有效，如果是模拟盘则直接下单，如果是实盘则需要先校验
+        if not self.is_simulate and not self.order_check(security=security, side=side, amount=amount, price=price):
+            return None
+
+        return self.async_orders.submit(add_stock_suffix(security), side, amount, price_type, price,
+                                        strategy_name, remark, timeout=timeout)
+
+    @profiled('Context.order_value_async', kind='context')
+    def order_value_async(self, security='000001.SZ', value=None, price=0, strategy_name='', remark='', timeout=None):
+        """
+        异步买卖价值为value的标的。
+
+        参数:
+            security (str): 股票代码，默认为 '000001.SZ'。
+            value (float): 股票价值，value = 最新价 * 手数 * 保证金率（股票为1） * 乘数（股票为100）。
+            price (float): 交易价格，0 表示市价单，非 0 表示限价单。
+            strategy_name (str): 策略名称，用于记录订单来源。
+            remark (str): 备注信息，用于记录订单的额外说明。
+            timeout (float): 超时撤单秒数，None表示不超时。
+
+        返回:
+            Future: 同order_async。
+        """
+        current_price = price
+        if price == 0:
+            current_price = self.get_latest_price(security)
+        # 计算股票数量
+        amount = calculate_shares(value, current_price)
+        return self.order_async(security, amount, price, strategy_name, remark, timeout=timeout)
+
+    def order_target_async(self, security='000001.SZ', amount=100, price=0, strategy_name='', remark='', timeout=None):
+        """
+        异步买卖标的，使最终标的的数量达到指定的amount。
+        指定标的的未完成订单通过cancel_security_order_async撤销，持仓取自簿记，不查询柜台。
+
+        参数:
+            security (str): 股票代码，默认为 '000001.SZ'。
+            amount (int): 目标持仓数量。
+            price (float): 交易价格，0 表示市价单，非 0 表示限价单。
+            strategy_name (str): 策略名称，用于记录订单来源。
+            remark (str): 备注信息，用于记录订单的额外说明。
+            timeout (float): 超时撤单秒数，None表示不超时。
+
+        返回:
+            Future: 同order_async。
+        """
+        position = self.get_position(security=security)
+        if position is not None:
+            amount = amount - position['持仓数量']
+        self.cancel_security_order_async(security=security)
+        return self.order_async(security, amount, price, strategy_name, remark, timeout=timeout)
+
+    def order_target_value_async(self, security='000001.SZ', value=None, price=0, strategy_name='', remark='',
+                                 timeout=None):
+        """
+        异步买卖目标价值为value的标的。
+
+        参数:
+            security (str): 股票代码，默认为 '000001.SZ'。
+            value (float): 股票价值，value = 最新价 * 手数 * 保证金率（股票为1） * 乘数（股票为100）。
+            price (float): 交易价格，0 表示市价单，非 0 表示限价单。
+            strategy_name (str): 策略名称，用于记录订单来源。
+            remark (str): 备注信息，用于记录订单的额外说明。
+            timeout (float): 超时撤单秒数，None表示不超时。
+
+        返回:
+            Future: 同order_async。
+        """
+        if price == 0:
+            price = self.get_latest_price(security)
+        position = self.get_position(security=security)
+        if position is not None:
+            value = value - position['持仓市值']
+        # 计算股票数量
+        amount = calculate_shares(value, price)
+        self.cancel_security_order_async(security=security)
+        return self.order_async(security, amount, price, strategy_name, remark, timeout=timeout)
+
+    def order_position_async(self, security='000001.SZ', percent=None, price=0, strategy_name='', remark='',
+                             timeout=None):
+        """
+        异步买卖仓位为position的标的。
+
+        参数:
+            security (str): 股票代码，默认为 '000001.SZ'。
+            percent (float): 股票仓位，基数为1，买入20%就传0.2，卖出20%就传-0.2。
+            price (float): 交易价格，0 表示市价单，非 0 表示限价单。
+            strategy_name (str): 策略名称，用于记录订单来源。
+            remark (str): 备注信息，用于记录订单的额外说明。
+            timeout (float): 超时撤单秒数，None表示不超时。
+
+        返回:
+            Future: 同order_async。
+        """
+        if percent is None:
+            logger.warning(f"{YELLOW}【数据校验】{RESET} {security} 交易仓位：{percent}")
+            return None
+        value = percent * self.get_total_asset()
+        return self.order_value_async(security, value, price, strategy_name, remark, timeout=timeout)
+
+    def order_target_position_async(self, security='000001.SZ', percent=None, price=0, strategy_name='', remark='',
+                                    timeout=None):
+        """
+        异步买卖目标仓位为position的标的。
+
+        参数:
+            security (str): 股票代码，默认为 '000001.SZ'。
+            percent (float): 股票仓位，基数为1，买入20%就传0.2，卖出20%就传-0.2。
+            price (float): 交易价格，0 表示市价单，非 0 表示限价单。
+            strategy_name (str): 策略名称，用于记录订单来源。
+            remark (str): 备注信息，用于记录订单的额外说明。
+            timeout (float): 超时撤单秒数，None表示不超时。
+
+        返回:
+            Future: 同order_async。
+        """
+        if percent is None:
+            logger.warning(f"{YELLOW}【数据校验】{RESET} {security} 目标仓位：{percent}")
+            return None
+        current_position = self.get_security_percent(security=security)
+        if current_position is not None:
+            percent = percent - current_position
+        value = percent * self.get_total_asset()
+        self.cancel_security_order_async(security=security)
+        return self.order_value_async(security, value, price, strategy_name, remark, timeout=timeout)
+
     def order_target(self, security='000001.SZ', amount=100, price=0, strategy_name='', remark=''):
         """
         买卖标的, 使最终标的的数量达到指定的amount。
@@ -668,6 +914,22 @@ class Context:
             return cancel_result
         return None
 
+    def query_order(self, order_id):
+        """
+        查询单个委托的最新状态
+
+        参数:
+            order_id (int): 同步下单接口返回的订单编号
+
+        返回:
+            XtOrder或None: 委托对象，查询失败时返回None
+        """
+        try:
+            return self.xt_trader.query_stock_order(self.qmt_account, order_id)
+        except Exception as e:
+            logger.error(f"{RED}【委托查询失败】{RESET} 订单ID:{order_id} 错误:{e}")
+            return None
+
     def cancel_all_order(self):
         """
         撤销当前账户的所有可撤销订单。
@@ -728,6 +990,23 @@ class Context:
                 cancel_result.append(result)
         return cancel_result
 
+    def cancel_security_order_async(self, security='000001.SZ'):
+        """
+        异步撤销指定标的的所有未完成订单。
+
+        未完成订单取自订单管理器，撤单通过cancel_order_stock_async发出，不查询柜台也不等待撤单结果，
+        撤单结果由委托推送更新到订单管理器。
+
+        参数:
+            security (str): 股票代码，支持带后缀和不带后缀的格式
+
+        返回:
+            list: 撤单请求序号列表，-1表示撤单请求发送失败
+        """
+        return [self.xt_trader.cancel_order_stock_async(self.qmt_account, record['order_id'])
+                for record in self.order_manager.get_open_orders(add_stock_suffix(security))]
+
+    @profiled('Context.get_latest_price', kind='context')
     def get_latest_price(self, security='000001.SZ'):
         """
         获取指定标的的最新市场价格。
@@ -759,11 +1038,12 @@ class Context:
             logger.error(f"获取最新价格失败: {e}")
             return 0
 
+    @profiled('Context.get_security_name', kind='context')
     def get_security_name(self, security='000001.SZ'):
         """
         获取指定标的的证券名称。
         
-        该方法通过QMT接口获取指定证券代码对应的证券名称。如果交易接口未初始化，则返回空字符串。
+        该方法优先从当日合约信息快照获取证券名称，快照中没有时通过QMT接口查询。如果交易接口未初始化，则返回空字符串。
         通常用于日志记录或界面显示，提高可读性。
         
         参数:
@@ -780,6 +1060,9 @@ class Context:
         if self.xt_trader is None:
             return ''
         security = add_stock_suffix(security)
+        snapshot = self.custom_data.get_instrument_snapshot()
+        if snapshot is not None and security in snapshot:
+            return str(snapshot.names[snapshot.index[security]])
         # 使用xtdata.get_instrument_detail获取股票名称
         instrument_detail = self.get_instrument_detail(security)
         if instrument_detail is not None and 'InstrumentName' in instrument_detail:
@@ -5,6 +5,7 @@
 该模块提供了QMT量化交易平台的数据获取和处理功能，包括：
 1. QMT历史数据下载和查询
 2. QMT全推行情数据获取
+3. 股票基本信息查询（基于每日合约信息快照）
 
 主要依赖：
 - xtquant: QMT量化交易平台API
@@ -12,12 +13,22 @@
 """
 
 from trader.utils import *
-from tqdm import tqdm
 from xtquant import xtdata
 from trader.logger import logger
 from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.profiler import profiled
+from trader.bar_store import BarStore, DEFAULT_BAR_FIELDS, to_time_int
+from trader.downloader import BulkDownloader
+from trader.instrument_snapshot import InstrumentSnapshot, DEFAULT_SNAPSHOT_ROOT, snapshot_trading_day
+import threading
+import time
+from datetime import datetime
+import numpy as np
 import pandas as pd
 
+# 合约信息快照构建失败后的重试间隔（秒），期间按只查询
+SNAPSHOT_RETRY_SECONDS = 60
+
 class CustomData:
     """
     自定义数据获取类
@@ -35,6 +46,12 @@ class CustomData:
         
         在初始化时下载板块数据，确保在使用相关功能前数据已经准备好。
         """
+        self.bar_store = None  # 本地K线存储，调用enable_bar_store后启用
+        self.instrument_snapshot = None  # 当日合约信息快照，首次查询股票信息时载入或构建
+        self.instrument_snapshot_root = DEFAULT_SNAPSHOT_ROOT  # 合约信息快照存储目录
+        self.download_concurrent_calls = False  # 批量下载时是否允许并发调用download_history_data2
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_retry_at = 0  # 快照构建失败后，下次允许重试的时间戳
         # try:
         #     logger.info(f"{GREEN}【初始化数据】{RESET} 开始下载板块分类信息")
         #     # 下载板块分类信息
@@ -44,12 +61,15 @@ class CustomData:
         #     logger.error(f"{YELLOW}【初始化数据失败】{RESET} {e}")
         #     logger.info(f"{YELLOW}【初始化数据】{RESET} 将在使用时尝试重新下载板块数据")
 
-    def download_qmt_history_data(self, stock_list=None, start_time='20250101', period='1d'):
+    def download_qmt_history_data(self, stock_list=None, start_time='20250101', period='1d', chunk_size=200, max_workers=4,
+                                  concurrent_calls=None):
         """
         使用QMT下载指定股票代码的历史数据
 
         通过QMT的API增量下载指定股票的历史数据，支持不同周期的数据下载。
         下载的数据将保存在QMT的本地数据库中，可以通过get_qmt_daily_data等函数查询。
+        股票列表按块调用xtdata.download_history_data2下载，已完成的块记录在检查点文件中，
+        中断后再次调用会从检查点继续。
 
         参数:
             stock_list (list): 股票代码列表，如['000001', '600000']
@@ -62,15 +82,22 @@ class CustomData:
                 - '1d': 日线
                 - '1w': 周线
                 - '1mon': 月线
+            chunk_size (int): 每块股票数量，默认为200
+            max_workers (int): 同时处理的最大块数，默认为4
+            concurrent_calls (bool): 是否允许多块同时调用download_history_data2，
+                默认为None表示使用download_concurrent_calls属性（全局配置DOWNLOAD_CONCURRENT_CALLS）；
+                为False时各块串行下载，只有失败重试的等待与其他块的下载重叠
 
         返回:
-            无直接返回值，数据下载到本地数据库
+            bool: 全部股票下载成功返回True，数据同时下载到本地数据库
         """
         logger.debug(f"{GREEN}【数据下载】{RESET} {len(stock_list)}只")
-        # 使用tqdm创建进度条，显示下载进度
-        for code in tqdm(stock_list, desc=f"{GREEN}下载历史数据{RESET}", ncols=100, colour="green"):
-            xtdata.download_history_data(code, period=period, start_time=start_time, incrementally=True)
-
+        if concurrent_calls is None:
+            concurrent_calls = self.download_concurrent_calls
+        downloader = BulkDownloader(chunk_size=chunk_size, max_workers=max_workers, concurrent_calls=concurrent_calls)
+        result = downloader.download(add_stock_suffix(list(stock_list)), period=period, start_time=start_time,
+                                     incrementally=True)
+        return not result['failed']
 
     def get_qmt_daily_data(self, stock_list=['000001.SZ'], period='1d', start_time='', end_time='', count=100, is_download=True):
         """
@@ -88,14 +115,26 @@ class CustomData:
                 - 当指定了start_time和end_time时，以end_time为基准向前取count条
                 - 当未指定start_time和end_time时，取最新的count条数据
             is_download (bool): 是否在查询前下载最新数据，默认为True
+                - 启用本地K线存储、存储已同步到最近一个已收盘的交易日且包含全部股票和字段时，
+                  直接从存储读取，不访问QMT终端，返回格式与xtdata.get_market_data_ex相同
 
         返回:
-            pd.DataFrame: 包含股票历史数据的DataFrame，如果获取失败则返回空DataFrame
+            dict: {股票代码: pd.DataFrame}，与xtdata.get_market_data_ex相同，如果获取失败则返回空DataFrame
             
         异常:
             Exception: 当数据获取失败时捕获异常并记录日志
         """
         try:
+            stored = self._read_bar_store(add_stock_suffix(stock_list), period, start_time, end_time, count)
+            if stored is not None:
+                codes, times, data = stored
+                index = [str(t) for t in times]
+                timetags = self._timetags(times)
+                return {
+                    code: pd.DataFrame({'time': timetags, **{field: values[i] for field, values in data.items()}},
+                                       index=index)
+                    for i, code in enumerate(codes)
+                }
             if is_download:
                 self.download_qmt_history_data(add_stock_suffix(stock_list), period)
             df = xtdata.get_market_data_ex(field_list=[], stock_list=add_stock_suffix(stock_list), period=period,
@@ -106,6 +145,183 @@ class CustomData:
             logger.error(f"{YELLOW}【数据获取失败】{RESET} {e}")
             return pd.DataFrame()
 
+    def get_qmt_daily_panel(self, stock_list, field_list=['open', 'high', 'low', 'close', 'volume'], period='1d', count=100, is_download=True):
+        """
+        使用QMT一次性获取多只股票对齐后的历史数据面板
+
+        与get_qmt_daily_data逐只返回DataFrame不同，该函数通过一次xtdata.get_market_data调用
+        获取整个股票列表的数据，所有股票按时间对齐，每个字段返回一个(股票数, 时间数)的二维数组，
+        便于对全市场做向量化筛选。
+
+        参数:
+            stock_list (list): 股票代码列表
+            field_list (list): 字段列表，默认为['open', 'high', 'low', 'close', 'volume']
+            period (str): 数据周期，默认为'1d'（日线）
+            count (int): 数据条数，默认为100条，取最新的count条数据
+            is_download (bool): 是否在查询前下载最新数据，默认为True
+                - 启用本地K线存储、存储已同步到最近一个已收盘的交易日且包含全部股票和字段时，
+                  直接从存储读取，不访问QMT终端
+
+        返回:
+            tuple: 包含三个元素的元组
+                - codes (list): 股票代码列表，与数组的行对应
+                - times (list): 时间列表，与数组的列对应，升序排列
+                - data (dict): {字段: numpy.ndarray}，缺失数据为NaN
+            获取失败时返回([], [], {})
+        """
+        try:
+            stock_list = add_stock_suffix(stock_list)
+            stored = self._read_bar_store(stock_list, period, count=count, field_list=field_list)
+            if stored is not None:
+                codes, times, data = stored
+                return codes, [str(t) for t in times], data
+            if is_download:
+                self.download_qmt_history_data(stock_list, period=period)
+            market_data = xtdata.get_market_data(field_list=field_list, stock_list=stock_list, period=period,
+                                                 count=count, dividend_type='none', fill_data=True)
+            return self._market_data_to_panel(market_data)
+        except Exception as e:
+            logger.error(f"{YELLOW}【数据获取失败】{RESET} {e}")
+            return [], [], {}
+
+    def enable_bar_store(self, root='data/bars'):
+        """
+        启用本地K线存储
+
+        启用后get_qmt_daily_data和get_qmt_daily_panel优先从本地存储读取，
+        存储需要通过sync_bar_store在收盘后增量更新，未同步到最近一个已收盘的交易日时回退到QMT终端。
+
+        参数:
+            root (str): 存储根目录，默认为'data/bars'
+
+        返回:
+            BarStore: 本地K线存储对象
+        """
+        self.bar_store = BarStore(root)
+        logger.debug(f"{GREEN}【K线存储】{RESET} 已启用本地K线存储 目录:{root}")
+        return self.bar_store
+
+    def sync_bar_store(self, stock_list, period='1d', count=250):
+        """
+        将QMT本地数据库中的K线增量同步到本地K线存储
+
+        存储为空时同步最近count条数据，否则从存储中最后一条数据所在的交易日开始重新同步并覆盖该日的数据，
+        盘中写入的未完成K线因此会在下次同步时被修正。只同步到最近一个已收盘的交易日，当天未收盘的K线不写入存储。
+        一般在收盘后下载历史数据完成后调用。
+
+        参数:
+            stock_list (list): 股票代码列表
+            period (str): 数据周期，默认为'1d'（日线）
+            count (int): 存储为空时同步的数据条数，默认为250条
+
+        返回:
+            int: 写入的数据条数（时间数），失败时返回0
+        """
+        if self.bar_store is None:
+            return 0
+        try:
+            stock_list = add_stock_suffix(stock_list)
+            last_time = self.bar_store.get_last_time(period)
+            start_time = str(last_time)[:8] if last_time is not None else ''
+            market_data = xtdata.get_market_data(field_list=DEFAULT_BAR_FIELDS, stock_list=stock_list, period=period,
+                                                 start_time=start_time, count=-1 if start_time else count,
+                                                 dividend_type='none', fill_data=True)
+            codes, times, data = self._market_data_to_panel(market_data)
+            # 只保留从存储最后一个交易日到最近一个已收盘交易日的数据
+            closed_day = last_closed_trading_day().strftime('%Y%m%d')
+            keep = np.array([start_time <= str(t)[:8] <= closed_day for t in times], dtype=bool)
+            if not codes or not keep.any():
+                return 0
+            times = [t for t, k in zip(times, keep) if k]
+            data = {field: values[:, keep] for field, values in data.items()}
+            written = self.bar_store.append(period, codes, times, data, replace=True)
+            logger.info(f"{GREEN}【K线存储】{RESET} 周期:{period} 股票:{len(codes)}只 新增:{written}条")
+            return written
+        except Exception as e:
+            logger.error(f"{YELLOW}【K线存储同步失败】{RESET} {e}")
+            return 0
+
+    @staticmethod
+    def _timetags(times):
+        """
+        将存储的整数时间转换为xtdata的time字段
+
+        参数:
+            times (numpy.ndarray): YYYYMMDD或YYYYMMDDHHMMSS格式的整数时间
+
+        返回:
+            numpy.ndarray: int64毫秒时间戳，北京时间对应的UTC时间，与get_market_data_ex的time列一致
+        """
+        text = pd.Index(np.asarray(times, dtype=np.int64).astype(str))
+        stamps = pd.to_datetime(text, format='%Y%m%d' if len(text) and len(text[0]) == 8 else '%Y%m%d%H%M%S')
+        milliseconds = (stamps - pd.Timestamp(1970, 1, 1)) // pd.Timedelta(milliseconds=1)
+        return np.asarray(milliseconds, dtype=np.int64) - 8 * 3600 * 1000
+
+    @staticmethod
+    def _market_data_to_panel(market_data):
+        """
+        将xtdata.get_market_data的返回结果转换为面板格式
+
+        参数:
+            market_data (dict): {字段: pd.DataFrame}，index为股票代码，columns为时间
+
+        返回:
+            tuple: (codes, times, data)，格式同get_qmt_daily_panel
+        """
+        if not market_data:
+            return [], [], {}
+        # 确保时间升序，并让各字段的行列顺序一致
+        first_frame = next(iter(market_data.values())).sort_index(axis=1)
+        codes = list(first_frame.index)
+        times = list(first_frame.columns)
+        data = {
+            field: frame.reindex(index=codes, columns=times).to_numpy(dtype='float64')
+            for field, frame in market_data.items()
+        }
+        return codes, times, data
+
+    def _read_bar_store(self, stock_list, period, start_time='', end_time='', count=-1, field_list=None):
+        """
+        从本地K线存储读取数据
+
+        存储未启用、没有该周期的数据、缺少请求的股票或字段时返回None，由调用方回退到QMT终端。
+        存储只在收盘后同步，最后一条数据不是最近一个已收盘的交易日（未同步，或有盘中写入的未完成K线）
+        时同样返回None；指定了更早的end_time时只要求存储覆盖到end_time。
+
+        参数:
+            stock_list (list): 带后缀的股票代码列表
+            period (str): 数据周期
+            start_time (str): 起始时间
+            end_time (str): 结束时间
+            count (int): 数据条数，-1或None表示不限
+            field_list (list): 字段列表，默认为None或空列表表示DEFAULT_BAR_FIELDS
+
+        返回:
+            tuple或None: (codes, times, data)，格式同BarStore.read
+        """
+        if self.bar_store is None or not self.bar_store.has_period(period):
+            return None
+        stored_codes = set(self.bar_store.get_codes(period))
+        if any(code not in stored_codes for code in stock_list):
+            return None
+        stored_fields = set(self.bar_store.get_fields(period))
+        if any(field not in stored_fields for field in field_list or DEFAULT_BAR_FIELDS):
+            return None
+
+        # 存储需要恰好同步到最近一个已收盘的交易日
+        closed_day = last_closed_trading_day().strftime('%Y%m%d')
+        last_day = str(self.bar_store.get_last_time(period))[:8]
+        required_day = min(closed_day, str(to_time_int(end_time))[:8]) if end_time else closed_day
+        if last_day > closed_day or last_day < required_day:
+            logger.debug(f"{YELLOW}【K线存储】{RESET} 周期:{period} 存储最后日期:{last_day} 最近收盘交易日:{closed_day}，从QMT终端读取")
+            return None
+        count = None if count is None or count < 0 else count
+        codes, times, data = self.bar_store.read(period, codes=stock_list, fields=list(field_list or DEFAULT_BAR_FIELDS),
+                                                 start_time=start_time, end_time=end_time, count=count)
+        if not codes:
+            return None
+        return codes, times, data
+
     def get_qmt_full_tick(self, stock_list=['000001.SZ']):
         """
         使用QMT获取指定股票代码的全推行情数据
@@ -173,10 +389,64 @@ class CustomData:
             logger.error(f"{YELLOW}【获取板块成份股失败】{RESET} {sector_name}: {e}")
             return []
     
+    def get_instrument_snapshot(self, refresh=False):
+        """
+        获取当前交易日的合约信息快照
+
+        快照有效时直接返回；否则先尝试载入磁盘上当前交易日（见snapshot_trading_day）的快照，再用xtdata.get_instrument_detail_list
+        一次性查询沪深A股全部股票构建并保存。构建失败时在SNAPSHOT_RETRY_SECONDS内不再重试。
+
+        参数:
+            refresh (bool): 是否强制重新构建，默认为False
+
+        返回:
+            InstrumentSnapshot: 当前交易日的快照，构建失败时返回None
+        """
+        snapshot = self.instrument_snapshot
+        if not refresh and snapshot is not None and snapshot.is_fresh():
+            return snapshot
+
+        with self._snapshot_lock:
+            # 其他线程可能已经完成构建
+            snapshot = self.instrument_snapshot
+            if not refresh and snapshot is not None and snapshot.is_fresh():
+                return snapshot
+            if not refresh and time.time() < self._snapshot_retry_at:
+                return None
+
+            if not refresh:
+                snapshot = InstrumentSnapshot.load(snapshot_trading_day().strftime('%Y%m%d'),
+                                                   self.instrument_snapshot_root)
+                if snapshot is not None and snapshot.is_fresh():
+                    self.instrument_snapshot = snapshot
+                    logger.debug(f"{GREEN}【合约快照】{RESET} 已载入交易日{snapshot.trading_day}的快照 股票:{len(snapshot)}只")
+                    return snapshot
+
+            try:
+                start = time.perf_counter()
+                stock_list = xtdata.get_stock_list_in_sector('沪深A股')
+                details = xtdata.get_instrument_detail_list(stock_list)
+                snapshot = InstrumentSnapshot.from_details(details)
+                if not len(snapshot):
+                    raise ValueError("未获取到合约信息")
+                snapshot.save(self.instrument_snapshot_root)
+            except Exception as e:
+                logger.error(f"{RED}【合约快照构建失败】{RESET} {e}")
+                self._snapshot_retry_at = time.time() + SNAPSHOT_RETRY_SECONDS
+                return None
+
+            self.instrument_snapshot = snapshot
+            logger.info(f"{GREEN}【合约快照】{RESET} 日期:{snapshot.trading_day} 股票:{len(snapshot)}只 "
+                        f"耗时:{time.perf_counter() - start:.2f}s")
+            return snapshot
+
+    @profiled('CustomData.get_stock_info', kind='context')
     def get_stock_info(self, stock_code):
         """
         获取股票基本信息
         
+        优先从当日合约信息快照读取，快照中没有该股票或快照不可用时查询xtdata.get_instrument_detail。
+        
         参数:
             stock_code (str): 股票代码
             
@@ -194,6 +464,10 @@ class CustomData:
         try:
             # 添加市场后缀
             stock_code_with_suffix = add_stock_suffix(stock_code)
+
+            snapshot = self.get_instrument_snapshot()
+            if snapshot is not None and stock_code_with_suffix in snapshot:
+                return snapshot.get(stock_code_with_suffix)
             
             # 获取股票详细信息
             detail = xtdata.get_instrument_detail(stock_code_with_suffix)
@@ -221,5 +495,26 @@ class CustomData:
             logger.error(f"获取股票信息失败: {e}")
             return None
 
+    def get_stock_info_list(self, stock_list):
+        """
+        批量获取股票基本信息
+
+        参数:
+            stock_list (list): 股票代码列表
+
+        返回:
+            dict: {股票代码: 股票基本信息}，字段同get_stock_info，获取失败的股票值为None
+        """
+        # 快照中的股票直接按代码取值，其余股票逐只查询
+        snapshot = self.get_instrument_snapshot()
+        result = {}
+        for stock_code in stock_list:
+            stock_code_with_suffix = add_stock_suffix(stock_code)
+            if snapshot is not None and stock_code_with_suffix in snapshot:
+                result[stock_code] = snapshot.get(stock_code_with_suffix)
+            else:
+                result[stock_code] = self.get_stock_info(stock_code)
+        return result
+
 # 创建 CustomData 实例供其他模块导入
 custom_data = CustomData()
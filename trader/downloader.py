@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+批量历史数据下载模块
+
+该模块基于xtdata.download_history_data2实现全市场历史数据的批量下载，包括：
+1. 股票列表分块，每块一次调用download_history_data2
+2. 有界线程池处理各块，重试等待期间其他块继续下载
+3. 按块记录完成状态到检查点文件，中断后重新运行时跳过已完成的块
+4. 失败块按指数退避重试，仍失败的块留待下次运行
+
+数据客户端通过构造参数注入，默认为xtdata，测试时可以传入模拟延迟和失败的替身对象，
+只需实现download_history_data2(stock_list, period, start_time, end_time, callback, incrementally)。
+xtdata的客户端没有说明可以多线程同时调用，默认所有下载器对客户端的调用经同一把锁串行执行，
+确认客户端线程安全时可以通过concurrent_calls=True允许并发调用。
+
+检查点按数据所属的交易日区分：未指定end_time时为最近一个已收盘的交易日，收盘后再次运行
+不会沿用盘中下载的检查点，而是重新下载当天收盘后的数据。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from tqdm import tqdm
+from xtquant import xtdata
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.utils import last_closed_trading_day
+
+# 串行调用数据客户端的锁，所有下载器共用
+_client_lock = threading.Lock()
+
+
+class BulkDownloader:
+    """
+    批量历史数据下载器
+
+    将股票列表分块后并发调用download_history_data2，并通过检查点文件支持断点续传。
+    """
+
+    def __init__(self, client=xtdata, chunk_size=200, max_workers=4, checkpoint_path='data/download_checkpoint.json',
+                 max_retries=3, retry_delay=1.0, show_progress=True, concurrent_calls=False):
+        """
+        初始化下载器
+
+        参数:
+            client: 数据客户端，需提供download_history_data2方法，默认为xtdata
+            chunk_size (int): 每块股票数量，默认为200
+            max_workers (int): 同时处理的最大块数，默认为4，串行调用时只有重试等待与下载重叠
+            checkpoint_path (str): 检查点文件路径，为None时不记录检查点
+            max_retries (int): 每块最大重试次数，默认为3
+            retry_delay (float): 首次重试等待秒数，之后每次翻倍，默认为1.0
+            show_progress (bool): 是否显示进度条，默认为True
+            concurrent_calls (bool): 是否允许并发调用download_history_data2，默认为False表示串行调用
+        """
+        self.client = client
+        self.chunk_size = max(1, chunk_size)
+        self.max_workers = max(1, max_workers)
+        self.checkpoint_path = checkpoint_path
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = retry_delay
+        self.show_progress = show_progress
+        self.concurrent_calls = concurrent_calls
+        self._lock = threading.Lock()
+
+    def download(self, stock_list, period='1d', start_time='', end_time='', incrementally=None):
+        """
+        批量下载历史数据
+
+        参数:
+            stock_list (list): 带后缀的股票代码列表
+            period (str): 数据周期，如'1d'、'1m'
+            start_time (str): 开始时间，格式为'YYYYMMDD'或'YYYYMMDDhhmmss'
+            end_time (str): 结束时间，格式同开始时间
+            incrementally (bool): 是否增量下载，None表示由start_time决定
+
+        返回:
+            dict: 下载结果，包含以下字段：
+                - total: 总块数
+                - downloaded: 本次下载完成的块数
+                - skipped: 检查点中已完成而跳过的块数
+                - failed: 失败块的股票代码列表
+        """
+        chunks = [stock_list[i:i + self.chunk_size] for i in range(0, len(stock_list), self.chunk_size)]
+        job_key = self._job_key(period, start_time, end_time, incrementally)
+        checkpoint = self._load_checkpoint()
+        completed = set(checkpoint.get(job_key, []))
+
+        pending = [chunk for chunk in chunks if self._chunk_id(chunk) not in completed]
+        result = {'total': len(chunks), 'downloaded': 0, 'skipped': len(chunks) - len(pending), 'failed': []}
+        if result['skipped']:
+            logger.info(f"{BLUE}【断点续传】{RESET} 跳过已完成 {result['skipped']}/{len(chunks)} 块")
+
+        progress = tqdm(total=sum(len(chunk) for chunk in pending), desc=f"{GREEN}下载历史数据{RESET}", ncols=100,
+                        colour="green", disable=not self.show_progress)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self._download_chunk, chunk, period, start_time, end_time, incrementally): chunk
+                    for chunk in pending
+                }
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    if future.result():
+                        result['downloaded'] += 1
+                        with self._lock:
+                            completed.add(self._chunk_id(chunk))
+                            checkpoint[job_key] = sorted(completed)
+                            self._save_checkpoint(checkpoint)
+                    else:
+                        result['failed'].extend(chunk)
+                    progress.update(len(chunk))
+        finally:
+            progress.close()
+
+        # 全部完成后清除本任务的检查点，下次运行重新下载增量数据
+        if not result['failed'] and job_key in checkpoint:
+            with self._lock:
+                checkpoint.pop(job_key, None)
+                self._save_checkpoint(checkpoint)
+
+        if result['failed']:
+            logger.warning(f"{YELLOW}【下载未完成】{RESET} 失败股票:{len(result['failed'])}只 重新运行将从检查点继续")
+        return result
+
+    def _download_chunk(self, chunk, period, start_time, end_time, incrementally):
+        """
+        下载一块股票的数据，失败时按指数退避重试
+
+        返回:
+            bool: 是否下载成功
+        """
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.concurrent_calls:
+                    self.client.download_history_data2(chunk, period, start_time, end_time, None, incrementally)
+                else:
+                    with _client_lock:
+                        self.client.download_history_data2(chunk, period, start_time, end_time, None, incrementally)
+                return True
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"{RED}【下载失败】{RESET} 股票:{chunk[0]}等{len(chunk)}只 错误:{e}")
+                    return False
+                logger.debug(f"{YELLOW}【下载重试】{RESET} 股票:{chunk[0]}等{len(chunk)}只 第{attempt + 1}次 错误:{e}")
+                time.sleep(delay)
+                delay *= 2
+        return False
+
+    @staticmethod
+    def _chunk_id(chunk):
+        # 以块内股票代码计算标识，股票列表变化时不会误判已完成
+        return hashlib.sha1(','.join(chunk).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _job_key(period, start_time, end_time, incrementally):
+        # 检查点只在同一天、同一参数、同一数据交易日的下载任务之间复用
+        data_day = last_closed_trading_day().strftime('%Y%m%d')
+        if end_time:
+            data_day = min(data_day, str(end_time)[:8])
+        return f"{date.today().strftime('%Y%m%d')}|{data_day}|{period}|{start_time}|{end_time}|{incrementally}"
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            # 丢弃往日的任务记录
+            today = date.today().strftime('%Y%m%d')
+            return {key: value for key, value in checkpoint.items() if key.startswith(today)}
+        except (OSError, ValueError) as e:
+            logger.warning(f"{YELLOW}【检查点读取失败】{RESET} {e}")
+            return {}
+
+    def _save_checkpoint(self, checkpoint):
+        if not self.checkpoint_path:
+            return
+        dir_path = os.path.dirname(self.checkpoint_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
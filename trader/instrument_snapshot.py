@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+合约基础信息日快照模块
+
+每个交易日用xtdata.get_instrument_detail_list一次性取得全市场的合约信息，按字段保存为列式数组
+（股票名称、涨跌停价、前收盘价、总股本、流通股本、停牌状态、是否可交易），通过股票代码索引。
+选股时的全市场查询和盘中的涨停价、股票名称查询都从快照读取，不再逐只调用xtdata.get_instrument_detail。
+
+存储结构：
+    {root}/{YYYYMMDD}.npz   按交易日保存的快照，重启时直接载入，不再向QMT终端查询
+
+失效规则：
+    - 快照按交易日区分：QMT在交易日的SNAPSHOT_READY_TIME更新当日的涨跌停价，此前（包括周末、节假日和
+      下一交易日开盘前）合约信息仍属于上一个交易日，快照也沿用上一个交易日的
+    - 交易日变化后下次查询时重新构建，SNAPSHOT_READY_TIME之前构建的快照在该时间之后重建一次
+"""
+
+import os
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+
+import numpy as np
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.utils import is_trading_day
+
+# 默认存储目录
+DEFAULT_SNAPSHOT_ROOT = 'data/instruments'
+
+# 当日合约信息（涨跌停价等）就绪的时间，之前构建的快照在该时间之后需要重建
+SNAPSHOT_READY_TIME = dt_time(9, 15)
+
+# 磁盘上保留的快照文件数
+SNAPSHOT_KEEP_DAYS = 5
+
+# 数值字段：{快照字段: 合约信息字段}
+NUMERIC_FIELDS = {
+    'pre_close': 'PreClose',
+    'up_stop_price': 'UpStopPrice',
+    'down_stop_price': 'DownStopPrice',
+    'float_volume': 'FloatVolume',
+    'total_volume': 'TotalVolume',
+}
+
+
+def snapshot_trading_day(now=None):
+    """
+    获取当前合约信息所属的交易日
+
+    当天为交易日且已过SNAPSHOT_READY_TIME时返回当天，否则向前查找最近的交易日。
+
+    参数:
+        now (datetime): 当前时间（北京时间），默认为现在
+
+    返回:
+        datetime.date: 合约信息所属的交易日
+    """
+    now = now or datetime.now()
+    day = now.date()
+    if is_trading_day(day) and now.time() >= SNAPSHOT_READY_TIME:
+        return day
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+class InstrumentSnapshot:
+    """
+    合约基础信息日快照
+
+    各字段为与codes对齐的一维数组，按股票代码查询时只做一次字典查找和数组取值。
+    """
+
+    def __init__(self, trading_day, built_at, codes, names, instrument_status, is_trading, numeric):
+        """
+        初始化快照
+
+        参数:
+            trading_day (str): 快照所属交易日，格式为YYYYMMDD，见snapshot_trading_day
+            built_at (datetime): 快照构建时间
+            codes (list): 股票代码列表
+            names (list): 股票名称，与codes对齐
+            instrument_status (list): 停牌状态（InstrumentStatus<=0:正常交易（-1:复牌）;>=1停牌天数），与codes对齐
+            is_trading (list): 是否可交易，与codes对齐
+            numeric (dict): {快照字段: 数值列表}，字段见NUMERIC_FIELDS，与codes对齐
+        """
+        self.trading_day = trading_day
+        self.built_at = built_at
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.names = np.asarray(names, dtype=str)
+        self.instrument_status = np.asarray(instrument_status, dtype=np.int32)
+        self.is_trading = np.asarray(is_trading, dtype=bool)
+        self.pre_close = np.asarray(numeric['pre_close'], dtype=np.float64)
+        self.up_stop_price = np.asarray(numeric['up_stop_price'], dtype=np.float64)
+        self.down_stop_price = np.asarray(numeric['down_stop_price'], dtype=np.float64)
+        self.float_volume = np.asarray(numeric['float_volume'], dtype=np.float64)
+        self.total_volume = np.asarray(numeric['total_volume'], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, stock_code):
+        return stock_code in self.index
+
+    @classmethod
+    def from_details(cls, details, now=None):
+        """
+        由xtdata.get_instrument_detail_list的返回结果构建快照
+
+        参数:
+            details (dict): {股票代码: 合约信息字典}，值为None的股票跳过
+            now (datetime): 构建时间，默认为当前时间
+
+        返回:
+            InstrumentSnapshot: 快照对象
+        """
+        now = now or datetime.now()
+        codes, names, status, trading = [], [], [], []
+        numeric = {field: [] for field in NUMERIC_FIELDS}
+        for stock_code, detail in details.items():
+            if not detail:
+                continue
+            codes.append(stock_code)
+            names.append(detail.get('InstrumentName', '') or '')
+            status.append(detail.get('InstrumentStatus', 0) or 0)
+            trading.append(bool(detail.get('IsTrading', True)))
+            for field, detail_field in NUMERIC_FIELDS.items():
+                numeric[field].append(detail.get(detail_field, 0) or 0)
+        return cls(snapshot_trading_day(now).strftime('%Y%m%d'), now, codes, names, status, trading, numeric)
+
+    def is_fresh(self, now=None):
+        """
+        判断快照是否仍然有效
+
+        参数:
+            now (datetime): 当前时间，默认为当前时间
+
+        返回:
+            bool: 快照属于当前合约信息所属的交易日，且在该交易日的SNAPSHOT_READY_TIME之后构建时返回True
+        """
+        day = snapshot_trading_day(now)
+        if self.trading_day != day.strftime('%Y%m%d'):
+            return False
+        return self.built_at >= datetime.combine(day, SNAPSHOT_READY_TIME)
+
+    def get(self, stock_code):
+        """
+        获取股票基本信息
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+
+        返回:
+            dict: 字段同CustomData.get_stock_info，快照中没有该股票时返回None
+        """
+        i = self.index.get(stock_code)
+        if i is None:
+            return None
+        pre_close = float(self.pre_close[i])
+        return {
+            '股票名称': str(self.names[i]),
+            '停牌状态': 1 if self.instrument_status[i] >= 1 else 0,  # 1表示停牌，0表示正常交易
+            '总市值': float(self.total_volume[i]) * pre_close,
+            '涨停价': float(self.up_stop_price[i]),
+            '跌停价': float(self.down_stop_price[i]),
+            '前收盘价': pre_close,
+            '流通股本': float(self.float_volume[i]),
+            '是否可交易': bool(self.is_trading[i])
+        }
+
+    # ------------------------------------------------------------------ 持久化
+
+    def save(self, root=DEFAULT_SNAPSHOT_ROOT):
+        """
+        保存快照到{root}/{YYYYMMDD}.npz，并清理较早的快照文件
+
+        参数:
+            root (str): 存储目录
+
+        返回:
+            str: 快照文件路径
+        """
+        os.makedirs(root, exist_ok=True)
+        path = os.path.join(root, f"{self.trading_day}.npz")
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, codes=np.asarray(self.codes, dtype=str), names=self.names,
+                     instrument_status=self.instrument_status, is_trading=self.is_trading,
+                     built_at=np.asarray(self.built_at.strftime('%Y%m%d%H%M%S')),
+                     **{field: getattr(self, field) for field in NUMERIC_FIELDS})
+        # 原子替换，中断时不会留下不完整的快照
+        os.replace(tmp_path, path)
+
+        snapshots = sorted(name for name in os.listdir(root) if name.endswith('.npz'))
+        for name in snapshots[:-SNAPSHOT_KEEP_DAYS]:
+            try:
+                os.remove(os.path.join(root, name))
+            except OSError:
+                pass
+        return path
+
+    @classmethod
+    def load(cls, trading_day, root=DEFAULT_SNAPSHOT_ROOT):
+        """
+        载入指定交易日的快照
+
+        参数:
+            trading_day (str): 交易日，格式为YYYYMMDD
+            root (str): 存储目录
+
+        返回:
+            InstrumentSnapshot: 快照对象，文件不存在或损坏时返回None
+        """
+        path = os.path.join(root, f"{trading_day}.npz")
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls(trading_day, datetime.strptime(str(data['built_at']), '%Y%m%d%H%M%S'),
+                           data['codes'].tolist(), data['names'], data['instrument_status'], data['is_trading'],
+                           {field: data[field] for field in NUMERIC_FIELDS})
+        except Exception as e:
+            logger.warning(f"{YELLOW}【合约快照】{RESET} 快照文件损坏，将重新构建 文件:{path} 错误:{e}")
+            return None
@@ -3,12 +3,22 @@
 日志模块
 
 该模块提供了日志记录功能，支持控制台输出、文件写入和WebHook推送
+
+记录日志的线程只把日志记录放入队列（QueueHandler），控制台、文件和WebHook处理器
+在QueueListener的后台线程中执行，行情回调等热点线程不会被磁盘和网络I/O阻塞。
+WebHook推送再由独立的发送线程合并成批，按频率限制发送，失败时退避重试。
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
+import time
 import requests
 import os
 import re
+from collections import deque
 from datetime import date
 
 # 标准日志格式，包含时间戳
@@ -17,6 +27,9 @@ formatter = logging.Formatter('[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:
 # WebHook推送日志格式，时间戳和消息内容分行显示
 push_formatter = logging.Formatter('[%(asctime)s]\n%(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
+# ANSI转义码匹配模式
+ANSI_ESCAPE_PATTERN = re.compile(r'\033\[[0-9;]*m')
+
 
 class RemoveAnsiEscapeCodes(logging.Filter):
     """
@@ -35,7 +48,7 @@ class RemoveAnsiEscapeCodes(logging.Filter):
         Returns:
             bool: 始终返回True，表示保留该日志记录
         """
-        record.msg = re.sub(r'\033\[[0-9;]*m', '', str(record.msg))
+        record.msg = ANSI_ESCAPE_PATTERN.sub('', str(record.msg))
         return True
 
 
@@ -45,9 +58,10 @@ def create_logger():
     
     创建一个日志记录器，配置控制台输出和文件输出。
     日志文件按日期命名，存放在logs目录下。
+    日志记录器只挂载QueueHandler，控制台和文件处理器由QueueListener在后台线程中执行。
     
     Returns:
-        logging.Logger: 配置好的日志记录器对象
+        tuple: (logging.Logger, logging.handlers.QueueListener)
     """
     logger = logging.getLogger('log')
     logger.setLevel(logging.DEBUG)  # 设置日志级别为DEBUG
@@ -55,7 +69,6 @@ def create_logger():
     # 添加控制台处理器
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
 
     # 创建日志文件夹（如果不存在）
     log_dir = 'logs'
@@ -68,9 +81,14 @@ def create_logger():
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
     file_handler.addFilter(RemoveAnsiEscapeCodes())  # 添加ANSI转义码过滤器
-    logger.addHandler(file_handler)
 
-    return logger
+    # 日志记录放入队列，由后台线程依次交给控制台和文件处理器
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+    listener.start()
+
+    return logger, listener
 
 
 class WebHookHandler(logging.Handler):
@@ -79,39 +97,154 @@ class WebHookHandler(logging.Handler):
     
     将日志消息通过HTTP POST请求发送到指定的WebHook URL。
     主要用于将重要日志推送到企业微信、钉钉等平台。
+
+    emit只把格式化后的消息放入有界缓冲区，由发送线程合并成批后推送：
+    1. 每批最多batch_size条，且不超过平台单条消息长度限制
+    2. 两次推送之间至少间隔min_interval秒，避免触发平台频率限制
+    3. 推送失败时按指数退避重试，仍失败则丢弃该批
+    4. 缓冲区满时丢弃最早的消息，丢弃数量在下一批消息中提示
     """
-    def __init__(self, webhook_url):
+    def __init__(self, webhook_url, batch_size=20, min_interval=3.0, max_pending=1000, max_retries=3,
+                 retry_delay=1.0, max_content_length=2000, timeout=5):
         """
         初始化WebHook处理器
         
         Args:
             webhook_url: WebHook的URL地址
+            batch_size: 每批最多合并的消息条数，默认为20
+            min_interval: 两次推送的最小间隔秒数，默认为3.0（企业微信机器人每分钟最多20条）
+            max_pending: 缓冲区最多保留的消息条数，默认为1000
+            max_retries: 推送失败的最大重试次数，默认为3
+            retry_delay: 首次重试等待秒数，之后每次翻倍，默认为1.0
+            max_content_length: 单条推送的最大字符数，默认为2000
+            timeout: HTTP请求超时秒数，默认为5
         """
         super().__init__()
         self.webhook_url = webhook_url
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_content_length = max_content_length
+        self.timeout = timeout
+        self.pending = deque(maxlen=max_pending)
+        self.dropped = 0  # 因缓冲区满或推送失败而丢弃的消息数量
+        self.sent = 0  # 已推送的批次数量
+        self._in_flight = 0  # 已从缓冲区取出、正在推送的消息条数
+        self._session = requests.Session()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_post = 0.0
+        self._thread = threading.Thread(target=self._run, name='WebHookSender', daemon=True)
+        self._thread.start()
 
     def emit(self, record):
         """
-        发送日志记录到WebHook
-        
-        将日志记录格式化后，通过HTTP POST请求发送到WebHook URL。
-        使用企业微信/钉钉等平台支持的消息格式。
+        将日志记录放入推送缓冲区
         
         Args:
             record: 日志记录对象
         """
-        log_entry = self.format(record)
+        try:
+            log_entry = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._cond:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(log_entry)
+            self._cond.notify()
+
+    def flush(self, timeout=10):
+        """
+        等待缓冲区中的消息和正在推送的一批消息推送完成
+
+        Args:
+            timeout: 最长等待秒数，默认为10
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self.pending or self._in_flight) and time.monotonic() < deadline:
+                self._cond.notify()
+                self._cond.wait(0.1)
+
+    def close(self):
+        """
+        推送剩余消息后停止发送线程
+        """
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        # 正在推送的一批消息可能还在退避重试，等待时间按一批消息推送的最长耗时计算
+        self._thread.join(timeout=self._max_post_seconds())
+        super().close()
+
+    def _max_post_seconds(self):
+        # 一批消息推送的最长耗时：每次请求的超时时间加上各次重试前的退避等待
+        return (self.max_retries + 1) * self.timeout + self.retry_delay * (2 ** self.max_retries - 1)
+
+    def _next_batch(self):
+        # 取出一批消息，合并后的内容不超过最大长度
+        batch, length = [], 0
+        while self.pending and len(batch) < self.batch_size:
+            entry = self.pending[0]
+            if batch and length + len(entry) + 2 > self.max_content_length:
+                break
+            batch.append(self.pending.popleft()[:self.max_content_length])
+            length += len(entry) + 2
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self.pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self.pending:
+                    return
+                # 频率限制，等待期间到达的消息合并进同一批
+                wait = self._last_post + self.min_interval - time.monotonic()
+                if wait > 0 and not self._closed:
+                    self._cond.wait(wait)
+                    continue
+                batch = self._next_batch()
+                dropped, self.dropped = self.dropped, 0
+                self._in_flight = len(batch)
+                self._cond.notify_all()
+
+            content = '\n\n'.join(batch)
+            if dropped:
+                content = f"[已丢弃{dropped}条日志]\n\n{content}"
+            posted = self._post(content)
+            with self._cond:
+                if not posted:
+                    self.dropped += len(batch)
+                self._in_flight = 0
+                self._last_post = time.monotonic()
+                self._cond.notify_all()
+
+    def _post(self, content):
         payload = {
             "msgtype": "text",
             "text": {
-                "content": log_entry
+                "content": content
             }
         }
-        try:
-            response = requests.post(self.webhook_url, json=payload)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print(f"Failed to send log to WeChat: {e}")
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._session.post(self.webhook_url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                self.sent += 1
+                return True
+            except requests.exceptions.RequestException as e:
+                if attempt >= self.max_retries:
+                    print(f"Failed to send log to WeChat: {e}")
+                    return False
+                time.sleep(delay)
+                delay *= 2
+        return False
 
 
 def add_webhook_handler(webhook_url):
@@ -130,8 +263,25 @@ def add_webhook_handler(webhook_url):
         webhook_handler.setLevel(logging.INFO)  # 只推送INFO及以上级别的日志
         webhook_handler.setFormatter(push_formatter)
         webhook_handler.addFilter(RemoveAnsiEscapeCodes())  # 添加ANSI转义码过滤器
-        logger.addHandler(webhook_handler)
+        # 重启队列监听器以挂载新的处理器
+        listener.stop()
+        listener.handlers = listener.handlers + (webhook_handler,)
+        listener.start()
+
+
+def shutdown_logging():
+    """
+    停止队列监听器，处理完队列中剩余的日志后推送WebHook缓冲区中的消息
+
+    程序退出时自动调用。
+    """
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
+    for handler in listener.handlers:
+        if isinstance(handler, WebHookHandler):
+            handler.close()
 
 
 # 创建全局日志记录器实例
-logger = create_logger()
+logger, listener = create_logger()
+atexit.register(shutdown_logging)
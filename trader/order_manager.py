@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+订单管理模块
+
+该模块根据交易回调推送跟踪每个委托的生命周期，包括：
+1. 以订单编号为键记录委托，按股票维护未完成委托，支持O(1)查询
+2. 由on_stock_order、on_stock_trade、on_order_error、on_cancel_error推送驱动状态变化
+3. 以截止时间小顶堆管理超时撤单，由后台线程在最近的截止时间唤醒，不再轮询扫描全部委托
+4. 撤单发出后重新设置确认截止时间，到期仍未收到终态推送时查询委托状态，仍未完成则重新撤单
+
+委托状态使用xtconstant中的整数状态码，已成、已撤、部撤、废单为终态。
+撤单函数、查询函数和时钟通过构造参数注入，便于在回测或测试中替换。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from xtquant import xtconstant
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+# 委托终态，收到后订单不再活跃
+FINAL_ORDER_STATUS = {
+    xtconstant.ORDER_PART_CANCEL,
+    xtconstant.ORDER_CANCELED,
+    xtconstant.ORDER_SUCCEEDED,
+    xtconstant.ORDER_JUNK,
+}
+
+# 撤单失败后重试的间隔，以及撤单发出后等待终态推送的时间（秒）
+CANCEL_RETRY_SECONDS = 5
+
+
+class OrderManager:
+    """
+    委托生命周期管理器
+
+    订单记录为字典，包含以下字段：
+        - order_id: 订单编号
+        - stock_code: 股票代码
+        - order_type: 委托类型，xtconstant.STOCK_BUY或xtconstant.STOCK_SELL
+        - order_volume: 委托数量
+        - traded_volume: 已成交数量，取委托推送的累计成交数量与去重后成交推送数量之和中的较大者
+        - order_traded_volume: 委托推送中的累计成交数量
+        - trade_volume: 已计入的成交推送数量之和
+        - trade_ids: 已计入的成交编号集合
+        - order_status: 委托状态码
+        - remark: 委托备注
+        - time: 登记时间（时钟秒数）
+        - deadline: 超时截止时间，撤单发出后为等待撤单确认的截止时间，None表示不超时
+        - cancel_requested: 是否已发出撤单
+    """
+
+    def __init__(self, cancel_func=None, clock=time.time, query_func=None):
+        """
+        初始化订单管理器
+
+        参数:
+            cancel_func (callable): 撤单函数，参数为订单编号，返回0表示撤单指令发送成功
+            clock (callable): 时钟函数，返回当前时间的秒数，默认为time.time
+            query_func (callable): 委托查询函数，参数为订单编号，返回XtOrder对象或None，
+                撤单后未收到终态推送时用于确认委托状态，默认为None表示不查询、直接重新撤单
+        """
+        self.cancel_func = cancel_func
+        self.query_func = query_func
+        self.clock = clock
+        self.orders = {}  # 全部订单，格式：{order_id: 订单记录}
+        self.open_orders = {}  # 未完成订单，格式：{stock_code: {order_id: 订单记录}}
+        self._early_final = {}  # 登记前已收到终态推送的订单，格式：{order_id: 状态码}
+        self._deadlines = []  # 超时堆，元素为(截止时间, 序号, order_id)
+        self._counter = itertools.count()
+        self._cond = threading.Condition(threading.RLock())
+        self._thread = None
+        self._running = False
+
+    # ------------------------------------------------------------------ 登记与查询
+
+    def track(self, order_id, stock_code, order_type, order_volume=0, remark='', timeout=None):
+        """
+        登记一个新委托
+
+        参数:
+            order_id (int): 下单接口返回的订单编号
+            stock_code (str): 带后缀的股票代码
+            order_type (int): 委托类型，xtconstant.STOCK_BUY或xtconstant.STOCK_SELL
+            order_volume (int): 委托数量
+            remark (str): 委托备注
+            timeout (float): 超时撤单秒数，None表示不超时
+
+        返回:
+            dict: 订单记录
+        """
+        with self._cond:
+            record = self.orders.get(order_id)
+            if record is None:
+                record = {
+                    'order_id': order_id,
+                    'stock_code': stock_code,
+                    'order_type': order_type,
+                    'order_volume': order_volume,
+                    'traded_volume': 0,
+                    'order_traded_volume': 0,
+                    'trade_volume': 0,
+                    'trade_ids': set(),
+                    'order_status': xtconstant.ORDER_UNREPORTED,
+                    'remark': remark,
+                    'time': self.clock(),
+                    'deadline': None,
+                    'cancel_requested': False,
+                }
+                self.orders[order_id] = record
+                # 下单接口返回前终态推送可能已经到达
+                final_status = self._early_final.pop(order_id, None)
+                if final_status is not None:
+                    record['order_status'] = final_status
+                else:
+                    self.open_orders.setdefault(stock_code, {})[order_id] = record
+            if timeout is not None and self.is_open(order_id):
+                self._schedule(record, record['time'] + timeout)
+            logger.debug(f"{BLUE}【订单记录】{RESET} 登记委托 ID:{order_id} 股票:{stock_code} 超时:{timeout}秒")
+            return record
+
+    def set_timeout(self, order_id, timeout):
+        """
+        为已登记的委托设置超时撤单时间，从登记时间起算
+
+        参数:
+            order_id (int): 订单编号
+            timeout (float): 超时撤单秒数
+
+        返回:
+            bool: 订单是否存在且仍未完成
+        """
+        with self._cond:
+            record = self.orders.get(order_id)
+            if record is None or not self.is_open(order_id):
+                return False
+            self._schedule(record, record['time'] + timeout)
+            return True
+
+    def get_order(self, order_id):
+        """
+        查询订单记录
+
+        参数:
+            order_id (int): 订单编号
+
+        返回:
+            dict: 订单记录的副本，不存在时返回None
+        """
+        record = self.orders.get(order_id)
+        return dict(record) if record is not None else None
+
+    def is_open(self, order_id):
+        """
+        判断委托是否仍未完成
+
+        参数:
+            order_id (int): 订单编号
+
+        返回:
+            bool: 未完成返回True
+        """
+        record = self.orders.get(order_id)
+        return record is not None and order_id in self.open_orders.get(record['stock_code'], ())
+
+    def has_open_order(self, stock_code, order_type=None):
+        """
+        判断指定股票是否有未完成委托
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+            order_type (int): 只判断指定委托类型，None表示不限
+
+        返回:
+            bool: 有未完成委托返回True
+        """
+        orders = self.open_orders.get(stock_code)
+        if not orders:
+            return False
+        if order_type is None:
+            return True
+        return any(record['order_type'] == order_type for record in list(orders.values()))
+
+    def get_open_orders(self, stock_code=None):
+        """
+        查询未完成委托
+
+        参数:
+            stock_code (str): 带后缀的股票代码，None表示全部股票
+
+        返回:
+            list: 订单记录副本的列表
+        """
+        with self._cond:
+            if stock_code is not None:
+                return [dict(record) for record in self.open_orders.get(stock_code, {}).values()]
+            return [dict(record) for orders in self.open_orders.values() for record in orders.values()]
+
+    def clear_closed(self):
+        """
+        清除已完成的订单记录，一般在新交易日开始时调用
+        """
+        with self._cond:
+            self.orders = {order_id: record for order_id, record in self.orders.items() if self.is_open(order_id)}
+            self._early_final.clear()
+
+    # ------------------------------------------------------------------ 交易回调
+
+    def on_stock_order(self, order):
+        """
+        委托状态推送
+
+        参数:
+            order: XtOrder对象
+        """
+        with self._cond:
+            record = self.orders.get(order.order_id)
+            if record is None:
+                if order.order_status in FINAL_ORDER_STATUS:
+                    self._early_final[order.order_id] = order.order_status
+                return
+            record['order_status'] = order.order_status
+            # 委托推送的成交数量是累计值，与成交推送分开记录，避免同一笔成交计入两次
+            record['order_traded_volume'] = max(record['order_traded_volume'], order.traded_volume)
+            record['traded_volume'] = max(record['order_traded_volume'], record['trade_volume'])
+            if order.order_volume:
+                record['order_volume'] = order.order_volume
+            if order.order_status in FINAL_ORDER_STATUS:
+                self._close(record)
+
+    def on_stock_trade(self, trade):
+        """
+        成交推送，按成交编号去重累计成交数量，全部成交时关闭委托
+
+        委托推送中的累计成交数量可能已经包含这笔成交，因此成交推送的数量单独累计，
+        已成交数量取两者中的较大者。
+
+        参数:
+            trade: XtTrade对象
+        """
+        with self._cond:
+            record = self.orders.get(trade.order_id)
+            if record is None or not self.is_open(trade.order_id):
+                return
+            traded_id = getattr(trade, 'traded_id', None)
+            if traded_id:
+                if traded_id in record['trade_ids']:
+                    return
+                record['trade_ids'].add(traded_id)
+            record['trade_volume'] += trade.traded_volume
+            record['traded_volume'] = max(record['order_traded_volume'], record['trade_volume'])
+            if record['order_volume'] and record['traded_volume'] >= record['order_volume']:
+                record['order_status'] = xtconstant.ORDER_SUCCEEDED
+                self._close(record)
+
+    def on_order_error(self, data):
+        """
+        委托失败推送，委托按废单关闭
+
+        参数:
+            data: XtOrderError对象
+        """
+        with self._cond:
+            record = self.orders.get(data.order_id)
+            if record is None:
+                self._early_final[data.order_id] = xtconstant.ORDER_JUNK
+                return
+            record['order_status'] = xtconstant.ORDER_JUNK
+            self._close(record)
+
+    def on_cancel_error(self, data):
+        """
+        撤单失败推送，委托可能已经成交，保持未完成状态等待委托推送，并稍后重试撤单
+
+        参数:
+            data: XtCancelError对象
+        """
+        with self._cond:
+            record = self.orders.get(data.order_id)
+            if record is None or not self.is_open(data.order_id):
+                return
+            record['cancel_requested'] = False
+            if record['deadline'] is not None:
+                self._schedule(record, self.clock() + CANCEL_RETRY_SECONDS)
+
+    # ------------------------------------------------------------------ 超时撤单
+
+    def expire(self, now=None):
+        """
+        对截止时间已到的未完成委托发出撤单
+
+        只弹出堆顶已到期的元素，没有到期委托时为O(1)。撤单发出后以CANCEL_RETRY_SECONDS重新设置截止时间，
+        推送丢失时委托不会一直处于未完成状态：到期后先查询委托状态，仍未完成则重新撤单。
+
+        参数:
+            now (float): 当前时间，None表示使用时钟
+
+        返回:
+            list: 本次发出撤单的订单编号列表
+        """
+        now = self.clock() if now is None else now
+        expired = []
+        with self._cond:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, _, order_id = heapq.heappop(self._deadlines)
+                record = self.orders.get(order_id)
+                # 已完成或截止时间已被更新的条目直接丢弃
+                if record is None or record['deadline'] != deadline or not self.is_open(order_id):
+                    continue
+                record['deadline'] = None
+                expired.append(record)
+
+        cancelled = []
+        for record in expired:
+            order_id = record['order_id']
+            resend = record['cancel_requested']
+            if resend:
+                # 撤单已发出但未收到终态推送，先查询委托状态
+                if self._refresh(record):
+                    continue
+                logger.warning(f"{YELLOW}【撤单未确认】{RESET} 订单ID:{order_id} 股票:{record['stock_code']} 重新撤单")
+            try:
+                result = self.cancel_func(order_id) if self.cancel_func else -1
+            except Exception as e:
+                logger.error(f"{RED}【撤单异常】{RESET} 订单ID:{order_id} 错误:{e}")
+                result = -1
+            with self._cond:
+                if result == 0:
+                    record['cancel_requested'] = True
+                    cancelled.append(order_id)
+                    if self.is_open(order_id):
+                        self._schedule(record, now + CANCEL_RETRY_SECONDS)
+                    if not resend:
+                        logger.info(f"{YELLOW}【超时撤单】{RESET} 订单ID:{order_id} 股票:{record['stock_code']} 已等待:{now - record['time']:.0f}秒")
+                elif self.is_open(order_id):
+                    self._schedule(record, now + CANCEL_RETRY_SECONDS)
+                    logger.warning(f"{YELLOW}【撤单失败】{RESET} 订单ID:{order_id} 股票:{record['stock_code']} {CANCEL_RETRY_SECONDS}秒后重试")
+        return cancelled
+
+    def start(self):
+        """
+        启动后台超时线程，线程在最近的截止时间唤醒，没有待超时委托时一直等待
+        """
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='OrderManager', daemon=True)
+            self._thread.start()
+        logger.debug(f"{GREEN}【订单管理】{RESET} 超时撤单线程已启动")
+
+    def stop(self):
+        """
+        停止后台超时线程
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                timeout = self._deadlines[0][0] - self.clock() if self._deadlines else None
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            try:
+                self.expire()
+            except Exception as e:
+                logger.error(f"{RED}【超时撤单异常】{RESET} 错误:{e}")
+
+    def _refresh(self, record):
+        # 查询委托状态并按委托推送处理，返回委托是否已完成
+        if self.query_func is None:
+            return False
+        try:
+            order = self.query_func(record['order_id'])
+        except Exception as e:
+            logger.error(f"{RED}【委托查询异常】{RESET} 订单ID:{record['order_id']} 错误:{e}")
+            return False
+        if order is not None:
+            self.on_stock_order(order)
+        return not self.is_open(record['order_id'])
+
+    def _schedule(self, record, deadline):
+        # 旧的堆元素不删除，弹出时按deadline比对丢弃
+        record['deadline'] = deadline
+        heapq.heappush(self._deadlines, (deadline, next(self._counter), record['order_id']))
+        self._cond.notify_all()
+
+    def _close(self, record):
+        orders = self.open_orders.get(record['stock_code'])
+        if orders is not None:
+            orders.pop(record['order_id'], None)
+            if not orders:
+                del self.open_orders[record['stock_code']]
+        record['deadline'] = None
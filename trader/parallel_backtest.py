@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+并行分段回测模块
+
+该模块在多进程中运行BacktestEngine，包括：
+1. 分段回测: 把回测区间切分为多个分段并行运行，分段之间按日终持仓交接拼接结果
+2. 参数扫描: 每组参数在一个进程中独立回测全区间，充分利用所有CPU核心
+
+子进程各自以只读内存映射方式打开同一个K线存储，分钟线数据由操作系统页缓存共享，不在进程间复制。
+
+分段拼接规则：
+    除第一个分段外，每个分段从起点之前的若干交易日（预热期）开始空仓运行，
+    预热期结束时的持仓与上一分段的日终持仓比较：
+    - 持仓一致时直接采用该分段的结果，资金差额平移到该分段的权益曲线上
+    - 持仓不一致时以上一分段的日终状态为起点重新运行该分段
+    策略在每个交易日开始时清空日内状态，跨日只通过持仓关联，预热期足够覆盖持仓周期时
+    绝大多数分段无需重跑。资金差额只做平移，资金或仓位上限约束生效时与逐日串行回测可能略有差异。
+
+策略和股票池通过工厂函数创建，工厂函数需定义在模块顶层以便传给子进程：
+    strategy_factory(context, params) -> 策略对象
+    pool_factory(bar_store) -> 股票池（列表或按交易日返回列表的函数）
+"""
+
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from trader.backtest import BacktestContext, BacktestEngine, calculate_summary
+from trader.bar_store import BarStore
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+# 分段预热的交易日数，应覆盖策略的常见持仓天数
+WARMUP_DAYS = 5
+
+
+def run_segment(task):
+    """
+    运行一个回测分段，在子进程中执行
+
+    参数:
+        task (dict): 分段任务，包含以下字段：
+            - strategy_factory / pool_factory: 策略和股票池工厂函数
+            - bar_root: K线存储根目录
+            - days: 分段的交易日列表（含预热期）
+            - warmup: 预热期交易日数，预热期的成交和权益不计入结果
+            - initial_cash: 初始资金
+            - initial_state: 起始账户状态（BacktestContext.get_state的返回值），None表示空仓
+            - params: 策略参数
+            - context_kwargs: BacktestContext的其他参数
+            - log_level: 子进程回测期间的日志级别
+
+    返回:
+        dict: 包含trades、equity（记录列表）、boundary_state（预热期结束时的状态）、
+            end_state（分段结束时的状态）和bar_count
+    """
+    bar_store = BarStore(task['bar_root'])
+    context = BacktestContext(initial_cash=task['initial_cash'], **task['context_kwargs'])
+    if task['initial_state'] is not None:
+        context.load_state(task['initial_state'])
+    strategy = task['strategy_factory'](context, task['params'])
+    engine = BacktestEngine(context, strategy, bar_store, task['pool_factory'](bar_store),
+                            log_level=task['log_level'])
+
+    days, warmup = task['days'], task['warmup']
+    boundary_state = None
+    if warmup > 0:
+        engine.run(days[0], days[warmup - 1])
+        boundary_state = context.get_state()
+        context.trades.clear()
+        context.equity.clear()
+    engine.run(days[warmup], days[-1])
+    return {
+        'trades': context.trades,
+        'equity': context.equity,
+        'boundary_state': boundary_state,
+        'end_state': context.get_state(),
+        'bar_count': engine.bar_count,
+    }
+
+
+def positions_match(state, other):
+    """
+    比较两个账户状态的持仓数量和可用数量是否一致
+
+    参数:
+        state (dict): 账户状态
+        other (dict): 账户状态
+
+    返回:
+        bool: 一致返回True
+    """
+    def key(s):
+        return {code: (p['volume'], p['can_use']) for code, p in s['positions'].items()}
+    return key(state) == key(other)
+
+
+class ParallelBacktestRunner:
+    """
+    多进程回测运行器
+    """
+
+    def __init__(self, strategy_factory, pool_factory, bar_root='data/bars', initial_cash=1000000.0,
+                 max_workers=None, segment_days=None, warmup_days=WARMUP_DAYS, log_level=logging.WARNING,
+                 context_kwargs=None):
+        """
+        初始化运行器
+
+        参数:
+            strategy_factory (callable): 策略工厂函数，参数为(context, params)，需定义在模块顶层
+            pool_factory (callable): 股票池工厂函数，参数为bar_store，需定义在模块顶层
+            bar_root (str): K线存储根目录
+            initial_cash (float): 初始资金
+            max_workers (int): 进程数，默认为CPU核心数
+            segment_days (int): 每个分段的交易日数，默认为按进程数均分，且不少于预热期
+            warmup_days (int): 分段预热期交易日数，默认为WARMUP_DAYS
+            log_level (int): 子进程的日志级别，默认为WARNING，避免多个进程的日志交错刷屏
+            context_kwargs (dict): 传给BacktestContext的其他参数，如费率和滑点
+        """
+        self.strategy_factory = strategy_factory
+        self.pool_factory = pool_factory
+        self.bar_root = bar_root
+        self.initial_cash = initial_cash
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.segment_days = segment_days
+        self.warmup_days = warmup_days
+        self.log_level = log_level
+        self.context_kwargs = context_kwargs or {}
+
+    def _executor(self):
+        # 使用spawn启动子进程：各平台行为一致，且不会复制父进程中日志、定时任务等后台线程的状态
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _make_task(self, days, warmup, params, initial_state=None):
+        return {
+            'strategy_factory': self.strategy_factory,
+            'pool_factory': self.pool_factory,
+            'bar_root': self.bar_root,
+            'days': days,
+            'warmup': warmup,
+            'initial_cash': self.initial_cash,
+            'initial_state': initial_state,
+            'params': params or {},
+            'context_kwargs': self.context_kwargs,
+            'log_level': self.log_level,
+        }
+
+    def _get_days(self, start_date, end_date):
+        bar_store = BarStore(self.bar_root)
+        return [day for day in bar_store.list_partitions('1m') if str(start_date) <= day <= str(end_date)]
+
+    def run(self, start_date, end_date, params=None):
+        """
+        分段并行回测
+
+        参数:
+            start_date (str): 开始日期，格式为YYYYMMDD
+            end_date (str): 结束日期，格式为YYYYMMDD
+            params (dict): 策略参数，默认为None表示使用策略默认参数
+
+        返回:
+            dict: 包含summary（汇总指标）、trades（成交记录DataFrame）、equity（每日权益DataFrame）
+        """
+        days = self._get_days(start_date, end_date)
+        if not days:
+            logger.error(f"{RED}【回测失败】{RESET} K线存储中没有{start_date}至{end_date}的1分钟K线")
+            return {'summary': {}, 'trades': pd.DataFrame(), 'equity': pd.DataFrame()}
+
+        segment_days = self.segment_days or max(math.ceil(len(days) / self.max_workers), self.warmup_days, 1)
+        bounds = [(lo, min(lo + segment_days, len(days))) for lo in range(0, len(days), segment_days)]
+        logger.info(f"{GREEN}【并行回测】{RESET} 区间:{days[0]}-{days[-1]} 交易日:{len(days)}天 "
+                    f"分段:{len(bounds)}个 进程:{self.max_workers}")
+
+        start = time.perf_counter()
+        trades, equity = [], []
+        reruns = 0
+        bar_count = 0
+        with self._executor() as executor:
+            futures = []
+            for lo, hi in bounds:
+                warmup = min(self.warmup_days, lo)
+                futures.append(executor.submit(run_segment, self._make_task(days[lo - warmup:hi], warmup, params)))
+
+            state = None
+            for index, future in enumerate(futures):
+                result = future.result()
+                bar_count += result['bar_count']
+                lo, hi = bounds[index]
+                if state is not None:
+                    boundary = result['boundary_state']
+                    if boundary is None or not positions_match(boundary, state):
+                        # 预热后的持仓与上一分段不一致，以上一分段的日终状态为起点重跑
+                        reruns += 1
+                        logger.info(f"{YELLOW}【分段重跑】{RESET} 分段:{days[lo]}-{days[hi - 1]} 交接持仓不一致")
+                        task = self._make_task(days[lo:hi], 0, params, initial_state=state)
+                        result = executor.submit(run_segment, task).result()
+                        bar_count += result['bar_count']
+                    else:
+                        # 持仓一致，把资金差额平移到该分段的权益曲线上
+                        offset = state['cash'] - boundary['cash']
+                        for record in result['equity']:
+                            record['可用金额'] += offset
+                            record['总资产'] += offset
+                            record['净值'] = record['总资产'] / self.initial_cash
+                        result['end_state']['cash'] += offset
+                trades.extend(result['trades'])
+                equity.extend(result['equity'])
+                state = result['end_state']
+
+        trades = pd.DataFrame(trades)
+        equity = pd.DataFrame(equity)
+        summary = calculate_summary(equity, trades, self.initial_cash)
+        summary['分段数'] = len(bounds)
+        summary['重跑分段数'] = reruns
+        elapsed = time.perf_counter() - start
+        logger.info(f"{GREEN}【并行回测完成】{RESET} 耗时:{elapsed:.1f}秒 K线:{bar_count}根 "
+                    f"分段:{len(bounds)}个 重跑:{reruns}个 总收益率:{summary['总收益率']:.2%} 最大回撤:{summary['最大回撤']:.2%}")
+        return {'summary': summary, 'trades': trades, 'equity': equity}
+
+    def sweep(self, param_grid, start_date, end_date):
+        """
+        参数扫描
+
+        对参数网格的每个组合在一个子进程中回测全区间，所有组合并行执行。
+
+        参数:
+            param_grid (dict): {参数名: 取值列表}，如{'MACDFS_SHORT': [6, 12], 'BUY_AMOUNT': [10000, 20000]}
+            start_date (str): 开始日期，格式为YYYYMMDD
+            end_date (str): 结束日期，格式为YYYYMMDD
+
+        返回:
+            DataFrame: 每行为一个参数组合，包含各参数取值和汇总指标
+        """
+        days = self._get_days(start_date, end_date)
+        names = list(param_grid.keys())
+        combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        if not days or not combinations:
+            logger.error(f"{RED}【参数扫描失败】{RESET} 交易日:{len(days)}天 参数组合:{len(combinations)}个")
+            return pd.DataFrame()
+
+        logger.info(f"{GREEN}【参数扫描】{RESET} 区间:{days[0]}-{days[-1]} 参数组合:{len(combinations)}个 进程:{self.max_workers}")
+        start = time.perf_counter()
+        rows = []
+        with self._executor() as executor:
+            futures = [executor.submit(run_segment, self._make_task(days, 0, params)) for params in combinations]
+            for params, future in zip(combinations, futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"{RED}【参数扫描异常】{RESET} 参数:{params} 错误:{e}")
+                    continue
+                summary = calculate_summary(pd.DataFrame(result['equity']), pd.DataFrame(result['trades']),
+                                            self.initial_cash)
+                rows.append({**params, **summary})
+                logger.info(f"{BLUE}【参数扫描】{RESET} 参数:{params} 总收益率:{summary['总收益率']:.2%} 最大回撤:{summary['最大回撤']:.2%}")
+
+        logger.info(f"{GREEN}【参数扫描完成】{RESET} 耗时:{time.perf_counter() - start:.1f}秒 完成:{len(rows)}/{len(combinations)}组")
+        return pd.DataFrame(rows)
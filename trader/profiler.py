@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+热点路径性能分析模块
+
+统计行情推送到下单之间各环节的耗时，用于定位行情处理的延迟：
+1. 行情推送分发（QuoteHub）、分笔合成K线（BarBuilder）、策略on_bar、各买卖信号判断和下单函数的单次耗时
+2. 每根K线调用Context查询接口（持仓、资产、股票信息、最新价等）的次数
+3. 同一线程内从行情推送开始到下单函数返回的端到端耗时
+
+耗时记录在HDR风格的对数线性直方图中（相对误差小于1%），报告p50、p90、p99和最大值，
+定期输出到日志并保存为JSON文件。
+
+性能分析需要显式开启：启动前设置环境变量QMT_PROFILE=1。未开启时@profiled直接返回原函数，
+不增加任何调用开销；开启后可在main.py中定时调用profiler.report()。
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+
+# 是否开启性能分析，模块导入时确定
+PROFILE_ENABLED = os.environ.get('QMT_PROFILE', '').strip() not in ('', '0')
+
+# 定时输出报告的周期
+PROFILE_REPORT_INTERVAL = '60nSecond'
+
+# 报告JSON文件路径
+DEFAULT_REPORT_PATH = 'logs/profile.json'
+
+# 直方图每个2的幂区间内的线性子区间数为2**HISTOGRAM_PRECISION_BITS，相对误差不超过1/128
+HISTOGRAM_PRECISION_BITS = 7
+
+# 直方图可记录的最大值为2**HISTOGRAM_MAX_BITS（纳秒约18分钟），超过时记入最后一个区间
+HISTOGRAM_MAX_BITS = 40
+
+# 统计项名称
+CONTEXT_CALLS_PER_BAR = '每根K线Context调用次数'
+PUSH_TO_ORDER = '行情推送到下单'
+
+
+class LatencyHistogram:
+    """
+    对数线性直方图
+
+    小于2**(P+1)的值各占一个区间；更大的值按最高位所在的2的幂分段，每段分为2**P个等宽区间，
+    记录和查询都是O(1)的整数运算，内存为固定大小的计数列表。
+    """
+
+    def __init__(self, precision_bits=HISTOGRAM_PRECISION_BITS, max_bits=HISTOGRAM_MAX_BITS):
+        """
+        初始化直方图
+
+        参数:
+            precision_bits (int): 精度位数P，默认为HISTOGRAM_PRECISION_BITS
+            max_bits (int): 可记录的最大值位数，默认为HISTOGRAM_MAX_BITS
+        """
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.linear_limit = 1 << (precision_bits + 1)
+        self.max_value = (1 << max_bits) - 1
+        self.counts = [0] * (self.linear_limit + (max_bits - precision_bits - 1) * self.sub_buckets)
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.linear_limit:
+            return value
+        shift = value.bit_length() - self.precision_bits - 1
+        return self.linear_limit + (shift - 1) * self.sub_buckets + (value >> shift) - self.sub_buckets
+
+    def _value_at(self, index):
+        # 区间的中间值
+        if index < self.linear_limit:
+            return index
+        shift = (index - self.linear_limit) // self.sub_buckets + 1
+        mantissa = (index - self.linear_limit) % self.sub_buckets + self.sub_buckets
+        return (mantissa << shift) + (1 << (shift - 1))
+
+    def record(self, value):
+        """
+        记录一个非负整数值
+
+        参数:
+            value (int): 记录值，耗时以纳秒为单位
+        """
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, percent):
+        """
+        计算分位数
+
+        参数:
+            percent (float): 百分位，0到100
+
+        返回:
+            int: 分位数，没有记录时返回0
+        """
+        if not self.total:
+            return 0
+        target = max(1, int(self.total * percent / 100.0 + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    def summary(self, scale=1.0):
+        """
+        汇总统计
+
+        参数:
+            scale (float): 数值除以的比例，例如1000表示纳秒转换为微秒
+
+        返回:
+            dict: 包含次数、平均值、最小值、p50、p90、p99和最大值
+        """
+        return {
+            '次数': self.total,
+            '平均': round(self.sum / self.total / scale, 3) if self.total else 0,
+            '最小': round((self.min or 0) / scale, 3),
+            'p50': round(self.percentile(50) / scale, 3),
+            'p90': round(self.percentile(90) / scale, 3),
+            'p99': round(self.percentile(99) / scale, 3),
+            '最大': round(self.max / scale, 3),
+        }
+
+
+class Profiler:
+    """
+    性能分析器
+
+    各环节的耗时和每根K线的Context调用次数分别记录在以名称为键的直方图中，
+    Context调用计数和行情推送开始时间按线程保存。
+    """
+
+    def __init__(self):
+        self.latencies = {}  # 耗时直方图（纳秒），格式：{名称: LatencyHistogram}
+        self.counts = {}  # 计数直方图，格式：{名称: LatencyHistogram}
+        self.started_at = datetime.now()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def record(self, name, nanoseconds):
+        """
+        记录一次耗时
+
+        参数:
+            name (str): 环节名称
+            nanoseconds (int): 耗时（纳秒）
+        """
+        with self._lock:
+            histogram = self.latencies.get(name)
+            if histogram is None:
+                histogram = self.latencies[name] = LatencyHistogram()
+            histogram.record(nanoseconds)
+
+    def record_count(self, name, value):
+        """
+        记录一次计数
+
+        参数:
+            name (str): 统计项名称
+            value (int): 计数值
+        """
+        with self._lock:
+            histogram = self.counts.get(name)
+            if histogram is None:
+                histogram = self.counts[name] = LatencyHistogram()
+            histogram.record(value)
+
+    # ------------------------------------------------------------------ 线程内状态
+
+    def begin_push(self):
+        """
+        记录当前线程行情推送处理的开始时间
+        """
+        self._local.push_started = time.perf_counter_ns()
+
+    def end_push(self):
+        """
+        清除当前线程的行情推送开始时间
+        """
+        self._local.push_started = None
+
+    def count_context_call(self):
+        """
+        当前线程的Context调用次数加1
+        """
+        self._local.context_calls = getattr(self._local, 'context_calls', 0) + 1
+
+    def context_calls(self):
+        """
+        获取当前线程累计的Context调用次数
+
+        返回:
+            int: 调用次数
+        """
+        return getattr(self._local, 'context_calls', 0)
+
+    def record_push_to_order(self):
+        """
+        记录当前线程从行情推送开始到此刻的耗时，不在行情推送中时不记录
+        """
+        started = getattr(self._local, 'push_started', None)
+        if started is not None:
+            self.record(PUSH_TO_ORDER, time.perf_counter_ns() - started)
+
+    # ------------------------------------------------------------------ 报告
+
+    def snapshot(self):
+        """
+        获取当前统计
+
+        返回:
+            dict: 包含开始时间、报告时间、各环节耗时（微秒）和计数统计
+        """
+        with self._lock:
+            return {
+                '开始时间': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+                '报告时间': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                '耗时(微秒)': {name: histogram.summary(1000.0) for name, histogram in sorted(self.latencies.items())},
+                '计数': {name: histogram.summary() for name, histogram in sorted(self.counts.items())},
+            }
+
+    def report(self, path=DEFAULT_REPORT_PATH):
+        """
+        输出统计到日志，并保存为JSON文件
+
+        参数:
+            path (str): JSON文件路径，为None时只输出到日志
+
+        返回:
+            dict: 统计结果，同snapshot
+        """
+        snapshot = self.snapshot()
+        lines = [f"{name}: 次数:{s['次数']} p50:{s['p50']:.1f} p90:{s['p90']:.1f} p99:{s['p99']:.1f} 最大:{s['最大']:.1f}"
+                 for name, s in snapshot['耗时(微秒)'].items()]
+        lines += [f"{name}: 次数:{s['次数']} 平均:{s['平均']:.2f} p99:{s['p99']:.0f} 最大:{s['最大']:.0f}"
+                  for name, s in snapshot['计数'].items()]
+        logger.info(f"{BLUE}【性能分析】{RESET} 耗时单位:微秒\n" + "\n".join(lines))
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"{RED}【性能分析】{RESET} 报告保存失败 文件:{path} 错误:{e}")
+        return snapshot
+
+    def reset(self):
+        """
+        清空全部统计
+        """
+        with self._lock:
+            self.latencies = {}
+            self.counts = {}
+            self.started_at = datetime.now()
+
+
+# 全局性能分析器
+profiler = Profiler()
+
+
+def profiled(name, kind=None):
+    """
+    性能分析装饰器，PROFILE_ENABLED为False时直接返回原函数
+
+    参数:
+        name (str): 环节名称
+        kind (str): 环节类型，用于关联统计：
+            - 'push': 行情推送入口，记录推送开始时间
+            - 'bar': 处理一根K线，记录期间的Context调用次数
+            - 'context': Context查询接口，计入当前K线的调用次数
+            - 'order': 下单函数，记录从行情推送开始的端到端耗时
+
+    返回:
+        callable: 装饰器
+    """
+    def decorator(func):
+        if not PROFILE_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if kind == 'push':
+                profiler.begin_push()
+            elif kind == 'bar':
+                calls_before = profiler.context_calls()
+            elif kind == 'context':
+                profiler.count_context_call()
+            started = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(name, time.perf_counter_ns() - started)
+                if kind == 'push':
+                    profiler.end_push()
+                elif kind == 'bar':
+                    profiler.record_count(CONTEXT_CALLS_PER_BAR, profiler.context_calls() - calls_before)
+                elif kind == 'order':
+                    profiler.record_push_to_order()
+        return wrapper
+    return decorator
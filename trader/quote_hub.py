@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+行情订阅中心模块
+
+集中管理进程内的行情订阅，每个行情周期只注册一个回调，推送数据只解码一次，
+再按股票代码通过字典分发给各股票的处理函数：
+1. 分笔行情（period='tick'）: 使用xtdata.subscribe_whole_quote，一次调用订阅一批股票
+2. K线行情（'1m'、'5m'、'1d'等）: xtdata.subscribe_quote只支持单只股票，每只股票一个订阅，但共用同一个分发回调
+
+订阅号按股票记录，增加或移除股票时只订阅新增的股票、只取消不再需要的订阅号，不会重新订阅全部股票。
+同一批订阅的股票共用一个订阅号，全部移除后才取消该订阅号，移除后仍推送到达的数据直接丢弃。
+
+处理函数的参数为(stock_code, data)，data为推送中该股票对应的值：
+分笔行情为行情快照字典，K线行情为K线字典列表。
+"""
+
+import threading
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.profiler import profiled
+
+# 分笔行情周期，使用全推订阅
+TICK_PERIOD = 'tick'
+
+
+class QuoteHub:
+    """
+    行情订阅中心
+
+    订阅状态的修改在锁内进行，分发回调只读取处理函数字典，不加锁。
+    处理函数列表在修改时整体替换，分发过程中不会看到修改到一半的列表。
+    """
+
+    def __init__(self, subscribe_quote=None, subscribe_whole_quote=None, unsubscribe_quote=None):
+        """
+        初始化订阅中心
+
+        参数:
+            subscribe_quote (callable): K线订阅函数，签名同xtdata.subscribe_quote，默认为xtdata.subscribe_quote
+            subscribe_whole_quote (callable): 全推订阅函数，签名同xtdata.subscribe_whole_quote，
+                默认为xtdata.subscribe_whole_quote
+            unsubscribe_quote (callable): 取消订阅函数，参数为订阅号，默认为xtdata.unsubscribe_quote
+        """
+        self._subscribe_quote = subscribe_quote
+        self._subscribe_whole_quote = subscribe_whole_quote
+        self._unsubscribe_quote = unsubscribe_quote
+        self._lock = threading.Lock()
+        self._handlers = {}  # 处理函数，格式：{period: {stock_code: (handler1, handler2, ...)}}
+        self._callbacks = {}  # 每个周期的分发回调，格式：{period: callback}
+        self._code_seqs = {}  # 股票对应的订阅号，格式：{period: {stock_code: seq}}
+        self._seq_codes = {}  # 订阅号覆盖的股票，格式：{seq: set(stock_code)}
+        self.stats = {'推送次数': 0, '分发次数': 0, '丢弃次数': 0, '处理异常': 0}
+
+    def _xtdata_functions(self):
+        # 默认使用xtdata的订阅接口，延迟导入，回测等不连接QMT的场景可以只注入替代函数
+        if self._subscribe_quote is None or self._subscribe_whole_quote is None or self._unsubscribe_quote is None:
+            from xtquant import xtdata
+            self._subscribe_quote = self._subscribe_quote or xtdata.subscribe_quote
+            self._subscribe_whole_quote = self._subscribe_whole_quote or xtdata.subscribe_whole_quote
+            self._unsubscribe_quote = self._unsubscribe_quote or xtdata.unsubscribe_quote
+
+    def _get_callback(self, period):
+        callback = self._callbacks.get(period)
+        if callback is None:
+            def callback(datas, period=period):
+                self._dispatch(period, datas)
+            self._callbacks[period] = callback
+        return callback
+
+    def subscribe(self, stock_codes, handler, period='1m'):
+        """
+        订阅股票行情
+
+        已订阅的股票只追加处理函数，不会重复订阅。
+
+        参数:
+            stock_codes (list): 带后缀的股票代码列表
+            handler (callable): 处理函数，参数为(stock_code, data)
+            period (str): 行情周期，'tick'使用全推订阅，默认为'1m'
+
+        返回:
+            list: 本次新订阅的股票代码列表
+        """
+        with self._lock:
+            self._xtdata_functions()
+            handlers = self._handlers.setdefault(period, {})
+            code_seqs = self._code_seqs.setdefault(period, {})
+            new_codes = []
+            for stock_code in dict.fromkeys(stock_codes):
+                current = handlers.get(stock_code, ())
+                if handler not in current:
+                    handlers[stock_code] = current + (handler,)
+                if stock_code not in code_seqs:
+                    new_codes.append(stock_code)
+            if not new_codes:
+                return []
+
+            callback = self._get_callback(period)
+            subscribed = []
+            if period == TICK_PERIOD:
+                # 一次全推订阅覆盖本批全部股票
+                try:
+                    seq = self._subscribe_whole_quote(new_codes, callback=callback)
+                except Exception as e:
+                    seq = -1
+                    logger.error(f"{RED}【订阅失败】{RESET} 全推行情 股票:{len(new_codes)}只 错误:{e}")
+                if seq is not None and seq >= 0:
+                    self._seq_codes[seq] = set(new_codes)
+                    for stock_code in new_codes:
+                        code_seqs[stock_code] = seq
+                    subscribed = new_codes
+            else:
+                for stock_code in new_codes:
+                    try:
+                        seq = self._subscribe_quote(stock_code, period=period, callback=callback)
+                    except Exception as e:
+                        seq = -1
+                        logger.error(f"{RED}【订阅失败】{RESET} 股票:{stock_code} 周期:{period} 错误:{e}")
+                    if seq is not None and seq >= 0:
+                        self._seq_codes[seq] = {stock_code}
+                        code_seqs[stock_code] = seq
+                        subscribed.append(stock_code)
+
+            # 订阅失败的股票不保留处理函数，下次subscribe时重试
+            for stock_code in new_codes:
+                if stock_code not in code_seqs:
+                    handlers.pop(stock_code, None)
+            logger.debug(f"{GREEN}【行情订阅】{RESET} 周期:{period} 新增订阅:{len(subscribed)}只 失败:{len(new_codes) - len(subscribed)}只")
+            return subscribed
+
+    def unsubscribe(self, stock_codes, handler=None, period='1m'):
+        """
+        取消订阅股票行情
+
+        参数:
+            stock_codes (list): 带后缀的股票代码列表
+            handler (callable): 要移除的处理函数，默认为None表示移除该股票的全部处理函数
+            period (str): 行情周期，默认为'1m'
+
+        返回:
+            list: 已不再有任何处理函数、被取消订阅的股票代码列表
+        """
+        with self._lock:
+            handlers = self._handlers.get(period, {})
+            code_seqs = self._code_seqs.get(period, {})
+            removed = []
+            for stock_code in dict.fromkeys(stock_codes):
+                current = handlers.get(stock_code, ())
+                remaining = tuple(h for h in current if handler is not None and h != handler)
+                if remaining:
+                    handlers[stock_code] = remaining
+                    continue
+                handlers.pop(stock_code, None)
+                seq = code_seqs.pop(stock_code, None)
+                if seq is None:
+                    continue
+                removed.append(stock_code)
+                codes = self._seq_codes.get(seq, set())
+                codes.discard(stock_code)
+                # 订阅号覆盖的股票全部移除后才取消订阅
+                if not codes:
+                    self._seq_codes.pop(seq, None)
+                    try:
+                        self._unsubscribe_quote(seq)
+                    except Exception as e:
+                        logger.error(f"{RED}【取消订阅失败】{RESET} 订阅号:{seq} 周期:{period} 错误:{e}")
+            if removed:
+                logger.debug(f"{BLUE}【取消订阅】{RESET} 周期:{period} 取消订阅:{len(removed)}只")
+            return removed
+
+    def set_symbols(self, stock_codes, handler, period='1m'):
+        """
+        将处理函数订阅的股票调整为stock_codes：订阅新增的股票，取消不再需要的股票
+
+        参数:
+            stock_codes (list): 带后缀的股票代码列表
+            handler (callable): 处理函数，参数为(stock_code, data)
+            period (str): 行情周期，默认为'1m'
+
+        返回:
+            tuple: (新订阅的股票列表, 取消订阅的股票列表)
+        """
+        target = set(stock_codes)
+        current = [code for code in self.get_symbols(period, handler) if code not in target]
+        removed = self.unsubscribe(current, handler=handler, period=period)
+        added = self.subscribe(stock_codes, handler, period=period)
+        return added, removed
+
+    def get_symbols(self, period='1m', handler=None):
+        """
+        获取已订阅的股票
+
+        参数:
+            period (str): 行情周期，默认为'1m'
+            handler (callable): 只返回注册了该处理函数的股票，默认为None表示全部
+
+        返回:
+            list: 股票代码列表
+        """
+        handlers = self._handlers.get(period, {})
+        return [code for code, current in list(handlers.items()) if handler is None or handler in current]
+
+    def unsubscribe_all(self):
+        """
+        取消全部订阅
+        """
+        for period in list(self._handlers):
+            self.unsubscribe(self.get_symbols(period), period=period)
+
+    @profiled('QuoteHub分发', kind='push')
+    def _dispatch(self, period, datas):
+        # 推送已由xtdata解码为{stock_code: data}，按股票代码查找处理函数
+        stats = self.stats
+        stats['推送次数'] += 1
+        if not datas:
+            return
+        handlers = self._handlers.get(period)
+        if not handlers:
+            stats['丢弃次数'] += len(datas)
+            return
+        for stock_code, data in datas.items():
+            current = handlers.get(stock_code)
+            if not current:
+                stats['丢弃次数'] += 1
+                continue
+            for handler in current:
+                try:
+                    handler(stock_code, data)
+                except Exception as e:
+                    stats['处理异常'] += 1
+                    logger.error(f"{RED}【行情处理异常】{RESET} 股票:{stock_code} 周期:{period} 错误:{e}")
+            stats['分发次数'] += 1
+
+    def get_stats(self):
+        """
+        获取分发统计
+
+        返回:
+            dict: 包含推送次数、分发次数、丢弃次数、处理异常和各周期的订阅股票数、订阅号数量
+        """
+        with self._lock:
+            return {
+                **self.stats,
+                '订阅股票数': {period: len(codes) for period, codes in self._code_seqs.items()},
+                '订阅号数量': len(self._seq_codes),
+            }
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+定时任务调度模块
+
+该模块为Context.run_time和Context.run_daily提供执行引擎，包括：
+1. 解析周期字符串（如"30nSecond"、"1nMinute"）和每日时间字符串（"HH:MM:SS"）
+2. 以下次执行时间小顶堆管理任务，单个后台线程在最近的执行时间唤醒
+3. 跳过非交易日
+4. 休眠或阻塞后错过执行时间的处理：周期任务合并为一次执行，
+   每日任务在容忍时间内补执行，超出则跳过到下一天
+5. 记录每个任务的执行次数、耗时、错过次数和异常次数
+
+时钟和交易日判断函数通过构造参数注入，测试时可以使用模拟时钟并调用run_pending驱动。
+"""
+
+import heapq
+import itertools
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from trader.logger import logger
+from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
+from trader.utils import is_trading_day
+
+# 周期字符串的单位换算（秒）
+PERIOD_UNITS = {
+    'Second': 1,
+    'Minute': 60,
+    'Hour': 3600,
+}
+
+PERIOD_PATTERN = re.compile(r'^(\d+)n(Second|Minute|Hour)$')
+
+
+def parse_period(period):
+    """
+    解析周期字符串
+
+    参数:
+        period (str): 周期字符串，例如 "5nSecond"、"1nMinute"、"2nHour"
+
+    返回:
+        int: 周期秒数
+
+    异常:
+        ValueError: 格式错误或周期不大于0时抛出
+    """
+    match = PERIOD_PATTERN.match(period.strip())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"周期格式错误: {period}，应为如'30nSecond'、'1nMinute'的格式")
+    return int(match.group(1)) * PERIOD_UNITS[match.group(2)]
+
+
+def parse_daily_time(value):
+    """
+    解析每日执行时间字符串
+
+    参数:
+        value (str): 时间字符串，格式为"HH:MM:SS"或"HH:MM"
+
+    返回:
+        datetime.time: 执行时间
+
+    异常:
+        ValueError: 格式错误时抛出
+    """
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.strptime(value.strip(), fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"时间格式错误: {value}，应为'HH:MM:SS'格式")
+
+
+class Scheduler:
+    """
+    定时任务调度器
+
+    任务记录为字典，包含以下字段：
+        - name: 任务名称
+        - func: 回调函数
+        - type: 'time'表示周期任务，'daily'表示每日任务
+        - interval: 周期任务的间隔秒数
+        - at: 每日任务的执行时间
+        - trading_days_only: 是否只在交易日执行
+        - next_run: 下次执行时间（时钟秒数）
+        - runs / errors / missed / skipped: 执行、异常、错过、非交易日跳过次数
+        - total_time / max_time / last_time: 累计、最长、最近一次执行耗时（秒）
+
+    所有任务在同一个后台线程中依次执行，耗时较长的任务会推迟其他任务。
+    """
+
+    def __init__(self, clock=time.time, is_trading_day=is_trading_day, misfire_grace_time=60):
+        """
+        初始化调度器
+
+        参数:
+            clock (callable): 时钟函数，返回当前时间的秒数，默认为time.time
+            is_trading_day (callable): 交易日判断函数，参数为datetime.date，为None时每天都执行
+            misfire_grace_time (float): 每日任务错过执行时间后仍补执行的容忍秒数，默认为60秒
+        """
+        self.clock = clock
+        self.is_trading_day = is_trading_day
+        self.misfire_grace_time = misfire_grace_time
+        self.tasks = {}  # 任务，格式：{name: 任务记录}
+        self._heap = []  # 元素为(下次执行时间, 序号, name)
+        self._counter = itertools.count()
+        self._trading_day_cache = {}
+        self._cond = threading.Condition(threading.RLock())
+        self._thread = None
+        self._running = False
+
+    # ------------------------------------------------------------------ 添加与移除
+
+    def run_time(self, func, period, name=None, trading_days_only=True):
+        """
+        添加周期任务
+
+        参数:
+            func (callable): 回调函数，无参数
+            period (str): 周期字符串，例如 "5nSecond"、"1nMinute"
+            name (str): 任务名称，默认为函数名（重名时追加序号），指定的名称已存在时替换原任务
+            trading_days_only (bool): 是否只在交易日执行，默认为True
+
+        返回:
+            dict: 任务记录
+        """
+        interval = parse_period(period)
+        task = self._new_task(func, name, 'time', trading_days_only)
+        task['interval'] = interval
+        return self._add(task, self.clock() + interval)
+
+    def run_daily(self, func, at, name=None, trading_days_only=True):
+        """
+        添加每日任务
+
+        参数:
+            func (callable): 回调函数，无参数
+            at (str): 执行时间字符串，格式为"HH:MM:SS"
+            name (str): 任务名称，默认为函数名（重名时追加序号），指定的名称已存在时替换原任务
+            trading_days_only (bool): 是否只在交易日执行，默认为True
+
+        返回:
+            dict: 任务记录
+        """
+        task = self._new_task(func, name, 'daily', trading_days_only)
+        task['at'] = parse_daily_time(at)
+        return self._add(task, self._next_daily(task['at'], self.clock(), inclusive=True))
+
+    def remove(self, name):
+        """
+        移除任务
+
+        参数:
+            name (str): 任务名称
+
+        返回:
+            bool: 任务是否存在
+        """
+        with self._cond:
+            return self.tasks.pop(name, None) is not None
+
+    # ------------------------------------------------------------------ 执行
+
+    def run_pending(self, now=None):
+        """
+        执行所有到期任务
+
+        后台线程和模拟时钟测试都通过该方法驱动，没有到期任务时为O(1)。
+
+        参数:
+            now (float): 当前时间，None表示使用时钟
+
+        返回:
+            list: 本次执行的任务名称列表
+        """
+        now = self.clock() if now is None else now
+        executed = []
+        while True:
+            with self._cond:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                next_run, _, name = heapq.heappop(self._heap)
+                task = self.tasks.get(name)
+                # 已移除或已被替换的任务直接丢弃
+                if task is None or task['next_run'] != next_run:
+                    continue
+                should_run = self._prepare(task, now)
+                self._reschedule(task, now)
+            if should_run and self._execute(task):
+                executed.append(name)
+        return executed
+
+    def reset(self):
+        """
+        按当前时钟重新计算所有任务的下次执行时间
+
+        时钟被整体调整后调用（如回测开始时把模拟时钟设到回测起点），
+        之前按旧时间安排的执行不视为错过。
+        """
+        with self._cond:
+            now = self.clock()
+            self._heap = []
+            for task in self.tasks.values():
+                if task['type'] == 'time':
+                    self._push(task, now + task['interval'])
+                else:
+                    self._push(task, self._next_daily(task['at'], now, inclusive=True))
+
+    def next_run_time(self):
+        """
+        查询最近的执行时间
+
+        堆中可能残留已移除或已替换任务的过期元素，返回值不晚于实际的最近执行时间，
+        按该时间调用run_pending是安全的。回测中用于按模拟时间逐个触发任务。
+
+        返回:
+            float: 最近的执行时间（时钟秒数），没有任务时返回None
+        """
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        """
+        启动后台调度线程
+        """
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='Scheduler', daemon=True)
+            self._thread.start()
+        logger.debug(f"{GREEN}【定时任务】{RESET} 调度线程已启动 任务数:{len(self.tasks)}")
+
+    def stop(self):
+        """
+        停止后台调度线程
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get_stats(self):
+        """
+        查询各任务的执行统计
+
+        返回:
+            dict: 格式为{name: 统计字典}，统计字典包含runs、errors、missed、skipped、
+                avg_time、max_time、last_time和next_run（datetime）
+        """
+        with self._cond:
+            return {
+                name: {
+                    'runs': task['runs'],
+                    'errors': task['errors'],
+                    'missed': task['missed'],
+                    'skipped': task['skipped'],
+                    'avg_time': task['total_time'] / task['runs'] if task['runs'] else 0.0,
+                    'max_time': task['max_time'],
+                    'last_time': task['last_time'],
+                    'next_run': datetime.fromtimestamp(task['next_run']),
+                }
+                for name, task in self.tasks.items()
+            }
+
+    # ------------------------------------------------------------------ 内部方法
+
+    def _new_task(self, func, name, task_type, trading_days_only):
+        if name is None:
+            base = getattr(func, '__name__', type(func).__name__)
+            name = base
+            with self._cond:
+                for index in itertools.count(2):
+                    if name not in self.tasks:
+                        break
+                    name = f"{base}#{index}"
+        return {
+            'name': name,
+            'func': func,
+            'type': task_type,
+            'interval': None,
+            'at': None,
+            'trading_days_only': trading_days_only,
+            'next_run': None,
+            'runs': 0,
+            'errors': 0,
+            'missed': 0,
+            'skipped': 0,
+            'total_time': 0.0,
+            'max_time': 0.0,
+            'last_time': 0.0,
+        }
+
+    def _add(self, task, next_run):
+        with self._cond:
+            if task['name'] in self.tasks:
+                logger.warning(f"{YELLOW}【定时任务】{RESET} 任务:{task['name']} 已存在，替换为新任务")
+            self.tasks[task['name']] = task
+            self._push(task, next_run)
+        logger.debug(f"{BLUE}【定时任务】{RESET} 添加任务:{task['name']} 下次执行:{datetime.fromtimestamp(next_run)}")
+        return task
+
+    def _push(self, task, next_run):
+        task['next_run'] = next_run
+        heapq.heappush(self._heap, (next_run, next(self._counter), task['name']))
+        self._cond.notify_all()
+
+    def _prepare(self, task, now):
+        """
+        判断到期任务本次是否执行，并记录错过和跳过次数
+        """
+        scheduled = task['next_run']
+        if task['type'] == 'time':
+            trading = self._should_run_on(task, datetime.fromtimestamp(now).date())
+            # 休眠或阻塞期间错过的多个周期合并为一次执行
+            missed = int((now - scheduled) // task['interval'])
+            if missed > 0 and trading:
+                task['missed'] += missed
+                logger.warning(f"{YELLOW}【定时任务】{RESET} 任务:{task['name']} 错过{missed}次执行，合并为一次")
+            if not trading:
+                task['skipped'] += 1
+            return trading
+
+        # 每日任务只补执行最近一次，更早错过的交易日只计数
+        latest = datetime.combine(datetime.fromtimestamp(now).date(), task['at'])
+        if latest.timestamp() > now:
+            latest -= timedelta(days=1)
+        day = datetime.fromtimestamp(scheduled)
+        while day < latest:
+            if self._should_run_on(task, day.date()):
+                task['missed'] += 1
+                logger.warning(f"{YELLOW}【定时任务】{RESET} 任务:{task['name']} 错过执行时间:{day}")
+            day += timedelta(days=1)
+
+        if not self._should_run_on(task, latest.date()):
+            task['skipped'] += 1
+            return False
+        if now - latest.timestamp() > self.misfire_grace_time:
+            task['missed'] += 1
+            logger.warning(f"{YELLOW}【定时任务】{RESET} 任务:{task['name']} 错过执行时间:{latest} 超过容忍时间，跳过")
+            return False
+        return True
+
+    def _should_run_on(self, task, day):
+        return not task['trading_days_only'] or self._is_trading_day(day)
+
+    def _reschedule(self, task, now):
+        if task['type'] == 'time':
+            interval = task['interval']
+            periods = int((now - task['next_run']) // interval) + 1
+            self._push(task, task['next_run'] + periods * interval)
+        else:
+            self._push(task, self._next_daily(task['at'], now, inclusive=False))
+
+    def _execute(self, task):
+        start = time.perf_counter()
+        try:
+            task['func']()
+            success = True
+        except Exception as e:
+            success = False
+            logger.error(f"{RED}【定时任务异常】{RESET} 任务:{task['name']} 错误:{e}")
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            task['runs'] += 1
+            task['errors'] += 0 if success else 1
+            task['total_time'] += elapsed
+            task['max_time'] = max(task['max_time'], elapsed)
+            task['last_time'] = elapsed
+        return success
+
+    def _next_daily(self, at, now, inclusive):
+        # 计算now之后（inclusive时包含now）的下一个执行时间
+        current = datetime.fromtimestamp(now)
+        candidate = datetime.combine(current.date(), at)
+        if candidate < current or (candidate == current and not inclusive):
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+    def _is_trading_day(self, day):
+        if self.is_trading_day is None:
+            return True
+        result = self._trading_day_cache.get(day)
+        if result is None:
+            result = self._trading_day_cache[day] = bool(self.is_trading_day(day))
+        return result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                timeout = self._heap[0][0] - self.clock() if self._heap else None
+                if timeout is None or timeout > 0:
+                    # 限制单次等待时长，系统休眠唤醒或调整时钟后能及时发现到期任务
+                    self._cond.wait(min(timeout, 60) if timeout is not None else None)
+                    continue
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"{RED}【定时任务异常】{RESET} 错误:{e}")
@@ -35,7 +35,43 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
     - 撤单错误处理
     
     该类实现了所有必要的回调方法，并使用logger记录交易过程中的各种状态和错误信息。
+    推送同时转发给通过add_listener注册的监听对象（如账户簿记），监听对象只需实现关心的回调方法。
     """
+    def __init__(self):
+        super().__init__()
+        self.listeners = []  # 推送监听对象列表
+
+    def add_listener(self, listener):
+        """
+        注册推送监听对象
+
+        参数:
+            listener: 实现了on_stock_position、on_stock_asset、on_stock_trade等任意回调方法的对象
+        """
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        移除推送监听对象
+
+        参数:
+            listener: 之前通过add_listener注册的对象
+        """
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _dispatch(self, name, data):
+        # 监听对象的异常只记录日志，不影响其他监听对象和交易线程
+        for listener in list(self.listeners):
+            handler = getattr(listener, name, None)
+            if handler is None:
+                continue
+            try:
+                handler(data)
+            except Exception as e:
+                logger.error(f"{RED}【推送处理异常】{RESET} 回调:{name} 监听对象:{type(listener).__name__} 错误:{e}")
+
     def on_disconnected(self):
         """
         连接断开回调处理
@@ -68,6 +104,7 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
         elif order.order_status == 53 or order.order_status == 54:
             logger.warning(
                 f"{YELLOW}【已撤单】{RESET} {parse_order_type(order.order_type)} 代码:{order.stock_code} 名称:{order.order_remark} 委托价格:{order.price:.2f} 委托数量:{order.order_volume} 订单编号:{order.order_id} 委托时间:{timestamp_to_datetime_string(convert_to_current_date(order.order_time))}")
+        self._dispatch('on_stock_order', order)
 
     def on_stock_trade(self, trade):
         """
@@ -83,16 +120,48 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
         """
         logger.info(
             f"{GREEN}【已成交】{RESET} {parse_order_type(trade.order_type)} 代码:{trade.stock_code} 名称:{trade.order_remark} 成交价格:{trade.traded_price:.2f} 成交数量:{trade.traded_volume} 成交编号:{trade.order_id} 成交时间:{timestamp_to_datetime_string(convert_to_current_date(trade.traded_time))}")
+        self._dispatch('on_stock_trade', trade)
+
+    def on_stock_position(self, position):
+        """
+        持仓变动推送回调处理
+
+        参数:
+            position: XtPosition对象，包含变动后的持仓信息
+        """
+        self._dispatch('on_stock_position', position)
+
+    def on_stock_asset(self, asset):
+        """
+        资产变动推送回调处理
+
+        参数:
+            asset: XtAsset对象，包含变动后的资产信息
+        """
+        self._dispatch('on_stock_asset', asset)
+
+    def on_order_stock_async_response(self, response):
+        """
+        异步下单反馈回调处理
+
+        参数:
+            response: XtOrderResponse对象，包含下单请求序号和订单编号
+        """
+        self._dispatch('on_order_stock_async_response', response)
 
     def on_order_error(self, data):
         """
         委托错误回调处理
         
-        当委托发生错误时被调用，记录错误信息并避免重复处理同一错误
+        当委托发生错误时被调用，记录错误信息并避免重复记录同一错误
+
+        异步委托在取得订单编号前被拒绝时，推送中的order_id为重复的占位值，只能按seq区分，
+        因此推送先转发给监听对象（由其按order_id或seq自行去重），再按order_id去重记录日志。
         
         参数:
             data: 包含错误信息的数据对象，具有order_id和error_msg属性
         """
+        self._dispatch('on_order_error', data)
         if data.order_id in error_orders:
             return
         error_orders.append(data.order_id)
@@ -111,6 +180,7 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
             return
         error_orders.append(data.order_id)
         logger.error(f"{RED}【撤单失败】{RESET}错误信息:{data.error_msg.strip()}")
+        self._dispatch('on_cancel_error', data)
 
 
 def create_trader(account_id, mini_qmt_path):
@@ -13,7 +13,8 @@
 
 from pytdx.config import hosts
 from xtquant import xtconstant
-from datetime import datetime
+from datetime import datetime, timedelta
+from datetime import time as dt_time
 from trader.logger import logger
 from trader.anis import RED, GREEN, YELLOW, BLUE, RESET
 import random
@@ -338,7 +339,73 @@ def convert_to_current_date(timestamp):
     return new_dt.timestamp()
 
 
-def is_trade_time():
+# 节假日缓存，格式为8位int日期的集合，首次调用is_trading_day时从xtdata加载
+_holidays = None
+
+
+def is_trading_day(day=None):
+    """
+    校验指定日期是否为A股交易日
+
+    周六、周日及xtdata节假日列表中的日期为非交易日。节假日列表只加载一次，
+    加载失败时仅按周末判断。
+
+    参数:
+        day (datetime.date): 要判断的日期，默认为今天
+
+    返回:
+        bool: 交易日返回True，否则返回False
+    """
+    global _holidays
+    day = day or datetime.now().date()
+    if day.weekday() >= 5:
+        return False
+    if _holidays is None:
+        try:
+            # 延迟导入，没有QMT数据服务的环境（如Linux回测）仍可使用本模块
+            from xtquant import xtdata
+            _holidays = set(int(d) for d in xtdata.get_holidays())
+        except Exception as e:
+            logger.warning(f"{YELLOW}【节假日获取失败】{RESET} 仅按周末判断交易日 错误:{e}")
+            _holidays = set()
+    return int(day.strftime('%Y%m%d')) not in _holidays
+
+
+def last_closed_trading_day(now=None):
+    """
+    获取最近一个已收盘的交易日
+
+    当天为交易日且已过15:00收盘时返回当天，否则向前查找最近的交易日。
+
+    参数:
+        now (datetime): 当前时间（北京时间），默认为现在
+
+    返回:
+        datetime.date: 最近一个已收盘的交易日
+    """
+    now = now or datetime.now()
+    day = now.date()
+    if is_trading_day(day) and now.time() >= dt_time(15, 0):
+        return day
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+# A股交易时段，格式为(名称, 开始时间, 结束时间)，首尾均包含
+TRADING_PERIODS = [
+    ("开盘集合竞价", dt_time(9, 15), dt_time(9, 25)),
+    ("早盘连续竞价", dt_time(9, 30), dt_time(11, 30)),
+    ("午间休市", dt_time(11, 30), dt_time(13, 0)),
+    ("午盘连续竞价", dt_time(13, 0), dt_time(14, 57)),
+    ("收盘集合竞价", dt_time(14, 57), dt_time(15, 0)),
+    # 科创板和创业板的盘后交易
+    ("科创/创业板盘后交易", dt_time(15, 5), dt_time(15, 30)),
+]
+
+
+def is_trade_time(now=None):
     """
     校验当前是否为A股交易时间
     
@@ -349,44 +416,27 @@ def is_trade_time():
     4. 收盘集合竞价 (14:57-15:00)
     5. 科创板和创业板盘后交易 (15:05-15:30)
     
-    注意：该函数仅检查时间，不考虑节假日因素
+    注意：该函数仅检查时间，不考虑节假日因素。每根K线都会调用，交易时段预先定义为TRADING_PERIODS，
+    不在每次调用时解析时间字符串
+    
+    参数:
+        now (datetime): 要判断的时间，默认为当前时间，回测时传入K线时间
     
     返回:
         bool: 如果当前时间在交易时段内返回True，否则返回False
     """
-    now = datetime.now()
-    current_time = now.time()
-    weekday = now.weekday()  # 0-4 是周一到周五
+    now = now or datetime.now()
 
     # 检查是否为交易日（周一至周五，非节假日）
-    if weekday >= 5:  # 周六、周日
-        return False  
-
-    # 定义交易时段
-    trading_periods = [
-        {"name": "开盘集合竞价", "start": "09:15:00", "end": "09:25:00", "can_cancel": True},
-        {"name": "早盘连续竞价", "start": "09:30:00", "end": "11:30:00", "can_cancel": True},
-        {"name": "午间休市", "start": "11:30:00", "end": "13:00:00", "can_cancel": False},
-        {"name": "午盘连续竞价", "start": "13:00:00", "end": "14:57:00", "can_cancel": True},
-        {"name": "收盘集合竞价", "start": "14:57:00", "end": "15:00:00", "can_cancel": False},
-    ]
-
-    # 科创板和创业板的盘后交易（15:05-15:30）
-    kechuang_cyb_period = {"name": "科创/创业板盘后交易", "start": "15:05:00", "end": "15:30:00", "can_cancel": False}
+    if now.weekday() >= 5:  # 周六、周日
+        return False
 
     # 检查当前是否在交易时段
-    for period in trading_periods:
-        start_time = datetime.strptime(period["start"], "%H:%M:%S").time()
-        end_time = datetime.strptime(period["end"], "%H:%M:%S").time()
+    current_time = now.time()
+    for _, start_time, end_time in TRADING_PERIODS:
         if start_time <= current_time <= end_time:
             return True
 
-    # 检查是否在科创/创业板盘后交易时段
-    kechuang_start = datetime.strptime(kechuang_cyb_period["start"], "%H:%M:%S").time()
-    kechuang_end = datetime.strptime(kechuang_cyb_period["end"], "%H:%M:%S").time()
-    if kechuang_start <= current_time <= kechuang_end:
-        return True
-
     # 不在任何交易时段
     return False
 
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+分时均价（VWAP）模块
+
+分时均价 = 当日累计成交额 ÷ 当日累计成交股数。QMT行情中的成交量以"手"为单位，
+不同市场和品种每手对应的数量不同，由get_volume_unit按代码换算：
+- 沪深北A股、ETF及其他基金: 1手=100股（份）
+- 沪深可转债: 1手=10张
+
+VWAPTracker按股票记录当日累计成交额和成交量，由策略的on_bar更新：实盘以分笔行情中的当日累计值更新，
+回测（K线存储回放的K线）按K线累加，查询为一次字典查找。cumulative_vwap为向量化版本，供参数优化等按数组计算的场景使用。
+"""
+
+import numpy as np
+
+# 成交量单位：(代码前缀, 每手数量)，按顺序匹配，未匹配时为DEFAULT_VOLUME_UNIT
+VOLUME_UNITS = (
+    ('11', 10),  # 上交所可转债
+    ('12', 10),  # 深交所可转债
+)
+DEFAULT_VOLUME_UNIT = 100
+
+
+def get_volume_unit(stock_code):
+    """
+    获取行情成交量单位（手）对应的股数（份数、张数）
+
+    参数:
+        stock_code (str): 股票代码，带或不带后缀均可
+
+    返回:
+        int: 每手数量
+    """
+    code = stock_code.split('.')[0]
+    for prefix, unit in VOLUME_UNITS:
+        if code.startswith(prefix):
+            return unit
+    return DEFAULT_VOLUME_UNIT
+
+
+def cumulative_vwap(amount, volume, units):
+    """
+    按分钟累计计算分时均价
+
+    参数:
+        amount (numpy.ndarray): 每分钟成交额，形状为(股票数, 分钟数)，缺失值为NaN
+        volume (numpy.ndarray): 每分钟成交量（手），形状同amount
+        units (numpy.ndarray): 每只股票的每手数量，形状为(股票数,)
+
+    返回:
+        numpy.ndarray: 每分钟收盘时的分时均价，形状同amount，尚无成交时为0
+    """
+    cum_amount = np.cumsum(np.nan_to_num(amount), axis=1)
+    cum_shares = np.cumsum(np.nan_to_num(volume), axis=1) * np.asarray(units, dtype=np.float64)[:, None]
+    return np.divide(cum_amount, cum_shares, out=np.zeros_like(cum_amount), where=cum_shares > 0)
+
+
+class VWAPTracker:
+    """
+    分时均价跟踪器
+
+    每只股票一条记录[交易日, 累计成交额, 累计成交股数, 每手数量]，交易日变化时重新累计。
+    """
+
+    def __init__(self):
+        self._state = {}  # 格式：{stock_code: [day, amount, shares, unit]}
+
+    def _record(self, stock_code, day):
+        record = self._state.get(stock_code)
+        if record is None:
+            record = self._state[stock_code] = [day, 0.0, 0.0, get_volume_unit(stock_code)]
+        elif record[0] != day:
+            record[0], record[1], record[2] = day, 0.0, 0.0
+        return record
+
+    def update(self, stock_code, day, amount, volume):
+        """
+        累加一根K线的成交额和成交量
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+            day: 交易日，任意可比较相等的值，如date或'YYYY-MM-DD'
+            amount (float): K线成交额（元）
+            volume (float): K线成交量（手）
+        """
+        if not volume or volume <= 0:
+            return
+        record = self._record(stock_code, day)
+        record[1] += amount
+        record[2] += volume * record[3]
+
+    def update_cumulative(self, stock_code, day, amount, volume):
+        """
+        以当日累计成交额和成交量更新，用于分笔行情
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+            day: 交易日
+            amount (float): 当日累计成交额（元）
+            volume (float): 当日累计成交量（手）
+        """
+        record = self._record(stock_code, day)
+        record[1] = float(amount or 0)
+        record[2] = float(volume or 0) * record[3]
+
+    def get(self, stock_code, day=None):
+        """
+        获取分时均价
+
+        参数:
+            stock_code (str): 带后缀的股票代码
+            day: 交易日，给出时只返回该交易日的均价
+
+        返回:
+            float: 分时均价，没有成交或不是指定交易日时返回0
+        """
+        record = self._state.get(stock_code)
+        if record is None or record[2] <= 0 or (day is not None and record[0] != day):
+            return 0.0
+        return record[1] / record[2]
+
+    def reset(self, stock_codes=None):
+        """
+        清除累计数据
+
+        参数:
+            stock_codes (list): 股票代码列表，默认为None表示全部股票
+        """
+        if stock_codes is None:
+            self._state.clear()
+            return
+        for stock_code in stock_codes:
+            self._state.pop(stock_code, None)
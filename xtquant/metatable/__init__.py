@@ -12,3 +12,4 @@ from . import get_arrow
 
 get_tabular_data = get_arrow.get_tabular_fe_data
 get_tabular_bson = get_arrow.get_tabular_fe_bson
+iter_tabular_data = get_arrow.iter_tabular_fe_data
@@ -101,6 +101,78 @@ def _get_tabular_feather_single_ori(
     return do_filter(), fe_fields
 
 
+def _open_tabular_feather_dataset(table: str):
+    '''
+    以pyarrow.dataset打开表的data.fe，只读取表结构，不读取数据
+    return: pyarrow.dataset.Dataset，文件不存在时为None
+    '''
+    from .. import xtdata
+    from pyarrow import dataset as ds
+    import os
+
+    file_path = os.path.join(xtdata.get_data_dir(), "EP", f"{table}_Xdat2", "data.fe")
+    if not os.path.exists(file_path):
+        return None
+
+    return ds.dataset(file_path, format='feather')
+
+
+def _iter_tabular_feather_single_ori(
+        dataset,
+        codes: list,
+        columns: list,
+        start_timetag: int,
+        end_timetag: int,
+        count: int = -1,
+        batch_size: int = 65536,
+        **kwargs
+):
+    '''
+    扫描data.fe，只读取columns中的列，_time和_stock的过滤在扫描时完成，逐批返回RecordBatch
+    count > 0时只返回过滤后的最后count行，最多缓存count行和一批数据
+    '''
+    from pyarrow import dataset as ds
+    from collections import deque
+
+    CONSTFIELD_TIME = '_time'
+    CONSTFIELD_CODE = '_stock'
+
+    fe_fields = dataset.schema.names
+
+    expressions = []
+    if CONSTFIELD_TIME in fe_fields:
+        if start_timetag > 0:
+            expressions.append(ds.field(CONSTFIELD_TIME) >= start_timetag)
+
+        if end_timetag > 0:
+            expressions.append(ds.field(CONSTFIELD_TIME) <= end_timetag)
+
+    if CONSTFIELD_CODE in fe_fields and len(codes) > 0:
+        expressions.append(ds.field(CONSTFIELD_CODE).isin(codes))
+
+    expr = None
+    for e in expressions:
+        expr = e if expr is None else expr & e
+
+    scanner = dataset.scanner(columns=columns, filter=expr, batch_size=batch_size)
+    batches = (batch for batch in scanner.to_batches() if batch.num_rows > 0)
+    if count <= 0:
+        yield from batches
+        return
+
+    tail = deque()
+    num_rows = 0
+    for batch in batches:
+        tail.append(batch)
+        num_rows += batch.num_rows
+        while num_rows - tail[0].num_rows >= count:
+            num_rows -= tail.popleft().num_rows
+
+    if tail and num_rows > count:
+        tail[0] = tail[0].slice(num_rows - count)
+    yield from tail
+
+
 def _parse_fields(fields):
     if not __META_FIELDS__:
         _init_metainfos()
@@ -228,7 +300,8 @@ def _datetime_to_timetag_end(timelabel, format=''):
         elif len(timelabel) == 14:
             return dt.datetime.strptime(timelabel, format).timestamp() * 1000 + 1000 - 1
     except:
-        return 0
+        pass
+    return 0
 
 def get_tabular_fe_data(
         codes: list,
@@ -373,3 +446,75 @@ def get_tabular_fe_bson(
 
     return ret_bsons
 
+
+def iter_tabular_fe_data(
+        codes: list,
+        fields: list,
+        period: str,
+        start_time: str,
+        end_time: str,
+        count: int = -1,
+        batch_size: int = 65536,
+        **kwargs
+):
+    '''
+    分批读取表数据，参数与get_tabular_fe_data相同
+    以pyarrow.dataset扫描data.fe，只读取请求的列，按_time和_stock过滤后分批转换，
+    读取大表时内存占用只与batch_size有关（count > 0时还与count有关）
+
+    batch_size: int
+        每批的最大行数
+    return: generator
+        每次返回一个pd.DataFrame，多个表时逐表返回，每批只包含一个表请求的字段
+    '''
+    import pandas as pd
+
+    time_format = None
+    if period in ('1m', '5m', '15m', '30m', '60m', '1h'):
+        time_format = '%Y-%m-%d %H:%M:%S'
+    elif period in ('1d', '1w', '1mon', '1q', '1hy', '1y'):
+        time_format = '%Y-%m-%d'
+    elif period == '':
+        time_format = '%Y-%m-%d %H:%M:%S.%f'
+
+    if not time_format:
+        raise Exception('Unsupported period')
+
+    if not isinstance(batch_size, int) or batch_size <= 0:
+        raise Exception('Invalid batch_size')
+
+    if not isinstance(count, int) or count == 0:
+        count = -1
+
+    table_fields = _parse_fields(fields)
+
+    start_timetag = _datetime_to_timetag(start_time)
+    end_timetag = _datetime_to_timetag_end(end_time)
+
+    for table, show_fields, fe_fields in table_fields:
+        dataset = _open_tabular_feather_dataset(table)
+        if dataset is None:
+            continue
+
+        fe_table_fields = dataset.schema.names
+        ifields = [f for f in OrderedDict.fromkeys(fe_fields) if f in fe_table_fields]
+        if not ifields:
+            continue
+
+        default_null_columns = [f for f in fe_fields if f not in fe_table_fields]
+
+        rename_fields = {}
+        ordered_fields = []
+        for i in range(min(len(show_fields), len(fe_fields))):
+            show_field = f'{table}.{show_fields[i]}'
+            rename_fields[fe_fields[i]] = show_field
+            ordered_fields.append(show_field)
+
+        for batch in _iter_tabular_feather_single_ori(dataset, codes, ifields, start_timetag, end_timetag, count, batch_size):
+            fe_df = batch.to_pandas()
+            # 补充请求的字段
+            for c in default_null_columns:
+                fe_df.loc[:, c] = pd.NA
+
+            fe_df.rename(columns=rename_fields, inplace=True)
+            yield fe_df[ordered_fields]
@@ -57,7 +57,7 @@ def parse_request_from_fields(fields):
 
 
 
-def _get_tabular_data_single_ori(
+def _iter_tabular_data_single_ori(
         codes: list,
         metaid: int,
         keys: list,
@@ -67,23 +67,24 @@ def _get_tabular_data_single_ori(
         count: int = -1,
         **kwargs
 ):
+    '''
+    逐行返回单个表的数据，每行为{key: value}
+    数据文件的原始数据由客户端一次读取，解码后的数据逐行返回，不在内存中累积
+    '''
     from .. import xtbson, xtdata
     import os
     CONSTKEY_CODE = 'S'
 
-    ret_datas = []
-
     scan_whole = False
     scan_whole_filters = dict()    # 额外对全市场数据的查询 { field : [codes] }
     client = xtdata.get_client()
     def read_single():
-        nonlocal codes, metaid, int_period, scan_whole, scan_whole_filters, client, keys, ret_datas
+        nonlocal codes, metaid, int_period, scan_whole, scan_whole_filters, client, keys
         if not codes:
             scan_whole = True
             return
 
         data_path_dict = xtdata._get_data_file_path(codes, (metaid, int_period))
-        print(data_path_dict)
         for code, file_path in data_path_dict.items():
             if not file_path:
                 continue
@@ -104,12 +105,12 @@ def _get_tabular_data_single_ori(
             bson_datas = client.read_local_data(file_path, start_time, end_time, count)
 
             for data in bson_datas:
-                idata = xtbson.decode(data)
+                idata = xtbson.decode_fields(data, keys)
                 ndata = {k: idata[k] for k in keys if k in idata}
-                ret_datas.append(ndata)
+                yield ndata
 
     def read_whole():
-        nonlocal scan_whole, scan_whole_filters, metaid, int_period, client, keys, ret_datas
+        nonlocal scan_whole, scan_whole_filters, metaid, int_period, client, keys
         if not scan_whole:
             return
 
@@ -122,29 +123,64 @@ def _get_tabular_data_single_ori(
 
         bson_datas = client.read_local_data(file_path, start_time, end_time, -1)
         data_c = count
+        # 先只解码过滤字段，通过过滤的行再解码请求的字段，其余字段按长度跳过
+        filters = {k: set(v) for k, v in scan_whole_filters.items()}
+        filter_keys = list(filters.keys())
         for data in bson_datas:
-            idata = xtbson.decode(data)
+            if filters:
+                fdata = xtbson.decode_fields(data, filter_keys)
 
-            valid = True
-            for k, v in scan_whole_filters.items():
-                if idata.get(k, None) not in v:
-                    valid = False
-                    break
+                valid = True
+                for k, v in filters.items():
+                    if fdata.get(k, None) not in v:
+                        valid = False
+                        break
 
-            if not valid:
-                continue
+                if not valid:
+                    continue
 
+            idata = xtbson.decode_fields(data, keys)
             ndata = {k: idata[k] for k in keys if k in idata}
-            ret_datas.append(ndata)
+            yield ndata
 
             data_c -= 1
             if data_c == 0:
                 break
 
-    read_single()
-    read_whole()
+    yield from read_single()
+    yield from read_whole()
 
-    return ret_datas
+
+def _get_tabular_data_single_ori(
+        codes: list,
+        metaid: int,
+        keys: list,
+        int_period: int,
+        start_time: str,
+        end_time: str,
+        count: int = -1,
+        **kwargs
+):
+    return list(_iter_tabular_data_single_ori(codes, metaid, keys, int_period, start_time, end_time, count, **kwargs))
+
+
+def _tabular_dataframe(datas, keys, key2field):
+    '''
+    单个表的数据行转换为DataFrame，补充缺少的请求字段，列名改为table.field
+    '''
+    import pandas as pd
+
+    df = pd.DataFrame(datas)
+    if df.empty:
+        return df
+
+    # 补充请求的字段
+    default_null_columns = [c for c in keys if c not in df.columns]
+    for c in default_null_columns:
+        df.loc[:, c] = keys[c]
+
+    df.rename(columns=key2field, inplace=True)
+    return df
 
 
 def get_tabular_data(
@@ -181,16 +217,10 @@ def get_tabular_data(
     # 额外查询 { metaid : [codes] }
     for metaid, keys in table_field.items():
         datas = _get_tabular_data_single_ori(codes, metaid, list(keys.keys()), int_period, start_time, end_time, count)
-        df = pd.DataFrame(datas)
+        df = _tabular_dataframe(datas, keys, key2field[metaid])
         if df.empty:
             continue
 
-        # 补充请求的字段
-        default_null_columns = [c for c in keys if c not in df.columns]
-        for c in default_null_columns:
-            df.loc[:, c] = keys[c]
-
-        df.rename(columns=key2field[metaid], inplace=True)
         dfs.append(df)
 
     if not dfs:
@@ -202,6 +232,58 @@ def get_tabular_data(
     return result
 
 
+def iter_tabular_data(
+        codes: list,
+        fields: list,
+        period: str,
+        start_time: str,
+        end_time: str,
+        count: int = -1,
+        batch_size: int = 65536,
+        **kwargs
+):
+    '''
+    分批读取表数据，参数与get_tabular_data相同，读取大表时内存占用只与batch_size有关
+
+    batch_size: int
+        每批的最大行数
+    return: generator
+        每次返回一个pd.DataFrame，多个表时逐表返回，每批只包含一个表请求的字段
+    '''
+    import itertools
+
+    time_format = None
+    if period in ('1m', '5m', '15m', '30m', '60m', '1h'):
+        time_format = '%Y-%m-%d %H:%M:%S'
+    elif period in ('1d', '1w', '1mon', '1q', '1hy', '1y'):
+        time_format = '%Y-%m-%d'
+    elif period == '':
+        time_format = '%Y-%m-%d %H:%M:%S.%f'
+
+    if not time_format:
+        raise Exception('Unsupported period')
+
+    if not isinstance(batch_size, int) or batch_size <= 0:
+        raise Exception('Invalid batch_size')
+
+    int_period = __TABULAR_PERIODS__[period]
+
+    if not isinstance(count, int) or count == 0:
+        count = -1
+
+    table_field, key2field, ori_columns = parse_request_from_fields(fields)
+
+    for metaid, keys in table_field.items():
+        columns = list(key2field[metaid].values())
+        datas = _iter_tabular_data_single_ori(codes, metaid, list(keys.keys()), int_period, start_time, end_time, count)
+        while True:
+            batch = list(itertools.islice(datas, batch_size))
+            if not batch:
+                break
+
+            yield _tabular_dataframe(batch, keys, key2field[metaid])[columns]
+
+
 def get_tabular_bson_head(
         fields: list
 ):
@@ -287,7 +369,7 @@ def get_tabular_bson(
     for metaid, keysinfo in table_field.items():
         table_head = get_tabular_bson_head(fields)
         ret_bsons.append(xtbson.encode(table_head))
-        datas = _get_tabular_data_single_ori(codes, metaid, list(keysinfo.keys()), int_period, start_time, end_time, count)
+        datas = _iter_tabular_data_single_ori(codes, metaid, list(keysinfo.keys()), int_period, start_time, end_time, count)
         for d in datas:
             ret_bsons.append(xtbson.encode(d))
 
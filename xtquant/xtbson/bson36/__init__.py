@@ -1028,6 +1028,105 @@ def _decode_all_selective(data, codec_options, fields):
     ]
 
 
+# Sizes of the element types whose encoded value has a fixed length.
+_FIXED_ELEMENT_SIZES = {
+    ord(BSONNUM): 8,
+    ord(BSONUND): 0,
+    ord(BSONOID): 12,
+    ord(BSONBOO): 1,
+    ord(BSONDAT): 8,
+    ord(BSONNUL): 0,
+    ord(BSONINT): 4,
+    ord(BSONTIM): 8,
+    ord(BSONLON): 8,
+    ord(BSONDEC): 16,
+    ord(BSONMIN): 0,
+    ord(BSONMAX): 0,
+}
+
+
+def _skip_element(data, element_type, position, element_name):
+    """Return the position after an element's value without decoding it."""
+    size = _FIXED_ELEMENT_SIZES.get(element_type)
+    if size is not None:
+        return position + size
+    if element_type in (ord(BSONSTR), ord(BSONCOD), ord(BSONSYM)):
+        return position + 4 + _UNPACK_INT_FROM(data, position)[0]
+    if element_type in (ord(BSONOBJ), ord(BSONARR), ord(BSONCWS)):
+        return position + _UNPACK_INT_FROM(data, position)[0]
+    if element_type == ord(BSONBIN):
+        return position + 5 + _UNPACK_INT_FROM(data, position)[0]
+    if element_type == ord(BSONREF):
+        return position + 4 + _UNPACK_INT_FROM(data, position)[0] + 12
+    if element_type == ord(BSONRGX):
+        position = data.index(b"\x00", position) + 1
+        return data.index(b"\x00", position) + 1
+    _raise_unknown_type(element_type, element_name.decode("utf-8", "replace"))
+
+
+def decode_fields(data, fields, codec_options=None):
+    """Decode only the given top-level fields of a BSON document.
+
+    Elements whose names are not in `fields` are skipped by their encoded
+    length without being decoded, which is much cheaper than :func:`decode`
+    when only a few fields of a wide document are needed. The requested
+    fields are decoded exactly as :func:`decode` would decode them.
+
+    Decoding stops as soon as all requested fields have been found, so the
+    rest of the document is not validated. If a field name is repeated, the
+    first occurrence is returned.
+
+    :Parameters:
+      - `data`: the BSON to decode. Any bytes-like object that implements
+        the buffer protocol.
+      - `fields`: names of the top-level fields to decode.
+      - `codec_options` (optional): An instance of
+        :class:`~bson.codec_options.CodecOptions`.
+
+    :Returns:
+      - A document containing the requested fields that are present, in
+        document order.
+    """
+    opts = codec_options or DEFAULT_CODEC_OPTIONS
+    if not isinstance(opts, CodecOptions):
+        raise _CODEC_OPTIONS_TYPE_ERROR
+
+    if isinstance(data, bytearray):
+        # Element names are compared as bytes, which bytearray slices are not.
+        data = bytes(data)
+    data, view = get_data_and_view(data)
+    remaining = {field.encode("utf-8") for field in fields}
+    try:
+        _, end = _get_object_size(data, 0, len(data))
+        result = opts.document_class()
+        position = 4
+        index = data.index
+        fixed_sizes = _FIXED_ELEMENT_SIZES
+        while remaining and position < end:
+            element_type = data[position]
+            name_end = index(b"\x00", position + 1)
+            name = data[position + 1 : name_end]
+            if name in remaining:
+                key, value, position = _element_to_dict(data, view, position, end, opts)
+                result[key] = value
+                remaining.discard(name)
+                continue
+            size = fixed_sizes.get(element_type)
+            if size is None:
+                position = _skip_element(data, element_type, name_end + 1, name)
+            else:
+                position = name_end + 1 + size
+        if remaining and position != end:
+            raise InvalidBSON("bad object or element length")
+        return result
+    except InvalidBSON:
+        raise
+    except Exception:
+        # Change exception type to InvalidBSON but preserve traceback.
+        _, exc_value, exc_tb = sys.exc_info()
+        raise InvalidBSON(str(exc_value)).with_traceback(exc_tb)
+
+
 def decode_iter(data, codec_options=DEFAULT_CODEC_OPTIONS):
     """Decode BSON data to multiple documents as a generator.
 
@@ -72,6 +72,7 @@ from typing import (
     Callable,
     Dict,
     Generator,
+    Iterable,
     Iterator,
     List,
     Mapping,
@@ -114,6 +115,7 @@ from .datetime_ms import (
 )
 from .dbref import DBRef
 from .decimal128 import Decimal128
+from . import _fast_decode
 from .errors import InvalidBSON, InvalidDocument, InvalidStringData
 from .int64 import Int64
 from .max_key import MaxKey
@@ -189,6 +191,7 @@ __all__ = [
     "encode",
     "decode",
     "decode_all",
+    "decode_fields",
     "decode_iter",
     "decode_file_iter",
     "is_valid",
@@ -1053,6 +1056,12 @@ def decode(
     if not isinstance(opts, CodecOptions):
         raise _CODEC_OPTIONS_TYPE_ERROR
 
+    # Quote pushes and query results only use a few element types; decode them with the
+    # specialised pure-Python path and fall back to the generic decoder for anything else.
+    if opts is DEFAULT_CODEC_OPTIONS and not _USE_C:
+        document = _fast_decode.fast_decode(data)
+        if document is not None:
+            return document
     return _bson_to_dict(data, opts)
 
 
@@ -1122,6 +1131,117 @@ def decode_all(
     return _decode_all(data, opts)  # type: ignore[arg-type]
 
 
+# Sizes of the element types whose encoded value has a fixed length.
+_FIXED_ELEMENT_SIZES: Dict[int, int] = {
+    ord(BSONNUM): 8,
+    ord(BSONUND): 0,
+    ord(BSONOID): 12,
+    ord(BSONBOO): 1,
+    ord(BSONDAT): 8,
+    ord(BSONNUL): 0,
+    ord(BSONINT): 4,
+    ord(BSONTIM): 8,
+    ord(BSONLON): 8,
+    ord(BSONDEC): 16,
+    ord(BSONMIN): 0,
+    ord(BSONMAX): 0,
+}
+
+
+def _skip_element(data: Any, element_type: int, position: int, element_name: bytes) -> int:
+    """Return the position after an element's value without decoding it."""
+    size = _FIXED_ELEMENT_SIZES.get(element_type)
+    if size is not None:
+        return position + size
+    if element_type in (ord(BSONSTR), ord(BSONCOD), ord(BSONSYM)):
+        return position + 4 + _UNPACK_INT_FROM(data, position)[0]
+    if element_type in (ord(BSONOBJ), ord(BSONARR), ord(BSONCWS)):
+        return position + _UNPACK_INT_FROM(data, position)[0]
+    if element_type == ord(BSONBIN):
+        return position + 5 + _UNPACK_INT_FROM(data, position)[0]
+    if element_type == ord(BSONREF):
+        return position + 4 + _UNPACK_INT_FROM(data, position)[0] + 12
+    if element_type == ord(BSONRGX):
+        position = data.index(b"\x00", position) + 1
+        return data.index(b"\x00", position) + 1
+    _raise_unknown_type(element_type, element_name.decode("utf-8", "replace"))
+
+
+def decode_fields(
+    data: _ReadableBuffer,
+    fields: Iterable[str],
+    codec_options: "Optional[CodecOptions[_DocumentType]]" = None,
+) -> _DocumentType:
+    """Decode only the given top-level fields of a BSON document.
+
+    Elements whose names are not in `fields` are skipped by their encoded
+    length without being decoded, which is much cheaper than :func:`decode`
+    when only a few fields of a wide document are needed. The requested
+    fields are decoded exactly as :func:`decode` would decode them.
+
+    Decoding stops as soon as all requested fields have been found, so the
+    rest of the document is not validated. If a field name is repeated, the
+    first occurrence is returned. Documents that share an element layout,
+    such as the rows of one table, locate the requested fields with a cached
+    layout instead of walking the elements in front of them.
+
+    :Parameters:
+      - `data`: the BSON to decode. Any bytes-like object that implements
+        the buffer protocol.
+      - `fields`: names of the top-level fields to decode.
+      - `codec_options` (optional): An instance of
+        :class:`~bson.codec_options.CodecOptions`.
+
+    :Returns:
+      - A document containing the requested fields that are present, in
+        document order.
+    """
+    opts: CodecOptions = codec_options or DEFAULT_CODEC_OPTIONS
+    if not isinstance(opts, CodecOptions):
+        raise _CODEC_OPTIONS_TYPE_ERROR
+
+    if isinstance(data, bytearray):
+        # Element names are compared as bytes, which bytearray slices are not.
+        data = bytes(data)
+    data, view = get_data_and_view(data)
+    remaining = {field.encode("utf-8") for field in fields}
+    try:
+        _, end = _get_object_size(data, 0, len(data))
+        result = opts.document_class()
+        positions = _fast_decode.locate_fields(data, end, frozenset(remaining))
+        if positions is not None:
+            for position in positions:
+                key, value, _ = _element_to_dict(data, view, position, end, opts)
+                result[key] = value
+            return result
+        position = 4
+        index = data.index
+        fixed_sizes = _FIXED_ELEMENT_SIZES
+        while remaining and position < end:
+            element_type = data[position]
+            name_end = index(b"\x00", position + 1)
+            name = data[position + 1 : name_end]
+            if name in remaining:
+                key, value, position = _element_to_dict(data, view, position, end, opts)
+                result[key] = value
+                remaining.discard(name)
+                continue
+            size = fixed_sizes.get(element_type)
+            if size is None:
+                position = _skip_element(data, element_type, name_end + 1, name)
+            else:
+                position = name_end + 1 + size
+        if remaining and position != end:
+            raise InvalidBSON("bad object or element length")
+        return result
+    except InvalidBSON:
+        raise
+    except Exception:
+        # Change exception type to InvalidBSON but preserve traceback.
+        _, exc_value, exc_tb = sys.exc_info()
+        raise InvalidBSON(str(exc_value)).with_traceback(exc_tb)
+
+
 def _decode_selective(rawdoc: Any, fields: Any, codec_options: Any) -> Mapping[Any, Any]:
     if _raw_document_class(codec_options.document_class):
         # If document_class is RawBSONDocument, use vanilla dictionary for
@@ -0,0 +1,369 @@
+"""Fast decoding path for the BSON documents produced by xtquant.
+
+Quote pushes and query results are documents such as ``{code: {field: number}}`` or
+``{code: [{field: number}, ...]}``: many small sub-documents with the same layout, made of
+doubles, int32, int64, strings and short arrays of numbers.
+
+:func:`fast_decode` walks the outer document with a specialised loop that only handles those
+element types. Every sub-document whose byte layout (element types, names and string lengths)
+has been seen before is decoded with a single precompiled :class:`struct.Struct` call: the
+non-value bytes are compared against the recorded layout and the result is built by a generated
+function. Layouts are learned the second time a sub-document of a given size appears.
+
+The result is identical to :func:`bson.decode` with the default codec options. Anything outside
+the supported subset (other element types, DBRef documents, invalid data) makes
+:func:`fast_decode` return ``None`` and the caller falls back to the generic decoder, which also
+produces the usual errors.
+
+:func:`locate_fields` serves :func:`bson.decode_fields` the same way for wide table rows: the
+element types, names and length prefixes in front of the requested fields are checked with one
+:class:`struct.Struct` call against a recorded layout, so the positions of the requested elements
+are known without walking the elements in between.
+"""
+
+import struct
+from operator import itemgetter
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .int64 import Int64
+
+_UNPACK_FLOAT_FROM = struct.Struct("<d").unpack_from
+_UNPACK_INT_FROM = struct.Struct("<i").unpack_from
+_UNPACK_LONG_FROM = struct.Struct("<q").unpack_from
+
+_DOUBLE = 0x01
+_STRING = 0x02
+_OBJECT = 0x03
+_ARRAY = 0x04
+_BOOLEAN = 0x08
+_NULL = 0x0A
+_INT32 = 0x10
+_INT64 = 0x12
+
+_BOOLEANS = {0: False, 1: True}
+
+# Layout cache: (element type, document size) -> list of _Layout. Sizes seen once are kept in
+# _SEEN so that one-off documents do not pay for compiling a layout.
+_MAX_LAYOUTS = 4096
+_MAX_LAYOUTS_PER_SIZE = 8
+_LAYOUTS: Dict[Tuple[int, int], List["_Layout"]] = {}
+_SEEN: Dict[Tuple[int, int], bool] = {}
+
+
+class _Fallback(Exception):
+    """Raised internally when the data is outside the supported subset."""
+
+
+class _Layout:
+    """Precompiled decoder for sub-documents with one fixed byte layout."""
+
+    __slots__ = ("unpack_from", "skeleton", "expected", "build")
+
+    def __init__(self, fmt: str, skeleton_index: List[int], expected: List[bytes], source: str) -> None:
+        self.unpack_from = struct.Struct(fmt).unpack_from
+        self.skeleton = itemgetter(*skeleton_index)
+        self.expected = tuple(expected)
+        namespace = {"Int64": Int64, "_BOOLEANS": _BOOLEANS}
+        exec(source, namespace)
+        self.build = namespace["build"]
+
+
+def _compile_layout(data: bytes, position: int, is_array: bool) -> Optional[_Layout]:
+    """Record the layout of the (sub-)document at ``position``.
+
+    Returns ``None`` when the document contains elements whose size or value cannot be expressed
+    as a fixed struct format.
+    """
+    fmt = ["<"]
+    skeleton_index: List[int] = []
+    expected: List[bytes] = []
+    pending = bytearray()
+    item = 0
+
+    def flush() -> None:
+        nonlocal item
+        if pending:
+            fmt.append("%ds" % len(pending))
+            skeleton_index.append(item)
+            expected.append(bytes(pending))
+            pending.clear()
+            item += 1
+
+    def value(code: str) -> int:
+        nonlocal item
+        flush()
+        fmt.append(code)
+        item += 1
+        return item - 1
+
+    def walk(position: int, is_array: bool) -> Tuple[str, int]:
+        size = _UNPACK_INT_FROM(data, position)[0]
+        end = position + size - 1
+        pending.extend(data[position : position + 4])
+        position += 4
+        parts = []
+        while position < end:
+            element_type = data[position]
+            name_end = data.index(b"\x00", position + 1)
+            name = data[position + 1 : name_end].decode()
+            if not is_array and name == "$ref":
+                return "", -1
+            pending.extend(data[position : name_end + 1])
+            position = name_end + 1
+            if element_type == _DOUBLE:
+                expr = "v[%d]" % value("d")
+                position += 8
+            elif element_type == _INT32:
+                expr = "v[%d]" % value("i")
+                position += 4
+            elif element_type == _INT64:
+                expr = "Int64(v[%d])" % value("q")
+                position += 8
+            elif element_type == _STRING:
+                length = _UNPACK_INT_FROM(data, position)[0]
+                pending.extend(data[position : position + 4])
+                expr = "v[%d].decode()" % value("%ds" % (length - 1))
+                pending.append(0)
+                position += 4 + length
+            elif element_type == _BOOLEAN:
+                expr = "_BOOLEANS[v[%d]]" % value("B")
+                position += 1
+            elif element_type == _NULL:
+                expr = "None"
+            elif element_type in (_OBJECT, _ARRAY):
+                expr, position = walk(position, element_type == _ARRAY)
+                if position < 0:
+                    return "", -1
+            else:
+                return "", -1
+            parts.append(expr if is_array else "%r: %s" % (name, expr))
+        pending.append(0)
+        if is_array:
+            return "[%s]" % ", ".join(parts), end + 1
+        return "{%s}" % ", ".join(parts), end + 1
+
+    expr, end = walk(position, is_array)
+    if end < 0:
+        return None
+    flush()
+    if len(skeleton_index) < 2:
+        return None
+    return _Layout("".join(fmt), skeleton_index, expected, "def build(v):\n    return %s\n" % expr)
+
+
+def _decode_layout(data: bytes, position: int, element_type: int) -> Tuple[Any, int]:
+    """Decode the sub-document or array at ``position``, using a cached layout when one matches."""
+    size = _UNPACK_INT_FROM(data, position)[0]
+    key = (element_type, size)
+    layouts = _LAYOUTS.get(key)
+    if layouts:
+        for layout in layouts:
+            try:
+                values = layout.unpack_from(data, position)
+            except struct.error:
+                raise _Fallback()
+            if layout.skeleton(values) == layout.expected:
+                try:
+                    return layout.build(values), position + size
+                except (KeyError, UnicodeDecodeError):
+                    raise _Fallback()
+
+    result, end = _decode_document(data, position, element_type == _ARRAY)
+    if layouts is None:
+        if _SEEN.pop(key, False):
+            # Second time this size is seen: compile its layout. An empty list marks a layout
+            # that cannot be compiled, so it is not tried again.
+            layout = _compile_layout(data, position, element_type == _ARRAY)
+            if len(_LAYOUTS) >= _MAX_LAYOUTS:
+                _LAYOUTS.clear()
+            _LAYOUTS[key] = [layout] if layout is not None else []
+        else:
+            if len(_SEEN) >= _MAX_LAYOUTS:
+                _SEEN.clear()
+            _SEEN[key] = True
+    elif layouts and len(layouts) < _MAX_LAYOUTS_PER_SIZE:
+        # Same size as a known layout but different element names or types.
+        layout = _compile_layout(data, position, element_type == _ARRAY)
+        if layout is not None:
+            layouts.append(layout)
+    return result, end
+
+
+def _decode_document(data: bytes, position: int, is_array: bool) -> Tuple[Any, int]:
+    """Decode the document or array at ``position`` element by element."""
+    size = _UNPACK_INT_FROM(data, position)[0]
+    end = position + size - 1
+    if size < 5 or end >= len(data) or data[end] != 0:
+        raise _Fallback()
+    position += 4
+    index = data.index
+    result: Any = [] if is_array else {}
+    append = result.append if is_array else None
+    while position < end:
+        element_type = data[position]
+        name_end = index(b"\x00", position + 1)
+        if not is_array:
+            name = data[position + 1 : name_end].decode()
+        position = name_end + 1
+        if element_type == _DOUBLE:
+            value = _UNPACK_FLOAT_FROM(data, position)[0]
+            position += 8
+        elif element_type == _INT32:
+            value = _UNPACK_INT_FROM(data, position)[0]
+            position += 4
+        elif element_type == _INT64:
+            value = Int64(_UNPACK_LONG_FROM(data, position)[0])
+            position += 8
+        elif element_type == _STRING:
+            length = _UNPACK_INT_FROM(data, position)[0]
+            if length < 1 or data[position + 3 + length] != 0:
+                raise _Fallback()
+            value = data[position + 4 : position + 3 + length].decode()
+            position += 4 + length
+        elif element_type == _OBJECT or element_type == _ARRAY:
+            value, position = _decode_layout(data, position, element_type)
+            if element_type == _OBJECT and "$ref" in value:
+                raise _Fallback()
+        elif element_type == _BOOLEAN:
+            value = _BOOLEANS.get(data[position])
+            if value is None:
+                raise _Fallback()
+            position += 1
+        elif element_type == _NULL:
+            value = None
+        else:
+            raise _Fallback()
+        if is_array:
+            append(value)
+        else:
+            result[name] = value
+    if position != end:
+        raise _Fallback()
+    return result, end + 1
+
+
+def fast_decode(data: Any) -> Optional[Dict[str, Any]]:
+    """Decode a BSON document produced by xtquant.
+
+    Returns ``None`` when the data is outside the supported subset; the caller should then use
+    the generic decoder.
+    """
+    if not isinstance(data, bytes):
+        if isinstance(data, bytearray):
+            data = bytes(data)
+        else:
+            data = memoryview(data).tobytes()
+    try:
+        result, end = _decode_document(data, 0, False)
+    except (_Fallback, struct.error, IndexError, ValueError):
+        return None
+    if end != len(data):
+        return None
+    return result
+
+
+# Element types skipped by locate_fields: fixed value sizes, and the types whose value starts with
+# an int32 length (value size is the length plus the given extra bytes).
+_FIXED_SIZES = {0x01: 8, 0x06: 0, 0x07: 12, 0x08: 1, 0x09: 8, 0x0A: 0, 0x10: 4, 0x11: 8, 0x12: 8,
+                0x13: 16, 0xFF: 0, 0x7F: 0}
+_LENGTH_PREFIXED = {0x02: 4, 0x0D: 4, 0x0E: 4, 0x03: 0, 0x04: 0, 0x0F: 0, 0x05: 5}
+
+# Field layout cache: requested names -> list of (unpack_from, expected skeleton, stop, positions),
+# where stop is the end of the last skeleton bytes in front of the document terminator. Rows of a
+# table usually share one layout; a few more are kept for variable-length values.
+_MAX_FIELD_LAYOUTS = 8
+_FIELD_LAYOUTS: Dict[FrozenSet[bytes], List[Tuple[Any, Tuple[bytes, ...], int, List[int]]]] = {}
+
+
+def _compile_field_layout(
+    data: bytes, end: int, names: FrozenSet[bytes]
+) -> Optional[Tuple[Any, Tuple[bytes, ...], int, List[int]]]:
+    """Record the layout of the elements up to the last requested one.
+
+    The skeleton holds every element's type and name and the length prefix of variable-size
+    values; the values themselves are struct pad bytes. When a requested name is missing the
+    layout covers the whole document including its size, so that the absence is also checked.
+    """
+    fmt: List[str] = []
+    expected: List[bytes] = []
+    positions: List[int] = []
+    remaining = set(names)
+    position = 4
+    stop = 4
+    skip = 0
+
+    def mark(start: int, end: int) -> None:
+        nonlocal skip, stop
+        if skip:
+            fmt.append("%dx" % skip)
+            skip = 0
+        fmt.append("%ds" % (end - start))
+        expected.append(data[start:end])
+        stop = end
+
+    while remaining and position < end:
+        start = position
+        element_type = data[position]
+        position = data.index(b"\x00", position + 1) + 1
+        name = data[start + 1 : position - 1]
+        if name in remaining:
+            remaining.discard(name)
+            positions.append(start)
+            if not remaining:
+                mark(start, position)
+                break
+        size = _FIXED_SIZES.get(element_type)
+        if size is None:
+            extra = _LENGTH_PREFIXED.get(element_type)
+            if extra is None:
+                return None
+            mark(start, position + 4)
+            size = _UNPACK_INT_FROM(data, position)[0] + extra
+            skip = size - 4
+        else:
+            mark(start, position)
+            skip = size
+        position += size
+
+    header = "4x"
+    if remaining:
+        if position != end:
+            return None
+        header = "4s"
+        expected.insert(0, data[:4])
+        mark(end, end + 1)
+        stop = end
+    return struct.Struct("<" + header + "".join(fmt)).unpack_from, tuple(expected), stop, positions
+
+
+def locate_fields(data: bytes, end: int, names: FrozenSet[bytes]) -> Optional[List[int]]:
+    """Return the positions of the requested top-level elements, in document order.
+
+    ``end`` is the position of the document's terminating null byte. Returns ``None`` when the
+    document's layout is not known and cannot be recorded; the caller then walks the elements.
+    """
+    layouts = _FIELD_LAYOUTS.get(names)
+    if layouts is None:
+        if len(_FIELD_LAYOUTS) >= _MAX_LAYOUTS:
+            _FIELD_LAYOUTS.clear()
+        layouts = _FIELD_LAYOUTS[names] = []
+    for unpack_from, expected, stop, positions in layouts:
+        if stop > end:
+            continue
+        try:
+            if unpack_from(data) == expected:
+                return positions
+        except struct.error:
+            continue
+    try:
+        layout = _compile_field_layout(data, end, names)
+    except (struct.error, IndexError, ValueError):
+        return None
+    if layout is None:
+        return None
+    if len(layouts) >= _MAX_FIELD_LAYOUTS:
+        # Keep the most recent layouts: a later table read with the same fields replaces the
+        # layouts of earlier ones.
+        del layouts[0]
+    layouts.append(layout)
+    return layout[3]
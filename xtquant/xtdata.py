@@ -7,6 +7,7 @@ import traceback as _TRACEBACK_
 from . import xtbson as _BSON_
 from .metatable import *
 from .metatable import get_tabular_data as _get_tabular_data
+from .metatable import iter_tabular_data as _iter_tabular_data
 
 
 __all__ = [
@@ -540,17 +541,43 @@ def get_market_data_ex(
     field_list = [], stock_list = [], period = '1d'
     , start_time = '', end_time = '', count = -1
     , dividend_type = 'none', fill_data = True
+    , raw_time = False, result_type = 'pandas'
 ):
+    '''
+    :param raw_time: (bool)为True时各DataFrame的index直接使用time字段的毫秒时间戳，不转换成日期时间字符串
+    :param result_type: (str)返回结果的类型
+        'pandas': {stock1 : DataFrame, stock2 : DataFrame, ...}
+        'numpy': 只支持K线周期，返回(index, data)，结构与get_market_data_ori相同，不逐只股票创建DataFrame
+            index: [stock_list, time_list]，raw_time为True时time_list为毫秒时间戳
+            data: {field1 : value1, field2 : value2, ...}，value为(股票数, 时间数)的np.ndarray
+            各股票时间不一致时按时间并集对齐，缺失位置为NaN
+        'arrow': 只支持K线和分笔周期，返回客户端读取的pyarrow.Table，不转换成pandas
+    '''
+    if result_type not in ('pandas', 'numpy', 'arrow'):
+        raise Exception(f'不支持的result_type:{result_type}')
+
     if period == 'hkbrokerqueue' or period == 'hkbrokerqueue2' or period == (1820, 0):
         showbrokename = period == 'hkbrokerqueue2'
         return get_broker_queue_data(stock_list, start_time, end_time, count, showbrokename)
 
     spec_period, meta_id, period_num = _validate_period(period)
+    is_kline = meta_id <= 0 and spec_period in {'1m', '5m', '15m', '30m', '60m', '1h', '1d', '1w', '1mon', '1q', '1hy', '1y'}
+
+    if result_type == 'numpy':
+        if not is_kline:
+            raise Exception(f'result_type为numpy时只支持K线周期:{period}')
+        return _get_market_data_ex_numpy_221207(field_list, stock_list, spec_period, start_time, end_time, count, dividend_type, fill_data, raw_time = raw_time)
+
+    if result_type == 'arrow':
+        if not is_kline and not (meta_id <= 0 and spec_period == 'tick'):
+            raise Exception(f'result_type为arrow时只支持K线和分笔周期:{period}')
+        return _get_market_data_ex_arrow_250414(field_list, stock_list, spec_period, start_time, end_time, count, dividend_type, fill_data)
+
     if meta_id > 0:
         return _get_market_data_ex_tuple_period(field_list, stock_list, (meta_id, period_num), start_time, end_time, count, dividend_type, fill_data)
 
-    if spec_period in {'1m', '5m', '15m', '30m', '60m', '1h', '1d', '1w', '1mon', '1q', '1hy', '1y'}:
-        return _get_market_data_ex_ori_221207(field_list, stock_list, spec_period, start_time, end_time, count, dividend_type, fill_data)
+    if is_kline:
+        return _get_market_data_ex_ori_221207(field_list, stock_list, spec_period, start_time, end_time, count, dividend_type, fill_data, raw_time = raw_time)
 
     import pandas as pd
     result = {}
@@ -569,7 +596,7 @@ def get_market_data_ex(
         for s in ori_data:
             sdata = pd.DataFrame(ori_data[s], columns = fl2)
             sdata2 = sdata[fl]
-            sdata2.index = [timetag_to_datetime(t, stime_fmt) for t in sdata[ifield]]
+            sdata2.index = _time_index(sdata[ifield], stime_fmt, raw_time)
             result[s] = sdata2
     else:
         needconvert, metaid  = _needconvert_period(spec_period)
@@ -587,25 +614,29 @@ def get_market_data_ex(
 
                 sdata = pd.DataFrame(odata)
                 if ifield in sdata.columns:
-                    sdata.index = [timetag_to_datetime(t, stime_fmt) for t in sdata[ifield]]
+                    sdata.index = _time_index(sdata[ifield], stime_fmt, raw_time)
                 result[s] = sdata
         else:
             for s in ori_data:
                 sdata = pd.DataFrame(ori_data[s])
-                sdata.index = [timetag_to_datetime(t, stime_fmt) for t in sdata[ifield]]
+                sdata.index = _time_index(sdata[ifield], stime_fmt, raw_time)
                 result[s] = sdata
 
     return result
 
 
-def _get_market_data_ex_ori_221207(
+def _read_market_data_v4(
     field_list = [], stock_list = [], period = '1d'
     , start_time = '', end_time = '', count = -1
     , dividend_type = 'none', fill_data = True, enable_read_from_server = True
-    , data_dir = None
+    , data_dir = None, raw_time = False
 ):
+    '''
+    按v4格式读取K线数据，各字段由客户端返回的缓冲区直接构造np.ndarray，不复制
+    :return: list [(stock, index, {field : np.ndarray}), ...]
+        raw_time为True时index为time字段的毫秒时间戳，time不在field_list中时不返回time字段
+    '''
     import numpy as np
-    import pandas as pd
     import datetime as dt
 
     client = get_client()
@@ -620,14 +651,89 @@ def _get_market_data_ex_ori_221207(
     if isinstance(end_time, dt.datetime):
         end_time = int(end_time.timestamp() * 1000)
 
-    ret = client.get_market_data3(field_list, stock_list, period, start_time, end_time, count, dividend_type, fill_data, 'v4', enable_read_from_local,
+    ifield = 'time'
+    query_field_list = field_list
+    if raw_time and field_list and ifield not in field_list:
+        query_field_list = [ifield] + field_list
+
+    ret = client.get_market_data3(query_field_list, stock_list, period, start_time, end_time, count, dividend_type, fill_data, 'v4', enable_read_from_local,
                                   enable_read_from_server, debug_mode, data_dir)
-    result = {}
+    result = []
     for stock, index, npdatas in ret:
         data = {field: np.frombuffer(b, fi) for field, fi, b in npdatas}
+        if raw_time and ifield in data:
+            index = data[ifield] if query_field_list is field_list else data.pop(ifield)
+        result.append((stock, index, data))
+    return result
+
+
+def _get_market_data_ex_ori_221207(
+    field_list = [], stock_list = [], period = '1d'
+    , start_time = '', end_time = '', count = -1
+    , dividend_type = 'none', fill_data = True, enable_read_from_server = True
+    , data_dir = None, raw_time = False
+):
+    import pandas as pd
+
+    ret = _read_market_data_v4(field_list, stock_list, period, start_time, end_time, count, dividend_type, fill_data, enable_read_from_server,
+                               data_dir, raw_time)
+    result = {}
+    for stock, index, data in ret:
         result[stock] = pd.DataFrame(data=data, index=index)
     return result
 
+
+def _get_market_data_ex_numpy_221207(
+    field_list = [], stock_list = [], period = '1d'
+    , start_time = '', end_time = '', count = -1
+    , dividend_type = 'none', fill_data = True, enable_read_from_server = True
+    , data_dir = None, raw_time = False
+):
+    '''
+    与_get_market_data_ex_ori_221207读取相同的数据，各字段按股票拼成二维数组，不逐只股票创建DataFrame
+    :return: (index, data)
+        index: [stock_list, time_list]
+        data: {field : np.ndarray}，shape为(len(stock_list), len(time_list))
+    '''
+    import numpy as np
+
+    ret = _read_market_data_v4(field_list, stock_list, period, start_time, end_time, count, dividend_type, fill_data, enable_read_from_server,
+                               data_dir, raw_time)
+    if not ret:
+        return [[], []], {}
+
+    stocks = [stock for stock, index, data in ret]
+    indexes = [index for stock, index, data in ret]
+    fields = {field: [data[field] for stock, index, data in ret] for field in ret[0][2]}
+
+    first = indexes[0]
+    if isinstance(first, np.ndarray):
+        aligned = all(len(index) == len(first) and np.array_equal(index, first) for index in indexes[1:])
+    else:
+        first = list(first)
+        aligned = all(list(index) == first for index in indexes[1:])
+    if aligned:
+        data = {field: np.array(values) for field, values in fields.items()}
+        return [stocks, first.tolist() if isinstance(first, np.ndarray) else first], data
+
+    # 各股票时间不一致（如停牌、上市时间不同）时按时间并集对齐，缺失位置为NaN
+    if isinstance(first, np.ndarray):
+        times = np.unique(np.concatenate(indexes))
+        positions = [np.searchsorted(times, index) for index in indexes]
+    else:
+        times = sorted(set().union(*indexes))
+        where = {t: i for i, t in enumerate(times)}
+        positions = [np.array([where[t] for t in index], dtype = 'int64') for index in indexes]
+    # 包含全部时间的股票整行赋值
+    positions = [slice(None) if len(pos) == len(times) else pos for pos in positions]
+    data = {}
+    for field, values in fields.items():
+        array = np.full((len(stocks), len(times)), np.nan, dtype = np.result_type(values[0].dtype, np.float64))
+        for row, (pos, value) in enumerate(zip(positions, values)):
+            array[row, pos] = value
+        data[field] = array
+    return [stocks, times.tolist() if isinstance(times, np.ndarray) else times], data
+
 def _get_market_data_ex_221207(
     field_list = [], stock_list = [], period = '1d'
     , start_time = '', end_time = '', count = -1
@@ -665,7 +771,7 @@ def _get_market_data_ex_221207(
 get_market_data3 = _get_market_data_ex_221207
 
 
-def _get_market_data_ex_250414(
+def _get_market_data_ex_arrow_250414(
     field_list = [], stock_list = [], period = '1d'
     , start_time = '', end_time = '', count = -1
     , dividend_type = 'none', fill_data = True, enable_read_from_server = True
@@ -692,7 +798,21 @@ def _get_market_data_ex_250414(
     )
 
     import pyarrow as pa
-    result = pa.ipc.open_stream(result).read_all().to_pandas()
+    return pa.ipc.open_stream(result).read_all()
+
+
+def _get_market_data_ex_250414(
+    field_list = [], stock_list = [], period = '1d'
+    , start_time = '', end_time = '', count = -1
+    , dividend_type = 'none', fill_data = True, enable_read_from_server = True
+    , data_dir = None
+):
+    result = _get_market_data_ex_arrow_250414(
+        field_list, stock_list, period
+        , start_time, end_time, count
+        , dividend_type, fill_data, enable_read_from_server
+        , data_dir
+    ).to_pandas()
 
     import pandas as pd
     result.index = pd.to_datetime(result['time'] + 28800000, unit = 'ms')
@@ -873,13 +993,13 @@ def _get_market_data_ex_tuple_period(
 
 
 def get_local_data(field_list=[], stock_list=[], period='1d', start_time='', end_time='', count=-1,
-                              dividend_type='none', fill_data=True, data_dir=None):
+                              dividend_type='none', fill_data=True, data_dir=None, raw_time=False):
     if data_dir == None:
         data_dir = get_data_dir()
 
     if period in {'1m', '5m', '15m', '30m', '60m', '1h', '1d', '1w', '1mon', '1q', '1hy', '1y'}:
         return _get_market_data_ex_ori_221207(field_list, stock_list, period, start_time, end_time, count,
-                                              dividend_type, fill_data, False, data_dir)
+                                              dividend_type, fill_data, False, data_dir, raw_time)
 
     import pandas as pd
     result = {}
@@ -899,12 +1019,12 @@ def get_local_data(field_list=[], stock_list=[], period='1d', start_time='', end
         for s in ori_data:
             sdata = pd.DataFrame(ori_data[s], columns = fl2)
             sdata2 = sdata[fl]
-            sdata2.index = [timetag_to_datetime(t, stime_fmt) for t in sdata[ifield]]
+            sdata2.index = _time_index(sdata[ifield], stime_fmt, raw_time)
             result[s] = sdata2
     else:
         for s in ori_data:
             sdata = pd.DataFrame(ori_data[s])
-            sdata.index = [timetag_to_datetime(t, stime_fmt) for t in sdata[ifield]]
+            sdata.index = _time_index(sdata[ifield], stime_fmt, raw_time)
             result[s] = sdata
 
     return result
@@ -1121,6 +1241,89 @@ def timetagToDateTime(timetag, format):
     return _TIME_.strftime(format, time_local)
 
 
+def _timetags_to_datetime_list(timetags, format):
+    '''
+    将毫秒时间序列批量转换成日期时间字符串，结果与逐个调用timetag_to_datetime相同
+    整个序列一次完成换算，不再逐个调用localtime和strftime
+    :param timetags: 毫秒时间戳序列，无法转换的值对应None
+    :param format: (str)时间格式
+    :return: list
+    '''
+    import numpy as np
+    import pandas as pd
+
+    ms = np.asarray(timetags)
+    if ms.size == 0:
+        return []
+    if ms.dtype.kind not in 'iuf':
+        return [timetag_to_datetime(t, format) for t in ms]
+
+    if ms.dtype.kind == 'f':
+        valid = np.isfinite(ms)
+        seconds = np.floor(ms[valid] / 1000).astype('int64')
+    else:
+        valid = None
+        seconds = ms.astype('int64') // 1000
+
+    if seconds.size == 0:
+        return [None] * ms.size
+
+    # 本地时区偏移按15分钟分段取值，夏令时切换都发生在分段起点，每段只调用一次localtime
+    # 时间跨度较短时（如几天的分笔数据）直接按分段建表，否则只对出现过的分段取值
+    bucket = seconds // 900
+    first = int(bucket.min())
+    span = int(bucket.max()) - first + 1
+    if span <= 4096:
+        buckets, inverse = np.arange(first, first + span), bucket - first
+    else:
+        buckets, inverse = np.unique(bucket, return_inverse = True)
+    try:
+        offsets = np.array([_TIME_.localtime(int(b) * 900).tm_gmtoff for b in buckets], dtype = 'int64')
+    except (OverflowError, OSError, ValueError):
+        return [timetag_to_datetime(t, format) for t in ms]
+
+    local = (seconds + offsets[inverse]).astype('datetime64[s]')
+    if format in ('%Y%m%d', '%Y%m%d%H%M%S') and seconds.min() >= 0:
+        months = local.astype('datetime64[M]')
+        days = local.astype('datetime64[D]')
+        number = (
+            (local.astype('datetime64[Y]').astype('int64') + 1970) * 10000
+            + (months.astype('int64') % 12 + 1) * 100
+            + (days - months.astype('datetime64[D]')).astype('int64') + 1
+        )
+        if format == '%Y%m%d%H%M%S':
+            second_of_day = (local - days).astype('int64')
+            number = (
+                number * 1000000
+                + second_of_day // 3600 * 10000
+                + second_of_day // 60 % 60 * 100
+                + second_of_day % 60
+            )
+        strs = list(map(str, number.tolist()))
+    else:
+        strs = pd.DatetimeIndex(local).strftime(format).tolist()
+
+    if valid is None:
+        return strs
+
+    result = np.full(ms.size, None, dtype = object)
+    result[valid] = strs
+    return result.tolist()
+
+
+def _time_index(timetags, format, raw_time = False):
+    '''
+    生成get_market_data_ex等接口返回的DataFrame的index
+    :param timetags: time字段的毫秒时间戳序列
+    :param format: (str)时间格式
+    :param raw_time: (bool)为True时直接返回毫秒时间戳，不做转换
+    '''
+    if raw_time:
+        import pandas as pd
+        return pd.Index(timetags)
+    return _timetags_to_datetime_list(timetags, format)
+
+
 def get_trading_dates(market, start_time='', end_time='', count=-1):
     '''
     根据市场获取交易日列表
@@ -4112,7 +4315,29 @@ def get_tabular_data(
         return _get_market_data_ex_250414(field_list, stock_list, period, start_time, end_time, count, dividend_type, fill_data)
 
     return _get_tabular_data(stock_list, field_list, period, start_time, end_time, count, dividend_type=dividend_type, fill_data=fill_data)
-    
+
+
+def iter_tabular_data(
+    field_list = [], stock_list = [], period = ''
+    , start_time = '', end_time = '', count = -1
+    , batch_size = 65536
+):
+    '''
+    分批获取表数据，与get_tabular_data相同但不一次读取全部数据，适用于财务、公告等大表
+    :param field_list: 字段列表，"表名"为整个表，"表名.字段名"为单个字段
+    :param stock_list: 股票代码列表，[]为全部
+    :param period: 周期，不支持K线周期，K线请使用get_tabular_data或get_market_data_ex
+    :param start_time: 起始时间 "20200101" "20200101093000"
+    :param end_time: 结束时间 "20201231" "20201231150000"
+    :param count: 数量 -1全部/n: 过滤后的最后n条
+    :param batch_size: 每批的最大行数
+    :return: generator 每次返回一个pd.DataFrame，多个表时逐表返回，每批只包含一个表请求的字段
+    '''
+    if period in {'1m', '5m', '15m', '30m', '60m', '1h', '1d', '1w', '1mon', '1q', '1hy', '1y'}:
+        raise Exception('iter_tabular_data不支持K线周期，请使用get_tabular_data')
+
+    return _iter_tabular_data(stock_list, field_list, period, start_time, end_time, count, batch_size)
+
 def get_order_rank(code, order_time, order_type, order_price, order_volume, order_left_volume):
     '''
     获取委托在千档队列中的排名, 需要订阅千档数据，并且数据源为本地计算的千档数据